@@ -13,13 +13,56 @@ Ejecuta los pasos en orden:
 Uso:
   python run_pipeline.py              # pipeline completo
   python run_pipeline.py --from dwh   # desde el paso dwh en adelante
+  python run_pipeline.py --only dwh --motor duckdb   # DWH local sobre data/
+  python run_pipeline.py --sin-cache  # ejecutar todos los pasos aunque no cambien sus entradas
+  python run_pipeline.py --encadenado # generate → upload → load_raw por distribuidor, solapados
+  python run_pipeline.py --profile    # perfil de CPU, memoria e I/O por paso en data/profiles/
+  python run_pipeline.py --metricas   # métricas OpenMetrics y trazas OTLP en data/metrics/
+  python run_pipeline.py --shard 2/4  # generate, upload y load_raw de un shard de distribuidores
+
+Con LOAD_RAW_ORIGEN = "local" load_raw carga los archivos de data/ directo
+en BigQuery y el paso upload se omite.
+
+Cada paso declara sus entradas (ENTRADAS); si su huella coincide con la de
+su última corrida exitosa, el paso se omite (ver src/common/cache_pasos.py).
 """
 
 import argparse
+import contextvars
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
 
+from src.common import metricas
+from src.common.cache_pasos import Entradas, EstadoPasos, calcular_huella, salidas_presentes
 from src.common.logger import get_logger
+from src.common.perfilado import Perfilador
+from src.common.run_context import get_run_id
+from src.common.shards import SeleccionDistribuidores, agregar_argumentos, desde_argumentos
+from src.config import (
+    BUCKET_NAME,
+    CONTROL_TABLE,
+    DUCKDB_PATH,
+    GCS_BASE_PATH,
+    INFRA_DATASET,
+    JOB_STATS_TABLE,
+    LOAD_RAW_ORIGEN,
+    LOCAL_DATA_PATH,
+    METRICAS_HABILITADAS,
+    PIPELINE_CACHE,
+    PIPELINE_CACHE_PATH,
+    PIPELINE_COLA_MAX,
+    PIPELINE_ENCADENADO,
+    PARTICIONES_RAW,
+    RAW_ARCHIVO_DATASET,
+    RAW_DATASET,
+    SQL_ENGINE,
+    TABLAS_RAW,
+    WATERMARKS_TABLE,
+)
 
 logger = get_logger("pipeline")
 
@@ -33,8 +76,92 @@ STEPS = [
     "datamarts",
 ]
 
+# Pasos que admiten --distribuidores / --shard
+PASOS_POR_DISTRIBUIDOR = ["generate", "upload", "load_raw"]
+
+# Pasos que el modo encadenado ejecuta como una cadena por distribuidor
+PASOS_ENCADENADOS = ["generate", "upload", "setup_datasets", "setup_infra", "load_raw"]
+
+ARCHIVOS_LOCALES = ["data/Archivos_*/*/*.csv", "data/Archivos_*/*/*.parquet"]
+
+TABLA_CONTROL = f"{INFRA_DATASET}.{CONTROL_TABLE}"
+
+ENTRADAS = {
+    "generate": Entradas(
+        archivos=["src/generate_data/generate_data.py"],
+        salidas=["data/Archivos_VentaClientes", "data/Archivos_Stock", "data/Archivos_Maestro"],
+    ),
+    "upload": Entradas(
+        archivos=["src/upload_to_gcs/upload_to_gcs.py", "src/common/manifiesto.py", *ARCHIVOS_LOCALES],
+        config=["BUCKET_NAME", "GCS_BASE_PATH"],
+    ),
+    "setup_datasets": Entradas(
+        archivos=["src/load_raw_to_bq/setup_datasets.py"],
+        config=["LOCATION", "PARTICIONES_RAW", "RAW_DATASET"],
+        # Un dataset o una tabla borrados se vuelven a crear
+        existen=[
+            RAW_DATASET, RAW_ARCHIVO_DATASET, "dwh", "datamarts",
+            *[f"{RAW_DATASET}.{t}" for t in TABLAS_RAW],
+            *[f"{RAW_ARCHIVO_DATASET}.{t}" for t in PARTICIONES_RAW],
+        ],
+    ),
+    "setup_infra": Entradas(
+        archivos=["src/load_raw_to_bq/setup_infra_control.py"],
+        config=["LOCATION", "INFRA_DATASET", "CONTROL_TABLE", "JOB_STATS_TABLE", "WATERMARKS_TABLE"],
+        existen=[
+            INFRA_DATASET,
+            *[f"{INFRA_DATASET}.{t}" for t in (CONTROL_TABLE, JOB_STATS_TABLE, WATERMARKS_TABLE)],
+        ],
+    ),
+    "load_raw": Entradas(
+        archivos=["src/load_raw_to_bq/load_raw.py", "src/load_raw_to_bq/maestro_cdc.py", "src/common/manifiesto.py"],
+        prefijos_gcs=[f"{GCS_BASE_PATH}/"],
+        config=["BUCKET_NAME", "RAW_DATASET", "TABLAS_RAW", "MAESTRO_CDC", "MAESTRO_CAMBIOS_TABLE", "LOAD_RAW_ORIGEN"],
+        # La tabla de control decide qué se carga: si se borran registros, se recargan
+        tablas=[TABLA_CONTROL],
+    ),
+    "dwh": Entradas(
+        archivos=["src/dwh/run_dwh.py", "sql/dwh/*.sql", "sql/dwh/*/*.sql"],
+        config=["SQL_DWH_ORDER", "DWH_MODO_EJECUCION", "DWH_SCRIPT_TRANSACCION", "GEOHASH_PRECISION"],
+        tablas=["raw.ventas", "raw.stock", "raw.maestro", "raw.maestro_cambios"],
+    ),
+    "datamarts": Entradas(
+        archivos=[
+            "src/datamarts/run_datamarts.py", "src/datamarts/cobertura.py",
+            "sql/datamarts/*.sql", "sql/datamarts/*/*.sql",
+        ],
+        config=["SQL_DATAMARTS_ORDER", "SQL_ROLLUPS_ORDER", "DATAMARTS_MODO", "DATAMARTS_ROLLUPS", "DATAMARTS_COBERTURA"],
+        tablas=[
+            "dwh.dim_fecha", "dwh.dim_cliente", "dwh.dim_producto", "dwh.dim_sucursal",
+            "dwh.fact_ventas", "dwh.fact_stock",
+        ],
+    ),
+}
+
+
+def entradas_paso(name: str, motor: str) -> Entradas:
+    """
+    Entradas del paso según el motor: con DuckDB los pasos dwh y datamarts
+    leen los archivos locales y la base local en lugar de tablas de BigQuery.
+    Con origen local, load_raw lee los archivos locales en lugar de GCS.
+    """
+    entradas = ENTRADAS[name]
+    if name == "load_raw" and LOAD_RAW_ORIGEN == "local":
+        return Entradas(
+            archivos=entradas.archivos + ["src/load_raw_to_bq/carga_directa.py"] + ARCHIVOS_LOCALES,
+            config=entradas.config + ["CARGA_DIRECTA_METODO", "CARGA_DIRECTA_BUCKET"],
+            tablas=entradas.tablas,
+        )
+    if motor != "duckdb" or name not in ("dwh", "datamarts"):
+        return entradas
 
-def run_step(name: str) -> None:
+    archivos = entradas.archivos + ["src/common/duckdb_engine.py"]
+    if name == "dwh":
+        return Entradas(archivos=archivos + ARCHIVOS_LOCALES, config=entradas.config, salidas=[DUCKDB_PATH])
+    return Entradas(archivos=archivos, config=entradas.config, depende_de=["dwh"], salidas=[DUCKDB_PATH])
+
+
+def run_step(name: str, perfilador: Optional[Perfilador] = None, **kwargs) -> None:
     logger.info("=" * 60)
     logger.info("PASO: %s", name.upper())
     logger.info("=" * 60)
@@ -57,10 +184,167 @@ def run_step(name: str) -> None:
     else:
         raise ValueError(f"Paso desconocido: {name}")
 
-    main()
+    resultado = "error"
+    try:
+        with perfilador.paso(name) if perfilador else nullcontext(), metricas.span(f"paso.{name}", paso=name):
+            main(**kwargs)
+        resultado = "ok"
+    finally:
+        metricas.observar("pipeline_duracion_paso_segundos", time.time() - t0, paso=name, resultado=resultado)
     logger.info("Paso '%s' completado en %.1fs", name, time.time() - t0)
 
 
+def run_encadenado(seleccion: SeleccionDistribuidores) -> None:
+    """
+    generate → upload → load_raw por distribuidor, con colas acotadas entre
+    etapas: el distribuidor 1 se carga mientras el 3 todavía se sube. Los
+    datasets y la infraestructura de control se crean en paralelo a la
+    generación; la carga del primer distribuidor espera a que estén listos.
+    """
+    logger.info("=" * 60)
+    logger.info("PASOS ENCADENADOS: %s", " → ".join(PASOS_ENCADENADOS).upper())
+    logger.info("=" * 60)
+    t0 = time.time()
+
+    from src.common.etapas import ejecutar_encadenado
+    from src.common.gcp_auth import get_bq_client, get_gcs_client
+    from src.common.job_stats import guardar_estadisticas
+    from src.generate_data.generate_data import crear_generador
+    from src.load_raw_to_bq import setup_datasets, setup_infra_control
+    from src.load_raw_to_bq.load_raw import cargar_distribuidor
+    from src.upload_to_gcs.upload_to_gcs import get_or_create_bucket, subir_distribuidor
+
+    storage_client = get_gcs_client()
+    bq_client = get_bq_client()
+    bucket = get_or_create_bucket(storage_client, BUCKET_NAME)
+
+    def preparar() -> None:
+        setup_datasets.main()
+        setup_infra_control.main()
+
+    errores: List[int] = []
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        setup = executor.submit(contextvars.copy_context().run, preparar)
+
+        def cargar(distribuidor: int) -> None:
+            setup.result()
+            errores.append(cargar_distribuidor(bq_client, storage_client, distribuidor))
+
+        distribuidores = ejecutar_encadenado(
+            crear_generador().escribir_por_distribuidor(Path(LOCAL_DATA_PATH), seleccion),
+            [
+                ("upload", lambda distribuidor: subir_distribuidor(bucket, distribuidor)),
+                ("load_raw", cargar),
+            ],
+            capacidad=PIPELINE_COLA_MAX,
+        )
+        setup.result()
+
+    guardar_estadisticas(bq_client)
+    if sum(errores):
+        raise RuntimeError(f"Carga RAW encadenada con {sum(errores)} archivos fallidos")
+    logger.info(
+        "Pasos encadenados completados en %.1fs | distribuidores=%d",
+        time.time() - t0, len(distribuidores),
+    )
+
+
+def extra_paso(name: str, kwargs: dict) -> dict:
+    """
+    Opciones de la corrida que entran en la huella. La salida de generate
+    depende de la fecha del día (los archivos se nombran por fecha) y de los
+    parámetros del generador, no sólo de su código.
+    """
+    if name != "generate":
+        return kwargs
+    from src.generate_data.generate_data import parametros_generador
+
+    opciones = {k: v for k, v in kwargs.items() if k != "generador"}
+    return {**opciones, "generador": parametros_generador(kwargs.get("generador"))}
+
+
+def huella_paso(name: str, motor: str, estado: EstadoPasos, kwargs: dict) -> Optional[str]:
+    """Huella de las entradas del paso; None si no se pudo calcular (el paso se ejecuta)."""
+    try:
+        from src.common.gcp_auth import get_bq_client, get_gcs_client
+
+        return calcular_huella(
+            entradas_paso(name, motor),
+            estado,
+            fabrica_storage=get_gcs_client,
+            fabrica_bq=get_bq_client,
+            extra=extra_paso(name, kwargs),
+        )
+    except Exception as e:
+        logger.warning("No se pudo calcular la huella del paso '%s', se ejecuta sin caché: %s", name, e)
+        return None
+
+
+def paso_vigente(name: str, motor: str, estado: EstadoPasos, huella: Optional[str]) -> bool:
+    """True si el paso puede omitirse: misma huella que su última corrida exitosa y salidas presentes."""
+    return bool(huella) and estado.vigente(name, huella) and salidas_presentes(entradas_paso(name, motor))
+
+
+def ejecutar_pasos(
+    steps_to_run: List[str],
+    opciones: Dict[str, dict],
+    estado: EstadoPasos,
+    seleccion: SeleccionDistribuidores,
+    motor: str,
+    cache: bool,
+    encadenado: bool,
+    perfilador: Optional[Perfilador],
+) -> None:
+    """Ejecuta los pasos en orden, omitiendo los vigentes según la caché; sale con 1 ante un fallo."""
+    if encadenado:
+        if set(PASOS_ENCADENADOS) <= set(steps_to_run):
+            huellas = {
+                s: huella_paso(s, motor, estado, opciones.get(s, {})) if cache else None
+                for s in PASOS_ENCADENADOS
+            }
+            if all(paso_vigente(s, motor, estado, huellas[s]) for s in PASOS_ENCADENADOS):
+                logger.info("Pasos encadenados omitidos: sus entradas no cambiaron desde la última corrida")
+            else:
+                for step in PASOS_ENCADENADOS:
+                    estado.invalidar(step)
+                try:
+                    with perfilador.paso("encadenado") if perfilador else nullcontext(), \
+                            metricas.span("paso.encadenado", pasos=",".join(PASOS_ENCADENADOS)):
+                        run_encadenado(seleccion)
+                except Exception as e:
+                    logger.error("Fallo en los pasos encadenados: %s", e)
+                    sys.exit(1)
+                if cache:
+                    for step in PASOS_ENCADENADOS:
+                        huella = huella_paso(step, motor, estado, opciones.get(step, {}))
+                        if huella:
+                            estado.registrar(step, huella, get_run_id())
+            steps_to_run = [s for s in steps_to_run if s not in PASOS_ENCADENADOS]
+        else:
+            logger.warning("--encadenado requiere los pasos %s; se ejecutan en secuencia", PASOS_ENCADENADOS)
+
+    for step in steps_to_run:
+        kwargs = opciones.get(step, {})
+        huella = huella_paso(step, motor, estado, kwargs) if cache else None
+        if paso_vigente(step, motor, estado, huella):
+            logger.info("Paso '%s' omitido: sus entradas no cambiaron desde la última corrida", step)
+            continue
+
+        # Un paso interrumpido no debe quedar como vigente
+        estado.invalidar(step)
+        try:
+            run_step(step, perfilador, **kwargs)
+        except Exception as e:
+            logger.error("Fallo en paso '%s': %s", step, e)
+            sys.exit(1)
+
+        if huella:
+            # Las entradas pueden haber cambiado durante el paso (por ejemplo
+            # tablas que el mismo paso crea): se registra la huella actual
+            estado.registrar(step, huella_paso(step, motor, estado, kwargs) or huella, get_run_id())
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Pipeline ventas-logística GCP")
     parser.add_argument(
@@ -77,7 +361,39 @@ def main() -> None:
         default=None,
         help="Ejecutar únicamente este paso",
     )
+    parser.add_argument(
+        "--sin-cache",
+        dest="cache",
+        action="store_false",
+        default=PIPELINE_CACHE,
+        help="Ejecutar los pasos aunque sus entradas no hayan cambiado",
+    )
+    parser.add_argument(
+        "--encadenado",
+        action="store_true",
+        default=PIPELINE_ENCADENADO,
+        help="Solapar generate, upload y load_raw por distribuidor",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfilar cada paso (CPU, memoria, I/O, HTTP y hotspots) y escribir un reporte JSON",
+    )
+    parser.add_argument(
+        "--metricas",
+        action="store_true",
+        default=METRICAS_HABILITADAS,
+        help="Escribir métricas OpenMetrics y trazas OTLP de la corrida",
+    )
+    parser.add_argument(
+        "--motor",
+        choices=["bigquery", "duckdb"],
+        default=SQL_ENGINE,
+        help="Motor SQL para los pasos dwh y datamarts",
+    )
+    agregar_argumentos(parser)
     args = parser.parse_args()
+    seleccion = desde_argumentos(args)
 
     if args.only_step:
         steps_to_run = [args.only_step]
@@ -87,16 +403,51 @@ def main() -> None:
     else:
         steps_to_run = STEPS
 
-    logger.info("Pipeline ventas-logística GCP")
+    if not seleccion.todos:
+        # El DWH se construye una sola vez, cuando terminaron todos los shards
+        omitidos = [s for s in steps_to_run if s in ("dwh", "datamarts")]
+        if omitidos:
+            logger.warning("Con --distribuidores/--shard no se ejecutan %s", omitidos)
+        steps_to_run = [s for s in steps_to_run if s not in omitidos]
+
+    if LOAD_RAW_ORIGEN == "local" and "upload" in steps_to_run:
+        logger.info("Origen local: load_raw carga los archivos de data/ sin GCS, se omite upload")
+        steps_to_run = [s for s in steps_to_run if s != "upload"]
+
+    logger.info("Pipeline ventas-logística GCP | run_id=%s", get_run_id())
+    if not seleccion.todos:
+        logger.info("Distribuidores: %s", seleccion.etiqueta())
     logger.info("Pasos a ejecutar: %s", steps_to_run)
     t_total = time.time()
 
-    for step in steps_to_run:
-        try:
-            run_step(step)
-        except Exception as e:
-            logger.error("Fallo en paso '%s': %s", step, e)
-            sys.exit(1)
+    opciones = {
+        "dwh": {"motor": args.motor},
+        "datamarts": {"motor": args.motor},
+    }
+    if not seleccion.todos:
+        for step in PASOS_POR_DISTRIBUIDOR:
+            opciones[step] = {"seleccion": seleccion}
+
+    # Cada selección de distribuidores lleva su propio estado de caché, así
+    # varios shards pueden correr en paralelo sobre la misma máquina
+    ruta_estado = Path(PIPELINE_CACHE_PATH)
+    if not seleccion.todos:
+        ruta_estado = ruta_estado.with_stem(f"{ruta_estado.stem}-{seleccion.etiqueta()}")
+    estado = EstadoPasos(ruta_estado)
+
+    perfilador = Perfilador(get_run_id()) if args.profile else None
+    if args.metricas:
+        metricas.habilitar(get_run_id())
+    try:
+        with metricas.span("pipeline", pasos=",".join(steps_to_run), distribuidores=seleccion.etiqueta()):
+            ejecutar_pasos(
+                steps_to_run, opciones, estado, seleccion,
+                args.motor, args.cache, args.encadenado, perfilador,
+            )
+    finally:
+        if perfilador:
+            perfilador.guardar()
+        metricas.escribir()
 
     logger.info("Pipeline completado en %.1fs", time.time() - t_total)
 
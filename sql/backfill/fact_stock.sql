@@ -0,0 +1,52 @@
+-- =====================================================
+-- Backfill Fact Stock
+-- Reescribe las filas de @desde a @hasta (opcionalmente sólo
+-- las sucursales de @distribuidor) a partir de raw.stock y
+-- raw_archivo.stock (particiones movidas por la retención)
+-- =====================================================
+
+BEGIN TRANSACTION;
+
+DELETE FROM `{{ project_id }}.dwh.fact_stock`
+WHERE fecha BETWEEN @desde AND @hasta
+  AND (
+    @distribuidor IS NULL
+    OR sucursal_id IN (
+      SELECT sucursal_id
+      FROM `{{ project_id }}.dwh.dim_sucursal`
+      WHERE distribuidor = @distribuidor
+    )
+  );
+
+INSERT INTO `{{ project_id }}.dwh.fact_stock` (
+  fecha,
+  producto_id,
+  sucursal_id,
+  stock,
+  producto_sk,
+  sucursal_sk
+)
+SELECT
+  s.fecha_cierre AS fecha,
+  s.sku AS producto_id,
+  s.sucursal AS sucursal_id,
+  s.stock,
+  kp.producto_sk,
+  ks.sucursal_sk
+FROM (
+  SELECT fecha_cierre, sku, sucursal, distribuidor, stock
+  FROM `{{ project_id }}.raw.stock`
+
+  UNION ALL
+
+  SELECT fecha_cierre, sku, sucursal, distribuidor, stock
+  FROM `{{ project_id }}.raw_archivo.stock`
+) s
+LEFT JOIN `{{ project_id }}.dwh.claves_producto` kp
+  ON kp.producto_id = s.sku
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` ks
+  ON ks.sucursal_id = s.sucursal
+WHERE s.fecha_cierre BETWEEN @desde AND @hasta
+  AND (@distribuidor IS NULL OR s.distribuidor = @distribuidor);
+
+COMMIT TRANSACTION;
@@ -0,0 +1,56 @@
+-- =====================================================
+-- Backfill Fact Ventas
+-- Reescribe las filas de @desde a @hasta (opcionalmente sólo
+-- las sucursales de @distribuidor) a partir de raw.ventas y
+-- raw_archivo.ventas (particiones movidas por la retención)
+-- =====================================================
+
+BEGIN TRANSACTION;
+
+DELETE FROM `{{ project_id }}.dwh.fact_ventas`
+WHERE fecha BETWEEN @desde AND @hasta
+  AND (
+    @distribuidor IS NULL
+    OR sucursal_id IN (
+      SELECT sucursal_id
+      FROM `{{ project_id }}.dwh.dim_sucursal`
+      WHERE distribuidor = @distribuidor
+    )
+  );
+
+INSERT INTO `{{ project_id }}.dwh.fact_ventas` (
+  fecha,
+  cliente_id,
+  producto_id,
+  sucursal_id,
+  venta_unidades,
+  venta_importe,
+  producto_sk,
+  sucursal_sk
+)
+SELECT
+  v.fecha_cierre AS fecha,
+  v.cliente AS cliente_id,
+  v.sku AS producto_id,
+  v.sucursal AS sucursal_id,
+  v.venta_unidades,
+  v.venta_importe,
+  kp.producto_sk,
+  ks.sucursal_sk
+FROM (
+  SELECT fecha_cierre, cliente, sku, sucursal, distribuidor, venta_unidades, venta_importe
+  FROM `{{ project_id }}.raw.ventas`
+
+  UNION ALL
+
+  SELECT fecha_cierre, cliente, sku, sucursal, distribuidor, venta_unidades, venta_importe
+  FROM `{{ project_id }}.raw_archivo.ventas`
+) v
+LEFT JOIN `{{ project_id }}.dwh.claves_producto` kp
+  ON kp.producto_id = v.sku
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` ks
+  ON ks.sucursal_id = v.sucursal
+WHERE v.fecha_cierre BETWEEN @desde AND @hasta
+  AND (@distribuidor IS NULL OR v.distribuidor = @distribuidor);
+
+COMMIT TRANSACTION;
@@ -0,0 +1,118 @@
+-- =====================================================
+-- Datamart Cobertura de Stock
+-- Grano: 1 producto en 1 sucursal en 1 fecha (fact_stock)
+-- Días de cobertura = stock / venta diaria promedio de los
+-- últimos 7 y 28 días (NULL sin ventas en la ventana)
+-- Se ejecuta una vez por día (@fecha), en orden: las
+-- ventanas de @fecha salen de las del día anterior
+-- (ver src/datamarts/cobertura.py). Recalcula días sueltos
+-- tras cargas tardías; la construcción inicial y el refresco
+-- total usan dm_cobertura_stock_total.sql. Las tablas se
+-- crean en tablas.sql
+-- =====================================================
+
+-- =====================================================
+-- Ventanas del día: las del día anterior + lo que entra
+-- (@fecha) - lo que sale (@fecha - 7 y @fecha - 28)
+-- Sólo se guardan los pares con ventas en la ventana
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.ventas_ventana`
+WHERE fecha = @fecha;
+
+INSERT INTO `{{ project_id }}.datamarts.ventas_ventana` (
+  fecha,
+  producto_id,
+  sucursal_id,
+  venta_unidades_7d,
+  venta_unidades_28d
+)
+WITH ventas_dia AS (
+  SELECT
+    fecha,
+    producto_id,
+    sucursal_id,
+    SUM(venta_unidades) AS unidades
+  FROM `{{ project_id }}.dwh.fact_ventas`
+  WHERE fecha IN (@fecha, DATE_SUB(@fecha, INTERVAL 7 DAY), DATE_SUB(@fecha, INTERVAL 28 DAY))
+  GROUP BY fecha, producto_id, sucursal_id
+),
+
+movimientos AS (
+  SELECT producto_id, sucursal_id, venta_unidades_7d AS u7, venta_unidades_28d AS u28
+  FROM `{{ project_id }}.datamarts.ventas_ventana`
+  WHERE fecha = DATE_SUB(@fecha, INTERVAL 1 DAY)
+
+  UNION ALL
+
+  SELECT producto_id, sucursal_id, unidades AS u7, unidades AS u28
+  FROM ventas_dia
+  WHERE fecha = @fecha
+
+  UNION ALL
+
+  SELECT producto_id, sucursal_id, -unidades AS u7, 0 AS u28
+  FROM ventas_dia
+  WHERE fecha = DATE_SUB(@fecha, INTERVAL 7 DAY)
+
+  UNION ALL
+
+  SELECT producto_id, sucursal_id, 0 AS u7, -unidades AS u28
+  FROM ventas_dia
+  WHERE fecha = DATE_SUB(@fecha, INTERVAL 28 DAY)
+)
+
+SELECT
+  @fecha AS fecha,
+  producto_id,
+  sucursal_id,
+  SUM(u7) AS venta_unidades_7d,
+  SUM(u28) AS venta_unidades_28d
+FROM movimientos
+GROUP BY producto_id, sucursal_id
+HAVING SUM(u7) != 0 OR SUM(u28) != 0;
+
+-- =====================================================
+-- Cobertura del día
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.dm_cobertura_stock`
+WHERE fecha = @fecha;
+
+INSERT INTO `{{ project_id }}.datamarts.dm_cobertura_stock` (
+  fecha,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  stock,
+  venta_unidades_7d,
+  venta_unidades_28d,
+  venta_diaria_7d,
+  venta_diaria_28d,
+  dias_cobertura_7d,
+  dias_cobertura_28d
+)
+SELECT
+  fs.fecha,
+  fs.producto_id,
+  dp.producto,
+  fs.sucursal_id,
+  ds.distribuidor,
+  fs.stock,
+  COALESCE(v.venta_unidades_7d, 0) AS venta_unidades_7d,
+  COALESCE(v.venta_unidades_28d, 0) AS venta_unidades_28d,
+  COALESCE(v.venta_unidades_7d, 0) / 7 AS venta_diaria_7d,
+  COALESCE(v.venta_unidades_28d, 0) / 28 AS venta_diaria_28d,
+  CASE WHEN v.venta_unidades_7d > 0 THEN fs.stock * 7 / v.venta_unidades_7d END AS dias_cobertura_7d,
+  CASE WHEN v.venta_unidades_28d > 0 THEN fs.stock * 28 / v.venta_unidades_28d END AS dias_cobertura_28d
+FROM `{{ project_id }}.dwh.fact_stock` fs
+LEFT JOIN `{{ project_id }}.datamarts.ventas_ventana` v
+  ON v.fecha = @fecha
+ AND v.producto_id = fs.producto_id
+ AND v.sucursal_id = fs.sucursal_id
+LEFT JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON dp.producto_id = fs.producto_id
+LEFT JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON ds.sucursal_id = fs.sucursal_id
+WHERE fs.fecha = @fecha;
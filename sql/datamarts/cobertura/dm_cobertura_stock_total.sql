@@ -0,0 +1,82 @@
+-- =====================================================
+-- Datamart Cobertura de Stock (construcción completa)
+-- Grano: 1 producto en 1 sucursal en 1 fecha (fact_stock)
+-- Calcula en una sola pasada las ventanas y la cobertura de
+-- todos los días de @desde a @hasta: cada venta diaria se
+-- reparte entre los 28 días cuyas ventanas la incluyen.
+-- Se usa en la primera construcción y en el refresco total;
+-- las cargas tardías van por dm_cobertura_stock.sql (por día)
+-- =====================================================
+
+TRUNCATE TABLE `{{ project_id }}.datamarts.ventas_ventana`;
+
+INSERT INTO `{{ project_id }}.datamarts.ventas_ventana` (
+  fecha,
+  producto_id,
+  sucursal_id,
+  venta_unidades_7d,
+  venta_unidades_28d
+)
+WITH ventas_dia AS (
+  SELECT
+    fecha,
+    producto_id,
+    sucursal_id,
+    SUM(venta_unidades) AS unidades
+  FROM `{{ project_id }}.dwh.fact_ventas`
+  WHERE fecha BETWEEN DATE_SUB(@desde, INTERVAL 27 DAY) AND @hasta
+  GROUP BY fecha, producto_id, sucursal_id
+)
+
+SELECT
+  dia AS fecha,
+  v.producto_id,
+  v.sucursal_id,
+  SUM(CASE WHEN dia < DATE_ADD(v.fecha, INTERVAL 7 DAY) THEN v.unidades ELSE 0 END) AS venta_unidades_7d,
+  SUM(v.unidades) AS venta_unidades_28d
+FROM ventas_dia v,
+  UNNEST(GENERATE_DATE_ARRAY(v.fecha, DATE_ADD(v.fecha, INTERVAL 27 DAY))) AS dia
+WHERE dia BETWEEN @desde AND @hasta
+GROUP BY dia, v.producto_id, v.sucursal_id
+HAVING SUM(CASE WHEN dia < DATE_ADD(v.fecha, INTERVAL 7 DAY) THEN v.unidades ELSE 0 END) != 0
+    OR SUM(v.unidades) != 0;
+
+TRUNCATE TABLE `{{ project_id }}.datamarts.dm_cobertura_stock`;
+
+INSERT INTO `{{ project_id }}.datamarts.dm_cobertura_stock` (
+  fecha,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  stock,
+  venta_unidades_7d,
+  venta_unidades_28d,
+  venta_diaria_7d,
+  venta_diaria_28d,
+  dias_cobertura_7d,
+  dias_cobertura_28d
+)
+SELECT
+  fs.fecha,
+  fs.producto_id,
+  dp.producto,
+  fs.sucursal_id,
+  ds.distribuidor,
+  fs.stock,
+  COALESCE(v.venta_unidades_7d, 0) AS venta_unidades_7d,
+  COALESCE(v.venta_unidades_28d, 0) AS venta_unidades_28d,
+  COALESCE(v.venta_unidades_7d, 0) / 7 AS venta_diaria_7d,
+  COALESCE(v.venta_unidades_28d, 0) / 28 AS venta_diaria_28d,
+  CASE WHEN v.venta_unidades_7d > 0 THEN fs.stock * 7 / v.venta_unidades_7d END AS dias_cobertura_7d,
+  CASE WHEN v.venta_unidades_28d > 0 THEN fs.stock * 28 / v.venta_unidades_28d END AS dias_cobertura_28d
+FROM `{{ project_id }}.dwh.fact_stock` fs
+LEFT JOIN `{{ project_id }}.datamarts.ventas_ventana` v
+  ON v.fecha = fs.fecha
+ AND v.producto_id = fs.producto_id
+ AND v.sucursal_id = fs.sucursal_id
+LEFT JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON dp.producto_id = fs.producto_id
+LEFT JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON ds.sucursal_id = fs.sucursal_id
+WHERE fs.fecha BETWEEN @desde AND @hasta;
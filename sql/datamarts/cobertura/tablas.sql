@@ -0,0 +1,38 @@
+-- =====================================================
+-- Tablas de la cobertura de stock
+-- Se ejecuta antes de dm_cobertura_stock.sql (por día) o de
+-- dm_cobertura_stock_total.sql (rango completo)
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.ventas_ventana` (
+  fecha DATE NOT NULL,
+  producto_id STRING NOT NULL,
+  sucursal_id INT64 NOT NULL,
+  venta_unidades_7d INT64,
+  venta_unidades_28d INT64
+)
+PARTITION BY fecha
+CLUSTER BY producto_id, sucursal_id
+OPTIONS (
+  description = "Ventas acumuladas de los últimos 7 y 28 días (estado de dm_cobertura_stock)"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.dm_cobertura_stock` (
+  fecha DATE NOT NULL,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  stock INT64,
+  venta_unidades_7d INT64,
+  venta_unidades_28d INT64,
+  venta_diaria_7d FLOAT64,
+  venta_diaria_28d FLOAT64,
+  dias_cobertura_7d FLOAT64,
+  dias_cobertura_28d FLOAT64
+)
+PARTITION BY fecha
+CLUSTER BY producto_id, sucursal_id
+OPTIONS (
+  description = "Días de cobertura de stock por producto y sucursal"
+);
@@ -16,6 +16,6 @@ FROM `{{ project_id }}.dwh.fact_stock` fs
 JOIN `{{ project_id }}.dwh.dim_fecha` df
   ON fs.fecha = df.fecha
 JOIN `{{ project_id }}.dwh.dim_producto` dp
-  ON fs.producto_id = dp.producto_id
+  ON fs.producto_sk = dp.producto_sk
 JOIN `{{ project_id }}.dwh.dim_sucursal` ds
-  ON fs.sucursal_id = ds.sucursal_id;
+  ON fs.sucursal_sk = ds.sucursal_sk;
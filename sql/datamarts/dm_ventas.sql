@@ -15,13 +15,15 @@ SELECT
   dc.provincia,
   CONCAT(CAST(dc.coordenada_latitud AS STRING), ',', CAST(dc.coordenada_longitud AS STRING)) AS coordenadas,
   dc.tipo_negocio,
-  dc.sucursal
+  dc.sucursal,
+  dc.ubicacion,
+  dc.geohash
 FROM `{{ project_id }}.dwh.fact_ventas` fv
 JOIN `{{ project_id }}.dwh.dim_fecha` df
   ON fv.fecha = df.fecha
 JOIN `{{ project_id }}.dwh.dim_cliente` dc
   ON fv.cliente_id = dc.cliente_id
 JOIN `{{ project_id }}.dwh.dim_producto` dp
-  ON fv.producto_id = dp.producto_id
+  ON fv.producto_sk = dp.producto_sk
 JOIN `{{ project_id }}.dwh.dim_sucursal` ds
-  ON fv.sucursal_id = ds.sucursal_id;
+  ON fv.sucursal_sk = ds.sucursal_sk;
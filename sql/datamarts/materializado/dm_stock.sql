@@ -0,0 +1,54 @@
+-- =====================================================
+-- Datamart Stock (materializado)
+-- Orientado a consumo en Looker Studio
+-- Particionado por fecha; refresco incremental de las
+-- fechas recibidas en @fechas
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.dm_stock` (
+  stock INT64,
+  fecha DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  semana_iso INT64,
+  producto STRING,
+  distribuidor INT64
+)
+PARTITION BY fecha
+CLUSTER BY producto, distribuidor
+OPTIONS (
+  description = "Datamart de stock materializado"
+);
+
+-- =====================================================
+-- Refresco incremental de las particiones afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.dm_stock`
+WHERE fecha IN UNNEST(@fechas);
+
+INSERT INTO `{{ project_id }}.datamarts.dm_stock` (
+  stock,
+  fecha,
+  anio,
+  mes,
+  semana_iso,
+  producto,
+  distribuidor
+)
+SELECT
+  fs.stock,
+  df.fecha,
+  df.anio,
+  df.mes,
+  df.semana_iso,
+  dp.producto,
+  ds.distribuidor
+FROM `{{ project_id }}.dwh.fact_stock` fs
+JOIN `{{ project_id }}.dwh.dim_fecha` df
+  ON fs.fecha = df.fecha
+JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON fs.producto_sk = dp.producto_sk
+JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON fs.sucursal_sk = ds.sucursal_sk
+WHERE fs.fecha IN UNNEST(@fechas);
@@ -0,0 +1,80 @@
+-- =====================================================
+-- Datamart Ventas (materializado)
+-- Orientado a consumo en Looker Studio
+-- Particionado por fecha; refresco incremental de las
+-- fechas recibidas en @fechas
+-- Clusterizado por geohash para podar por región
+-- (ver src/common/geo.py: filtro_bbox)
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.dm_ventas` (
+  venta_unidades INT64,
+  venta_importe FLOAT64,
+  fecha DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  semana_iso INT64,
+  producto STRING,
+  provincia STRING,
+  coordenadas STRING,
+  tipo_negocio STRING,
+  sucursal INT64,
+  ubicacion GEOGRAPHY,
+  geohash STRING
+)
+PARTITION BY fecha
+CLUSTER BY geohash, producto, provincia, tipo_negocio
+OPTIONS (
+  description = "Datamart de ventas materializado"
+);
+
+-- Tablas creadas antes de la ubicación geoespacial
+ALTER TABLE `{{ project_id }}.datamarts.dm_ventas` ADD COLUMN IF NOT EXISTS ubicacion GEOGRAPHY;
+ALTER TABLE `{{ project_id }}.datamarts.dm_ventas` ADD COLUMN IF NOT EXISTS geohash STRING;
+
+-- =====================================================
+-- Refresco incremental de las particiones afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.dm_ventas`
+WHERE fecha IN UNNEST(@fechas);
+
+INSERT INTO `{{ project_id }}.datamarts.dm_ventas` (
+  venta_unidades,
+  venta_importe,
+  fecha,
+  anio,
+  mes,
+  semana_iso,
+  producto,
+  provincia,
+  coordenadas,
+  tipo_negocio,
+  sucursal,
+  ubicacion,
+  geohash
+)
+SELECT
+  fv.venta_unidades,
+  fv.venta_importe,
+  df.fecha,
+  df.anio,
+  df.mes,
+  df.semana_iso,
+  dp.producto,
+  dc.provincia,
+  CONCAT(CAST(dc.coordenada_latitud AS STRING), ',', CAST(dc.coordenada_longitud AS STRING)) AS coordenadas,
+  dc.tipo_negocio,
+  dc.sucursal,
+  dc.ubicacion,
+  dc.geohash
+FROM `{{ project_id }}.dwh.fact_ventas` fv
+JOIN `{{ project_id }}.dwh.dim_fecha` df
+  ON fv.fecha = df.fecha
+JOIN `{{ project_id }}.dwh.dim_cliente` dc
+  ON fv.cliente_id = dc.cliente_id
+JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON fv.producto_sk = dp.producto_sk
+JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON fv.sucursal_sk = ds.sucursal_sk
+WHERE fv.fecha IN UNNEST(@fechas);
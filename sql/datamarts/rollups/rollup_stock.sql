@@ -0,0 +1,143 @@
+-- =====================================================
+-- Rollups de Stock
+-- Granos: día × sucursal × producto, semana ISO y mes
+-- El stock es una foto diaria: los granos semanal y
+-- mensual guardan promedio, mínimo, máximo y cierre
+-- Refresco incremental igual que en rollup_ventas.sql
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_stock_diario` (
+  fecha DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  anio_iso INT64,
+  semana_iso INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  stock INT64
+)
+PARTITION BY fecha
+CLUSTER BY producto_id, sucursal_id
+OPTIONS (
+  description = "Rollup diario de stock"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_stock_semanal` (
+  semana_inicio DATE NOT NULL,
+  anio_iso INT64,
+  semana_iso INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  stock_promedio FLOAT64,
+  stock_minimo INT64,
+  stock_maximo INT64,
+  stock_cierre INT64,
+  dias_con_dato INT64
+)
+PARTITION BY semana_inicio
+CLUSTER BY producto_id, sucursal_id
+OPTIONS (
+  description = "Rollup semanal (semana ISO) de stock"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_stock_mensual` (
+  mes_inicio DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  stock_promedio FLOAT64,
+  stock_minimo INT64,
+  stock_maximo INT64,
+  stock_cierre INT64,
+  dias_con_dato INT64
+)
+PARTITION BY mes_inicio
+CLUSTER BY producto_id, sucursal_id
+OPTIONS (
+  description = "Rollup mensual de stock"
+);
+
+-- =====================================================
+-- Diario: desde fact_stock para las fechas afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_stock_diario`
+WHERE fecha IN UNNEST(@fechas);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_stock_diario`
+SELECT
+  df.fecha,
+  df.anio,
+  df.mes,
+  df.anio_iso,
+  df.semana_iso,
+  dp.producto_id,
+  dp.producto,
+  ds.sucursal_id,
+  ds.distribuidor,
+  fs.stock
+FROM `{{ project_id }}.dwh.fact_stock` fs
+JOIN `{{ project_id }}.dwh.dim_fecha` df
+  ON fs.fecha = df.fecha
+JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON fs.producto_sk = dp.producto_sk
+JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON fs.sucursal_sk = ds.sucursal_sk
+WHERE fs.fecha IN UNNEST(@fechas);
+
+-- =====================================================
+-- Semanal: desde el diario para las semanas afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_stock_semanal`
+WHERE semana_inicio IN (SELECT DISTINCT DATE_TRUNC(f, ISOWEEK) FROM UNNEST(@fechas) AS f);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_stock_semanal`
+SELECT
+  DATE_TRUNC(fecha, ISOWEEK) AS semana_inicio,
+  anio_iso,
+  semana_iso,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  AVG(stock) AS stock_promedio,
+  MIN(stock) AS stock_minimo,
+  MAX(stock) AS stock_maximo,
+  MAX_BY(stock, fecha) AS stock_cierre,
+  COUNT(*) AS dias_con_dato
+FROM `{{ project_id }}.datamarts.rollup_stock_diario`
+WHERE DATE_TRUNC(fecha, ISOWEEK) IN (SELECT DISTINCT DATE_TRUNC(f, ISOWEEK) FROM UNNEST(@fechas) AS f)
+GROUP BY 1, 2, 3, 4, 5, 6, 7;
+
+-- =====================================================
+-- Mensual: desde el diario para los meses afectados
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_stock_mensual`
+WHERE mes_inicio IN (SELECT DISTINCT DATE_TRUNC(f, MONTH) FROM UNNEST(@fechas) AS f);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_stock_mensual`
+SELECT
+  DATE_TRUNC(fecha, MONTH) AS mes_inicio,
+  anio,
+  mes,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  AVG(stock) AS stock_promedio,
+  MIN(stock) AS stock_minimo,
+  MAX(stock) AS stock_maximo,
+  MAX_BY(stock, fecha) AS stock_cierre,
+  COUNT(*) AS dias_con_dato
+FROM `{{ project_id }}.datamarts.rollup_stock_diario`
+WHERE DATE_TRUNC(fecha, MONTH) IN (SELECT DISTINCT DATE_TRUNC(f, MONTH) FROM UNNEST(@fechas) AS f)
+GROUP BY 1, 2, 3, 4, 5, 6, 7;
@@ -0,0 +1,155 @@
+-- =====================================================
+-- Rollups de Ventas
+-- Granos: día × sucursal × producto (× provincia × tipo de negocio),
+--         semana ISO y mes
+-- Refresco incremental: el diario se recalcula para las
+-- fechas de @fechas y el semanal / mensual sólo para las
+-- semanas y meses que las contienen
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_ventas_diario` (
+  fecha DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  anio_iso INT64,
+  semana_iso INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  provincia STRING,
+  tipo_negocio STRING,
+  venta_unidades INT64,
+  venta_importe FLOAT64,
+  transacciones INT64
+)
+PARTITION BY fecha
+CLUSTER BY producto_id, provincia, tipo_negocio, sucursal_id
+OPTIONS (
+  description = "Rollup diario de ventas"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_ventas_semanal` (
+  semana_inicio DATE NOT NULL,
+  anio_iso INT64,
+  semana_iso INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  provincia STRING,
+  tipo_negocio STRING,
+  venta_unidades INT64,
+  venta_importe FLOAT64,
+  transacciones INT64
+)
+PARTITION BY semana_inicio
+CLUSTER BY producto_id, provincia, tipo_negocio, sucursal_id
+OPTIONS (
+  description = "Rollup semanal (semana ISO) de ventas"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.datamarts.rollup_ventas_mensual` (
+  mes_inicio DATE NOT NULL,
+  anio INT64,
+  mes INT64,
+  producto_id STRING,
+  producto STRING,
+  sucursal_id INT64,
+  distribuidor INT64,
+  provincia STRING,
+  tipo_negocio STRING,
+  venta_unidades INT64,
+  venta_importe FLOAT64,
+  transacciones INT64
+)
+PARTITION BY mes_inicio
+CLUSTER BY producto_id, provincia, tipo_negocio, sucursal_id
+OPTIONS (
+  description = "Rollup mensual de ventas"
+);
+
+-- =====================================================
+-- Diario: desde fact_ventas para las fechas afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_ventas_diario`
+WHERE fecha IN UNNEST(@fechas);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_ventas_diario`
+SELECT
+  df.fecha,
+  df.anio,
+  df.mes,
+  df.anio_iso,
+  df.semana_iso,
+  dp.producto_id,
+  dp.producto,
+  ds.sucursal_id,
+  ds.distribuidor,
+  dc.provincia,
+  dc.tipo_negocio,
+  SUM(fv.venta_unidades) AS venta_unidades,
+  SUM(fv.venta_importe) AS venta_importe,
+  COUNT(*) AS transacciones
+FROM `{{ project_id }}.dwh.fact_ventas` fv
+JOIN `{{ project_id }}.dwh.dim_fecha` df
+  ON fv.fecha = df.fecha
+JOIN `{{ project_id }}.dwh.dim_cliente` dc
+  ON fv.cliente_id = dc.cliente_id
+JOIN `{{ project_id }}.dwh.dim_producto` dp
+  ON fv.producto_sk = dp.producto_sk
+JOIN `{{ project_id }}.dwh.dim_sucursal` ds
+  ON fv.sucursal_sk = ds.sucursal_sk
+WHERE fv.fecha IN UNNEST(@fechas)
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11;
+
+-- =====================================================
+-- Semanal: desde el diario para las semanas afectadas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_ventas_semanal`
+WHERE semana_inicio IN (SELECT DISTINCT DATE_TRUNC(f, ISOWEEK) FROM UNNEST(@fechas) AS f);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_ventas_semanal`
+SELECT
+  DATE_TRUNC(fecha, ISOWEEK) AS semana_inicio,
+  anio_iso,
+  semana_iso,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  provincia,
+  tipo_negocio,
+  SUM(venta_unidades) AS venta_unidades,
+  SUM(venta_importe) AS venta_importe,
+  SUM(transacciones) AS transacciones
+FROM `{{ project_id }}.datamarts.rollup_ventas_diario`
+WHERE DATE_TRUNC(fecha, ISOWEEK) IN (SELECT DISTINCT DATE_TRUNC(f, ISOWEEK) FROM UNNEST(@fechas) AS f)
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9;
+
+-- =====================================================
+-- Mensual: desde el diario para los meses afectados
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.datamarts.rollup_ventas_mensual`
+WHERE mes_inicio IN (SELECT DISTINCT DATE_TRUNC(f, MONTH) FROM UNNEST(@fechas) AS f);
+
+INSERT INTO `{{ project_id }}.datamarts.rollup_ventas_mensual`
+SELECT
+  DATE_TRUNC(fecha, MONTH) AS mes_inicio,
+  anio,
+  mes,
+  producto_id,
+  producto,
+  sucursal_id,
+  distribuidor,
+  provincia,
+  tipo_negocio,
+  SUM(venta_unidades) AS venta_unidades,
+  SUM(venta_importe) AS venta_importe,
+  SUM(transacciones) AS transacciones
+FROM `{{ project_id }}.datamarts.rollup_ventas_diario`
+WHERE DATE_TRUNC(fecha, MONTH) IN (SELECT DISTINCT DATE_TRUNC(f, MONTH) FROM UNNEST(@fechas) AS f)
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9;
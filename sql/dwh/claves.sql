@@ -0,0 +1,120 @@
+-- =====================================================
+-- Claves subrogadas
+-- Fuente: raw.stock, raw.ventas, raw.maestro, raw.maestro_cambios
+-- Grano: 1 fila por clave natural
+-- Descripción: Asigna una clave INT64 estable a cada producto
+--              y sucursal. Las claves ya asignadas no cambian;
+--              las claves naturales nuevas reciben MAX + n.
+--              Sólo usa DDL (CTAS sobre la propia tabla) para
+--              poder ejecutarse antes de la transacción del modo
+--              script.
+-- =====================================================
+
+-- La carga RAW crea la tabla de cambios; se declara acá para
+-- entornos que todavía no corrieron el CDC
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.raw.maestro_cambios` (
+  sucursal INT64,
+  cliente INT64,
+  ciudad STRING,
+  provincia STRING,
+  estado STRING,
+  nombre_cliente STRING,
+  cuit STRING,
+  razon_social STRING,
+  direccion STRING,
+  dia_visita STRING,
+  telefono STRING,
+  email STRING,
+  fecha_alta DATE,
+  fecha_baja DATE,
+  coordenada_latitud FLOAT64,
+  coordenada_longitud FLOAT64,
+  condicion_venta STRING,
+  deuda_vencida FLOAT64,
+  tipo_negocio STRING,
+  distribuidor INT64,
+  operacion STRING,
+  hash_fila STRING,
+  object_path STRING,
+  cargado_en TIMESTAMP
+)
+PARTITION BY DATE(cargado_en)
+CLUSTER BY distribuidor, cliente;
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.claves_producto` (
+  producto_sk INT64,
+  producto_id STRING,
+  asignada_en TIMESTAMP
+)
+OPTIONS (
+  description = "Mapeo persistente producto_id -> producto_sk"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.claves_sucursal` (
+  sucursal_sk INT64,
+  sucursal_id INT64,
+  asignada_en TIMESTAMP
+)
+OPTIONS (
+  description = "Mapeo persistente sucursal_id -> sucursal_sk"
+);
+
+-- =====================================================
+-- Productos nuevos
+-- =====================================================
+
+CREATE OR REPLACE TABLE `{{ project_id }}.dwh.claves_producto`
+OPTIONS (
+  description = "Mapeo persistente producto_id -> producto_sk"
+)
+AS
+SELECT producto_sk, producto_id, asignada_en
+FROM `{{ project_id }}.dwh.claves_producto`
+
+UNION ALL
+
+SELECT
+  (SELECT COALESCE(MAX(producto_sk), 0) FROM `{{ project_id }}.dwh.claves_producto`)
+    + ROW_NUMBER() OVER (ORDER BY n.producto_id) AS producto_sk,
+  n.producto_id,
+  CURRENT_TIMESTAMP() AS asignada_en
+FROM (
+  SELECT sku AS producto_id FROM `{{ project_id }}.raw.stock` WHERE sku IS NOT NULL
+  UNION DISTINCT
+  SELECT sku AS producto_id FROM `{{ project_id }}.raw.ventas` WHERE sku IS NOT NULL
+) n
+LEFT JOIN `{{ project_id }}.dwh.claves_producto` c
+  ON c.producto_id = n.producto_id
+WHERE c.producto_id IS NULL;
+
+-- =====================================================
+-- Sucursales nuevas
+-- =====================================================
+
+CREATE OR REPLACE TABLE `{{ project_id }}.dwh.claves_sucursal`
+OPTIONS (
+  description = "Mapeo persistente sucursal_id -> sucursal_sk"
+)
+AS
+SELECT sucursal_sk, sucursal_id, asignada_en
+FROM `{{ project_id }}.dwh.claves_sucursal`
+
+UNION ALL
+
+SELECT
+  (SELECT COALESCE(MAX(sucursal_sk), 0) FROM `{{ project_id }}.dwh.claves_sucursal`)
+    + ROW_NUMBER() OVER (ORDER BY n.sucursal_id) AS sucursal_sk,
+  n.sucursal_id,
+  CURRENT_TIMESTAMP() AS asignada_en
+FROM (
+  SELECT sucursal AS sucursal_id FROM `{{ project_id }}.raw.maestro` WHERE sucursal IS NOT NULL
+  UNION DISTINCT
+  SELECT sucursal AS sucursal_id FROM `{{ project_id }}.raw.maestro_cambios` WHERE sucursal IS NOT NULL
+  UNION DISTINCT
+  SELECT sucursal AS sucursal_id FROM `{{ project_id }}.raw.stock` WHERE sucursal IS NOT NULL
+  UNION DISTINCT
+  SELECT sucursal AS sucursal_id FROM `{{ project_id }}.raw.ventas` WHERE sucursal IS NOT NULL
+) n
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` c
+  ON c.sucursal_id = n.sucursal_id
+WHERE c.sucursal_id IS NULL;
@@ -1,16 +1,63 @@
 -- =====================================================
 -- Dimensión Cliente
--- Fuente: raw.maestro
+-- Fuente: raw.maestro_cambios (estado vigente por CDC)
+--         + raw.maestro (clientes cargados antes del CDC)
 -- Grano: 1 fila por cliente
+-- sucursal_sk referencia a dim_sucursal (dwh.claves_sucursal)
+-- ubicacion: punto GEOGRAPHY; geohash: celda de 7 caracteres
+--            (~150 m, GEOHASH_PRECISION en src/config.py)
 -- =====================================================
 
-CREATE OR REPLACE TABLE `{{ project_id }}.dwh.dim_cliente` AS
+CREATE OR REPLACE TABLE `{{ project_id }}.dwh.dim_cliente`
+CLUSTER BY geohash
+AS
 SELECT
-  DISTINCT cliente AS cliente_id,
-  provincia,
-  coordenada_latitud,
-  coordenada_longitud,
-  tipo_negocio,
-  sucursal
-FROM `{{ project_id }}.raw.maestro`
+  c.cliente_id,
+  c.provincia,
+  c.coordenada_latitud,
+  c.coordenada_longitud,
+  c.tipo_negocio,
+  c.sucursal,
+  k.sucursal_sk,
+  ST_GEOGPOINT(c.coordenada_longitud, c.coordenada_latitud) AS ubicacion,
+  ST_GEOHASH(ST_GEOGPOINT(c.coordenada_longitud, c.coordenada_latitud), 7) AS geohash
+FROM (
+
+  -- 1. Estado vigente de cada cliente según su último cambio (sin bajas)
+  SELECT
+    cliente AS cliente_id,
+    provincia,
+    coordenada_latitud,
+    coordenada_longitud,
+    tipo_negocio,
+    sucursal
+  FROM (
+    SELECT *
+    FROM `{{ project_id }}.raw.maestro_cambios`
+    WHERE TRUE
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY distribuidor, cliente ORDER BY cargado_en DESC) = 1
+  )
+  WHERE operacion != 'D'
+
+  UNION ALL
+
+  -- 2. Clientes cargados completos en raw.maestro que el CDC nunca vio
+  --    (el número de cliente es único dentro de cada distribuidor)
+  SELECT DISTINCT
+    cliente AS cliente_id,
+    provincia,
+    coordenada_latitud,
+    coordenada_longitud,
+    tipo_negocio,
+    sucursal
+  FROM `{{ project_id }}.raw.maestro` m
+  WHERE NOT EXISTS (
+    SELECT 1
+    FROM `{{ project_id }}.raw.maestro_cambios` mc
+    WHERE mc.distribuidor = m.distribuidor
+      AND mc.cliente = m.cliente
+  )
+) c
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` k
+  ON k.sucursal_id = c.sucursal
 ORDER BY cliente_id;
\ No newline at end of file
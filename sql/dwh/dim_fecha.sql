@@ -1,17 +1,25 @@
 -- =====================================================
 -- Dimensión Fecha
 -- Grano: 1 fila por fecha
+-- Rango: raw.ventas + raw_archivo.ventas (particiones movidas
+--        por la retención)
 -- =====================================================
 
 CREATE OR REPLACE TABLE `{{ project_id }}.dwh.dim_fecha` AS
-WITH fechas AS (
+WITH ventas AS (
+  SELECT fecha_cierre FROM `{{ project_id }}.raw.ventas`
+  UNION ALL
+  SELECT fecha_cierre FROM `{{ project_id }}.raw_archivo.ventas`
+),
+
+fechas AS (
   SELECT
     fecha
   FROM
     UNNEST(
       GENERATE_DATE_ARRAY(
-        (SELECT MIN(fecha_cierre) FROM `{{ project_id }}.raw.ventas`),
-        (SELECT MAX(fecha_cierre) FROM `{{ project_id }}.raw.ventas`)
+        (SELECT MIN(fecha_cierre) FROM ventas),
+        (SELECT MAX(fecha_cierre) FROM ventas)
       )
     ) AS fecha
 )
@@ -1,12 +1,33 @@
 -- =====================================================
 -- Dimensión Producto
+-- Fuente: raw.stock + raw_archivo.stock (particiones movidas
+--         por la retención)
 -- Grano: 1 fila por SKU
+-- Clave: producto_sk (dwh.claves_producto); producto_id se
+--        conserva como clave natural
 -- =====================================================
 
 CREATE OR REPLACE TABLE `{{ project_id }}.dwh.dim_producto` AS
 SELECT
-  DISTINCT sku AS producto_id,
-  producto,
-  unidad
-FROM `{{ project_id }}.raw.stock`
-ORDER BY producto_id;
\ No newline at end of file
+  k.producto_sk,
+  p.producto_id,
+  p.producto,
+  p.unidad
+FROM (
+  SELECT DISTINCT
+    sku AS producto_id,
+    producto,
+    unidad
+  FROM `{{ project_id }}.raw.stock`
+
+  UNION DISTINCT
+
+  SELECT DISTINCT
+    sku AS producto_id,
+    producto,
+    unidad
+  FROM `{{ project_id }}.raw_archivo.stock`
+) p
+LEFT JOIN `{{ project_id }}.dwh.claves_producto` k
+  ON k.producto_id = p.producto_id
+ORDER BY producto_sk;
\ No newline at end of file
@@ -1,29 +1,52 @@
 -- =====================================================
 -- Dimensión Sucursal
--- Fuente: raw.maestro (base) + raw.stock (complemento)
+-- Fuente: raw.maestro y raw.maestro_cambios (base) + raw.stock
+--         y raw_archivo.stock (complemento)
 -- Grano: 1 fila por sucursal
 -- Descripción: Carga todas las sucursales del maestro y agrega
 --              las sucursales de stock QUE NO EXISTEN en maestro.
+-- Clave: sucursal_sk (dwh.claves_sucursal); sucursal_id se
+--        conserva como clave natural
 -- =====================================================
 
 CREATE OR REPLACE TABLE `{{ project_id }}.dwh.dim_sucursal` AS
+SELECT
+  k.sucursal_sk,
+  s.sucursal_id,
+  s.distribuidor
+FROM (
 
--- 1. Tomamos todas las sucursales y distribuidores del Maestro (Fuente de Verdad)
+-- 1. Tomamos todas las sucursales y distribuidores del Maestro (Fuente de Verdad),
+--    cargado completo o por CDC
 SELECT DISTINCT 
     sucursal AS sucursal_id,
     distribuidor
-FROM `{{ project_id }}.raw.maestro`
+FROM (
+    SELECT sucursal, distribuidor FROM `{{ project_id }}.raw.maestro`
+    UNION ALL
+    SELECT sucursal, distribuidor FROM `{{ project_id }}.raw.maestro_cambios`
+    -- Las bajas del CDC ('D') llegan sin sucursal
+    WHERE operacion != 'D' AND sucursal IS NOT NULL
+)
 
 UNION ALL
 
--- 2. Agregamos las de Stock, pero SOLO si NO están ya en el Maestro
+-- 2. Agregamos las de Stock (incluidas las particiones archivadas),
+--    pero SOLO si NO están ya en el Maestro
 SELECT DISTINCT 
     sucursal AS sucursal_id,
     distribuidor
-FROM `{{ project_id }}.raw.stock`
+FROM (
+    SELECT sucursal, distribuidor FROM `{{ project_id }}.raw.stock`
+    UNION ALL
+    SELECT sucursal, distribuidor FROM `{{ project_id }}.raw_archivo.stock`
+)
 WHERE sucursal NOT IN (
-    SELECT DISTINCT sucursal 
-    FROM `{{ project_id }}.raw.maestro` 
-    WHERE sucursal IS NOT NULL
+    SELECT sucursal FROM `{{ project_id }}.raw.maestro` WHERE sucursal IS NOT NULL
+    UNION DISTINCT
+    SELECT sucursal FROM `{{ project_id }}.raw.maestro_cambios` WHERE sucursal IS NOT NULL
 )
-ORDER BY sucursal_id;
\ No newline at end of file
+) s
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` k
+  ON k.sucursal_id = s.sucursal_id
+ORDER BY sucursal_sk;
\ No newline at end of file
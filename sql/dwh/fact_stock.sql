@@ -2,20 +2,32 @@
 -- Fact Stock
 -- Fuente: raw.stock
 -- Grano: 1 producto en 1 sucursal en 1 fecha
+-- Claves: producto_sk / sucursal_sk (dwh.claves_*) para los
+--         joins de datamarts; se conservan las claves naturales
 -- =====================================================
 
 CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.fact_stock` (
   fecha DATE NOT NULL,
   producto_id STRING NOT NULL,
   sucursal_id INT64 NOT NULL,
-  stock INT64
+  stock INT64,
+  producto_sk INT64,
+  sucursal_sk INT64
 )
+PARTITION BY fecha
+CLUSTER BY producto_sk, sucursal_sk
 OPTIONS (
   description = "Hecho de stock diario"
 );
 
+-- Tablas creadas antes de las claves subrogadas
+ALTER TABLE `{{ project_id }}.dwh.fact_stock` ADD COLUMN IF NOT EXISTS producto_sk INT64;
+ALTER TABLE `{{ project_id }}.dwh.fact_stock` ADD COLUMN IF NOT EXISTS sucursal_sk INT64;
+
 -- =====================================================
 -- Carga incremental (idempotente)
+-- Las filas existentes sin claves subrogadas se completan
+-- al volver a matchear con raw.stock
 -- =====================================================
 
 MERGE `{{ project_id }}.dwh.fact_stock` t
@@ -25,8 +37,14 @@ USING (
     s.fecha_cierre AS fecha,
     s.sku AS producto_id,
     s.sucursal AS sucursal_id,
-    s.stock
+    s.stock,
+    kp.producto_sk,
+    ks.sucursal_sk
   FROM `{{ project_id }}.raw.stock` s
+  LEFT JOIN `{{ project_id }}.dwh.claves_producto` kp
+    ON kp.producto_id = s.sku
+  LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` ks
+    ON ks.sucursal_id = s.sucursal
 
 ) src
 ON t.fecha = src.fecha
@@ -35,18 +53,24 @@ AND t.sucursal_id = src.sucursal_id
 
 WHEN MATCHED THEN
   UPDATE SET
-    stock = src.stock
+    stock = src.stock,
+    producto_sk = src.producto_sk,
+    sucursal_sk = src.sucursal_sk
 
 WHEN NOT MATCHED THEN
   INSERT (
     fecha,
     producto_id,
     sucursal_id,
-    stock
+    stock,
+    producto_sk,
+    sucursal_sk
   )
   VALUES (
     src.fecha,
     src.producto_id,
     src.sucursal_id,
-    src.stock
-  );
\ No newline at end of file
+    src.stock,
+    src.producto_sk,
+    src.sucursal_sk
+  );
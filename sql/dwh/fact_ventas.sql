@@ -2,6 +2,8 @@
 -- Fact Ventas
 -- Fuente: raw.ventas
 -- Grano: 1 producto vendido a 1 cliente en 1 sucursal en 1 fecha
+-- Claves: producto_sk / sucursal_sk (dwh.claves_*) para los
+--         joins de datamarts; se conservan las claves naturales
 -- =====================================================
 
 CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.fact_ventas` (
@@ -10,12 +12,21 @@ CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.fact_ventas` (
   producto_id STRING NOT NULL,
   sucursal_id INT64 NOT NULL,
   venta_unidades INT64,
-  venta_importe FLOAT64
+  venta_importe FLOAT64,
+  producto_sk INT64,
+  sucursal_sk INT64
 )
+PARTITION BY fecha
+CLUSTER BY producto_sk, sucursal_sk
 OPTIONS (
   description = "Hecho de ventas"
 );
 
+-- Tablas creadas antes de las claves subrogadas (las filas previas se
+-- completan una única vez con python -m src.dwh.migrar_claves)
+ALTER TABLE `{{ project_id }}.dwh.fact_ventas` ADD COLUMN IF NOT EXISTS producto_sk INT64;
+ALTER TABLE `{{ project_id }}.dwh.fact_ventas` ADD COLUMN IF NOT EXISTS sucursal_sk INT64;
+
 -- =====================================================
 -- Carga incremental (idempotente)
 -- =====================================================
@@ -26,7 +37,9 @@ INSERT INTO `{{ project_id }}.dwh.fact_ventas` (
   producto_id,
   sucursal_id,
   venta_unidades,
-  venta_importe
+  venta_importe,
+  producto_sk,
+  sucursal_sk
 )
 
 SELECT
@@ -35,11 +48,17 @@ SELECT
   v.sku AS producto_id,
   v.sucursal AS sucursal_id,
   v.venta_unidades,
-  v.venta_importe
+  v.venta_importe,
+  kp.producto_sk,
+  ks.sucursal_sk
 FROM `{{ project_id }}.raw.ventas` v
+LEFT JOIN `{{ project_id }}.dwh.claves_producto` kp
+  ON kp.producto_id = v.sku
+LEFT JOIN `{{ project_id }}.dwh.claves_sucursal` ks
+  ON ks.sucursal_id = v.sucursal
 LEFT JOIN `{{ project_id }}.dwh.fact_ventas` f
   ON f.fecha = v.fecha_cierre
  AND f.cliente_id = v.cliente
  AND f.producto_id = v.sku
  AND f.sucursal_id = v.sucursal
-WHERE f.fecha IS NULL;
\ No newline at end of file
+WHERE f.fecha IS NULL;
@@ -0,0 +1,248 @@
+-- =====================================================
+-- Snapshot de Actividad de Cliente
+-- Fuente: dwh.fact_ventas (sólo las particiones de @fechas y
+--         las que salen de las ventanas al mover el corte)
+-- Grano: 1 fila por cliente
+-- Estado según la recencia respecto de @corte (la última
+-- fecha con datos), con los umbrales del generador:
+-- ACTIVO hasta 60 días, INACTIVO hasta 180, BAJA después
+-- Parámetros (src/dwh/run_dwh.py):
+--   @fechas          fechas nuevas o modificadas en fact_ventas
+--   @corte_anterior  corte del snapshot vigente (NULL si no hay)
+--   @corte           nuevo corte
+-- =====================================================
+
+-- Compras por cliente y día: permite restar la versión
+-- anterior de un día que se vuelve a cargar
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.actividad_cliente_diaria` (
+  fecha DATE NOT NULL,
+  cliente_id INT64 NOT NULL,
+  lineas INT64,
+  venta_unidades INT64,
+  venta_importe FLOAT64
+)
+PARTITION BY fecha
+CLUSTER BY cliente_id
+OPTIONS (
+  description = "Compras por cliente y día (estado de snapshot_actividad_cliente)"
+);
+
+CREATE TABLE IF NOT EXISTS `{{ project_id }}.dwh.snapshot_actividad_cliente` (
+  cliente_id INT64 NOT NULL,
+  primera_compra DATE,
+  ultima_compra DATE,
+  dias_con_compra INT64,
+  lineas INT64,
+  venta_unidades INT64,
+  venta_importe FLOAT64,
+  dias_con_compra_90d INT64,
+  venta_importe_30d FLOAT64,
+  venta_importe_90d FLOAT64,
+  fecha_corte DATE,
+  dias_desde_ultima_compra INT64,
+  estado STRING,
+  actualizado_en TIMESTAMP
+)
+CLUSTER BY cliente_id
+OPTIONS (
+  description = "Recencia, frecuencia, gasto y estado por cliente"
+);
+
+-- =====================================================
+-- Acumulados: se aplican las diferencias de cada cliente
+-- 1. días de @fechas: sale la versión guardada y entra la
+--    de fact_ventas (cuenta en cada ventana según el corte
+--    con el que se sumó o se suma)
+-- 2. días sin cambios que salen de las ventanas de 30 y 90
+--    días al pasar de @corte_anterior a @corte
+-- =====================================================
+
+MERGE `{{ project_id }}.dwh.snapshot_actividad_cliente` t
+USING (
+  WITH movimientos AS (
+    SELECT
+      cliente_id,
+      fecha,
+      -1 AS signo,
+      TRUE AS en_total,
+      fecha > DATE_SUB(CAST(@corte_anterior AS DATE), INTERVAL 30 DAY) AND fecha <= CAST(@corte_anterior AS DATE) AS en_30d,
+      fecha > DATE_SUB(CAST(@corte_anterior AS DATE), INTERVAL 90 DAY) AND fecha <= CAST(@corte_anterior AS DATE) AS en_90d,
+      lineas,
+      venta_unidades,
+      venta_importe
+    FROM `{{ project_id }}.dwh.actividad_cliente_diaria`
+    WHERE fecha IN UNNEST(@fechas)
+
+    UNION ALL
+
+    SELECT
+      cliente_id,
+      fecha,
+      1 AS signo,
+      TRUE AS en_total,
+      fecha > DATE_SUB(@corte, INTERVAL 30 DAY) AND fecha <= @corte AS en_30d,
+      fecha > DATE_SUB(@corte, INTERVAL 90 DAY) AND fecha <= @corte AS en_90d,
+      COUNT(*) AS lineas,
+      SUM(venta_unidades) AS venta_unidades,
+      SUM(venta_importe) AS venta_importe
+    FROM `{{ project_id }}.dwh.fact_ventas`
+    WHERE fecha IN UNNEST(@fechas)
+    GROUP BY cliente_id, fecha
+
+    UNION ALL
+
+    SELECT
+      cliente_id,
+      fecha,
+      -1 AS signo,
+      FALSE AS en_total,
+      fecha <= DATE_SUB(@corte, INTERVAL 30 DAY) AND fecha > DATE_SUB(CAST(@corte_anterior AS DATE), INTERVAL 30 DAY) AS en_30d,
+      fecha <= DATE_SUB(@corte, INTERVAL 90 DAY) AS en_90d,
+      lineas,
+      venta_unidades,
+      venta_importe
+    FROM `{{ project_id }}.dwh.actividad_cliente_diaria`
+    WHERE fecha > DATE_SUB(CAST(@corte_anterior AS DATE), INTERVAL 90 DAY)
+      AND fecha <= DATE_SUB(@corte, INTERVAL 30 DAY)
+      AND fecha NOT IN UNNEST(@fechas)
+  )
+
+  SELECT
+    cliente_id,
+    MIN(CASE WHEN signo > 0 THEN fecha END) AS primera_compra,
+    MAX(CASE WHEN signo > 0 THEN fecha END) AS ultima_compra,
+    SUM(CASE WHEN en_total THEN signo ELSE 0 END) AS dias_con_compra,
+    SUM(CASE WHEN en_total THEN signo * lineas ELSE 0 END) AS lineas,
+    SUM(CASE WHEN en_total THEN signo * venta_unidades ELSE 0 END) AS venta_unidades,
+    SUM(CASE WHEN en_total THEN signo * venta_importe ELSE 0 END) AS venta_importe,
+    SUM(CASE WHEN en_90d THEN signo ELSE 0 END) AS dias_con_compra_90d,
+    SUM(CASE WHEN en_30d THEN signo * venta_importe ELSE 0 END) AS venta_importe_30d,
+    SUM(CASE WHEN en_90d THEN signo * venta_importe ELSE 0 END) AS venta_importe_90d
+  FROM movimientos
+  GROUP BY cliente_id
+) s
+ON t.cliente_id = s.cliente_id
+
+WHEN MATCHED THEN
+  UPDATE SET
+    primera_compra = LEAST(t.primera_compra, COALESCE(s.primera_compra, t.primera_compra)),
+    ultima_compra = GREATEST(t.ultima_compra, COALESCE(s.ultima_compra, t.ultima_compra)),
+    dias_con_compra = t.dias_con_compra + s.dias_con_compra,
+    lineas = t.lineas + s.lineas,
+    venta_unidades = t.venta_unidades + s.venta_unidades,
+    venta_importe = t.venta_importe + s.venta_importe,
+    dias_con_compra_90d = t.dias_con_compra_90d + s.dias_con_compra_90d,
+    venta_importe_30d = t.venta_importe_30d + s.venta_importe_30d,
+    venta_importe_90d = t.venta_importe_90d + s.venta_importe_90d
+
+WHEN NOT MATCHED AND s.dias_con_compra > 0 THEN
+  INSERT (
+    cliente_id,
+    primera_compra,
+    ultima_compra,
+    dias_con_compra,
+    lineas,
+    venta_unidades,
+    venta_importe,
+    dias_con_compra_90d,
+    venta_importe_30d,
+    venta_importe_90d
+  )
+  VALUES (
+    s.cliente_id,
+    s.primera_compra,
+    s.ultima_compra,
+    s.dias_con_compra,
+    s.lineas,
+    s.venta_unidades,
+    s.venta_importe,
+    s.dias_con_compra_90d,
+    s.venta_importe_30d,
+    s.venta_importe_90d
+  );
+
+-- =====================================================
+-- Compras por cliente y día de @fechas
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.dwh.actividad_cliente_diaria`
+WHERE fecha IN UNNEST(@fechas);
+
+INSERT INTO `{{ project_id }}.dwh.actividad_cliente_diaria` (
+  fecha,
+  cliente_id,
+  lineas,
+  venta_unidades,
+  venta_importe
+)
+SELECT
+  fecha,
+  cliente_id,
+  COUNT(*) AS lineas,
+  SUM(venta_unidades) AS venta_unidades,
+  SUM(venta_importe) AS venta_importe
+FROM `{{ project_id }}.dwh.fact_ventas`
+WHERE fecha IN UNNEST(@fechas)
+GROUP BY fecha, cliente_id;
+
+-- =====================================================
+-- Clientes cuya primera o última compra desapareció al
+-- volver a cargar un día (backfill): se recalculan desde
+-- las compras diarias
+-- =====================================================
+
+DELETE FROM `{{ project_id }}.dwh.snapshot_actividad_cliente`
+WHERE dias_con_compra <= 0;
+
+UPDATE `{{ project_id }}.dwh.snapshot_actividad_cliente` t
+SET
+  primera_compra = d.primera_compra,
+  ultima_compra = d.ultima_compra
+FROM (
+  SELECT
+    cliente_id,
+    MIN(fecha) AS primera_compra,
+    MAX(fecha) AS ultima_compra
+  FROM `{{ project_id }}.dwh.actividad_cliente_diaria`
+  WHERE cliente_id IN (
+    SELECT s.cliente_id
+    FROM `{{ project_id }}.dwh.snapshot_actividad_cliente` s
+    WHERE (
+      s.primera_compra IN UNNEST(@fechas)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM `{{ project_id }}.dwh.actividad_cliente_diaria` a
+        WHERE a.fecha IN UNNEST(@fechas)
+          AND a.cliente_id = s.cliente_id
+          AND a.fecha = s.primera_compra
+      )
+    ) OR (
+      s.ultima_compra IN UNNEST(@fechas)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM `{{ project_id }}.dwh.actividad_cliente_diaria` a
+        WHERE a.fecha IN UNNEST(@fechas)
+          AND a.cliente_id = s.cliente_id
+          AND a.fecha = s.ultima_compra
+      )
+    )
+  )
+  GROUP BY cliente_id
+) d
+WHERE t.cliente_id = d.cliente_id;
+
+-- =====================================================
+-- Recencia y estado de todos los clientes al nuevo corte
+-- =====================================================
+
+UPDATE `{{ project_id }}.dwh.snapshot_actividad_cliente`
+SET
+  fecha_corte = @corte,
+  dias_desde_ultima_compra = DATE_DIFF(@corte, ultima_compra, DAY),
+  estado = CASE
+    WHEN DATE_DIFF(@corte, ultima_compra, DAY) > 180 THEN 'BAJA'
+    WHEN DATE_DIFF(@corte, ultima_compra, DAY) > 60 THEN 'INACTIVO'
+    ELSE 'ACTIVO'
+  END,
+  actualizado_en = CURRENT_TIMESTAMP()
+WHERE TRUE;
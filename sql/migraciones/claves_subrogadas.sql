@@ -0,0 +1,29 @@
+-- =====================================================
+-- Migración: claves subrogadas en hechos previos
+-- Fuente: dwh.claves_producto, dwh.claves_sucursal
+-- Descripción: Completa producto_sk / sucursal_sk de las filas
+--              cargadas antes de claves.sql. Recorre los hechos
+--              completos: se ejecuta una sola vez con
+--              python -m src.dwh.migrar_claves, después de la
+--              primera corrida del DWH con claves subrogadas.
+-- =====================================================
+
+UPDATE `{{ project_id }}.dwh.fact_ventas` f
+SET
+  producto_sk = kp.producto_sk,
+  sucursal_sk = ks.sucursal_sk
+FROM `{{ project_id }}.dwh.claves_producto` kp, `{{ project_id }}.dwh.claves_sucursal` ks
+WHERE (f.producto_sk IS NULL OR f.sucursal_sk IS NULL)
+  AND kp.producto_id = f.producto_id
+  AND ks.sucursal_id = f.sucursal_id;
+
+-- fact_stock completa en cada corrida las filas que siguen en raw.stock;
+-- acá se completan las que ya no están (retención)
+UPDATE `{{ project_id }}.dwh.fact_stock` f
+SET
+  producto_sk = kp.producto_sk,
+  sucursal_sk = ks.sucursal_sk
+FROM `{{ project_id }}.dwh.claves_producto` kp, `{{ project_id }}.dwh.claves_sucursal` ks
+WHERE (f.producto_sk IS NULL OR f.sucursal_sk IS NULL)
+  AND kp.producto_id = f.producto_id
+  AND ks.sucursal_id = f.sucursal_id;
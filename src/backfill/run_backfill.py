@@ -0,0 +1,275 @@
+"""
+Backfill por rango de fechas en raw, DWH y datamarts.
+
+Para un rango [desde, hasta] (y opcionalmente un distribuidor):
+
+1. Lista en GCS los archivos de ventas y stock cuya fecha de negocio (en el
+   nombre del archivo) cae en el rango
+2. Los carga en una tabla de staging con un único load job y reemplaza en
+   una transacción las filas del rango en raw.ventas / raw.stock. Las del
+   rango que la retención movió a raw_archivo se borran de allí: las
+   recargadas quedan en raw y la próxima retención las vuelve a mover
+3. Reconstruye claves y dimensiones (reemplazo total, son chicas)
+4. Reescribe en una transacción las filas del rango en dwh.fact_ventas y
+   dwh.fact_stock (sql/backfill/) a partir de raw y raw_archivo, y aplica las fechas del rango al snapshot
+   de actividad de cliente
+5. Refresca sólo las fechas del rango en los datamarts materializados y
+   rollups
+6. Registra los archivos recargados en infra.control_archivos_cargados
+
+Con raw y hechos particionados por fecha, el costo escala con el rango y
+no con la historia completa. El maestro no se procesa (no es por fecha). Los
+meses que la retención ya compactó en Parquet no se listan en data/: sus
+hechos se reescriben a partir de lo que hay en raw_archivo. Con
+RETENCION_RAW_MODO = "expirar" no hay archivo: se rechazan los rangos
+anteriores al corte de retención.
+
+Uso:
+  python -m src.backfill.run_backfill --desde 2025-01-06 --hasta 2025-01-12
+  python -m src.backfill.run_backfill --desde 2025-01-06 --hasta 2025-01-12 --distribuidor 3
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from google.cloud import bigquery
+from google.cloud.exceptions import GoogleCloudError
+
+from src.common.gcp_auth import get_bq_client, get_gcs_client
+from src.common.manifiesto import fechas_de
+from src.common.job_stats import guardar_estadisticas, registrar_job
+from src.common.logger import get_logger
+from src.config import (
+    DATAMARTS_MODO,
+    DATAMARTS_ROLLUPS,
+    PARTICIONES_RAW,
+    RAW_ARCHIVO_DATASET,
+    RAW_DATASET,
+    RETENCION_RAW_DIAS,
+    RETENCION_RAW_MODO,
+    SQL_BACKFILL_PATH,
+    SQL_DWH_ORDER,
+)
+from src.datamarts.run_datamarts import refrescar_fechas
+from src.dwh.run_dwh import SQL_BASE_PATH as SQL_DWH_BASE_PATH
+from src.dwh.run_dwh import actualizar_snapshot, load_sql_file
+from src.load_raw_to_bq.load_raw import (
+    SCHEMAS,
+    filtrar_pendientes,
+    listar_blobs,
+    obtener_distribuidores,
+    obtener_ya_cargados,
+    registrar_control,
+)
+from src.retencion.run_retencion import fecha_corte
+
+logger = get_logger(__name__)
+
+SQL_BASE_PATH = Path(SQL_BACKFILL_PATH)
+
+# Tablas raw con fecha de negocio (las que admiten backfill por rango)
+TABLAS_BACKFILL = list(PARTICIONES_RAW)
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def fechas_del_rango(desde: date, hasta: date) -> List[date]:
+    if desde > hasta:
+        raise ValueError(f"Rango inválido: {desde} > {hasta}")
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+
+def validar_retencion(desde: date, hoy: date, modo: str = RETENCION_RAW_MODO, dias: int = RETENCION_RAW_DIAS) -> None:
+    """
+    Con particiones de raw que expiran, las fechas anteriores al corte ya no
+    están en raw ni en raw_archivo (y las recargadas vencerían de nuevo):
+    reescribirlas borraría los hechos.
+    """
+    corte = fecha_corte(hoy, dias)
+    if modo == "expirar" and desde < corte:
+        raise ValueError(f"Rango anterior al corte de retención de raw ({corte}): sus particiones expiraron")
+
+
+def filtrar_por_rango(archivos: List[Dict], desde: date, hasta: date) -> List[Dict]:
+    """Archivos con alguna fecha de negocio (manifiesto o nombre) en [desde, hasta]."""
+    return [a for a in archivos if any(desde <= fecha <= hasta for fecha in fechas_de(a))]
+
+
+def parametros_rango(desde: date, hasta: date, distribuidor: Optional[int]) -> List:
+    return [
+        bigquery.ScalarQueryParameter("desde", "DATE", desde),
+        bigquery.ScalarQueryParameter("hasta", "DATE", hasta),
+        bigquery.ScalarQueryParameter("distribuidor", "INT64", distribuidor),
+    ]
+
+
+# ======================
+# EJECUCIÓN
+# ======================
+
+def run_sql(
+    client: bigquery.Client,
+    sql: str,
+    label: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+) -> None:
+    t0 = time.time()
+    job = client.query(sql, job_config=job_config)
+    try:
+        job.result()
+    finally:
+        registrar_job(job, label, paso="backfill")
+    logger.info("%s completado en %.1fs", label, time.time() - t0)
+
+
+def reemplazar_raw(
+    client: bigquery.Client,
+    tabla: str,
+    archivos: List[Dict],
+    desde: date,
+    hasta: date,
+    distribuidor: Optional[int],
+) -> None:
+    """
+    Carga los archivos en staging y reemplaza las filas del rango en
+    raw.<tabla> dentro de una transacción, quitándolas también de
+    raw_archivo.<tabla>.
+    """
+    staging_id = f"{client.project}.{RAW_DATASET}._backfill_{tabla}"
+    uris = [f"gs://{a['bucket']}/{a['object_path']}" for a in archivos]
+    columna_fecha = PARTICIONES_RAW[tabla]
+
+    job = client.load_table_from_uri(
+        uris,
+        staging_id,
+        job_config=bigquery.LoadJobConfig(
+            schema=SCHEMAS[tabla],
+            source_format=bigquery.SourceFormat.CSV,
+            skip_leading_rows=1,
+            write_disposition="WRITE_TRUNCATE",
+        ),
+    )
+    try:
+        job.result()
+    finally:
+        registrar_job(job, f"staging:{tabla}", paso="backfill")
+
+    try:
+        sql = f"""
+        BEGIN TRANSACTION;
+
+        DELETE FROM `{client.project}.{RAW_DATASET}.{tabla}`
+        WHERE {columna_fecha} BETWEEN @desde AND @hasta
+          AND (@distribuidor IS NULL OR distribuidor = @distribuidor);
+
+        DELETE FROM `{client.project}.{RAW_ARCHIVO_DATASET}.{tabla}`
+        WHERE {columna_fecha} BETWEEN @desde AND @hasta
+          AND (@distribuidor IS NULL OR distribuidor = @distribuidor);
+
+        INSERT INTO `{client.project}.{RAW_DATASET}.{tabla}`
+        SELECT *
+        FROM `{staging_id}`
+        WHERE {columna_fecha} BETWEEN @desde AND @hasta
+          AND (@distribuidor IS NULL OR distribuidor = @distribuidor);
+
+        COMMIT TRANSACTION;
+        """
+        run_sql(
+            client,
+            sql,
+            f"raw:{tabla}",
+            bigquery.QueryJobConfig(query_parameters=parametros_rango(desde, hasta, distribuidor)),
+        )
+    finally:
+        client.delete_table(staging_id, not_found_ok=True)
+
+
+def reconstruir_dimensiones(client: bigquery.Client) -> None:
+    """Claves y dimensiones: reemplazo total (pueden llegar productos o sucursales nuevos)."""
+    for sql_file in SQL_DWH_ORDER:
+        if sql_file.startswith("fact_"):
+            continue
+        run_sql(client, load_sql_file(SQL_DWH_BASE_PATH / sql_file, client.project), sql_file)
+
+
+def reescribir_hechos(
+    client: bigquery.Client,
+    desde: date,
+    hasta: date,
+    distribuidor: Optional[int],
+) -> None:
+    job_config = bigquery.QueryJobConfig(query_parameters=parametros_rango(desde, hasta, distribuidor))
+    for path in sorted(SQL_BASE_PATH.glob("fact_*.sql")):
+        run_sql(client, load_sql_file(path, client.project), f"backfill:{path.name}", job_config)
+
+
+def main(
+    desde: date,
+    hasta: date,
+    distribuidor: Optional[int] = None,
+    modo: str = DATAMARTS_MODO,
+    rollups: bool = DATAMARTS_ROLLUPS,
+) -> None:
+    fechas = fechas_del_rango(desde, hasta)
+    validar_retencion(desde, date.today())
+
+    bq_client = get_bq_client()
+    storage_client = get_gcs_client()
+
+    logger.info(
+        "Backfill | proyecto=%s desde=%s hasta=%s distribuidor=%s",
+        bq_client.project, desde, hasta, distribuidor if distribuidor is not None else "todos",
+    )
+
+    distribuidores = [distribuidor] if distribuidor is not None else obtener_distribuidores(storage_client)
+
+    try:
+        # 1-2. RAW
+        por_tabla: Dict[str, List[Dict]] = {}
+        for tabla in TABLAS_BACKFILL:
+            archivos = []
+            for dist in distribuidores:
+                archivos += filtrar_por_rango(listar_blobs(storage_client, dist, tabla), desde, hasta)
+            por_tabla[tabla] = archivos
+
+            logger.info("raw.%s | archivos en el rango=%d", tabla, len(archivos))
+            if archivos:
+                reemplazar_raw(bq_client, tabla, archivos, desde, hasta, distribuidor)
+
+        # 3-4. DWH
+        reconstruir_dimensiones(bq_client)
+        reescribir_hechos(bq_client, desde, hasta, distribuidor)
+        actualizar_snapshot(bq_client, fechas)
+
+        # 5. Datamarts y rollups
+        refrescar_fechas(bq_client, fechas, modo, rollups)
+    except GoogleCloudError as e:
+        logger.error("Error en el backfill: %s", e)
+        guardar_estadisticas(bq_client)
+        raise
+
+    # 6. Control: los archivos recargados no vuelven a cargarse en load_raw
+    for tabla, archivos in por_tabla.items():
+        for dist in distribuidores:
+            del_dist = [a for a in archivos if a["distribuidor"] == dist]
+            nuevos = filtrar_pendientes(del_dist, obtener_ya_cargados(bq_client, tabla, dist))
+            registrar_control(bq_client, nuevos)
+
+    guardar_estadisticas(bq_client)
+    logger.info("Backfill finalizado | fechas=%d", len(fechas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill por rango de fechas")
+    parser.add_argument("--desde", type=date.fromisoformat, required=True, help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, required=True, help="Fecha final inclusive (YYYY-MM-DD)")
+    parser.add_argument("--distribuidor", type=int, default=None, help="Limitar el backfill a un distribuidor")
+    parser.add_argument("--modo", choices=["vista", "materializado"], default=DATAMARTS_MODO)
+    parser.add_argument("--sin-rollups", dest="rollups", action="store_false", default=DATAMARTS_ROLLUPS)
+    args = parser.parse_args()
+    main(args.desde, args.hasta, args.distribuidor, args.modo, args.rollups)
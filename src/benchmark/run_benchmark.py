@@ -0,0 +1,303 @@
+"""
+Benchmark de punta a punta del pipeline, sin GCP.
+
+Para cada escala de BENCHMARK_ESCALAS corre los pasos de run_pipeline.py
+(generate → datamarts) en un directorio temporal, con GCS sobre un
+directorio local (src/common/gcs_local.py) y BigQuery sobre DuckDB
+(src/common/bigquery_local.py). Por paso mide:
+
+- tiempo de pared y de CPU
+- pico de memoria de Python (tracemalloc) y RSS máximo del proceso
+- solicitudes a GCS y a BigQuery (llamadas a la API de los clientes locales)
+- filas/s y archivos/s sobre el volumen generado (pasos que procesan datos)
+
+Los tiempos miden el código del pipeline y el motor local, no la latencia
+de GCP; las solicitudes sí son las que haría contra GCP. El resultado queda
+en data/benchmarks/<run_id>.json y se compara contra la línea base
+(BENCHMARK_BASE_PATH): sale con 1 si alguna métrica empeoró más que el
+umbral.
+
+Uso:
+  python -m src.benchmark.run_benchmark
+  python -m src.benchmark.run_benchmark --escalas chica mediana
+  python -m src.benchmark.run_benchmark --guardar-base     # escribe la línea base
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.common import gcp_auth
+from src.common.logger import get_logger
+from src.common.perfilado import rss_maximo_mb
+from src.common.run_context import get_run_id
+from src.config import (
+    BENCHMARK_BASE_PATH,
+    BENCHMARK_ESCALAS,
+    BENCHMARK_PATH,
+    BENCHMARK_UMBRAL,
+    LOCAL_DATA_PATH,
+)
+
+logger = get_logger(__name__)
+
+# Pasos cuyo trabajo crece con el volumen generado (tienen filas/s y archivos/s)
+PASOS_CON_VOLUMEN = ["generate", "upload", "load_raw", "dwh", "datamarts"]
+
+METRICAS_MENOR_MEJOR = ["pared_s", "memoria_pico_mb", "solicitudes_gcs", "solicitudes_bigquery"]
+METRICAS_MAYOR_MEJOR = ["filas_por_s", "archivos_por_s"]
+METRICAS_DE_TIEMPO = ["pared_s", "filas_por_s", "archivos_por_s"]
+
+# Pasos más cortos que esto varían más que el umbral entre corridas: no se
+# comparan sus tiempos (sí su memoria y sus solicitudes)
+PARED_MINIMA_S = 0.5
+
+PATRONES_ARCHIVOS = ["Archivos_*/*/*.csv", "Archivos_*/*/*.parquet"]
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def es_regresion(metrica: str, valor_base: Optional[float], valor_nuevo: Optional[float], umbral: float) -> bool:
+    """True si `valor_nuevo` empeoró más que `umbral` (proporción) respecto de `valor_base`."""
+    if not valor_base or valor_nuevo is None:
+        return False
+    if metrica in METRICAS_MAYOR_MEJOR:
+        return valor_nuevo < valor_base * (1 - umbral)
+    return valor_nuevo > valor_base * (1 + umbral)
+
+
+def comparar(base: Dict, nuevo: Dict, umbral: float = BENCHMARK_UMBRAL) -> List[Dict]:
+    """
+    Compara dos resultados de benchmark paso por paso en las escalas que
+    tienen ambos. Cada fila lleva (base, nuevo) por métrica y la lista de
+    métricas en regresión; los tiempos de pasos más cortos que
+    PARED_MINIMA_S en las dos corridas no se comparan.
+    """
+    comparacion = []
+    for escala in sorted(set(base["escalas"]) & set(nuevo["escalas"])):
+        pasos_base = base["escalas"][escala]["pasos"]
+        pasos_nuevo = nuevo["escalas"][escala]["pasos"]
+
+        for paso in [p for p in pasos_nuevo if p in pasos_base]:
+            b, n = pasos_base[paso], pasos_nuevo[paso]
+            corto = max(b["pared_s"], n["pared_s"]) < PARED_MINIMA_S
+            fila = {"escala": escala, "paso": paso, "regresiones": []}
+
+            for m in METRICAS_MENOR_MEJOR + METRICAS_MAYOR_MEJOR:
+                fila[m] = (b.get(m), n.get(m))
+                if corto and m in METRICAS_DE_TIEMPO:
+                    continue
+                if es_regresion(m, b.get(m), n.get(m), umbral):
+                    fila["regresiones"].append(m)
+
+            comparacion.append(fila)
+
+    return comparacion
+
+
+def ritmos(volumen: Dict[str, int], pared_s: float) -> Dict[str, Optional[float]]:
+    if pared_s <= 0:
+        return {"filas_por_s": None, "archivos_por_s": None}
+    return {
+        "filas_por_s": round(volumen["filas"] / pared_s, 1),
+        "archivos_por_s": round(volumen["archivos"] / pared_s, 1),
+    }
+
+
+def medir_volumen(data_path: Path) -> Dict[str, int]:
+    """Archivos y filas (sin encabezados) que dejó el generador en `data_path`."""
+    archivos = sorted(r for patron in PATRONES_ARCHIVOS for r in data_path.glob(patron))
+    filas = 0
+    for ruta in archivos:
+        if ruta.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            filas += pq.ParquetFile(ruta).metadata.num_rows
+        else:
+            with open(ruta, "rb") as f:
+                filas += max(sum(1 for _ in f) - 1, 0)
+    return {"archivos": len(archivos), "filas": filas}
+
+
+def total_solicitudes(antes: Dict[str, int], despues: Dict[str, int]) -> int:
+    return sum(despues.values()) - sum(antes.values())
+
+
+# ======================
+# EJECUCIÓN
+# ======================
+
+@contextmanager
+def entorno_local(directorio: Path, sql_path: Path) -> Iterator[tuple]:
+    """
+    Directorio de trabajo con una copia de sql/, y clientes locales de GCS y
+    BigQuery registrados en gcp_auth. Al salir restaura el directorio y el
+    registro de clientes.
+    """
+    from src.common.bigquery_local import ClienteBigQueryLocal
+    from src.common.gcs_local import ClienteGCSLocal
+
+    shutil.copytree(sql_path, directorio / "sql")
+    gcs = ClienteGCSLocal(directorio / "gcs")
+    bq = ClienteBigQueryLocal(directorio / "bigquery.duckdb", gcs=gcs)
+    gcp_auth.reiniciar_clientes()
+    gcp_auth.registrar_cliente("gcs", gcs)
+    gcp_auth.registrar_cliente("bigquery", bq)
+
+    cwd = os.getcwd()
+    os.chdir(directorio)
+    try:
+        yield gcs, bq
+    finally:
+        os.chdir(cwd)
+        bq.close()
+        gcp_auth.reiniciar_clientes()
+
+
+def correr_escala(nombre: str, parametros: Dict[str, int], sql_path: Path = Path("sql")) -> Dict:
+    """Corre todos los pasos del pipeline a la escala `parametros` y mide cada uno."""
+    from run_pipeline import STEPS, run_step
+    from src.generate_data.generate_data import crear_generador
+
+    logger.info("Benchmark escala '%s' | %s", nombre, parametros)
+    opciones = {
+        "generate": {"generador": crear_generador(**parametros)},
+        "dwh": {"motor": "bigquery"},
+        "datamarts": {"motor": "bigquery"},
+    }
+    pasos: Dict[str, Dict] = {}
+    volumen: Dict[str, int] = {}
+
+    directorio = Path(tempfile.mkdtemp(prefix=f"benchmark_{nombre}_"))
+    try:
+        with entorno_local(directorio, sql_path.resolve()) as (gcs, bq):
+            tracemalloc_propio = not tracemalloc.is_tracing()
+            if tracemalloc_propio:
+                tracemalloc.start()
+            try:
+                for paso in STEPS:
+                    gcs_antes, bq_antes = dict(gcs.solicitudes), dict(bq.solicitudes)
+                    tracemalloc.reset_peak()
+                    t0, cpu0 = time.perf_counter(), time.process_time()
+
+                    run_step(paso, **opciones.get(paso, {}))
+
+                    pared, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+                    _, pico = tracemalloc.get_traced_memory()
+                    if paso == "generate":
+                        volumen = medir_volumen(Path(LOCAL_DATA_PATH))
+
+                    pasos[paso] = {
+                        "pared_s": round(pared, 3),
+                        "cpu_s": round(cpu, 3),
+                        "memoria_pico_mb": round(pico / (1024 * 1024), 1),
+                        "rss_maximo_mb": rss_maximo_mb(),
+                        "solicitudes_gcs": total_solicitudes(gcs_antes, gcs.solicitudes),
+                        "solicitudes_bigquery": total_solicitudes(bq_antes, bq.solicitudes),
+                        **(ritmos(volumen, pared) if paso in PASOS_CON_VOLUMEN else {}),
+                    }
+            finally:
+                if tracemalloc_propio:
+                    tracemalloc.stop()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    for paso, m in pasos.items():
+        logger.info(
+            "Benchmark '%s' %s | pared=%.2fs memoria_pico=%.1fMB gcs=%d bq=%d filas/s=%s",
+            nombre, paso, m["pared_s"], m["memoria_pico_mb"],
+            m["solicitudes_gcs"], m["solicitudes_bigquery"], m.get("filas_por_s", "-"),
+        )
+    return {"parametros": parametros, "volumen": volumen, "pasos": pasos}
+
+
+def ejecutar(escalas: List[str]) -> Dict:
+    return {
+        "run_id": get_run_id(),
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "escalas": {nombre: correr_escala(nombre, BENCHMARK_ESCALAS[nombre]) for nombre in escalas},
+    }
+
+
+def guardar(resultado: Dict, ruta: Path) -> Path:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    return ruta
+
+
+def reportar(comparacion: List[Dict]) -> int:
+    """Loguea las regresiones; retorna cuántos pasos tienen alguna."""
+    con_regresion = [f for f in comparacion if f["regresiones"]]
+    for fila in con_regresion:
+        detalle = ", ".join(f"{m} {fila[m][0]} → {fila[m][1]}" for m in fila["regresiones"])
+        logger.warning("Regresión en '%s' %s | %s", fila["escala"], fila["paso"], detalle)
+    if not con_regresion:
+        logger.info("Sin regresiones contra la línea base (%d pasos comparados)", len(comparacion))
+    return len(con_regresion)
+
+
+# ======================
+# MAIN
+# ======================
+
+def main(
+    escalas: Optional[List[str]] = None,
+    umbral: float = BENCHMARK_UMBRAL,
+    base: Path = Path(BENCHMARK_BASE_PATH),
+    guardar_base: bool = False,
+) -> int:
+    """Corre el benchmark y lo compara con la línea base; retorna la cantidad de pasos con regresión."""
+    resultado = ejecutar(escalas or list(BENCHMARK_ESCALAS))
+    ruta = guardar(resultado, Path(BENCHMARK_PATH) / f"{resultado['run_id']}.json")
+    logger.info("Resultado del benchmark: %s", ruta)
+
+    if guardar_base:
+        guardar(resultado, base)
+        logger.info("Línea base guardada en %s", base)
+        return 0
+    if not base.exists():
+        logger.warning("No hay línea base en %s; ejecutar con --guardar-base para crearla", base)
+        return 0
+
+    return reportar(comparar(json.loads(base.read_text(encoding="utf-8")), resultado, umbral))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta con GCS y BigQuery locales")
+    parser.add_argument(
+        "--escalas",
+        nargs="+",
+        choices=list(BENCHMARK_ESCALAS),
+        default=None,
+        help="Escalas a correr (por defecto, todas)",
+    )
+    parser.add_argument(
+        "--umbral",
+        type=float,
+        default=BENCHMARK_UMBRAL,
+        help="Proporción de empeoramiento que cuenta como regresión",
+    )
+    parser.add_argument(
+        "--base",
+        type=Path,
+        default=Path(BENCHMARK_BASE_PATH),
+        help="Archivo de línea base",
+    )
+    parser.add_argument(
+        "--guardar-base",
+        action="store_true",
+        help="Guardar esta corrida como línea base en lugar de compararla",
+    )
+    args = parser.parse_args()
+    sys.exit(1 if main(args.escalas, args.umbral, args.base, args.guardar_base) else 0)
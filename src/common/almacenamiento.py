@@ -0,0 +1,80 @@
+"""
+Acceso de sólo lectura a los archivos de origen, en GCS o en un directorio
+local con la misma estructura (data/distribuidor_N/<tabla>/...).
+
+El directorio local permite probar sin conexión la lógica que sólo necesita
+listar objetos, y correr el modo continuo de carga sin GCS. Los archivos cuyo
+nombre empieza con "." se ignoran: quien escribe en el directorio debe usar
+un temporal con ese prefijo y renombrarlo al terminar, como GCS, donde un
+objeto sólo aparece cuando está completo.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+
+@dataclass(frozen=True)
+class Objeto:
+    ruta: str
+    tamano: int
+    actualizado: datetime
+    generacion: int
+    crc32c: Optional[str] = None
+    metadata: Optional[Dict[str, str]] = None
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class AlmacenamientoGCS:
+    def __init__(self, cliente: "storage.Client", bucket: str):
+        self.cliente = cliente
+        self.nombre = bucket
+
+    def listar(self, prefijo: str, desde: Optional[str] = None) -> Iterator[Objeto]:
+        """Objetos bajo `prefijo`; con `desde`, sólo los de nombre >= `desde` (start_offset)."""
+        for blob in self.cliente.bucket(self.nombre).list_blobs(prefix=prefijo, start_offset=desde):
+            yield Objeto(
+                ruta=blob.name,
+                tamano=int(blob.size or 0),
+                actualizado=blob.updated,
+                generacion=int(blob.generation),
+                crc32c=blob.crc32c,
+                metadata=blob.metadata,
+            )
+
+    def uri(self, ruta: str) -> str:
+        return f"gs://{self.nombre}/{ruta}"
+
+
+class AlmacenamientoLocal:
+    def __init__(self, raiz: Path):
+        self.raiz = Path(raiz)
+        self.nombre = str(self.raiz)
+
+    def listar(self, prefijo: str, desde: Optional[str] = None) -> Iterator[Objeto]:
+        # Un prefijo de carpeta sólo recorre esa carpeta
+        carpeta = self.raiz / prefijo.rsplit("/", 1)[0] if "/" in prefijo else self.raiz
+        for path in sorted(carpeta.rglob("*")):
+            ruta = path.relative_to(self.raiz).as_posix()
+            if not ruta.startswith(prefijo) or (desde and ruta < desde):
+                continue
+            if path.name.startswith(".") or not path.is_file():
+                continue
+            info = path.stat()
+            # mtime en microsegundos, como la generación de GCS y la carga directa
+            modificado = info.st_mtime_ns // 1000
+            yield Objeto(
+                ruta=ruta,
+                tamano=info.st_size,
+                actualizado=EPOCH + timedelta(microseconds=modificado),
+                generacion=modificado,
+            )
+
+    def uri(self, ruta: str) -> str:
+        return str(self.raiz / ruta)
@@ -0,0 +1,499 @@
+"""
+Cliente de BigQuery sobre una base DuckDB local.
+
+Imita la parte de google.cloud.bigquery que usa el pipeline para poder
+correrlo de punta a punta sin GCP (ver src/benchmark/run_benchmark.py):
+
+- datasets y tablas (get/create/update/delete; Conflict y NotFound como la
+  API), con el particionado y clustering declarados como metadata
+- query con parámetros escalares y de arreglo: el SQL se traduce con
+  traducir_sql (src/common/duckdb_engine.py) y los scripts se ejecutan
+  sentencia por sentencia; los errores aparecen en job.result()
+- load jobs desde URIs gs:// de un ClienteGCSLocal (CSV posicional contra
+  el esquema, como BigQuery, o Parquet), desde archivos abiertos y desde
+  filas JSON
+- inserción por streaming (insert_rows_json) con descarte de insertId
+  repetidos
+- jobs con los atributos que lee src/common/job_stats.py
+
+Los TIMESTAMP se guardan en UTC y se devuelven con zona horaria. No se
+soportan los scripts con transacciones (DWH en modo script) ni la Storage
+Read API. `modified` de una tabla refleja su creación y sus load jobs, no
+las DML.
+"""
+
+import re
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from glob import glob
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from google.api_core.exceptions import BadRequest, Conflict, NotFound
+from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+
+from src.common.duckdb_engine import TIPOS_DUCKDB, MotorDuckDB, traducir_sql
+from src.common.gcs_local import ClienteGCSLocal
+from src.common.sql_utils import dividir_sentencias, quitar_comentarios
+
+TIPOS_BIGQUERY = {
+    "BIGINT": "INTEGER",
+    "INTEGER": "INTEGER",
+    "DOUBLE": "FLOAT",
+    "VARCHAR": "STRING",
+    "DATE": "DATE",
+    "TIMESTAMP": "TIMESTAMP",
+    "BOOLEAN": "BOOLEAN",
+}
+
+REGEX_DML = re.compile(r"^\s*(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+REGEX_CONSULTA = re.compile(r"^\s*(SELECT|WITH|\()", re.IGNORECASE)
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def dividir_id(objeto: Union[str, object], partes: int) -> Tuple[str, ...]:
+    """
+    (dataset,) o (dataset, tabla) de un id "proyecto.dataset[.tabla]" o de
+    un objeto Dataset / Table / TableReference.
+    """
+    if not isinstance(objeto, str):
+        if partes == 1:
+            return (objeto.dataset_id,)
+        return objeto.dataset_id, objeto.table_id
+    return tuple(objeto.split(".")[-partes:])
+
+
+def tipo_duckdb(campo: bigquery.SchemaField) -> str:
+    """Tipo DuckDB de un campo de un esquema de BigQuery (RECORD → STRUCT, REPEATED → lista)."""
+    if campo.field_type in ("RECORD", "STRUCT"):
+        tipo = "STRUCT(" + ", ".join(f"{f.name} {tipo_duckdb(f)}" for f in campo.fields) + ")"
+    else:
+        tipo = TIPOS_DUCKDB[campo.field_type]
+    return f"{tipo}[]" if campo.mode == "REPEATED" else tipo
+
+
+def campo_bigquery(nombre: str, tipo_dato: str) -> bigquery.SchemaField:
+    """Campo de BigQuery equivalente a una columna DuckDB sin esquema declarado."""
+    repetido = tipo_dato.endswith("[]")
+    base = tipo_dato[:-2] if repetido else tipo_dato
+    return bigquery.SchemaField(nombre, TIPOS_BIGQUERY.get(base, "STRING"), mode="REPEATED" if repetido else "NULLABLE")
+
+
+def a_utc(valor):
+    """datetime con zona → UTC sin zona (como se guarda un TIMESTAMP)."""
+    if isinstance(valor, datetime) and valor.tzinfo is not None:
+        return valor.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(valor, list):
+        return [a_utc(v) for v in valor]
+    return valor
+
+
+def desde_utc(valor):
+    """TIMESTAMP leído de DuckDB → datetime en UTC, como lo devuelve BigQuery."""
+    if isinstance(valor, datetime) and valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor
+
+
+def parametros_de(job_config: Optional[bigquery.QueryJobConfig]) -> Dict:
+    parametros = {}
+    for p in (job_config.query_parameters if job_config else None) or []:
+        valor = p.values if isinstance(p, bigquery.ArrayQueryParameter) else p.value
+        parametros[p.name] = a_utc(valor)
+    return parametros
+
+
+# ======================
+# JOBS
+# ======================
+
+class JobLocal:
+    """Job terminado (query o load) con los atributos de estadísticas de BigQuery."""
+
+    def __init__(self, job_type: str):
+        self.job_id = f"local_{uuid.uuid4().hex}"
+        self.job_type = job_type
+        self.created = self.started = datetime.now(timezone.utc)
+        self.ended: Optional[datetime] = None
+        self.state = "RUNNING"
+        self.error_result: Optional[Dict] = None
+        self._error: Optional[Exception] = None
+        self._filas: List[Row] = []
+
+        # Load
+        self.output_rows: Optional[int] = None
+        self.input_file_bytes: Optional[int] = None
+        # Query
+        self.num_dml_affected_rows: Optional[int] = None
+        self.total_bytes_processed: Optional[int] = None
+        self.total_bytes_billed: Optional[int] = None
+        self.slot_millis: Optional[int] = None
+        self.cache_hit = False
+        self.query_plan: List = []
+
+    def _terminar(self, error: Optional[Exception] = None) -> "JobLocal":
+        self.ended = datetime.now(timezone.utc)
+        self.state = "DONE"
+        if error is not None:
+            self._error = error
+            self.error_result = {"reason": type(error).__name__, "message": str(error)}
+        return self
+
+    def done(self) -> bool:
+        return self.state == "DONE"
+
+    def result(self, *args, **kwargs) -> List[Row]:
+        if self._error is not None:
+            raise self._error
+        return self._filas
+
+
+# ======================
+# CLIENTE
+# ======================
+
+class ClienteBigQueryLocal:
+    """
+    Cliente de BigQuery sobre DuckDB (un dataset = un esquema). Los load
+    jobs desde gs:// leen los objetos de `gcs`. `solicitudes` cuenta las
+    llamadas a la API por método.
+    """
+
+    def __init__(self, ruta_db: Path, gcs: Optional[ClienteGCSLocal] = None, project: str = "local"):
+        self.project = project
+        self.gcs = gcs
+        self.motor = MotorDuckDB(ruta_db=Path(ruta_db), esquemas=())
+        self.con = self.motor.con
+        self.con.execute("SET TimeZone = 'UTC'")
+        self.solicitudes: Counter = Counter()
+        self._metadatos: Dict[Tuple[str, str], Dict] = {}
+        self._insert_ids: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def _contar(self, metodo: str) -> None:
+        with self._lock:
+            self.solicitudes[metodo] += 1
+
+    def _existe_dataset(self, dataset: str) -> bool:
+        return bool(self.con.execute(
+            "SELECT 1 FROM information_schema.schemata WHERE schema_name = ?", [dataset]
+        ).fetchone())
+
+    def _tipo_tabla(self, dataset: str, tabla: str) -> Optional[str]:
+        tipo = self.motor.tipo_objeto(dataset, tabla)
+        return {"BASE TABLE": "TABLE", "VIEW": "VIEW"}.get(tipo) if tipo else None
+
+    def _marcar_modificada(self, dataset: str, tabla: str) -> None:
+        self._metadatos.setdefault((dataset, tabla), {})["modified"] = datetime.now(timezone.utc)
+
+    def _crear_tabla(self, dataset: str, tabla: str, schema: Iterable[bigquery.SchemaField]) -> None:
+        schema = list(schema)
+        definicion = ", ".join(f"{f.name} {tipo_duckdb(f)}" for f in schema)
+        self.con.execute(f"CREATE TABLE {dataset}.{tabla} ({definicion})")
+        self._metadatos[(dataset, tabla)] = {"schema": schema}
+        self._marcar_modificada(dataset, tabla)
+
+    # ── Datasets ────────────────────────────────────────────────────────────
+
+    def get_dataset(self, dataset_ref) -> bigquery.Dataset:
+        self._contar("get_dataset")
+        (dataset,) = dividir_id(dataset_ref, 1)
+        with self._lock:
+            if not self._existe_dataset(dataset):
+                raise NotFound(f"Not found: Dataset {self.project}:{dataset}")
+        return bigquery.Dataset(f"{self.project}.{dataset}")
+
+    def create_dataset(self, dataset_ref, exists_ok: bool = False, **kwargs) -> bigquery.Dataset:
+        self._contar("create_dataset")
+        (dataset,) = dividir_id(dataset_ref, 1)
+        with self._lock:
+            if self._existe_dataset(dataset):
+                if exists_ok:
+                    return bigquery.Dataset(f"{self.project}.{dataset}")
+                raise Conflict(f"Already Exists: Dataset {self.project}:{dataset}")
+            self.con.execute(f"CREATE SCHEMA {dataset}")
+        return bigquery.Dataset(f"{self.project}.{dataset}")
+
+    # ── Tablas ──────────────────────────────────────────────────────────────
+
+    def get_table(self, table_ref) -> bigquery.Table:
+        self._contar("get_table")
+        dataset, nombre = dividir_id(table_ref, 2)
+        with self._lock:
+            tipo = self._tipo_tabla(dataset, nombre)
+            if tipo is None:
+                raise NotFound(f"Not found: Table {self.project}:{dataset}.{nombre}")
+            columnas = self.con.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = ? AND table_name = ? ORDER BY ordinal_position",
+                [dataset, nombre],
+            ).fetchall()
+            filas = self.con.execute(f"SELECT COUNT(*) FROM {dataset}.{nombre}").fetchone()[0] if tipo == "TABLE" else None
+            metadatos = self._metadatos.get((dataset, nombre), {})
+
+        # Campos declarados al crear la tabla; los agregados por SQL se deducen del tipo DuckDB
+        declarados = {f.name: f for f in metadatos.get("schema", [])}
+        tabla = bigquery.Table(
+            f"{self.project}.{dataset}.{nombre}",
+            schema=[declarados.get(columna) or campo_bigquery(columna, tipo_dato) for columna, tipo_dato in columnas],
+        )
+        tabla.time_partitioning = metadatos.get("time_partitioning")
+        tabla.clustering_fields = metadatos.get("clustering_fields")
+        tabla._properties["type"] = tipo
+        tabla._properties["numRows"] = str(filas) if filas is not None else None
+        modificada = metadatos.get("modified")
+        if modificada is not None:
+            tabla._properties["lastModifiedTime"] = str(int(modificada.timestamp() * 1000))
+        return tabla
+
+    def create_table(self, table: bigquery.Table, exists_ok: bool = False) -> bigquery.Table:
+        self._contar("create_table")
+        dataset, nombre = dividir_id(table, 2)
+        with self._lock:
+            if not self._existe_dataset(dataset):
+                raise NotFound(f"Not found: Dataset {self.project}:{dataset}")
+            if self._tipo_tabla(dataset, nombre):
+                if exists_ok:
+                    return self.get_table(table)
+                raise Conflict(f"Already Exists: Table {self.project}:{dataset}.{nombre}")
+            self._crear_tabla(dataset, nombre, table.schema)
+            self._metadatos[(dataset, nombre)].update(
+                time_partitioning=table.time_partitioning,
+                clustering_fields=table.clustering_fields,
+            )
+        return self.get_table(table)
+
+    def update_table(self, table: bigquery.Table, fields: List[str]) -> bigquery.Table:
+        """Sólo admite agregar columnas al esquema y cambiar el particionado declarado."""
+        self._contar("update_table")
+        dataset, nombre = dividir_id(table, 2)
+        with self._lock:
+            actual = {f.name for f in self.get_table(table).schema}
+            if "schema" in fields:
+                for campo in table.schema:
+                    if campo.name not in actual:
+                        self.con.execute(f"ALTER TABLE {dataset}.{nombre} ADD COLUMN {campo.name} {tipo_duckdb(campo)}")
+                self._metadatos.setdefault((dataset, nombre), {})["schema"] = list(table.schema)
+            if "time_partitioning" in fields:
+                self._metadatos.setdefault((dataset, nombre), {})["time_partitioning"] = table.time_partitioning
+            self._marcar_modificada(dataset, nombre)
+        return self.get_table(table)
+
+    def delete_table(self, table_ref, not_found_ok: bool = False) -> None:
+        self._contar("delete_table")
+        dataset, nombre = dividir_id(table_ref, 2)
+        with self._lock:
+            tipo = self._tipo_tabla(dataset, nombre)
+            if tipo is None:
+                if not_found_ok:
+                    return
+                raise NotFound(f"Not found: Table {self.project}:{dataset}.{nombre}")
+            self.con.execute(f"DROP {tipo} {dataset}.{nombre}")
+            self._metadatos.pop((dataset, nombre), None)
+
+    # ── Jobs ────────────────────────────────────────────────────────────────
+
+    def _error(self, e: Exception) -> Exception:
+        import duckdb
+
+        if isinstance(e, duckdb.CatalogException):
+            return NotFound(str(e))
+        return BadRequest(str(e))
+
+    def query(self, query: str, job_config: Optional[bigquery.QueryJobConfig] = None, **kwargs) -> JobLocal:
+        import duckdb
+
+        self._contar("query")
+        job = JobLocal("query")
+        parametros = parametros_de(job_config)
+        afectadas = 0
+
+        with self._lock:
+            try:
+                for sentencia in dividir_sentencias(traducir_sql(query)):
+                    codigo = quitar_comentarios(sentencia)
+                    usados = {k: v for k, v in parametros.items() if re.search(rf"\${k}\b", codigo)}
+                    cursor = self.con.execute(sentencia, usados or None)
+                    if REGEX_DML.match(codigo):
+                        afectadas += cursor.fetchone()[0]
+                    elif REGEX_CONSULTA.match(codigo):
+                        columnas = {d[0]: i for i, d in enumerate(cursor.description)}
+                        job._filas = [Row(tuple(desde_utc(v) for v in fila), columnas) for fila in cursor.fetchall()]
+            except duckdb.Error as e:
+                return job._terminar(self._error(e))
+
+        job.num_dml_affected_rows = afectadas
+        return job._terminar()
+
+    def _preparar_destino(self, destination, job_config, schema: Optional[List[bigquery.SchemaField]]) -> Tuple[str, str]:
+        dataset, nombre = dividir_id(destination, 2)
+        if not self._existe_dataset(dataset):
+            raise NotFound(f"Not found: Dataset {self.project}:{dataset}")
+
+        disposicion = getattr(job_config, "write_disposition", None) or "WRITE_APPEND"
+        existe = self._tipo_tabla(dataset, nombre) is not None
+        if existe and disposicion == "WRITE_TRUNCATE":
+            self.con.execute(f"DELETE FROM {dataset}.{nombre}")
+        elif existe and disposicion == "WRITE_EMPTY":
+            if self.con.execute(f"SELECT COUNT(*) FROM {dataset}.{nombre}").fetchone()[0]:
+                raise BadRequest(f"Already Exists: Table {self.project}:{dataset}.{nombre} no está vacía")
+        elif not existe:
+            if not schema:
+                raise BadRequest(f"Se requiere un esquema para crear {dataset}.{nombre}")
+            self._crear_tabla(dataset, nombre, schema)
+            self._metadatos[(dataset, nombre)].update(
+                time_partitioning=getattr(job_config, "time_partitioning", None),
+                clustering_fields=getattr(job_config, "clustering_fields", None),
+            )
+        return dataset, nombre
+
+    def _cargar(self, job: JobLocal, destination, job_config, schema, fuente: str, parametros: Optional[Dict] = None) -> None:
+        """INSERT BY NAME de `fuente` (SELECT) en el destino, como un único load job."""
+        import duckdb
+
+        with self._lock:
+            try:
+                self.con.execute("BEGIN TRANSACTION")
+                try:
+                    dataset, nombre = self._preparar_destino(destination, job_config, schema)
+                    job.output_rows = self.con.execute(
+                        f"INSERT INTO {dataset}.{nombre} BY NAME {fuente}", parametros or None
+                    ).fetchone()[0]
+                    self._marcar_modificada(dataset, nombre)
+                    self.con.execute("COMMIT")
+                except BaseException:
+                    self.con.execute("ROLLBACK")
+                    raise
+            except duckdb.Error as e:
+                job._terminar(self._error(e))
+                return
+            except (BadRequest, NotFound) as e:
+                job._terminar(e)
+                return
+        job._terminar()
+
+    def _esquema_destino(self, destination, job_config) -> Optional[List[bigquery.SchemaField]]:
+        schema = getattr(job_config, "schema", None)
+        if schema:
+            return list(schema)
+        try:
+            return list(self.get_table(destination).schema)
+        except NotFound:
+            return None
+
+    def _cargar_rutas(self, job: JobLocal, rutas: List[str], destination, job_config) -> JobLocal:
+        """Load job de archivos locales (CSV o Parquet) en el destino."""
+        job.input_file_bytes = sum(Path(r).stat().st_size for r in rutas)
+        schema = self._esquema_destino(destination, job_config)
+        formato = getattr(job_config, "source_format", None) or bigquery.SourceFormat.CSV
+        if formato == bigquery.SourceFormat.PARQUET:
+            fuente = f"SELECT * FROM read_parquet({rutas!r}, union_by_name = true)"
+        elif schema:
+            # Como BigQuery: las columnas del CSV se asignan por posición al esquema
+            columnas = {f.name: tipo_duckdb(f) for f in schema}
+            saltear = getattr(job_config, "skip_leading_rows", None) or 0
+            fuente = f"SELECT * FROM read_csv({rutas!r}, header = false, skip = {saltear}, columns = {columnas!r})"
+        else:
+            return job._terminar(BadRequest("La carga de CSV requiere un esquema (no se soporta autodetect)"))
+
+        self._cargar(job, destination, job_config, schema, fuente)
+        return job
+
+    def _cargar_filas(self, job: JobLocal, filas: List[Dict], destination, job_config) -> JobLocal:
+        import pyarrow as pa
+
+        schema = self._esquema_destino(destination, job_config)
+        if not filas:
+            with self._lock:
+                try:
+                    self._preparar_destino(destination, job_config, schema)
+                except (BadRequest, NotFound) as e:
+                    return job._terminar(e)
+            job.output_rows = 0
+            return job._terminar()
+
+        datos = pa.Table.from_pylist(filas)
+        with self._lock:
+            self.con.register("_filas_json", datos)
+            try:
+                self._cargar(job, destination, job_config, schema, "SELECT * FROM _filas_json")
+            finally:
+                self.con.unregister("_filas_json")
+        return job
+
+    def load_table_from_uri(self, source_uris, destination, job_config: Optional[bigquery.LoadJobConfig] = None, **kwargs) -> JobLocal:
+        self._contar("load")
+        job = JobLocal("load")
+        if self.gcs is None:
+            return job._terminar(BadRequest("El cliente local no tiene un almacenamiento GCS asociado"))
+
+        uris = [source_uris] if isinstance(source_uris, str) else list(source_uris)
+        rutas = []
+        for uri in uris:
+            ruta = str(self.gcs.ruta_local(uri))
+            encontradas = sorted(glob(ruta)) if "*" in ruta else ([ruta] if Path(ruta).exists() else [])
+            if not encontradas:
+                return job._terminar(NotFound(f"Not found: URI {uri}"))
+            rutas += encontradas
+        return self._cargar_rutas(job, rutas, destination, job_config)
+
+    def load_table_from_file(
+        self,
+        file_obj: BinaryIO,
+        destination,
+        rewind: bool = False,
+        job_config: Optional[bigquery.LoadJobConfig] = None,
+        **kwargs,
+    ) -> JobLocal:
+        self._contar("load")
+        job = JobLocal("load")
+        if rewind:
+            file_obj.seek(0)
+        formato = getattr(job_config, "source_format", None) or bigquery.SourceFormat.CSV
+        sufijo = ".parquet" if formato == bigquery.SourceFormat.PARQUET else ".csv"
+
+        with tempfile.TemporaryDirectory(prefix="bigquery_local_") as directorio:
+            ruta = Path(directorio) / f"archivo{sufijo}"
+            ruta.write_bytes(file_obj.read())
+            return self._cargar_rutas(job, [str(ruta)], destination, job_config)
+
+    def load_table_from_json(self, json_rows, destination, job_config: Optional[bigquery.LoadJobConfig] = None, **kwargs) -> JobLocal:
+        self._contar("load")
+        return self._cargar_filas(JobLocal("load"), list(json_rows), destination, job_config)
+
+    def insert_rows_json(self, table, json_rows, row_ids: Optional[Iterable[Optional[str]]] = None, **kwargs) -> List[Dict]:
+        """
+        Inserción por streaming: retorna los errores por fila (lista vacía si
+        no hubo), como la API. Las filas con un insertId ya visto se descartan.
+        """
+        self._contar("insert_rows")
+        dataset, nombre = dividir_id(table, 2)
+        if self._tipo_tabla(dataset, nombre) is None:
+            raise NotFound(f"Not found: Table {self.project}:{dataset}.{nombre}")
+
+        filas = list(json_rows)
+        ids = list(row_ids) if row_ids is not None else [None] * len(filas)
+        with self._lock:
+            nuevas = [f for f, i in zip(filas, ids) if i is None or i not in self._insert_ids]
+            job = self._cargar_filas(JobLocal("load"), nuevas, table, None)
+            if job.error_result is None:
+                self._insert_ids.update(i for i in ids if i is not None)
+
+        if job.error_result is None:
+            return []
+        return [{"index": i, "errors": [{"reason": "invalid", "message": job.error_result["message"]}]} for i in range(len(filas))]
+
+    def list_jobs(self, parent_job=None, **kwargs) -> List[JobLocal]:
+        """Los jobs locales no tienen jobs hijos (no hay scripts multi-statement)."""
+        self._contar("list_jobs")
+        return []
+
+    def close(self) -> None:
+        self.motor.cerrar()
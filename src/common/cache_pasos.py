@@ -0,0 +1,187 @@
+"""
+Caché de pasos del pipeline por huella de sus entradas (estilo make).
+
+Cada paso declara sus entradas:
+
+- archivos locales (código del paso, SQL, datos generados), por contenido
+- prefijos de GCS, por nombre y generación de cada blob
+- valores de src/config.py
+- tablas de BigQuery de las que lee, por su last_modified
+- datasets y tablas de BigQuery que crea, sólo por su existencia
+- pasos de los que depende, por la huella de su última corrida exitosa
+
+Antes de ejecutar un paso se calcula la huella (SHA-256) de esas entradas;
+si coincide con la de su última corrida exitosa y sus salidas locales
+existen, el paso se omite. El estado se guarda en un JSON local.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src import config
+from src.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Huella de una tabla inexistente (distinta de cualquier last_modified)
+TABLA_INEXISTENTE = "-"
+
+
+@dataclass
+class Entradas:
+    """Entradas declaradas de un paso del pipeline."""
+
+    archivos: List[str] = field(default_factory=list)      # rutas o patrones glob locales
+    prefijos_gcs: List[str] = field(default_factory=list)  # prefijos dentro de BUCKET_NAME
+    config: List[str] = field(default_factory=list)        # nombres en src/config.py
+    tablas: List[str] = field(default_factory=list)        # dataset.tabla de BigQuery
+    existen: List[str] = field(default_factory=list)       # dataset o dataset.tabla de BigQuery
+    depende_de: List[str] = field(default_factory=list)    # pasos previos
+    salidas: List[str] = field(default_factory=list)       # rutas locales que deben existir
+
+
+# ======================
+# HUELLAS
+# ======================
+
+def _sha256_archivo(ruta: Path) -> str:
+    h = hashlib.sha256()
+    with ruta.open("rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_archivos(patrones: Iterable[str], base: Path = Path(".")) -> Dict[str, str]:
+    """Hash de contenido de cada archivo que matchea los patrones (rutas relativas a base)."""
+    huellas: Dict[str, str] = {}
+    for patron in patrones:
+        rutas = [base / patron] if not any(c in patron for c in "*?[") else sorted(base.glob(patron))
+        for ruta in rutas:
+            if ruta.is_file():
+                huellas[ruta.relative_to(base).as_posix()] = _sha256_archivo(ruta)
+    return dict(sorted(huellas.items()))
+
+
+def huella_config(nombres: Iterable[str]) -> Dict[str, str]:
+    return {n: json.dumps(getattr(config, n), sort_keys=True, default=str) for n in nombres}
+
+
+def huella_gcs(storage_client, prefijos: Iterable[str]) -> Dict[str, int]:
+    """Generación de cada blob bajo los prefijos del bucket del pipeline."""
+    huellas: Dict[str, int] = {}
+    for prefijo in prefijos:
+        for blob in storage_client.list_blobs(config.BUCKET_NAME, prefix=prefijo):
+            huellas[blob.name] = blob.generation
+    return dict(sorted(huellas.items()))
+
+
+def huella_tablas(bq_client, tablas: Iterable[str]) -> Dict[str, str]:
+    """last_modified de cada tabla (TABLA_INEXISTENTE si no existe)."""
+    from google.cloud.exceptions import NotFound
+
+    huellas: Dict[str, str] = {}
+    for tabla in tablas:
+        try:
+            huellas[tabla] = bq_client.get_table(f"{bq_client.project}.{tabla}").modified.isoformat()
+        except NotFound:
+            huellas[tabla] = TABLA_INEXISTENTE
+    return huellas
+
+
+def huella_existencia(bq_client, recursos: Iterable[str]) -> Dict[str, bool]:
+    """Si existe cada dataset ("raw") o tabla ("raw.ventas"), sin importar sus cambios."""
+    from google.cloud.exceptions import NotFound
+
+    huellas: Dict[str, bool] = {}
+    for recurso in recursos:
+        try:
+            if "." in recurso:
+                bq_client.get_table(f"{bq_client.project}.{recurso}")
+            else:
+                bq_client.get_dataset(f"{bq_client.project}.{recurso}")
+            huellas[recurso] = True
+        except NotFound:
+            huellas[recurso] = False
+    return huellas
+
+
+def calcular_huella(
+    entradas: Entradas,
+    estado: "EstadoPasos",
+    fabrica_storage: Optional[Callable] = None,
+    fabrica_bq: Optional[Callable] = None,
+    extra: Optional[Dict] = None,
+) -> str:
+    """
+    Huella SHA-256 de las entradas de un paso.
+
+    `fabrica_storage` y `fabrica_bq` crean los clientes y sólo se invocan
+    si el paso declara prefijos de GCS, tablas o recursos que deben existir.
+    `extra` agrega opciones de la corrida (por ejemplo el motor SQL).
+    """
+    partes = {
+        "archivos": huella_archivos(entradas.archivos),
+        "config": huella_config(entradas.config),
+        "depende_de": {p: estado.huella(p) for p in entradas.depende_de},
+        "extra": extra or {},
+    }
+    if entradas.prefijos_gcs:
+        partes["gcs"] = huella_gcs(fabrica_storage(), entradas.prefijos_gcs)
+    if entradas.tablas:
+        partes["tablas"] = huella_tablas(fabrica_bq(), entradas.tablas)
+    if entradas.existen:
+        partes["existen"] = huella_existencia(fabrica_bq(), entradas.existen)
+
+    contenido = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def salidas_presentes(entradas: Entradas) -> bool:
+    return all(Path(s).exists() for s in entradas.salidas)
+
+
+# ======================
+# ESTADO
+# ======================
+
+class EstadoPasos:
+    """Última corrida exitosa de cada paso, persistida en un JSON local."""
+
+    def __init__(self, ruta: Path = Path(config.PIPELINE_CACHE_PATH)):
+        self.ruta = ruta
+        self._pasos: Dict[str, Dict] = {}
+        if ruta.exists():
+            try:
+                self._pasos = json.loads(ruta.read_text(encoding="utf-8"))
+            except ValueError:
+                logger.warning("Estado de caché ilegible, se ignora: %s", ruta)
+
+    def huella(self, paso: str) -> Optional[str]:
+        return self._pasos.get(paso, {}).get("huella")
+
+    def vigente(self, paso: str, huella: str) -> bool:
+        return self.huella(paso) == huella
+
+    def registrar(self, paso: str, huella: str, run_id: str) -> None:
+        self._pasos[paso] = {
+            "huella": huella,
+            "run_id": run_id,
+            "completado_en": datetime.now(timezone.utc).isoformat(),
+        }
+        self._guardar()
+
+    def invalidar(self, paso: str) -> None:
+        if self._pasos.pop(paso, None) is not None:
+            self._guardar()
+
+    def _guardar(self) -> None:
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta.with_suffix(".tmp")
+        temporal.write_text(json.dumps(self._pasos, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(temporal, self.ruta)
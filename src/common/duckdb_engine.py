@@ -0,0 +1,401 @@
+"""
+Motor de ejecución local sobre DuckDB.
+
+- Ejecuta los mismos scripts de sql/dwh y sql/datamarts sin BigQuery
+- Carga las tablas raw desde los CSV/Parquet locales del generador (data/)
+- Traduce el dialecto de BigQuery usado en el proyecto al de DuckDB
+
+Traducciones soportadas:
+- `proyecto.dataset.tabla` (backticks)       → dataset.tabla
+- GENERATE_DATE_ARRAY(a, b)                  → generate_series(a, b, INTERVAL 1 DAY)
+- UNNEST(...) AS alias                       → UNNEST(...) AS alias(alias)
+- x IN UNNEST(@param)                        → x IN (SELECT UNNEST($param))
+- FORMAT_DATE(fmt, d)                        → strftime(d, fmt)
+- [SAFE.]PARSE_DATE(fmt, s)                  → CAST([try_]strptime(s, fmt) AS DATE)
+- REGEXP_EXTRACT(s, r'...(grupo)...')        → regexp_extract(s, '...', 1)
+- COUNTIF(x)                                 → count_if(x)
+- ARRAY_AGG(x IGNORE NULLS)                  → ARRAY_AGG(x) FILTER (WHERE x IS NOT NULL)
+- DATE_TRUNC(d, ISOWEEK | MONTH | ...)       → CAST(date_trunc('week' | 'month' | ..., d) AS DATE)
+- EXTRACT(ISOWEEK FROM d)                    → EXTRACT(WEEK FROM d)
+- MERGE tabla                                → MERGE INTO tabla
+- CURRENT_TIMESTAMP()                        → CURRENT_TIMESTAMP
+- ST_GEOGPOINT(lon, lat) / GEOGRAPHY         → [lon, lat] / DOUBLE[]
+- ST_INTERSECTSBOX(p, lon1, lat1, lon2, lat2) → comparación de p[1] y p[2]
+- ST_GEOHASH(p, n)                           → función Python registrada (src/common/geo.py)
+- OPTIONS (...)                              → (se elimina)
+- PARTITION BY / CLUSTER BY de tablas        → (se eliminan)
+- INT64 / FLOAT64 / STRING                   → BIGINT / DOUBLE / VARCHAR
+- @param                                     → $param
+
+CREATE OR REPLACE VIEW / TABLE se ejecutan tal cual: DuckDB los soporta.
+"""
+
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.common.geo import codificar_geohash
+from src.common.logger import get_logger
+from src.common.sql_utils import dividir_sentencias, quitar_comentarios
+from src.config import (
+    DATAMARTS_DATASET,
+    DUCKDB_PATH,
+    DWH_DATASET,
+    INFRA_DATASET,
+    LOCAL_DATA_PATH,
+    MAESTRO_CAMBIOS_TABLE,
+    MAESTRO_CDC,
+    PARTICIONES_RAW,
+    RAW_ARCHIVO_DATASET,
+    RAW_DATASET,
+    TABLAS_RAW,
+)
+from src.load_raw_to_bq import maestro_cdc
+from src.load_raw_to_bq.load_raw import SCHEMAS
+
+logger = get_logger(__name__)
+
+TIPOS_DUCKDB = {
+    "INTEGER": "BIGINT",
+    "INT64": "BIGINT",
+    "FLOAT": "DOUBLE",
+    "FLOAT64": "DOUBLE",
+    "STRING": "VARCHAR",
+    "DATE": "DATE",
+    "TIMESTAMP": "TIMESTAMP",
+    "BOOL": "BOOLEAN",
+    "BOOLEAN": "BOOLEAN",
+}
+
+PARTES_FECHA = {
+    "ISOWEEK": "week",
+    "ISOYEAR": "isoyear",
+}
+
+CARPETAS_LOCALES = {
+    "ventas": "Archivos_VentaClientes",
+    "stock": "Archivos_Stock",
+    "maestro": "Archivos_Maestro",
+}
+
+
+# ======================
+# TRADUCCIÓN DE DIALECTO
+# ======================
+
+def _cierre_parentesis(sql: str, apertura: int) -> int:
+    """Retorna la posición del paréntesis que cierra al abierto en `apertura`."""
+    nivel = 0
+    i = apertura
+    while i < len(sql):
+        c = sql[i]
+        if c in ("'", '"', "`"):
+            i = sql.index(c, i + 1)
+        elif c == "(":
+            nivel += 1
+        elif c == ")":
+            nivel -= 1
+            if nivel == 0:
+                return i
+        i += 1
+    raise ValueError("Paréntesis sin cerrar en el SQL")
+
+
+def _dividir_argumentos(texto: str) -> List[str]:
+    """Divide los argumentos de una llamada respetando paréntesis anidados."""
+    argumentos = []
+    nivel = 0
+    actual = []
+    for c in texto:
+        if c == "(":
+            nivel += 1
+        elif c == ")":
+            nivel -= 1
+        if c == "," and nivel == 0:
+            argumentos.append("".join(actual).strip())
+            actual = []
+        else:
+            actual.append(c)
+    argumentos.append("".join(actual).strip())
+    return argumentos
+
+
+def _reemplazar_llamadas(sql: str, funcion: str, reemplazo: Callable[[List[str]], str]) -> str:
+    """Reemplaza cada llamada `funcion(...)` por el resultado de `reemplazo(args)`."""
+    patron = re.compile(rf"\b{funcion}\s*\(", re.IGNORECASE)
+    pos = 0
+    while True:
+        m = patron.search(sql, pos)
+        if not m:
+            return sql
+        apertura = m.end() - 1
+        cierre = _cierre_parentesis(sql, apertura)
+        argumentos = _dividir_argumentos(sql[apertura + 1:cierre])
+        nuevo = reemplazo(argumentos)
+        sql = sql[:m.start()] + nuevo + sql[cierre + 1:]
+        pos = m.start() + len(nuevo)
+
+
+def _traducir_unnest(sql: str) -> str:
+    """Agrega alias de columna a UNNEST ... AS x y adapta `IN UNNEST(...)`."""
+    patron = re.compile(r"\bUNNEST\s*\(", re.IGNORECASE)
+    resultado = []
+    pos = 0
+    for m in patron.finditer(sql):
+        if m.start() < pos:
+            continue
+        apertura = m.end() - 1
+        cierre = _cierre_parentesis(sql, apertura)
+        llamada = "UNNEST" + sql[apertura:cierre + 1]
+        previo = sql[pos:m.start()]
+
+        alias = re.match(r"\s+AS\s+(\w+)\b(?!\s*\()", sql[cierre + 1:], re.IGNORECASE)
+        if re.search(r"\bIN\s*$", previo, re.IGNORECASE):
+            resultado.append(previo + f"(SELECT {llamada})")
+            pos = cierre + 1
+        elif alias:
+            nombre = alias.group(1)
+            resultado.append(previo + f"{llamada} AS _{nombre}({nombre})")
+            pos = cierre + 1 + alias.end()
+        else:
+            resultado.append(previo + llamada)
+            pos = cierre + 1
+    resultado.append(sql[pos:])
+    return "".join(resultado)
+
+
+def _quitar_opciones(sql: str) -> str:
+    patron = re.compile(r"\bOPTIONS\s*\(", re.IGNORECASE)
+    while True:
+        m = patron.search(sql)
+        if not m:
+            return sql
+        cierre = _cierre_parentesis(sql, m.end() - 1)
+        sql = sql[:m.start()] + sql[cierre + 1:]
+
+
+def _nivel_parentesis(sql: str, hasta: int) -> int:
+    nivel = 0
+    i = 0
+    while i < hasta:
+        c = sql[i]
+        if c in ("'", '"', "`"):
+            i = sql.index(c, i + 1)
+        elif c == "(":
+            nivel += 1
+        elif c == ")":
+            nivel -= 1
+        i += 1
+    return nivel
+
+
+def _quitar_clausulas_tabla(sql: str) -> str:
+    """Elimina PARTITION BY / CLUSTER BY de nivel superior (no las de ventanas OVER)."""
+    patron = re.compile(r"^[ \t]*(PARTITION|CLUSTER)\s+BY\b[^\n;]*\n?", re.IGNORECASE | re.MULTILINE)
+    for m in reversed(list(patron.finditer(sql))):
+        if _nivel_parentesis(sql, m.start()) == 0:
+            sql = sql[:m.start()] + sql[m.end():]
+    return sql
+
+
+def _array_agg_sin_nulos(argumentos: List[str]) -> str:
+    expresion = argumentos[0]
+    m = re.match(r"(.*?)\s+IGNORE\s+NULLS$", expresion, re.IGNORECASE | re.DOTALL)
+    if not m:
+        return f"ARRAY_AGG({', '.join(argumentos)})"
+    expresion = m.group(1)
+    columna = re.sub(r"^DISTINCT\s+", "", expresion, flags=re.IGNORECASE)
+    return f"ARRAY_AGG({expresion}) FILTER (WHERE {columna} IS NOT NULL)"
+
+
+def _regexp_extract(argumentos: List[str]) -> str:
+    # BigQuery retorna el grupo de captura si el patrón tiene uno
+    grupo = 1 if re.search(r"(?<!\\)\((?!\?)", argumentos[1]) else 0
+    return f"regexp_extract({argumentos[0]}, {argumentos[1]}, {grupo})"
+
+
+def traducir_sql(sql: str) -> str:
+    """Traduce un script SQL del dialecto de BigQuery al de DuckDB."""
+    # `proyecto.dataset.tabla` → dataset.tabla
+    sql = re.sub(r"`(?:[\w-]+\.)?(\w+)\.(\w+)`", r"\1.\2", sql)
+    sql = re.sub(r"`(\w+)`", r"\1", sql)
+    # Literales raw (r'...'): DuckDB no interpreta escapes en los literales
+    sql = re.sub(r"(?<![\w'])[rR]'", "'", sql)
+
+    sql = _quitar_opciones(sql)
+    sql = _quitar_clausulas_tabla(sql)
+
+    sql = _reemplazar_llamadas(
+        sql,
+        "GENERATE_DATE_ARRAY",
+        lambda a: f"generate_series(CAST({a[0]} AS DATE), CAST({a[1]} AS DATE), INTERVAL 1 DAY)::DATE[]",
+    )
+    sql = _reemplazar_llamadas(sql, "FORMAT_DATE", lambda a: f"strftime({a[1]}, {a[0]})")
+    sql = _reemplazar_llamadas(sql, r"SAFE\.PARSE_DATE", lambda a: f"CAST(try_strptime({a[1]}, {a[0]}) AS DATE)")
+    sql = _reemplazar_llamadas(sql, "PARSE_DATE", lambda a: f"CAST(strptime({a[1]}, {a[0]}) AS DATE)")
+    sql = _reemplazar_llamadas(sql, "REGEXP_EXTRACT", _regexp_extract)
+    sql = _reemplazar_llamadas(sql, "ARRAY_AGG", _array_agg_sin_nulos)
+    sql = _reemplazar_llamadas(sql, "FARM_FINGERPRINT", lambda a: f"hash({a[0]})")
+    sql = _reemplazar_llamadas(sql, "TO_JSON_STRING", lambda a: f"CAST(to_json({a[0]}) AS VARCHAR)")
+    sql = _reemplazar_llamadas(sql, "DATE_SUB", lambda a: f"CAST({a[0]} - {a[1]} AS DATE)")
+    sql = _reemplazar_llamadas(sql, "DATE_ADD", lambda a: f"CAST({a[0]} + {a[1]} AS DATE)")
+    sql = _reemplazar_llamadas(sql, "DATE_DIFF", lambda a: f"date_diff('{a[2].lower()}', {a[1]}, {a[0]})")
+    sql = _reemplazar_llamadas(
+        sql,
+        "DATE_TRUNC",
+        lambda a: f"CAST(date_trunc('{PARTES_FECHA.get(a[1].upper(), a[1].lower())}', {a[0]}) AS DATE)",
+    )
+    sql = _reemplazar_llamadas(
+        sql,
+        "ST_GEOGPOINT",
+        lambda a: f"[CAST({a[0]} AS DOUBLE), CAST({a[1]} AS DOUBLE)]",
+    )
+    sql = _reemplazar_llamadas(
+        sql,
+        "ST_INTERSECTSBOX",
+        lambda a: f"({a[0]}[1] BETWEEN {a[1]} AND {a[3]} AND {a[0]}[2] BETWEEN {a[2]} AND {a[4]})",
+    )
+    sql = _traducir_unnest(sql)
+
+    sql = re.sub(r"\bEXTRACT\s*\(\s*ISOWEEK\b", "EXTRACT(WEEK", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bMERGE\s+(?!INTO\b)", "MERGE INTO ", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\s*\(\s*\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCOUNTIF\s*\(", "count_if(", sql, flags=re.IGNORECASE)
+
+    sql = re.sub(r"\bINT64\b", "BIGINT", sql)
+    sql = re.sub(r"\bFLOAT64\b", "DOUBLE", sql)
+    sql = re.sub(r"\bSTRING\b", "VARCHAR", sql)
+    sql = re.sub(r"\bGEOGRAPHY\b", "DOUBLE[]", sql)
+
+    sql = re.sub(r"(?<!@)@(\w+)", r"$\1", sql)
+    return sql
+
+
+# ======================
+# MOTOR
+# ======================
+
+def _st_geohash(punto: Optional[List[float]], precision: int) -> Optional[str]:
+    """Equivalente de ST_GEOHASH para puntos representados como [lon, lat]."""
+    if punto is None or None in punto:
+        return None
+    return codificar_geohash(punto[1], punto[0], precision)
+
+
+class MotorDuckDB:
+    """Ejecuta los scripts SQL del proyecto sobre una base DuckDB local."""
+
+    def __init__(
+        self,
+        ruta_db: Path = Path(DUCKDB_PATH),
+        data_path: Path = Path(LOCAL_DATA_PATH),
+        esquemas: Iterable[str] = (RAW_DATASET, RAW_ARCHIVO_DATASET, DWH_DATASET, DATAMARTS_DATASET, INFRA_DATASET),
+    ):
+        import duckdb
+
+        ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self.ruta_db = ruta_db
+        self.data_path = data_path
+        self.con = duckdb.connect(str(ruta_db))
+
+        for dataset in esquemas:
+            self.con.execute(f"CREATE SCHEMA IF NOT EXISTS {dataset}")
+
+        self.con.create_function("st_geohash", _st_geohash, ["DOUBLE[]", "BIGINT"], "VARCHAR")
+
+    def archivos_raw(self, tabla: str) -> Tuple[List[str], List[str]]:
+        """Retorna (csvs, parquets) locales de una tabla raw."""
+        base = self.data_path / CARPETAS_LOCALES[tabla]
+        csvs = sorted(str(p) for p in base.glob("*/*.csv"))
+        parquets = sorted(str(p) for p in base.glob("*/*.parquet"))
+        return csvs, parquets
+
+    def cargar_raw(self) -> None:
+        """(Re)crea las tablas raw a partir de los archivos locales."""
+        for tabla in TABLAS_RAW:
+            columnas = {f.name: TIPOS_DUCKDB[f.field_type] for f in SCHEMAS[tabla]}
+            csvs, parquets = self.archivos_raw(tabla)
+
+            fuentes = []
+            if csvs:
+                fuentes.append(f"SELECT * FROM read_csv({csvs!r}, header = true, columns = {columnas!r})")
+            if parquets:
+                casteo = ", ".join(f"CAST({c} AS {t}) AS {c}" for c, t in columnas.items())
+                fuentes.append(f"SELECT {casteo} FROM read_parquet({parquets!r}, union_by_name = true)")
+
+            if fuentes:
+                self.con.execute(f"CREATE OR REPLACE TABLE {RAW_DATASET}.{tabla} AS " + " UNION ALL BY NAME ".join(fuentes))
+            else:
+                definicion = ", ".join(f"{c} {t}" for c, t in columnas.items())
+                self.con.execute(f"CREATE OR REPLACE TABLE {RAW_DATASET}.{tabla} ({definicion})")
+
+            filas = self.con.execute(f"SELECT COUNT(*) FROM {RAW_DATASET}.{tabla}").fetchone()[0]
+            logger.info("raw.%s cargada en DuckDB | archivos=%d filas=%d", tabla, len(csvs) + len(parquets), filas)
+
+        # Los archivos locales se cargan completos en raw: el archivo de
+        # particiones sólo existe para que las dimensiones lo puedan leer
+        for tabla in PARTICIONES_RAW:
+            self.con.execute(
+                f"CREATE TABLE IF NOT EXISTS {RAW_ARCHIVO_DATASET}.{tabla} AS "
+                f"SELECT * FROM {RAW_DATASET}.{tabla} WHERE FALSE"
+            )
+
+        self.cargar_maestro_cambios()
+
+    def cargar_maestro_cambios(self) -> None:
+        """
+        (Re)crea raw.maestro_cambios aplicando el CDC sobre los archivos de
+        maestro locales, en orden de fecha dentro de cada distribuidor.
+        """
+        esquema = maestro_cdc.esquema_cambios(SCHEMAS["maestro"])
+        definicion = ", ".join(f"{f.name} {TIPOS_DUCKDB[f.field_type]}" for f in esquema)
+        self.con.execute(f"CREATE OR REPLACE TABLE {RAW_DATASET}.{MAESTRO_CAMBIOS_TABLE} ({definicion})")
+        if not MAESTRO_CDC:
+            return
+
+        columnas = [f.name for f in SCHEMAS["maestro"]]
+        vigentes_por_carpeta: Dict[Path, Dict] = {}
+        inicio = datetime.now(timezone.utc)
+        registros = []
+
+        csvs, _ = self.archivos_raw("maestro")
+        for i, ruta in enumerate(Path(p) for p in csvs):
+            vigentes = vigentes_por_carpeta.setdefault(ruta.parent, {})
+            filas = maestro_cdc.leer_maestro_csv(ruta.read_text(encoding="utf-8"))
+            cambios = maestro_cdc.calcular_cambios(filas, vigentes, columnas)
+            maestro_cdc.aplicar_cambios(vigentes, cambios)
+            cargado_en = inicio + timedelta(microseconds=i)
+            registros.extend(
+                [c.get(f.name) for f in esquema[:-2]] + [str(ruta), cargado_en]
+                for c in cambios
+            )
+
+        if registros:
+            marcadores = ", ".join("?" for _ in esquema)
+            self.con.executemany(f"INSERT INTO {RAW_DATASET}.{MAESTRO_CAMBIOS_TABLE} VALUES ({marcadores})", registros)
+        logger.info("raw.%s cargada en DuckDB | cambios=%d", MAESTRO_CAMBIOS_TABLE, len(registros))
+
+    def ejecutar(self, sql: str, label: str, parametros: Optional[Dict] = None) -> None:
+        """Traduce y ejecuta un script SQL sentencia por sentencia."""
+        t0 = time.time()
+        for sentencia in dividir_sentencias(traducir_sql(sql)):
+            codigo = quitar_comentarios(sentencia)
+            usados = {k: v for k, v in (parametros or {}).items() if re.search(rf"\${k}\b", codigo)}
+            self.con.execute(sentencia, usados or None)
+        logger.info("%s completado en %.1fs (duckdb)", label, time.time() - t0)
+
+    def tipo_objeto(self, esquema: str, nombre: str) -> Optional[str]:
+        """Retorna 'BASE TABLE', 'VIEW' o None si el objeto no existe."""
+        fila = self.con.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+            [esquema, nombre],
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def consultar(self, sql: str, parametros: Optional[Dict] = None) -> List[tuple]:
+        return self.con.execute(traducir_sql(sql), parametros or None).fetchall()
+
+    def cerrar(self) -> None:
+        self.con.close()
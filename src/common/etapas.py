@@ -0,0 +1,113 @@
+"""
+Ejecución encadenada de etapas con colas acotadas.
+
+Cada ítem que produce la fuente (por ejemplo un distribuidor recién
+generado) recorre las etapas en orden; cada etapa corre en su propio hilo y
+se comunica con la siguiente por una cola de capacidad fija. Así la etapa 2
+procesa el ítem 1 mientras la etapa 1 procesa el ítem 2, y la latencia total
+se acerca a la de la cadena más lenta en lugar de a la suma de las etapas.
+
+Si una etapa falla se cancelan las demás y se relanza el error original.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Tuple
+
+from src.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+_FIN = object()
+_ESPERA_SEG = 0.1
+
+Etapa = Tuple[str, Callable]
+
+
+def ejecutar_encadenado(fuente: Iterable, etapas: List[Etapa], capacidad: int = 1) -> List:
+    """
+    Pasa cada ítem de `fuente` por las `etapas` (nombre, función) en orden.
+
+    `capacidad` es el tamaño de cada cola entre etapas: la fuente no se
+    adelanta más de esa cantidad de ítems a la etapa que la consume.
+    Retorna los ítems que completaron todas las etapas, en orden de llegada.
+    """
+    if not etapas:
+        raise ValueError("Se requiere al menos una etapa")
+
+    colas = [queue.Queue(maxsize=capacidad) for _ in etapas]
+    completados: List = []
+    errores: List[BaseException] = []
+    cancelado = threading.Event()
+
+    def poner(cola: queue.Queue, item) -> bool:
+        while not cancelado.is_set():
+            try:
+                cola.put(item, timeout=_ESPERA_SEG)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fallar(nombre: str, item, error: BaseException) -> None:
+        logger.error("Etapa '%s' falló con %s: %s", nombre, item, error)
+        errores.append(error)
+        cancelado.set()
+
+    def trabajador(indice: int, nombre: str, funcion: Callable) -> None:
+        entrada = colas[indice]
+        salida = colas[indice + 1] if indice + 1 < len(colas) else None
+        while not cancelado.is_set():
+            try:
+                item = entrada.get(timeout=_ESPERA_SEG)
+            except queue.Empty:
+                continue
+            if item is _FIN:
+                if salida is not None:
+                    poner(salida, _FIN)
+                return
+
+            t0 = time.time()
+            try:
+                funcion(item)
+            except Exception as e:
+                fallar(nombre, item, e)
+                return
+            logger.info("Etapa '%s' | %s completado en %.1fs", nombre, item, time.time() - t0)
+
+            if salida is not None:
+                poner(salida, item)
+            else:
+                completados.append(item)
+
+    # Cada hilo corre en una copia del contexto del llamador (span de trazas actual)
+    hilos = [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(trabajador, i, nombre, funcion),
+            name=f"etapa-{nombre}",
+            daemon=True,
+        )
+        for i, (nombre, funcion) in enumerate(etapas)
+    ]
+    for hilo in hilos:
+        hilo.start()
+
+    # La fuente corre en el hilo llamador
+    try:
+        for item in fuente:
+            if not poner(colas[0], item):
+                break
+        else:
+            poner(colas[0], _FIN)
+    except Exception as e:
+        fallar("fuente", None, e)
+
+    for hilo in hilos:
+        hilo.join()
+
+    if errores:
+        raise errores[0]
+    return completados
@@ -1,17 +1,106 @@
-from google.cloud import storage, bigquery
+"""
+Registro de clientes de GCP del proceso.
 
+- Las librerías de Google Cloud se importan recién al pedir un cliente, así
+  los pasos que no las usan (por ejemplo generate) no pagan su importación
+- Las credenciales (Application Default Credentials) se resuelven una sola
+  vez y cada servicio tiene un único cliente por proceso
+- Los clientes REST usan una sesión HTTP con un pool de HTTP_POOL_SIZE
+  conexiones, dimensionado para varios hilos concurrentes
+- registrar_cliente permite inyectar un cliente propio (tests, motores
+  alternativos) y reiniciar_clientes vacía el registro
+"""
 
-def get_gcs_client() -> storage.Client:
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from src.config import HTTP_POOL_SIZE
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery, bigquery_storage_v1, storage
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+_clientes: Dict[str, object] = {}
+_credenciales: Optional[Tuple[object, Optional[str]]] = None
+_lock = threading.RLock()
+
+
+def _credenciales_y_proyecto() -> Tuple[object, Optional[str]]:
+    global _credenciales
+    with _lock:
+        if _credenciales is None:
+            import google.auth
+
+            _credenciales = google.auth.default(scopes=SCOPES)
+        return _credenciales
+
+
+def crear_sesion_http(credenciales, pool_size: int = HTTP_POOL_SIZE):
+    """Sesión autenticada con un pool de `pool_size` conexiones por host."""
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    sesion = AuthorizedSession(credenciales)
+    adaptador = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+def _obtener(servicio: str, fabrica: Callable[[object, Optional[str]], object]):
+    with _lock:
+        if servicio not in _clientes:
+            credenciales, proyecto = _credenciales_y_proyecto()
+            _clientes[servicio] = fabrica(credenciales, proyecto)
+        return _clientes[servicio]
+
+
+def registrar_cliente(servicio: str, cliente: object) -> None:
+    """Reemplaza el cliente de un servicio ("gcs", "bigquery", "bigquery_read")."""
+    with _lock:
+        _clientes[servicio] = cliente
+
+
+def reiniciar_clientes() -> None:
+    """Descarta los clientes y credenciales registrados."""
+    global _credenciales
+    with _lock:
+        _clientes.clear()
+        _credenciales = None
+
+
+def get_gcs_client() -> "storage.Client":
     """
-    Retorna un cliente autenticado de Google Cloud Storage
-    usando Application Default Credentials.
+    Retorna el cliente de Google Cloud Storage del proceso,
+    autenticado con Application Default Credentials.
     """
-    return storage.Client()
+    def fabrica(credenciales, proyecto):
+        from google.cloud import storage
+
+        return storage.Client(project=proyecto, credentials=credenciales, _http=crear_sesion_http(credenciales))
+
+    return _obtener("gcs", fabrica)
 
 
-def get_bq_client() -> bigquery.Client:
+def get_bq_client() -> "bigquery.Client":
     """
-    Retorna un cliente autenticado de BigQuery
-    usando Application Default Credentials.
+    Retorna el cliente de BigQuery del proceso,
+    autenticado con Application Default Credentials.
     """
-    return bigquery.Client()
+    def fabrica(credenciales, proyecto):
+        from google.cloud import bigquery
+
+        return bigquery.Client(project=proyecto, credentials=credenciales, _http=crear_sesion_http(credenciales))
+
+    return _obtener("bigquery", fabrica)
+
+
+def get_bq_read_client() -> "bigquery_storage_v1.BigQueryReadClient":
+    """Cliente de la BigQuery Storage Read API (gRPC) del proceso."""
+    def fabrica(credenciales, proyecto):
+        from google.cloud import bigquery_storage_v1
+
+        return bigquery_storage_v1.BigQueryReadClient(credentials=credenciales)
+
+    return _obtener("bigquery_read", fabrica)
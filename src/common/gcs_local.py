@@ -0,0 +1,244 @@
+"""
+Cliente de Cloud Storage sobre un directorio local.
+
+Imita la parte de google.cloud.storage que usa el pipeline (buckets,
+listado, subida y descarga de objetos, metadata) con la semántica que el
+pipeline necesita de GCS:
+
+- cada escritura de un objeto crea una generación nueva, mayor que las
+  anteriores; las precondiciones if_generation_match (0 = el objeto no debe
+  existir) fallan con PreconditionFailed
+- crc32c en base64 (big-endian), como lo reporta GCS
+- leer una generación que ya no es la vigente falla con NotFound (bucket
+  sin versionado)
+
+Los objetos se guardan en <raiz>/<bucket>/<ruta> y sus atributos en
+<raiz>/.objetos/<bucket>/<ruta>.json. Se registra con
+gcp_auth.registrar_cliente("gcs", ...) para correr el pipeline sin GCP
+(ver src/benchmark/run_benchmark.py).
+"""
+
+import base64
+import json
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+import google_crc32c
+from google.api_core.exceptions import Conflict, NotFound, PreconditionFailed
+
+CARPETA_ATRIBUTOS = ".objetos"
+# Objetos por página del listado de la API de GCS
+TAMANO_PAGINA = 1000
+
+
+def calcular_crc32c(contenido: bytes) -> str:
+    """CRC32C de un contenido en el formato de GCS (base64 de 4 bytes big-endian)."""
+    return base64.b64encode(google_crc32c.value(contenido).to_bytes(4, "big")).decode("ascii")
+
+
+class BlobLocal:
+    def __init__(self, bucket: "BucketLocal", name: str, generation: Optional[int] = None):
+        self.bucket = bucket
+        self.name = name
+        self.metadata: Optional[Dict[str, str]] = None
+        self.content_type: Optional[str] = None
+        self.size: Optional[int] = None
+        self.updated: Optional[datetime] = None
+        self.crc32c: Optional[str] = None
+        self.generation = generation
+        self._generacion_pedida = generation
+
+    @property
+    def _ruta(self) -> Path:
+        return self.bucket._ruta / self.name
+
+    @property
+    def _ruta_atributos(self) -> Path:
+        return self.bucket.client.raiz / CARPETA_ATRIBUTOS / self.bucket.name / f"{self.name}.json"
+
+    def _cargar(self, atributos: Dict) -> "BlobLocal":
+        self.generation = atributos["generation"]
+        self.size = atributos["size"]
+        self.crc32c = atributos["crc32c"]
+        self.metadata = atributos["metadata"]
+        self.content_type = atributos["content_type"]
+        self.updated = datetime.fromisoformat(atributos["updated"])
+        return self
+
+    def _atributos(self) -> Optional[Dict]:
+        try:
+            return json.loads(self._ruta_atributos.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def _vigente(self) -> Dict:
+        atributos = self._atributos()
+        if atributos is None or (
+            self._generacion_pedida is not None and atributos["generation"] != self._generacion_pedida
+        ):
+            raise NotFound(f"No existe gs://{self.bucket.name}/{self.name}")
+        return atributos
+
+    def exists(self) -> bool:
+        self.bucket.client._contar("get_blob")
+        try:
+            self._vigente()
+            return True
+        except NotFound:
+            return False
+
+    def reload(self) -> None:
+        self.bucket.client._contar("get_blob")
+        self._cargar(self._vigente())
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None,
+    ) -> None:
+        contenido = data.encode("utf-8") if isinstance(data, str) else data
+        cliente = self.bucket.client
+        cliente._contar("upload")
+
+        with cliente._lock:
+            previo = self._atributos()
+            if if_generation_match is not None and (previo["generation"] if previo else 0) != if_generation_match:
+                raise PreconditionFailed(
+                    f"gs://{self.bucket.name}/{self.name}: la generación no coincide con {if_generation_match}"
+                )
+
+            self._ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal = self._ruta.with_name(f".{self._ruta.name}.tmp")
+            temporal.write_bytes(contenido)
+            temporal.replace(self._ruta)
+
+            atributos = {
+                "generation": cliente._nueva_generacion(),
+                "size": len(contenido),
+                "crc32c": calcular_crc32c(contenido),
+                "metadata": dict(self.metadata) if self.metadata else None,
+                "content_type": content_type or self.content_type,
+                "updated": datetime.now(timezone.utc).isoformat(),
+            }
+            self._ruta_atributos.parent.mkdir(parents=True, exist_ok=True)
+            self._ruta_atributos.write_text(json.dumps(atributos), encoding="utf-8")
+        self._cargar(atributos)
+        self._generacion_pedida = None
+
+    def upload_from_filename(self, filename: Union[str, Path], content_type: Optional[str] = None, **kwargs) -> None:
+        self.upload_from_string(Path(filename).read_bytes(), content_type=content_type, **kwargs)
+
+    def download_as_bytes(self) -> bytes:
+        self.bucket.client._contar("download")
+        self._cargar(self._vigente())
+        return self._ruta.read_bytes()
+
+    def download_as_text(self, encoding: str = "utf-8") -> str:
+        return self.download_as_bytes().decode(encoding)
+
+    def delete(self, if_generation_match: Optional[int] = None) -> None:
+        self.bucket.delete_blob(self.name, if_generation_match=if_generation_match)
+
+
+class BucketLocal:
+    def __init__(self, client: "ClienteGCSLocal", name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def _ruta(self) -> Path:
+        return self.client.raiz / self.name
+
+    def blob(self, blob_name: str, generation: Optional[int] = None) -> BlobLocal:
+        return BlobLocal(self, blob_name, generation)
+
+    def get_blob(self, blob_name: str) -> Optional[BlobLocal]:
+        self.client._contar("get_blob")
+        blob = BlobLocal(self, blob_name)
+        atributos = blob._atributos()
+        return blob._cargar(atributos) if atributos else None
+
+    def list_blobs(self, prefix: str = "", start_offset: Optional[str] = None) -> Iterator[BlobLocal]:
+        base = self.client.raiz / CARPETA_ATRIBUTOS / self.name
+        blobs = []
+        for ruta in sorted(base.rglob("*.json")):
+            nombre = ruta.relative_to(base).as_posix()[:-len(".json")]
+            if nombre.startswith(prefix) and (not start_offset or nombre >= start_offset):
+                blobs.append(BlobLocal(self, nombre)._cargar(json.loads(ruta.read_text(encoding="utf-8"))))
+        # Una solicitud por página del listado
+        self.client._contar("list_blobs", max(1, math.ceil(len(blobs) / TAMANO_PAGINA)))
+        return iter(blobs)
+
+    def delete_blob(self, blob_name: str, if_generation_match: Optional[int] = None) -> None:
+        self.client._contar("delete")
+        blob = BlobLocal(self, blob_name)
+        with self.client._lock:
+            atributos = blob._atributos()
+            if atributos is None:
+                raise NotFound(f"No existe gs://{self.name}/{blob_name}")
+            if if_generation_match is not None and atributos["generation"] != if_generation_match:
+                raise PreconditionFailed(f"gs://{self.name}/{blob_name}: la generación no coincide")
+            blob._ruta.unlink(missing_ok=True)
+            blob._ruta_atributos.unlink()
+
+
+class ClienteGCSLocal:
+    """
+    Cliente de GCS sobre `raiz`. `solicitudes` cuenta las operaciones por
+    tipo (cada una equivale a una solicitud a la API de GCS).
+    """
+
+    def __init__(self, raiz: Path, project: str = "local"):
+        self.raiz = Path(raiz)
+        self.project = project
+        self.solicitudes: Counter = Counter()
+        self._lock = threading.RLock()
+        self._ultima_generacion = 0
+        self.raiz.mkdir(parents=True, exist_ok=True)
+
+    def _contar(self, operacion: str, cantidad: int = 1) -> None:
+        with self._lock:
+            self.solicitudes[operacion] += cantidad
+
+    def _nueva_generacion(self) -> int:
+        # Microsegundos desde epoch, como GCS, estrictamente crecientes
+        with self._lock:
+            self._ultima_generacion = max(self._ultima_generacion + 1, time.time_ns() // 1000)
+            return self._ultima_generacion
+
+    def bucket(self, bucket_name: str) -> BucketLocal:
+        return BucketLocal(self, bucket_name)
+
+    def get_bucket(self, bucket_name: str) -> BucketLocal:
+        self._contar("get_bucket")
+        if not (self.raiz / bucket_name).is_dir():
+            raise NotFound(f"No existe el bucket {bucket_name}")
+        return BucketLocal(self, bucket_name)
+
+    def create_bucket(self, bucket_name: str) -> BucketLocal:
+        self._contar("create_bucket")
+        ruta = self.raiz / bucket_name
+        if ruta.is_dir():
+            raise Conflict(f"El bucket {bucket_name} ya existe")
+        ruta.mkdir(parents=True)
+        return BucketLocal(self, bucket_name)
+
+    def list_blobs(
+        self,
+        bucket_or_name: Union[str, BucketLocal],
+        prefix: str = "",
+        start_offset: Optional[str] = None,
+    ) -> Iterator[BlobLocal]:
+        nombre = bucket_or_name.name if isinstance(bucket_or_name, BucketLocal) else bucket_or_name
+        return BucketLocal(self, nombre).list_blobs(prefix=prefix, start_offset=start_offset)
+
+    def ruta_local(self, uri: str) -> Path:
+        """Archivo local de un objeto gs://bucket/ruta."""
+        bucket, _, ruta = uri[len("gs://"):].partition("/")
+        return self.raiz / bucket / ruta
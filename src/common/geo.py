@@ -0,0 +1,162 @@
+"""
+Utilidades geoespaciales para la ubicación de clientes.
+
+- Codificación geohash (la misma que ST_GEOHASH de BigQuery), usada por el
+  motor DuckDB y por los tests
+- Cobertura de un bounding box con celdas geohash y armado de un filtro SQL
+  por rangos de geohash (aprovecha el clustering de los datamarts) más el
+  filtro exacto por caja
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from src.config import GEOHASH_MAX_CELDAS_FILTRO, GEOHASH_PRECISION
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def codificar_geohash(latitud: float, longitud: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash de `precision` caracteres del punto (latitud, longitud)."""
+    if not -90 <= latitud <= 90 or not -180 <= longitud <= 180:
+        raise ValueError(f"Coordenadas fuera de rango: ({latitud}, {longitud})")
+
+    rango_lat = [-90.0, 90.0]
+    rango_lon = [-180.0, 180.0]
+    resultado = []
+    bits = 0
+    cantidad = 0
+    es_longitud = True
+
+    while len(resultado) < precision:
+        rango, valor = (rango_lon, longitud) if es_longitud else (rango_lat, latitud)
+        medio = (rango[0] + rango[1]) / 2
+        bits <<= 1
+        if valor >= medio:
+            bits |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        es_longitud = not es_longitud
+        cantidad += 1
+        if cantidad == 5:
+            resultado.append(BASE32[bits])
+            bits = 0
+            cantidad = 0
+
+    return "".join(resultado)
+
+
+def tamanio_celda(precision: int) -> Tuple[float, float]:
+    """(alto en grados de latitud, ancho en grados de longitud) de una celda."""
+    bits = 5 * precision
+    bits_lon = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / 2 ** bits_lat, 360.0 / 2 ** bits_lon
+
+
+def _indices(minimo: float, maximo: float, origen: float, paso: float, limite: int) -> range:
+    desde = max(0, math.floor((minimo - origen) / paso))
+    hasta = min(limite - 1, math.floor((maximo - origen) / paso))
+    return range(desde, hasta + 1)
+
+
+def _grilla_bbox(lat_min, lon_min, lat_max, lon_max, precision) -> Tuple[range, range]:
+    """Índices de fila (latitud) y columna (longitud) de las celdas del bounding box."""
+    if lat_min > lat_max or lon_min > lon_max:
+        raise ValueError("Bounding box inválido: el mínimo supera al máximo")
+    alto, ancho = tamanio_celda(precision)
+    filas = _indices(lat_min, lat_max, -90.0, alto, round(180.0 / alto))
+    columnas = _indices(lon_min, lon_max, -180.0, ancho, round(360.0 / ancho))
+    return filas, columnas
+
+
+def cantidad_celdas(lat_min: float, lon_min: float, lat_max: float, lon_max: float, precision: int) -> int:
+    filas, columnas = _grilla_bbox(lat_min, lon_min, lat_max, lon_max, precision)
+    return len(filas) * len(columnas)
+
+
+def celdas_bbox(
+    lat_min: float,
+    lon_min: float,
+    lat_max: float,
+    lon_max: float,
+    precision: int,
+) -> List[str]:
+    """Geohashes de `precision` caracteres que cubren el bounding box (ordenados)."""
+    filas, columnas = _grilla_bbox(lat_min, lon_min, lat_max, lon_max, precision)
+    alto, ancho = tamanio_celda(precision)
+    return sorted({
+        codificar_geohash(-90.0 + (i + 0.5) * alto, -180.0 + (j + 0.5) * ancho, precision)
+        for i in filas
+        for j in columnas
+    })
+
+
+def siguiente_geohash(geohash: str) -> Optional[str]:
+    """Menor geohash de igual largo posterior a `geohash` (None si no existe)."""
+    caracteres = list(geohash)
+    for pos in range(len(caracteres) - 1, -1, -1):
+        indice = BASE32.index(caracteres[pos])
+        if indice < len(BASE32) - 1:
+            caracteres[pos] = BASE32[indice + 1]
+            return "".join(caracteres)
+        caracteres[pos] = BASE32[0]
+    return None
+
+
+def rangos_geohash(celdas: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Agrupa celdas consecutivas en rangos [inicio, fin) para filtrar por prefijo."""
+    rangos: List[Tuple[str, Optional[str]]] = []
+    for celda in sorted(celdas):
+        fin = siguiente_geohash(celda)
+        if rangos and rangos[-1][1] == celda:
+            rangos[-1] = (rangos[-1][0], fin)
+        else:
+            rangos.append((celda, fin))
+    return rangos
+
+
+def filtro_bbox(
+    lat_min: float,
+    lon_min: float,
+    lat_max: float,
+    lon_max: float,
+    columna_geohash: str = "geohash",
+    columna_ubicacion: str = "ubicacion",
+    max_celdas: int = GEOHASH_MAX_CELDAS_FILTRO,
+) -> Tuple[str, Dict]:
+    """
+    Condición SQL (y sus parámetros) que selecciona las filas dentro del
+    bounding box.
+
+    Combina rangos sobre la columna geohash (podables por el clustering)
+    con ST_INTERSECTSBOX sobre la ubicación para descartar los bordes de las
+    celdas. La precisión de las celdas se reduce hasta que la cobertura
+    tenga como máximo `max_celdas` celdas.
+    """
+    precision = GEOHASH_PRECISION
+    while precision > 1 and cantidad_celdas(lat_min, lon_min, lat_max, lon_max, precision) > max_celdas:
+        precision -= 1
+    celdas = celdas_bbox(lat_min, lon_min, lat_max, lon_max, precision)
+
+    parametros: Dict = {
+        "bbox_lat_min": float(lat_min),
+        "bbox_lon_min": float(lon_min),
+        "bbox_lat_max": float(lat_max),
+        "bbox_lon_max": float(lon_max),
+    }
+    rangos = []
+    for i, (inicio, fin) in enumerate(rangos_geohash(celdas)):
+        parametros[f"gh_desde_{i}"] = inicio
+        if fin is None:
+            rangos.append(f"{columna_geohash} >= @gh_desde_{i}")
+        else:
+            parametros[f"gh_hasta_{i}"] = fin
+            rangos.append(f"({columna_geohash} >= @gh_desde_{i} AND {columna_geohash} < @gh_hasta_{i})")
+
+    condicion = (
+        "(" + " OR ".join(rangos) + ")"
+        f" AND ST_INTERSECTSBOX({columna_ubicacion}, @bbox_lon_min, @bbox_lat_min, @bbox_lon_max, @bbox_lat_max)"
+    )
+    return condicion, parametros
@@ -0,0 +1,151 @@
+"""
+Soporte para refrescos incrementales por fecha.
+
+- Deriva las fechas afectadas a partir de los archivos registrados en
+  infra.control_archivos_cargados desde la última marca de agua
+- Guarda marcas de agua (watermarks) por proceso en infra.watermarks, con
+  una huella opcional del contenido de las tablas que el proceso leyó
+"""
+
+import hashlib
+import re
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+from src.common.logger import get_logger
+from src.common.run_context import get_run_id
+from src.config import CONTROL_TABLE, DWH_DATASET, INFRA_DATASET, WATERMARKS_TABLE
+
+logger = get_logger(__name__)
+
+# Fecha contenida en el nombre de archivo: Venta_Clientes_YYYY-MM-DD.csv, StockPeriodo_YYYY-MM-DD.csv
+REGEX_FECHA_ARCHIVO = r"(\d{4}-\d{2}-\d{2})\.[A-Za-z]+$"
+
+
+def fecha_de_archivo(object_path: str) -> Optional[date]:
+    """Fecha de negocio contenida en el nombre del archivo (o None)."""
+    m = re.search(REGEX_FECHA_ARCHIVO, object_path)
+    if not m:
+        return None
+    try:
+        return date.fromisoformat(m.group(1))
+    except ValueError:
+        return None
+
+
+def obtener_watermark(client: bigquery.Client, proceso: str) -> Optional[datetime]:
+    """Retorna la última marca de agua registrada para el proceso (o None)."""
+    query = f"""
+    SELECT MAX(valor) AS valor
+    FROM `{client.project}.{INFRA_DATASET}.{WATERMARKS_TABLE}`
+    WHERE proceso = @proceso
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("proceso", "STRING", proceso)]
+        ),
+    )
+    return next(iter(job.result())).valor
+
+
+def obtener_huella(client: bigquery.Client, proceso: str) -> Optional[str]:
+    """Retorna la huella de la última marca de agua del proceso (o None)."""
+    query = f"""
+    SELECT huella
+    FROM `{client.project}.{INFRA_DATASET}.{WATERMARKS_TABLE}`
+    WHERE proceso = @proceso
+    ORDER BY actualizado_en DESC
+    LIMIT 1
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("proceso", "STRING", proceso)]
+        ),
+    )
+    fila = next(iter(job.result()), None)
+    return fila.huella if fila else None
+
+
+def guardar_watermark(client: bigquery.Client, proceso: str, valor: datetime, huella: Optional[str] = None) -> None:
+    """Registra una nueva marca de agua para el proceso."""
+    table_id = f"{client.project}.{INFRA_DATASET}.{WATERMARKS_TABLE}"
+    registro = {
+        "proceso": proceso,
+        "valor": valor.isoformat(),
+        "actualizado_en": datetime.now(timezone.utc).isoformat(),
+        "run_id": get_run_id(),
+        "huella": huella,
+    }
+    job = client.load_table_from_json(
+        [registro],
+        table_id,
+        job_config=bigquery.LoadJobConfig(write_disposition="WRITE_APPEND"),
+    )
+    job.result()
+    logger.info("Watermark '%s' actualizado a %s", proceso, valor.isoformat())
+
+
+def fechas_cargadas_desde(
+    client: bigquery.Client,
+    desde: Optional[datetime],
+) -> Tuple[List[date], Optional[datetime]]:
+    """
+    Retorna las fechas de negocio de los archivos de ventas y stock
+    cargados después de `desde`, junto con el mayor loaded_at observado
+    (a usar como próxima marca de agua).
+
+    Usa el rango de fechas del manifiesto de cada archivo y, para archivos
+    sin manifiesto, la fecha contenida en el nombre.
+    """
+    query = f"""
+    SELECT
+      ARRAY_AGG(DISTINCT fecha IGNORE NULLS) AS fechas,
+      MAX(loaded_at) AS hasta
+    FROM `{client.project}.{INFRA_DATASET}.{CONTROL_TABLE}`,
+      UNNEST(IF(
+        fecha_min IS NOT NULL,
+        GENERATE_DATE_ARRAY(fecha_min, fecha_max),
+        [SAFE.PARSE_DATE('%Y-%m-%d', REGEXP_EXTRACT(object_path, r'{REGEX_FECHA_ARCHIVO}'))]
+      )) AS fecha
+    WHERE tabla IN ('ventas', 'stock')
+      AND (@desde IS NULL OR loaded_at > @desde)
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("desde", "TIMESTAMP", desde)]
+        ),
+    )
+    fila = next(iter(job.result()))
+    return sorted(fila.fechas or []), fila.hasta
+
+
+def fechas_en_hechos(client: bigquery.Client) -> List[date]:
+    """Retorna todas las fechas presentes en fact_ventas y fact_stock (refresco total)."""
+    query = f"""
+    SELECT fecha FROM `{client.project}.{DWH_DATASET}.fact_ventas`
+    UNION DISTINCT
+    SELECT fecha FROM `{client.project}.{DWH_DATASET}.fact_stock`
+    """
+    return sorted(r.fecha for r in client.query(query).result())
+
+
+def huella_tablas_dwh(client: bigquery.Client, tablas: Iterable[str]) -> str:
+    """
+    Huella del contenido de tablas del DWH: filas y XOR de un hash por fila.
+
+    No usa last_modified porque el DWH reconstruye las dimensiones completas
+    (CREATE OR REPLACE) en cada corrida, cambien o no. Las dimensiones son
+    chicas frente a los hechos, así que leerlas cuesta poco.
+    """
+    partes = [
+        f"""SELECT '{tabla}' AS tabla, COUNT(*) AS filas, BIT_XOR(FARM_FINGERPRINT(TO_JSON_STRING(t))) AS hash_filas
+    FROM `{client.project}.{DWH_DATASET}.{tabla}` AS t"""
+        for tabla in sorted(tablas)
+    ]
+    filas = sorted((r.tabla, r.filas, r.hash_filas) for r in client.query("\n    UNION ALL\n    ".join(partes)).result())
+    return hashlib.sha256(repr(filas).encode("utf-8")).hexdigest()
@@ -0,0 +1,298 @@
+"""
+Estadísticas de ejecución de jobs de BigQuery.
+
+- Recolecta bytes procesados/facturados, slot-ms, cache hit, etapas y
+  filas escritas de cada job que ejecuta el pipeline
+- Persiste las estadísticas en infra.job_stats etiquetadas con el run_id
+- Compara corridas para detectar regresiones por query
+
+Uso:
+  python -m src.common.job_stats                      # compara las 2 últimas corridas
+  python -m src.common.job_stats RUN_BASE RUN_NUEVO   # compara dos corridas puntuales
+"""
+
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import bigquery
+from google.cloud.exceptions import GoogleCloudError
+
+from src.common import metricas
+from src.common.gcp_auth import get_bq_client
+from src.common.logger import get_logger
+from src.common.run_context import get_run_id
+from src.config import INFRA_DATASET, JOB_STATS_TABLE
+
+logger = get_logger(__name__)
+
+METRICAS_COMPARADAS = ["duracion_ms", "bytes_procesados", "bytes_facturados", "slot_ms", "filas_escritas"]
+
+_pendientes: List[Dict] = []
+_lock = threading.Lock()
+
+
+# ======================
+# RECOLECCIÓN
+# ======================
+
+def _iso(valor: Optional[datetime]) -> Optional[str]:
+    return valor.isoformat() if valor else None
+
+
+def _ms_entre(inicio: Optional[datetime], fin: Optional[datetime]) -> Optional[int]:
+    if not inicio or not fin:
+        return None
+    return int((fin - inicio).total_seconds() * 1000)
+
+
+def extraer_estadisticas(job, etiqueta: str, paso: str) -> Dict:
+    """
+    Arma el registro de estadísticas de un job de BigQuery (query o load).
+
+    Usa sólo los atributos públicos de QueryJob / LoadJob. Los que no
+    aplican al tipo de job quedan en None.
+    """
+    if job.job_type == "load":
+        filas_escritas = job.output_rows
+        # LoadJob expone slot_millis sólo en algunas versiones de la librería
+        slot_ms = getattr(job, "slot_millis", None)
+        bytes_procesados = job.input_file_bytes
+        bytes_facturados = None
+        cache_hit = None
+        etapas = []
+    else:
+        filas_escritas = job.num_dml_affected_rows
+        slot_ms = job.slot_millis
+        bytes_procesados = job.total_bytes_processed
+        bytes_facturados = job.total_bytes_billed
+        cache_hit = job.cache_hit
+        etapas = [
+            {
+                "nombre": e.name,
+                "estado": e.status,
+                "duracion_ms": _ms_entre(e.start, e.end),
+                "espera_ms_avg": e.wait_ms_avg,
+                "lectura_ms_avg": e.read_ms_avg,
+                "computo_ms_avg": e.compute_ms_avg,
+                "escritura_ms_avg": e.write_ms_avg,
+                "slot_ms": e.slot_ms,
+                "registros_leidos": e.records_read,
+                "registros_escritos": e.records_written,
+            }
+            for e in (job.query_plan or [])
+        ]
+
+    error = job.error_result.get("message") if job.error_result else None
+
+    return {
+        "run_id": get_run_id(),
+        "paso": paso,
+        "etiqueta": etiqueta,
+        "job_id": job.job_id,
+        "tipo_job": job.job_type,
+        "creado_en": _iso(job.created),
+        "inicio": _iso(job.started),
+        "fin": _iso(job.ended),
+        "duracion_ms": _ms_entre(job.started, job.ended),
+        "bytes_procesados": int(bytes_procesados) if bytes_procesados is not None else None,
+        "bytes_facturados": int(bytes_facturados) if bytes_facturados is not None else None,
+        "slot_ms": int(slot_ms) if slot_ms is not None else None,
+        "cache_hit": cache_hit,
+        "filas_escritas": int(filas_escritas) if filas_escritas is not None else None,
+        "etapas": etapas,
+        "error": error,
+    }
+
+
+def registrar_job(job, etiqueta: str, paso: str) -> None:
+    """
+    Registra las estadísticas de un job finalizado (o fallido).
+
+    Nunca propaga errores: las estadísticas no deben romper el pipeline.
+    """
+    try:
+        registro = extraer_estadisticas(job, etiqueta, paso)
+    except Exception as e:
+        logger.warning("No se pudieron extraer estadísticas de %s: %s", etiqueta, e)
+        return
+
+    with _lock:
+        _pendientes.append(registro)
+
+    if metricas.habilitado():
+        try:
+            _registrar_metricas(job, registro)
+        except Exception as e:
+            logger.warning("No se pudieron registrar métricas de %s: %s", etiqueta, e)
+
+
+def _ns(valor: datetime) -> int:
+    return int(valor.timestamp() * 1_000_000_000)
+
+
+def _registrar_metricas(job, registro: Dict) -> None:
+    """Contadores, latencia y span del job (con los tiempos que reporta BigQuery)."""
+    etiquetas = {"paso": registro["paso"], "tipo_job": registro["tipo_job"]}
+    metricas.incrementar("pipeline_jobs", resultado="error" if registro["error"] else "ok", **etiquetas)
+    if registro["duracion_ms"] is not None:
+        metricas.observar("pipeline_duracion_job_segundos", registro["duracion_ms"] / 1000, **etiquetas)
+    if registro["bytes_procesados"]:
+        metricas.incrementar("pipeline_bytes_procesados", registro["bytes_procesados"], **etiquetas)
+    if registro["filas_escritas"]:
+        metricas.incrementar("pipeline_filas_escritas", registro["filas_escritas"], **etiquetas)
+
+    inicio = job.started or job.created
+    if inicio and job.ended:
+        metricas.registrar_span(
+            f"bigquery.{registro['tipo_job']}",
+            _ns(inicio),
+            _ns(job.ended),
+            error=registro["error"],
+            etiqueta=registro["etiqueta"],
+            job_id=registro["job_id"],
+            bytes_procesados=registro["bytes_procesados"],
+            slot_ms=registro["slot_ms"],
+            filas_escritas=registro["filas_escritas"],
+        )
+
+
+def guardar_estadisticas(client: bigquery.Client) -> None:
+    """Persiste en infra.job_stats las estadísticas acumuladas."""
+    with _lock:
+        registros = list(_pendientes)
+        _pendientes.clear()
+
+    if not registros:
+        return
+
+    table_id = f"{client.project}.{INFRA_DATASET}.{JOB_STATS_TABLE}"
+
+    try:
+        job = client.load_table_from_json(
+            registros,
+            table_id,
+            job_config=bigquery.LoadJobConfig(write_disposition="WRITE_APPEND"),
+        )
+        job.result()
+        logger.info("Estadísticas de %d jobs guardadas en %s", len(registros), table_id)
+    except GoogleCloudError as e:
+        logger.warning("No se pudieron guardar estadísticas de jobs en %s: %s", table_id, e)
+
+
+# ======================
+# REPORTE
+# ======================
+
+def agregar_por_etiqueta(filas: List[Dict]) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """Suma las métricas de una corrida por (paso, etiqueta)."""
+    agregado: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for f in filas:
+        clave = (f["paso"], f["etiqueta"])
+        acc = agregado.setdefault(clave, {m: 0 for m in METRICAS_COMPARADAS} | {"jobs": 0})
+        acc["jobs"] += 1
+        for m in METRICAS_COMPARADAS:
+            acc[m] += f.get(m) or 0
+    return agregado
+
+
+def comparar_corridas(
+    filas_base: List[Dict],
+    filas_nueva: List[Dict],
+    umbral: float = 0.2,
+) -> List[Dict]:
+    """
+    Compara dos corridas métrica por métrica para cada (paso, etiqueta).
+
+    Una métrica se marca como regresión si crece más que `umbral`
+    (proporción) respecto de la corrida base.
+    """
+    base = agregar_por_etiqueta(filas_base)
+    nueva = agregar_por_etiqueta(filas_nueva)
+
+    comparacion = []
+    for clave in sorted(set(base) | set(nueva)):
+        b = base.get(clave)
+        n = nueva.get(clave)
+        fila = {"paso": clave[0], "etiqueta": clave[1], "regresiones": []}
+
+        for m in METRICAS_COMPARADAS:
+            valor_base = b[m] if b else None
+            valor_nuevo = n[m] if n else None
+            fila[m] = (valor_base, valor_nuevo)
+            if valor_base and valor_nuevo is not None and valor_nuevo > valor_base * (1 + umbral):
+                fila["regresiones"].append(m)
+
+        comparacion.append(fila)
+
+    return comparacion
+
+
+def obtener_filas_corrida(client: bigquery.Client, run_id: str) -> List[Dict]:
+    query = f"""
+    SELECT paso, etiqueta, duracion_ms, bytes_procesados, bytes_facturados, slot_ms, filas_escritas
+    FROM `{client.project}.{INFRA_DATASET}.{JOB_STATS_TABLE}`
+    WHERE run_id = @run_id
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("run_id", "STRING", run_id)]
+        ),
+    )
+    return [dict(r.items()) for r in job.result()]
+
+
+def ultimas_corridas(client: bigquery.Client, cantidad: int = 2) -> List[str]:
+    query = f"""
+    SELECT run_id, MIN(creado_en) AS inicio
+    FROM `{client.project}.{INFRA_DATASET}.{JOB_STATS_TABLE}`
+    GROUP BY run_id
+    ORDER BY inicio DESC
+    LIMIT {int(cantidad)}
+    """
+    return [r.run_id for r in client.query(query).result()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Comparación de estadísticas de jobs entre corridas")
+    parser.add_argument("run_base", nargs="?", help="run_id de referencia")
+    parser.add_argument("run_nuevo", nargs="?", help="run_id a comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Crecimiento tolerado (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    client = get_bq_client()
+
+    if args.run_base and args.run_nuevo:
+        run_base, run_nuevo = args.run_base, args.run_nuevo
+    else:
+        corridas = ultimas_corridas(client, 2)
+        if len(corridas) < 2:
+            logger.info("Se necesitan al menos dos corridas registradas para comparar.")
+            return
+        run_nuevo, run_base = corridas
+
+    logger.info("Comparando corridas | base=%s nueva=%s umbral=%.0f%%", run_base, run_nuevo, args.umbral * 100)
+
+    comparacion = comparar_corridas(
+        obtener_filas_corrida(client, run_base),
+        obtener_filas_corrida(client, run_nuevo),
+        umbral=args.umbral,
+    )
+
+    for fila in comparacion:
+        dur_base, dur_nueva = fila["duracion_ms"]
+        bytes_base, bytes_nuevo = fila["bytes_procesados"]
+        logger.info(
+            "%s | %-40s | duracion_ms %s -> %s | bytes %s -> %s%s",
+            fila["paso"], fila["etiqueta"], dur_base, dur_nueva, bytes_base, bytes_nuevo,
+            f" | REGRESIÓN: {', '.join(fila['regresiones'])}" if fila["regresiones"] else "",
+        )
+
+    regresiones = sum(1 for f in comparacion if f["regresiones"])
+    logger.info("Etiquetas con regresión: %d de %d", regresiones, len(comparacion))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,211 @@
+"""
+Logging del pipeline.
+
+- Formato texto (por defecto) o JSON de una línea por registro (LOG_FORMATO)
+- Con LOG_ASINCRONICO los registros pasan por una cola y un único hilo los
+  escribe en stdout, de modo que loguear no bloquea al paso
+- Progreso: resumen periódico (cantidad, ritmo, errores) de operaciones por
+  ítem, en lugar de una línea por archivo; los errores se loguean siempre
+  uno por uno
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from src.config import LOG_ASINCRONICO, LOG_FORMATO, LOG_POR_ARCHIVO, LOG_PROGRESO_INTERVALO_SEG
+
+FORMATO_TEXTO = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# Cola única del proceso: los handlers de todos los loggers escriben en ella
+_cola: queue.Queue = queue.Queue(-1)
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+_atexit_registrado = False
+
+
+class FormatoJson(logging.Formatter):
+    """Un objeto JSON por línea; los datos de `extra={"datos": {...}}` se agregan como campos."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        run_id = os.environ.get("PIPELINE_RUN_ID")
+        if run_id:
+            registro["run_id"] = run_id
+        datos = getattr(record, "datos", None)
+        if isinstance(datos, dict):
+            registro.update(datos)
+        if record.exc_info:
+            registro["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+def crear_formatter(formato: str = LOG_FORMATO) -> logging.Formatter:
+    if formato == "json":
+        return FormatoJson()
+    return logging.Formatter(fmt=FORMATO_TEXTO, datefmt=FORMATO_FECHA)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Encola el registro sin formatearlo: el formato lo aplica el hilo escritor."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Se resuelven mensaje y traceback antes de cruzar de hilo
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+class _SalidaEstandar(logging.StreamHandler):
+    """
+    StreamHandler sobre el sys.stdout vigente al escribir, no el de su
+    creación: pytest y otros reemplazan sys.stdout y cierran el anterior.
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+def _handler_salida() -> logging.Handler:
+    handler = _SalidaEstandar()
+    handler.setFormatter(crear_formatter())
+    return handler
+
+
+def iniciar_escritor() -> None:
+    """Arranca (si no está corriendo) el hilo que escribe la cola en stdout."""
+    global _listener, _atexit_registrado
+    with _lock:
+        if _listener is None:
+            _listener = logging.handlers.QueueListener(_cola, _handler_salida(), respect_handler_level=True)
+            _listener.start()
+            if not _atexit_registrado:
+                atexit.register(detener_logging)
+                _atexit_registrado = True
+
+
+def _handler_asincronico() -> logging.Handler:
+    iniciar_escritor()
+    return _QueueHandler(_cola)
+
+
+def detener_logging() -> None:
+    """Vacía la cola de logs pendientes y detiene el hilo escritor."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
 
 
 def get_logger(name: str) -> logging.Logger:
     """Retorna un logger configurado con formato estándar."""
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(
-            logging.Formatter(
-                fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-        )
+        if LOG_ASINCRONICO:
+            handler = _handler_asincronico()
+        else:
+            handler = _handler_salida()
         logger.addHandler(handler)
         logger.setLevel(logging.INFO)
     return logger
+
+
+class Progreso:
+    """
+    Resumen periódico de una operación que procesa muchos ítems.
+
+    Cada `ok` cuenta un ítem (y se loguea en DEBUG, o en INFO con
+    LOG_POR_ARCHIVO); cada `error` se loguea siempre. Cada `intervalo`
+    segundos, y al cerrar, se emite un resumen con cantidad, ritmo y errores.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        operacion: str,
+        total: Optional[int] = None,
+        intervalo: float = LOG_PROGRESO_INTERVALO_SEG,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.logger = logger
+        self.operacion = operacion
+        self.total = total
+        self.intervalo = intervalo
+        self.reloj = reloj
+        self.procesados = 0
+        self.errores = 0
+        self._inicio = reloj()
+        self._ultimo_resumen = self._inicio
+        self._lock = threading.Lock()
+
+    def ok(self, detalle: str = "") -> None:
+        with self._lock:
+            self.procesados += 1
+        nivel = logging.INFO if LOG_POR_ARCHIVO else logging.DEBUG
+        if detalle and self.logger.isEnabledFor(nivel):
+            self.logger.log(nivel, "%s: %s", self.operacion, detalle)
+        self._tal_vez_resumir()
+
+    def error(self, detalle: str, error: BaseException) -> None:
+        with self._lock:
+            self.errores += 1
+        self.logger.error("%s: error en %s: %s", self.operacion, detalle, error)
+        self._tal_vez_resumir()
+
+    def _tal_vez_resumir(self) -> None:
+        ahora = self.reloj()
+        with self._lock:
+            if ahora - self._ultimo_resumen < self.intervalo:
+                return
+            self._ultimo_resumen = ahora
+        self.resumir()
+
+    def datos(self) -> dict:
+        transcurrido = max(self.reloj() - self._inicio, 1e-9)
+        return {
+            "operacion": self.operacion,
+            "procesados": self.procesados,
+            "total": self.total,
+            "errores": self.errores,
+            "por_segundo": round(self.procesados / transcurrido, 2),
+            "transcurrido_s": round(transcurrido, 1),
+        }
+
+    def resumir(self, final: bool = False) -> None:
+        d = self.datos()
+        avance = f"{d['procesados']}/{d['total']}" if self.total is not None else str(d["procesados"])
+        self.logger.info(
+            "%s%s | %s | %.1f/s | errores=%d | %.1fs",
+            self.operacion, " (fin)" if final else "", avance, d["por_segundo"], d["errores"], d["transcurrido_s"],
+            extra={"datos": d},
+        )
+
+    def cerrar(self) -> None:
+        self.resumir(final=True)
+
+    def __enter__(self) -> "Progreso":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
@@ -0,0 +1,92 @@
+"""
+Manifiesto por archivo: qué contiene cada CSV que llega al lago.
+
+- filas, fecha_cierre mínima y máxima, distribuidor y hash SHA-256 del
+  contenido
+- Lo calcula upload_to_gcs al subir el archivo y se guarda como metadata del
+  objeto en GCS; load_raw lo copia a la tabla de control al cargarlo
+- Con el manifiesto en la tabla de control, la reconciliación raw vs lago es
+  una consulta de metadata (ver src/load_raw_to_bq/reconciliar.py) y las
+  fechas afectadas por cada archivo se conocen sin leer raw
+"""
+
+import csv
+import hashlib
+import io
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional
+
+from src.common.incremental import fecha_de_archivo
+
+COLUMNA_FECHA = "fecha_cierre"
+COLUMNA_DISTRIBUIDOR = "distribuidor"
+
+CAMPOS = ["filas", "fecha_min", "fecha_max", "distribuidor", "sha256"]
+
+# Campos que se copian a la tabla de control (el distribuidor ya está, tomado de la ruta)
+COLUMNAS_CONTROL = ["filas", "fecha_min", "fecha_max", "sha256"]
+
+
+def calcular_manifiesto(contenido: bytes) -> Dict:
+    """Manifiesto de un CSV con encabezado; las fechas quedan en None si no hay fecha_cierre."""
+    lector = csv.reader(io.StringIO(contenido.decode("utf-8")))
+    encabezado = next(lector, [])
+    i_fecha = encabezado.index(COLUMNA_FECHA) if COLUMNA_FECHA in encabezado else None
+    i_dist = encabezado.index(COLUMNA_DISTRIBUIDOR) if COLUMNA_DISTRIBUIDOR in encabezado else None
+
+    filas = 0
+    fecha_min = fecha_max = None
+    distribuidores = set()
+    for fila in lector:
+        if not fila:
+            continue
+        filas += 1
+        if i_fecha is not None and fila[i_fecha]:
+            # Fechas ISO: el orden lexicográfico es el cronológico
+            fecha = fila[i_fecha]
+            fecha_min = fecha if fecha_min is None or fecha < fecha_min else fecha_min
+            fecha_max = fecha if fecha_max is None or fecha > fecha_max else fecha_max
+        if i_dist is not None and fila[i_dist]:
+            distribuidores.add(int(fila[i_dist]))
+
+    return {
+        "filas": filas,
+        "fecha_min": fecha_min,
+        "fecha_max": fecha_max,
+        "distribuidor": distribuidores.pop() if len(distribuidores) == 1 else None,
+        "sha256": hashlib.sha256(contenido).hexdigest(),
+    }
+
+
+def a_metadata(manifiesto: Mapping) -> Dict[str, str]:
+    """Manifiesto como metadata de objeto de GCS (sólo admite strings)."""
+    return {campo: str(manifiesto[campo]) for campo in CAMPOS if manifiesto.get(campo) is not None}
+
+
+def desde_metadata(metadata: Optional[Mapping[str, str]]) -> Dict:
+    """Manifiesto a partir de la metadata de un objeto; campos en None si no tiene."""
+    metadata = metadata or {}
+    manifiesto = {campo: metadata.get(campo) for campo in CAMPOS}
+    for campo in ("filas", "distribuidor"):
+        if manifiesto[campo] is not None:
+            manifiesto[campo] = int(manifiesto[campo])
+    return manifiesto
+
+
+def para_control(metadata: Optional[Mapping[str, str]]) -> Dict:
+    """Columnas de manifiesto de la tabla de control a partir de la metadata del objeto."""
+    manifiesto = desde_metadata(metadata)
+    return {campo: manifiesto[campo] for campo in COLUMNAS_CONTROL}
+
+
+def fechas_de(archivo: Mapping) -> List[date]:
+    """
+    Fechas de negocio que toca un archivo: el rango del manifiesto si lo
+    tiene, si no la fecha del nombre del archivo.
+    """
+    if archivo.get("fecha_min") and archivo.get("fecha_max"):
+        desde = date.fromisoformat(str(archivo["fecha_min"]))
+        hasta = date.fromisoformat(str(archivo["fecha_max"]))
+        return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    fecha = fecha_de_archivo(archivo["object_path"])
+    return [fecha] if fecha else []
@@ -0,0 +1,287 @@
+"""
+Métricas y trazas del pipeline (run_pipeline.py --metricas).
+
+- Contadores e histogramas (archivos generados/subidos/cargados, bytes,
+  filas escritas, latencia de jobs de BigQuery, duración de pasos) que se
+  escriben como textfile OpenMetrics en METRICAS_PATH/pipeline.prom, listo
+  para el textfile collector de node_exporter
+- Spans anidados por paso, por distribuidor y por job de BigQuery, que se
+  escriben como JSON compatible con OTLP en METRICAS_PATH/trazas/<run_id>.json
+
+Deshabilitado (por defecto), cada llamada retorna apenas consulta una
+variable del módulo: no hay registro, locks ni lecturas de reloj.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.common.logger import get_logger
+from src.common.run_context import get_run_id
+from src.config import METRICAS_PATH
+
+logger = get_logger(__name__)
+
+SERVICIO = "pipeline-ventas-logistica"
+
+# nombre -> (tipo, descripción)
+METRICAS = {
+    "pipeline_archivos_generados": ("counter", "Archivos CSV generados localmente"),
+    "pipeline_archivos_subidos": ("counter", "Archivos subidos a GCS"),
+    "pipeline_archivos_cargados": ("counter", "Archivos cargados en tablas RAW"),
+    "pipeline_errores_archivo": ("counter", "Archivos cuya subida o carga falló"),
+    "pipeline_bytes_subidos": ("counter", "Bytes subidos a GCS"),
+    "pipeline_bytes_procesados": ("counter", "Bytes leídos por jobs de BigQuery (query y load)"),
+    "pipeline_filas_escritas": ("counter", "Filas escritas por jobs de BigQuery"),
+    "pipeline_jobs": ("counter", "Jobs de BigQuery ejecutados"),
+    "pipeline_duracion_job_segundos": ("histogram", "Latencia de los jobs de BigQuery"),
+    "pipeline_duracion_paso_segundos": ("histogram", "Duración de los pasos del pipeline"),
+}
+
+BUCKETS_SEGUNDOS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+_span_actual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_actual", default=None)
+
+
+# ======================
+# REGISTRO
+# ======================
+
+def _etiquetas(etiquetas: Dict[str, object]) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+class Registro:
+    """Valores de las métricas y spans finalizados de una corrida."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.trace_id = uuid.uuid4().hex
+        self.contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self.histogramas: Dict[Tuple[str, Etiquetas], List[float]] = {}
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def incrementar(self, nombre: str, valor: float, etiquetas: Dict[str, object]) -> None:
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, etiquetas: Dict[str, object]) -> None:
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._lock:
+            # [conteo por bucket..., +Inf, suma]
+            acumulado = self.histogramas.setdefault(clave, [0] * (len(BUCKETS_SEGUNDOS) + 2))
+            for i, limite in enumerate(BUCKETS_SEGUNDOS):
+                if valor <= limite:
+                    acumulado[i] += 1
+            acumulado[-2] += 1
+            acumulado[-1] += valor
+
+    def agregar_span(self, span: Dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+
+# ======================
+# FORMATOS DE SALIDA
+# ======================
+
+def _formatear_etiquetas(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    partes = []
+    for k, v in etiquetas:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def formatear_openmetrics(registro: Registro) -> str:
+    """Exposición OpenMetrics de todas las métricas del registro."""
+    lineas = []
+    for nombre, (tipo, descripcion) in METRICAS.items():
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        lineas.append(f"# HELP {nombre} {descripcion}")
+        if tipo == "counter":
+            for (n, etiquetas), valor in sorted(registro.contadores.items()):
+                if n == nombre:
+                    lineas.append(f"{nombre}_total{_formatear_etiquetas(etiquetas)} {_numero(valor)}")
+        else:
+            for (n, etiquetas), acumulado in sorted(registro.histogramas.items()):
+                if n != nombre:
+                    continue
+                for limite, conteo in zip(BUCKETS_SEGUNDOS + ("+Inf",), acumulado[:-1]):
+                    con_le = etiquetas + (("le", str(limite)),)
+                    lineas.append(f"{nombre}_bucket{_formatear_etiquetas(con_le)} {conteo}")
+                lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {acumulado[-2]}")
+                lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {_numero(acumulado[-1])}")
+    lineas.append("# EOF")
+    return "\n".join(lineas) + "\n"
+
+
+def _atributo_otlp(clave: str, valor: object) -> Dict:
+    if isinstance(valor, bool):
+        return {"key": clave, "value": {"boolValue": valor}}
+    if isinstance(valor, int):
+        return {"key": clave, "value": {"intValue": str(valor)}}
+    if isinstance(valor, float):
+        return {"key": clave, "value": {"doubleValue": valor}}
+    return {"key": clave, "value": {"stringValue": str(valor)}}
+
+
+def formatear_otlp(registro: Registro) -> Dict:
+    """Spans del registro en el formato JSON de OTLP (ExportTraceServiceRequest)."""
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [
+                    _atributo_otlp("service.name", SERVICIO),
+                    _atributo_otlp("pipeline.run_id", registro.run_id),
+                ],
+            },
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [
+                    {
+                        "traceId": registro.trace_id,
+                        "spanId": s["span_id"],
+                        **({"parentSpanId": s["padre"]} if s["padre"] else {}),
+                        "name": s["nombre"],
+                        "kind": 1,
+                        "startTimeUnixNano": str(s["inicio_ns"]),
+                        "endTimeUnixNano": str(s["fin_ns"]),
+                        "attributes": [_atributo_otlp(k, v) for k, v in s["atributos"].items() if v is not None],
+                        "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+                    }
+                    for s in registro.spans
+                ],
+            }],
+        }],
+    }
+
+
+# ======================
+# API DEL PIPELINE
+# ======================
+
+_registro: Optional[Registro] = None
+
+
+def habilitar(run_id: Optional[str] = None) -> None:
+    """Empieza a registrar métricas y spans para la corrida."""
+    global _registro
+    _registro = Registro(run_id or get_run_id())
+
+
+def deshabilitar() -> None:
+    global _registro
+    _registro = None
+
+
+def habilitado() -> bool:
+    return _registro is not None
+
+
+def incrementar(nombre: str, valor: float = 1, **etiquetas) -> None:
+    if _registro is not None:
+        _registro.incrementar(nombre, valor, etiquetas)
+
+
+def observar(nombre: str, valor: float, **etiquetas) -> None:
+    if _registro is not None:
+        _registro.observar(nombre, valor, etiquetas)
+
+
+def registrar_span(
+    nombre: str,
+    inicio_ns: int,
+    fin_ns: int,
+    error: Optional[str] = None,
+    **atributos,
+) -> None:
+    """Agrega un span ya finalizado (por ejemplo un job, con sus tiempos de BigQuery) bajo el span actual."""
+    if _registro is not None:
+        _registro.agregar_span({
+            "span_id": uuid.uuid4().hex[:16],
+            "padre": _span_actual.get(),
+            "nombre": nombre,
+            "inicio_ns": inicio_ns,
+            "fin_ns": fin_ns,
+            "atributos": atributos,
+            "error": error,
+        })
+
+
+@contextmanager
+def _span_activo(registro: Registro, nombre: str, atributos: Dict) -> Iterator[None]:
+    span_id = uuid.uuid4().hex[:16]
+    padre = _span_actual.get()
+    token = _span_actual.set(span_id)
+    inicio = time.time_ns()
+    error: Optional[str] = None
+    try:
+        yield
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        _span_actual.reset(token)
+        registro.agregar_span({
+            "span_id": span_id,
+            "padre": padre,
+            "nombre": nombre,
+            "inicio_ns": inicio,
+            "fin_ns": time.time_ns(),
+            "atributos": atributos,
+            "error": error,
+        })
+
+
+@contextmanager
+def _sin_span() -> Iterator[None]:
+    yield
+
+
+def span(nombre: str, **atributos):
+    """
+    Context manager que registra el bloque como un span hijo del span
+    actual del hilo. Los hilos nuevos no heredan el span actual salvo que
+    corran dentro de una copia del contexto (contextvars.copy_context).
+    """
+    if _registro is None:
+        return _sin_span()
+    return _span_activo(_registro, nombre, atributos)
+
+
+def escribir(destino: Path = Path(METRICAS_PATH)) -> Optional[Tuple[Path, Path]]:
+    """Escribe el textfile OpenMetrics y el archivo de trazas; None si está deshabilitado."""
+    registro = _registro
+    if registro is None:
+        return None
+
+    destino.mkdir(parents=True, exist_ok=True)
+    ruta_metricas = destino / "pipeline.prom"
+    # Escritura atómica: el textfile collector puede leer en cualquier momento
+    temporal = ruta_metricas.with_name(f".{ruta_metricas.name}.tmp")
+    temporal.write_text(formatear_openmetrics(registro), encoding="utf-8")
+    os.replace(temporal, ruta_metricas)
+
+    ruta_trazas = destino / "trazas" / f"{registro.run_id}.json"
+    ruta_trazas.parent.mkdir(parents=True, exist_ok=True)
+    ruta_trazas.write_text(json.dumps(formatear_otlp(registro), ensure_ascii=False), encoding="utf-8")
+
+    logger.info("Métricas: %s | trazas: %s (%d spans)", ruta_metricas, ruta_trazas, len(registro.spans))
+    return ruta_metricas, ruta_trazas
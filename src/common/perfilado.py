@@ -0,0 +1,228 @@
+"""
+Perfilado de los pasos del pipeline (run_pipeline.py --profile).
+
+Por cada paso mide:
+
+- tiempo de pared y de CPU del proceso (la diferencia es espera: red, disco,
+  jobs de BigQuery)
+- pico de memoria de Python (tracemalloc) y RSS máximo del proceso
+- bytes leídos y escritos (/proc/self/io, sólo Linux)
+- solicitudes HTTP y tiempo acumulado en ellas (clientes de GCS y BigQuery,
+  vía urllib3; las lecturas gRPC de la Storage Read API no se cuentan)
+- hotspots de cProfile (hilo principal)
+
+Al final escribe en data/profiles/<run_id>/ un reporte.json, un resumen de
+hotspots por paso (<paso>.txt) y el volcado de pstats (<paso>.prof) para
+abrirlo con snakeviz u otra herramienta.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.common.logger import get_logger
+from src.config import PROFILE_PATH, PROFILE_TOP_N
+
+logger = get_logger(__name__)
+
+RUTA_IO_PROCESO = Path("/proc/self/io")
+CAMPOS_IO = {
+    "rchar": "bytes_leidos",
+    "wchar": "bytes_escritos",
+    "read_bytes": "bytes_leidos_disco",
+    "write_bytes": "bytes_escritos_disco",
+}
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def parsear_io_proceso(texto: str) -> Dict[str, int]:
+    """Contadores de /proc/self/io con los nombres de CAMPOS_IO."""
+    contadores = {}
+    for linea in texto.splitlines():
+        clave, _, valor = linea.partition(":")
+        if clave.strip() in CAMPOS_IO:
+            contadores[CAMPOS_IO[clave.strip()]] = int(valor)
+    return contadores
+
+
+def diferencia(antes: Dict[str, float], despues: Dict[str, float]) -> Dict[str, float]:
+    return {k: despues[k] - antes.get(k, 0) for k in despues}
+
+
+def hotspots(estadisticas: pstats.Stats, top_n: int = PROFILE_TOP_N, orden: str = "cumulative") -> List[Dict]:
+    """Las `top_n` funciones con más tiempo acumulado ("cumulative") o propio ("tottime")."""
+    if orden not in ("cumulative", "tottime"):
+        raise ValueError(f"Orden desconocido: {orden}")
+
+    filas = [
+        {
+            "funcion": funcion,
+            "ubicacion": f"{archivo}:{linea}",
+            "llamadas": llamadas,
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        }
+        for (archivo, linea, funcion), (_, llamadas, tottime, cumtime, _) in estadisticas.stats.items()
+    ]
+    clave = "cumtime_s" if orden == "cumulative" else "tottime_s"
+    filas.sort(key=lambda f: f[clave], reverse=True)
+    return filas[:top_n]
+
+
+# ======================
+# CONTADORES
+# ======================
+
+def leer_io_proceso() -> Dict[str, int]:
+    try:
+        return parsear_io_proceso(RUTA_IO_PROCESO.read_text())
+    except OSError:
+        return {}
+
+
+def rss_maximo_mb() -> float:
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB; macOS, bytes
+    return round(maximo / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class ContadorHttp:
+    """Cuenta las solicitudes HTTP de urllib3 (que usan los clientes de Google)."""
+
+    def __init__(self):
+        self.solicitudes = 0
+        self.segundos = 0.0
+        self._lock = threading.Lock()
+        self._original = None
+
+    def instalar(self) -> None:
+        try:
+            from urllib3.connectionpool import HTTPConnectionPool
+        except ImportError:
+            return
+
+        original = HTTPConnectionPool.urlopen
+        contador = self
+
+        def urlopen(pool, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return original(pool, *args, **kwargs)
+            finally:
+                with contador._lock:
+                    contador.solicitudes += 1
+                    contador.segundos += time.perf_counter() - t0
+
+        HTTPConnectionPool.urlopen = urlopen
+        self._original = original
+
+    def desinstalar(self) -> None:
+        if self._original is not None:
+            from urllib3.connectionpool import HTTPConnectionPool
+
+            HTTPConnectionPool.urlopen = self._original
+            self._original = None
+
+    def lectura(self) -> Dict[str, float]:
+        with self._lock:
+            return {"solicitudes_http": self.solicitudes, "segundos_http": self.segundos}
+
+
+# ======================
+# PERFILADOR
+# ======================
+
+class Perfilador:
+    """Acumula el perfil de cada paso de una corrida y escribe el reporte."""
+
+    def __init__(self, run_id: str, destino: Path = Path(PROFILE_PATH), top_n: int = PROFILE_TOP_N):
+        self.run_id = run_id
+        self.destino = destino / run_id
+        self.top_n = top_n
+        self.pasos: Dict[str, Dict] = {}
+        self._http = ContadorHttp()
+
+    @contextmanager
+    def paso(self, nombre: str) -> Iterator[None]:
+        """Perfila el bloque como el paso `nombre` (el reporte se registra aunque falle)."""
+        self.destino.mkdir(parents=True, exist_ok=True)
+        self._http.instalar()
+        tracemalloc_propio = not tracemalloc.is_tracing()
+        if tracemalloc_propio:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        io_antes = leer_io_proceso()
+        http_antes = self._http.lectura()
+        perfil = cProfile.Profile()
+        error: Optional[BaseException] = None
+        t0, cpu0 = time.perf_counter(), time.process_time()
+
+        perfil.enable()
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            perfil.disable()
+            pared, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            _, pico = tracemalloc.get_traced_memory()
+            if tracemalloc_propio:
+                tracemalloc.stop()
+            self._http.desinstalar()
+
+            self.pasos[nombre] = self._resumir(
+                nombre, perfil, pared, cpu, pico,
+                diferencia(io_antes, leer_io_proceso()),
+                diferencia(http_antes, self._http.lectura()),
+                error,
+            )
+
+    def _resumir(self, nombre, perfil, pared, cpu, pico, io_paso, http, error) -> Dict:
+        perfil.dump_stats(str(self.destino / f"{nombre}.prof"))
+        estadisticas = pstats.Stats(perfil)
+
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(self.top_n)
+        (self.destino / f"{nombre}.txt").write_text(texto.getvalue(), encoding="utf-8")
+
+        resumen = {
+            "pared_s": round(pared, 3),
+            "cpu_s": round(cpu, 3),
+            "espera_s": round(max(pared - cpu, 0.0), 3),
+            "memoria_pico_mb": round(pico / (1024 * 1024), 1),
+            "rss_maximo_mb": rss_maximo_mb(),
+            **{k: int(v) for k, v in io_paso.items()},
+            "solicitudes_http": int(http["solicitudes_http"]),
+            "segundos_http": round(http["segundos_http"], 3),
+            "error": repr(error) if error else None,
+            "hotspots_acumulado": hotspots(estadisticas, self.top_n, "cumulative"),
+            "hotspots_propio": hotspots(estadisticas, self.top_n, "tottime"),
+        }
+        logger.info(
+            "Perfil '%s' | pared=%.1fs cpu=%.1fs espera=%.1fs memoria_pico=%.1fMB http=%d (%.1fs)",
+            nombre, resumen["pared_s"], resumen["cpu_s"], resumen["espera_s"],
+            resumen["memoria_pico_mb"], resumen["solicitudes_http"], resumen["segundos_http"],
+        )
+        return resumen
+
+    def guardar(self) -> Path:
+        self.destino.mkdir(parents=True, exist_ok=True)
+        ruta = self.destino / "reporte.json"
+        reporte = {"run_id": self.run_id, "pasos": self.pasos}
+        ruta.write_text(json.dumps(reporte, indent=2, ensure_ascii=False), encoding="utf-8")
+        logger.info("Reporte de perfilado: %s", ruta)
+        return ruta
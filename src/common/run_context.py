@@ -0,0 +1,20 @@
+import os
+import uuid
+from datetime import datetime, timezone
+
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+
+
+def get_run_id() -> str:
+    """
+    Retorna el identificador de la corrida actual del pipeline.
+
+    Se genera una única vez por proceso y se guarda en la variable de
+    entorno PIPELINE_RUN_ID, de modo que los subprocesos lo hereden.
+    """
+    run_id = os.environ.get(RUN_ID_ENV)
+    if not run_id:
+        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        run_id = f"{ts}-{uuid.uuid4().hex[:6]}"
+        os.environ[RUN_ID_ENV] = run_id
+    return run_id
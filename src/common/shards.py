@@ -0,0 +1,105 @@
+"""
+Selección de distribuidores para ejecutar generate, upload y load_raw sobre
+un subconjunto.
+
+- `--distribuidores 1,3,5-7`: lista explícita (admite rangos)
+- `--shard i/N`: el shard i (1..N) de N; el distribuidor d va al shard
+  ((d - 1) mod N) + 1, de modo que la asignación es determinística y los N
+  shards cubren a todos los distribuidores sin superponerse
+
+Ambas opciones se pueden combinar (se aplican las dos).
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+
+def parsear_distribuidores(texto: str) -> FrozenSet[int]:
+    """'1,3,5-7' -> {1, 3, 5, 6, 7}"""
+    distribuidores = set()
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        try:
+            if "-" in parte:
+                desde, hasta = (int(x) for x in parte.split("-", 1))
+                if desde > hasta:
+                    raise ValueError
+                distribuidores.update(range(desde, hasta + 1))
+            else:
+                distribuidores.add(int(parte))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Distribuidores inválidos: '{parte}'") from None
+    if not distribuidores:
+        raise argparse.ArgumentTypeError("La lista de distribuidores está vacía")
+    return frozenset(distribuidores)
+
+
+def parsear_shard(texto: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4)"""
+    try:
+        indice, total = (int(x) for x in texto.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard inválido: '{texto}' (formato i/N)") from None
+    if total < 1 or not 1 <= indice <= total:
+        raise argparse.ArgumentTypeError(f"Shard inválido: '{texto}' (se requiere 1 <= i <= N)")
+    return indice, total
+
+
+def shard_de(distribuidor: int, total: int) -> int:
+    """Shard (1..total) al que pertenece un distribuidor."""
+    return (distribuidor - 1) % total + 1
+
+
+@dataclass(frozen=True)
+class SeleccionDistribuidores:
+    distribuidores: Optional[FrozenSet[int]] = None
+    shard: Optional[Tuple[int, int]] = None
+
+    @property
+    def todos(self) -> bool:
+        return self.distribuidores is None and self.shard is None
+
+    def incluye(self, distribuidor: int) -> bool:
+        if self.distribuidores is not None and distribuidor not in self.distribuidores:
+            return False
+        if self.shard is not None:
+            indice, total = self.shard
+            return shard_de(distribuidor, total) == indice
+        return True
+
+    def filtrar(self, distribuidores: Iterable[int]) -> List[int]:
+        return [d for d in distribuidores if self.incluye(d)]
+
+    def etiqueta(self) -> str:
+        """Identificador legible de la selección (logs y nombres de archivo)."""
+        partes = []
+        if self.distribuidores is not None:
+            partes.append("d" + "_".join(str(d) for d in sorted(self.distribuidores)))
+        if self.shard is not None:
+            partes.append(f"shard{self.shard[0]}de{self.shard[1]}")
+        return "-".join(partes) or "todos"
+
+
+TODOS = SeleccionDistribuidores()
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--distribuidores",
+        type=parsear_distribuidores,
+        default=None,
+        help="Procesar sólo estos distribuidores (ej. 1,3,5-7)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parsear_shard,
+        default=None,
+        help="Procesar sólo el shard i de N (ej. 2/4)",
+    )
+
+
+def desde_argumentos(args: argparse.Namespace) -> SeleccionDistribuidores:
+    return SeleccionDistribuidores(args.distribuidores, args.shard)
@@ -0,0 +1,91 @@
+"""Utilidades para manipular el texto de los scripts SQL del proyecto."""
+
+import re
+from typing import List
+
+_PALABRA_INICIAL = re.compile(r"^\s*([A-Za-z]+)")
+_DDL_IDEMPOTENTE = re.compile(
+    r"^\s*(CREATE\s+(TABLE|SCHEMA|VIEW)\s+IF\s+NOT\s+EXISTS|ALTER\s+TABLE\s+\S+\s+ADD\s+COLUMN\s+IF\s+NOT\s+EXISTS)",
+    re.IGNORECASE,
+)
+
+
+def quitar_comentarios(sql: str) -> str:
+    """Elimina comentarios `--` y `/* */` respetando literales entre comillas."""
+    return "".join(_recorrer(sql, conservar_comentarios=False))
+
+
+def dividir_sentencias(sql: str) -> List[str]:
+    """
+    Divide un script en sentencias individuales separadas por `;`.
+
+    Ignora los `;` dentro de literales, identificadores entre backticks y
+    comentarios. Las sentencias vacías (o sólo con comentarios) se descartan.
+    """
+    sentencias = []
+    actual = []
+    for fragmento in _recorrer(sql, conservar_comentarios=True):
+        if fragmento == ";":
+            sentencias.append("".join(actual))
+            actual = []
+        else:
+            actual.append(fragmento)
+    sentencias.append("".join(actual))
+
+    return [s.strip() for s in sentencias if quitar_comentarios(s).strip()]
+
+
+def palabra_inicial(sentencia: str) -> str:
+    """Retorna la primera palabra clave de la sentencia (en mayúsculas)."""
+    m = _PALABRA_INICIAL.match(quitar_comentarios(sentencia))
+    return m.group(1).upper() if m else ""
+
+
+def es_ddl(sentencia: str) -> bool:
+    return palabra_inicial(sentencia) in {"CREATE", "DROP", "ALTER"}
+
+
+def es_ddl_idempotente(sentencia: str) -> bool:
+    """DDL de sólo esquema (IF NOT EXISTS) que puede ejecutarse antes sin alterar datos."""
+    return bool(_DDL_IDEMPOTENTE.match(quitar_comentarios(sentencia)))
+
+
+def _recorrer(sql: str, conservar_comentarios: bool):
+    """
+    Recorre el SQL emitiendo fragmentos de texto; los `;` de nivel
+    superior se emiten como fragmentos sueltos.
+    """
+    i = 0
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+
+        if c in ("'", '"', "`"):
+            j = i + 1
+            while j < n and sql[j] != c:
+                j += 2 if sql[j] == "\\" else 1
+            yield sql[i:j + 1]
+            i = j + 1
+        elif sql.startswith("--", i):
+            j = sql.find("\n", i)
+            j = n if j == -1 else j
+            if conservar_comentarios:
+                yield sql[i:j]
+            i = j
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            if conservar_comentarios:
+                yield sql[i:j]
+            i = j
+        elif c == ";":
+            yield ";"
+            i += 1
+        else:
+            j = i
+            while j < n and sql[j] not in ("'", '"', "`", ";", "-", "/"):
+                j += 1
+            if j == i:
+                j += 1
+            yield sql[i:j]
+            i = j
@@ -4,23 +4,48 @@
 BUCKET_NAME = "ventas-logistica-raw"
 GCS_BASE_PATH = "data"
 
+# ── Clientes GCP ──────────────────────────────────────────────────────────────
+# Conexiones por host del pool HTTP compartido de cada cliente (src/common/gcp_auth.py)
+HTTP_POOL_SIZE = 32
+
+# ── Datos locales ─────────────────────────────────────────────────────────────
+LOCAL_DATA_PATH = "data"
+
 # ── BigQuery ──────────────────────────────────────────────────────────────────
 LOCATION = "US"
 
 RAW_DATASET = "raw"
+# Particiones de raw movidas por la retención (src/retencion/run_retencion.py)
+RAW_ARCHIVO_DATASET = "raw_archivo"
 DWH_DATASET = "dwh"
 DATAMARTS_DATASET = "datamarts"
 INFRA_DATASET = "infra"
 CONTROL_TABLE = "control_archivos_cargados"
+JOB_STATS_TABLE = "job_stats"
+WATERMARKS_TABLE = "watermarks"
 
 TABLAS_RAW = ["ventas", "stock", "maestro"]
 
+# Columna de partición diaria de las tablas raw con fecha de negocio
+PARTICIONES_RAW = {
+    "ventas": "fecha_cierre",
+    "stock": "fecha_cierre",
+}
+
+# Maestro: True = sólo se cargan los cambios (CDC) en raw.maestro_cambios;
+# False = cada archivo se anexa completo a raw.maestro
+MAESTRO_CDC = True
+MAESTRO_CAMBIOS_TABLE = "maestro_cambios"
+
 # ── Rutas SQL ─────────────────────────────────────────────────────────────────
 SQL_DWH_PATH = "sql/dwh"
 SQL_DATAMARTS_PATH = "sql/datamarts"
+SQL_BACKFILL_PATH = "sql/backfill"
+SQL_MIGRACIONES_PATH = "sql/migraciones"
 
 SQL_DWH_ORDER = [
     "dim_fecha.sql",
+    "claves.sql",
     "dim_cliente.sql",
     "dim_producto.sql",
     "dim_sucursal.sql",
@@ -32,3 +57,132 @@ SQL_DATAMARTS_ORDER = [
     "dm_ventas.sql",
     "dm_stock.sql",
 ]
+
+# ── Geoespacial ───────────────────────────────────────────────────────────────
+# Precisión del geohash de dim_cliente (debe coincidir con sql/dwh/dim_cliente.sql)
+GEOHASH_PRECISION = 7
+GEOHASH_MAX_CELDAS_FILTRO = 16
+
+# ── Datamarts ─────────────────────────────────────────────────────────────────
+# "vista": vistas sobre el DWH | "materializado": tablas particionadas con refresco incremental
+DATAMARTS_MODO = "vista"
+DATAMARTS_ROLLUPS = True
+# dm_cobertura_stock: días de cobertura con ventanas de ventas de 7 y 28 días
+# mantenidas un día por vez (src/datamarts/cobertura.py)
+DATAMARTS_COBERTURA = True
+
+SQL_ROLLUPS_ORDER = [
+    "rollup_ventas.sql",
+    "rollup_stock.sql",
+]
+
+# Caché de la API de lectura (src/datamarts/consultas.py)
+CONSULTAS_CACHE_PATH = "data/cache/consultas"
+CONSULTAS_CACHE_ENTRADAS = 128
+CONSULTAS_TTL_METADATA_SEG = 30
+
+# ── Exportación ───────────────────────────────────────────────────────────────
+# Snapshots Parquet leídos con la BigQuery Storage Read API (src/datamarts/exportar.py)
+EXPORT_PATH = "data/exports"
+EXPORT_MAX_STREAMS = 8
+EXPORT_COMPRESION = "zstd"
+# Archivos de partición abiertos a la vez por stream (el resto se cierra y rota)
+EXPORT_MAX_ARCHIVOS_ABIERTOS = 64
+
+# ── Ejecución DWH ─────────────────────────────────────────────────────────────
+# "jobs": un job por archivo SQL | "script": un único job multi-statement
+DWH_MODO_EJECUCION = "jobs"
+# Sólo las cargas de los hechos van dentro de la transacción: las dimensiones
+# y las claves son DDL (CREATE OR REPLACE) y BigQuery no admite DDL en una
+# transacción, así que un fallo en los hechos las deja ya reconstruidas
+DWH_SCRIPT_TRANSACCION = True
+
+# ── Carga continua ────────────────────────────────────────────────────────────
+# Modo continuo de load_raw (src/load_raw_to_bq/continuo.py)
+CONTINUO_INTERVALO_SEG = 30
+# Un micro-lote se procesa al alcanzar cualquiera de estos límites
+CONTINUO_LOTE_MAX_BYTES = 256 * 1024 * 1024
+CONTINUO_LOTE_MAX_ARCHIVOS = 500
+CONTINUO_LOTE_MAX_EDAD_SEG = 120
+# Tolerancia para objetos que aparecen en el listado con fecha anterior al cursor
+CONTINUO_MARGEN_SEG = 300
+# Entre listados completos de data/, cada sondeo lista sólo las carpetas
+# distribuidor/tabla conocidas desde su último nombre (start_offset). El
+# listado completo descubre carpetas nuevas y archivos de fechas anteriores
+CONTINUO_LISTADO_COMPLETO_CADA = 20
+CONTINUO_CURSOR_PATH = "data/cache/cursor_continuo.json"
+# Dimensiones y fechas cargadas en raw cuyo refresco del DWH no terminó
+CONTINUO_REFRESCO_PATH = "data/cache/refresco_continuo.json"
+
+# ── Carga directa ─────────────────────────────────────────────────────────────
+# Origen de load_raw: "gcs" (objetos subidos al bucket) | "local" (los CSV de
+# data/ se cargan directo en BigQuery y el pipeline omite el paso upload)
+LOAD_RAW_ORIGEN = "gcs"
+# "archivo": load_table_from_file con varios archivos por load job
+# "filas": inserción por streaming (insert_rows_json) en lotes de filas
+CARGA_DIRECTA_METODO = "archivo"
+CARGA_DIRECTA_LOTE_ARCHIVOS = 50
+CARGA_DIRECTA_LOTE_FILAS = 500
+# Bucket con el que la tabla de control registra los archivos cargados directo
+CARGA_DIRECTA_BUCKET = "local"
+
+# ── Retención ─────────────────────────────────────────────────────────────────
+# src/retencion/run_retencion.py. Los CSV del lago de meses completos con más
+# de RETENCION_LAGO_DIAS días se compactan en un Parquet por distribuidor,
+# tabla y mes bajo RETENCION_ARCHIVO_PREFIJO (fuera de GCS_BASE_PATH)
+RETENCION_LAGO_DIAS = 90
+RETENCION_ARCHIVO_PREFIJO = "archivo"
+# Particiones de raw.ventas / raw.stock con más de RETENCION_RAW_DIAS días:
+# "archivar" = se mueven a RAW_ARCHIVO_DATASET | "expirar" = se borran
+# (vencimiento de particiones de BigQuery)
+RETENCION_RAW_DIAS = 180
+RETENCION_RAW_MODO = "archivar"
+
+# ── Orquestación ──────────────────────────────────────────────────────────────
+# Huella de la última corrida exitosa de cada paso de run_pipeline.py
+PIPELINE_CACHE = True
+PIPELINE_CACHE_PATH = "data/cache/pasos.json"
+
+# Modo encadenado: generate → upload → load_raw por distribuidor con colas
+# acotadas (PIPELINE_COLA_MAX ítems en espera entre etapas)
+PIPELINE_ENCADENADO = False
+PIPELINE_COLA_MAX = 1
+
+# Perfilado por paso (run_pipeline.py --profile)
+PROFILE_PATH = "data/profiles"
+PROFILE_TOP_N = 20
+
+# ── Logging ───────────────────────────────────────────────────────────────────
+# "texto" | "json" (un objeto por línea)
+LOG_FORMATO = "texto"
+# Escritura de logs en un hilo aparte (cola en memoria)
+LOG_ASINCRONICO = True
+# Resumen de progreso cada N segundos en operaciones por archivo
+LOG_PROGRESO_INTERVALO_SEG = 10
+# True = además una línea INFO por archivo subido/cargado (si no, en DEBUG)
+LOG_POR_ARCHIVO = False
+
+# ── Métricas y trazas ─────────────────────────────────────────────────────────
+# Textfile OpenMetrics (pipeline.prom) y spans OTLP JSON (trazas/<run_id>.json)
+# de run_pipeline.py --metricas
+METRICAS_HABILITADAS = False
+METRICAS_PATH = "data/metrics"
+
+# ── Motor SQL ─────────────────────────────────────────────────────────────────
+# "bigquery": ejecución en BigQuery | "duckdb": ejecución local sobre data/
+SQL_ENGINE = "bigquery"
+DUCKDB_PATH = "data/warehouse.duckdb"
+
+# ── Benchmark ─────────────────────────────────────────────────────────────────
+# Escalas de src/benchmark/run_benchmark.py: distribuidores, días y clientes
+# por distribuidor de los datos sintéticos
+BENCHMARK_ESCALAS = {
+    "chica": {"cant_distribuidores": 2, "cant_dias": 7, "clientes_por_dist": 5},
+    "mediana": {"cant_distribuidores": 3, "cant_dias": 30, "clientes_por_dist": 20},
+    "grande": {"cant_distribuidores": 5, "cant_dias": 93, "clientes_por_dist": 50},
+}
+BENCHMARK_PATH = "data/benchmarks"
+# Línea base contra la que se compara cada corrida (--guardar-base la escribe)
+BENCHMARK_BASE_PATH = "data/benchmarks/base.json"
+# Regresión: más de 20% peor que la línea base
+BENCHMARK_UMBRAL = 0.2
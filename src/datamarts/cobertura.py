@@ -0,0 +1,75 @@
+"""
+Datamart de cobertura de stock: días de inventario por producto y sucursal.
+
+dm_cobertura_stock combina el stock diario de fact_stock con la venta
+promedio de los últimos 7 y 28 días de fact_ventas. Las ventanas se guardan
+en datamarts.ventas_ventana y se mantienen un día por vez a partir de las
+del día anterior:
+
+  ventana(d) = ventana(d - 1) + ventas(d) - ventas(d - N)
+
+Cada día lee una partición del estado y tres de fact_ventas (d, d - 7 y
+d - 28), sin recorrer la ventana completa ni la historia. Por eso los días
+se calculan en orden, uno por ejecución de
+sql/datamarts/cobertura/dm_cobertura_stock.sql (@fecha). Es el camino de
+las cargas tardías; la primera construcción y el refresco total calculan
+todo el rango con un único job (dm_cobertura_stock_total.sql, @desde /
+@hasta).
+
+Un cambio en las ventas del día d afecta las ventanas de d a d + 27; desde
+d + 28 los valores guardados siguen siendo correctos (la venta vieja de d
+entró y salió de la ventana).
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.config import SQL_DATAMARTS_PATH
+
+SQL_COBERTURA_TABLAS = Path(SQL_DATAMARTS_PATH) / "cobertura" / "tablas.sql"
+SQL_COBERTURA = Path(SQL_DATAMARTS_PATH) / "cobertura" / "dm_cobertura_stock.sql"
+SQL_COBERTURA_TOTAL = Path(SQL_DATAMARTS_PATH) / "cobertura" / "dm_cobertura_stock_total.sql"
+
+TABLA_COBERTURA = "dm_cobertura_stock"
+WATERMARK_COBERTURA = "cobertura_stock"
+
+# Ventana más larga: hasta dónde se propaga un cambio en las ventas de un día
+VENTANA_MAXIMA_DIAS = 28
+
+
+def dias_a_recalcular(
+    fechas: Iterable[date],
+    ultimo_calculado: Optional[date],
+    primer_dia: Optional[date],
+    ultimo_dia: Optional[date],
+) -> List[date]:
+    """
+    Días a calcular, en orden, para que el datamart quede al día.
+
+    Args:
+        fechas: fechas con datos nuevos o modificados en los hechos
+        ultimo_calculado: último día calculado (None = nunca se calculó)
+        primer_dia / ultimo_dia: rango de fechas de los hechos
+
+    Se recalculan la unión de los días a los que llega el cambio de cada
+    fecha (fecha .. fecha + 27) y los posteriores al último calculado. Sin
+    cálculo previo se arranca desde el primer día de los hechos.
+    """
+    if primer_dia is None or ultimo_dia is None:
+        return []
+
+    if ultimo_calculado is None:
+        desde = primer_dia
+        dias = set()
+    else:
+        desde = max(ultimo_calculado + timedelta(days=1), primer_dia)
+        dias = {
+            fecha + timedelta(days=i)
+            for fecha in fechas
+            for i in range(VENTANA_MAXIMA_DIAS)
+            if primer_dia <= fecha + timedelta(days=i) <= ultimo_dia
+        }
+
+    dias.update(desde + timedelta(days=i) for i in range((ultimo_dia - desde).days + 1))
+    return sorted(dias)
@@ -0,0 +1,408 @@
+"""
+API de lectura de datamarts con caché local.
+
+- Funciones tipadas para los cortes más usados (rango de fechas,
+  distribuidor, producto, bounding box) sobre dm_ventas, dm_stock y los
+  rollups
+- Resultados en Arrow (por defecto) o pandas
+- Caché LRU en memoria + caché en disco (Arrow IPC) con clave derivada del
+  SQL normalizado, los parámetros y el last_modified de las tablas leídas
+  (de una vista, el más reciente entre ella y las tablas que lee: recargar
+  los datos no cambia el last_modified de la vista)
+- El last_modified de cada tabla se consulta como máximo una vez cada
+  CONSULTAS_TTL_METADATA_SEG; al cambiar, las entradas viejas se descartan
+
+Uso:
+  from src.datamarts.consultas import ConsultasDatamarts
+
+  consultas = ConsultasDatamarts.desde_bigquery()
+  tabla = consultas.ventas(date(2025, 1, 1), date(2025, 1, 31), producto="Coca Cola 2.25L")
+  df = consultas.stock(date(2025, 1, 1), date(2025, 1, 31), distribuidor=3, formato="pandas")
+  mapa = consultas.ventas_en_bbox(date(2025, 1, 1), date(2025, 1, 31), -35.0, -59.0, -34.4, -58.2)
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+
+from src.common.geo import filtro_bbox
+from src.common.logger import get_logger
+from src.common.sql_utils import quitar_comentarios
+from src.config import (
+    CONSULTAS_CACHE_ENTRADAS,
+    CONSULTAS_CACHE_PATH,
+    CONSULTAS_TTL_METADATA_SEG,
+    DATAMARTS_DATASET,
+)
+from src.datamarts.rollups import elegir_tabla
+
+logger = get_logger(__name__)
+
+FORMATOS = ("arrow", "pandas")
+
+# (sql, parámetros) -> tabla Arrow
+Ejecutor = Callable[[str, Dict], pa.Table]
+# "dataset.tabla" -> último instante de modificación
+Modificado = Callable[[str], datetime]
+
+
+# ======================
+# CLAVES DE CACHÉ
+# ======================
+
+def normalizar_sql(sql: str) -> str:
+    """Quita comentarios y colapsa espacios para que el formato no afecte la clave."""
+    return re.sub(r"\s+", " ", quitar_comentarios(sql)).strip()
+
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple)):
+        return [_valor_json(v) for v in valor]
+    return valor
+
+
+def clave_consulta(sql: str, parametros: Dict, versiones: Dict[str, datetime]) -> str:
+    """Hash del SQL normalizado, los parámetros y el last_modified de cada tabla."""
+    contenido = json.dumps(
+        {
+            "sql": normalizar_sql(sql),
+            "parametros": {k: _valor_json(v) for k, v in sorted(parametros.items())},
+            "versiones": {t: v.isoformat() for t, v in sorted(versiones.items())},
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def tablas_de_vista(view_query: str) -> List[str]:
+    """Tablas (dataset.tabla) referenciadas con backticks en el SQL de una vista."""
+    return sorted(set(re.findall(r"`(?:[\w-]+\.)?(\w+\.\w+)`", view_query)))
+
+
+def modificado_bigquery(client, tabla: str) -> datetime:
+    """
+    last_modified de `tabla` (dataset.tabla). Para una vista es el más
+    reciente entre la vista y las tablas que lee, recorriendo vistas
+    anidadas.
+    """
+    objeto = client.get_table(f"{client.project}.{tabla}")
+    if objeto.table_type != "VIEW":
+        return objeto.modified
+    return max([objeto.modified] + [modificado_bigquery(client, t) for t in tablas_de_vista(objeto.view_query)])
+
+
+# ======================
+# CACHÉ
+# ======================
+
+class ConsultasDatamarts:
+    """
+    Ejecuta consultas de lectura sobre los datamarts con caché en dos niveles.
+
+    `ejecutar` y `modificado` se inyectan para poder usar la API contra
+    BigQuery (ver `desde_bigquery`) o contra un origen falso en los tests.
+    """
+
+    def __init__(
+        self,
+        ejecutar: Ejecutor,
+        modificado: Modificado,
+        ruta_cache: Optional[Path] = Path(CONSULTAS_CACHE_PATH),
+        max_entradas: int = CONSULTAS_CACHE_ENTRADAS,
+        ttl_metadata: float = CONSULTAS_TTL_METADATA_SEG,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self._ejecutar = ejecutar
+        self._modificado = modificado
+        self.ruta_cache = ruta_cache
+        self.max_entradas = max_entradas
+        self.ttl_metadata = ttl_metadata
+        self._reloj = reloj
+
+        self._memoria: "OrderedDict[str, pa.Table]" = OrderedDict()
+        self._versiones: Dict[str, Tuple[datetime, float]] = {}
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+        if self.ruta_cache is not None:
+            self.ruta_cache.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def desde_bigquery(cls, client=None, **kwargs) -> "ConsultasDatamarts":
+        """Construye la API sobre un cliente de BigQuery (por defecto, ADC)."""
+        from google.cloud import bigquery
+
+        from src.common.gcp_auth import get_bq_client
+
+        client = client or get_bq_client()
+
+        def ejecutar(sql: str, parametros: Dict) -> pa.Table:
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[_parametro_bq(bigquery, k, v) for k, v in parametros.items()]
+            )
+            return client.query(sql, job_config=job_config).result().to_arrow()
+
+        return cls(ejecutar, lambda tabla: modificado_bigquery(client, tabla), **kwargs)
+
+    # ── Versionado de tablas ──────────────────────────────────────────────────
+
+    def _version(self, tabla: str) -> datetime:
+        """last_modified de la tabla, consultado como máximo una vez por TTL."""
+        ahora = self._reloj()
+        with self._lock:
+            previa = self._versiones.get(tabla)
+        if previa and ahora - previa[1] < self.ttl_metadata:
+            return previa[0]
+
+        version = self._modificado(tabla)
+        with self._lock:
+            self._versiones[tabla] = (version, ahora)
+        if previa and previa[0] != version:
+            logger.info("%s modificada (%s): se invalida su caché", tabla, version.isoformat())
+            self._purgar_disco(tabla, version)
+        return version
+
+    # ── Disco ─────────────────────────────────────────────────────────────────
+
+    def _ruta_disco(self, clave: str, tablas: Iterable[str], versiones: Dict[str, datetime]) -> Path:
+        prefijo = "+".join(f"{t}@{int(versiones[t].timestamp() * 1_000_000)}" for t in sorted(tablas))
+        return self.ruta_cache / f"{prefijo}--{clave}.arrow"
+
+    def _purgar_disco(self, tabla: str, version: datetime) -> None:
+        if self.ruta_cache is None:
+            return
+        vigente = f"{tabla}@{int(version.timestamp() * 1_000_000)}"
+        for ruta in self.ruta_cache.glob("*.arrow"):
+            partes = ruta.name.split("--")[0].split("+")
+            if any(p.split("@")[0] == tabla and p != vigente for p in partes):
+                ruta.unlink(missing_ok=True)
+
+    def _leer_disco(self, ruta: Path) -> Optional[pa.Table]:
+        if not ruta.exists():
+            return None
+        try:
+            with pa.memory_map(str(ruta)) as fuente:
+                return pa.ipc.open_file(fuente).read_all()
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning("Entrada de caché ilegible %s: %s", ruta.name, e)
+            ruta.unlink(missing_ok=True)
+            return None
+
+    def _escribir_disco(self, ruta: Path, tabla: pa.Table) -> None:
+        temporal = ruta.with_suffix(".tmp")
+        with pa.OSFile(str(temporal), "wb") as destino:
+            with pa.ipc.new_file(destino, tabla.schema) as writer:
+                writer.write_table(tabla)
+        temporal.replace(ruta)
+
+    # ── Memoria ───────────────────────────────────────────────────────────────
+
+    def _guardar_memoria(self, clave: str, tabla: pa.Table) -> None:
+        with self._lock:
+            self._memoria[clave] = tabla
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_entradas:
+                self._memoria.popitem(last=False)
+
+    # ── Consulta genérica ─────────────────────────────────────────────────────
+
+    def consultar(
+        self,
+        sql: str,
+        parametros: Optional[Dict] = None,
+        tablas: Iterable[str] = (),
+        formato: str = "arrow",
+    ):
+        """
+        Ejecuta `sql` (o lo resuelve desde la caché). `tablas` son las
+        tablas leídas (dataset.tabla) cuyo last_modified invalida el resultado.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato}")
+
+        parametros = parametros or {}
+        tablas = sorted(set(tablas))
+        versiones = {t: self._version(t) for t in tablas}
+        clave = clave_consulta(sql, parametros, versiones)
+
+        with self._lock:
+            resultado = self._memoria.get(clave)
+            if resultado is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+
+        if resultado is None and self.ruta_cache is not None:
+            ruta = self._ruta_disco(clave, tablas, versiones)
+            resultado = self._leer_disco(ruta)
+            if resultado is not None:
+                self.aciertos_disco += 1
+                self._guardar_memoria(clave, resultado)
+
+        if resultado is None:
+            t0 = time.time()
+            resultado = self._ejecutar(sql, parametros)
+            self.fallos += 1
+            logger.info("Consulta ejecutada en %.2fs | filas=%d tablas=%s", time.time() - t0, resultado.num_rows, tablas)
+            self._guardar_memoria(clave, resultado)
+            if self.ruta_cache is not None:
+                self._escribir_disco(self._ruta_disco(clave, tablas, versiones), resultado)
+
+        return resultado.to_pandas() if formato == "pandas" else resultado
+
+    # ── Cortes tipados ────────────────────────────────────────────────────────
+
+    def ventas(
+        self,
+        desde: date,
+        hasta: date,
+        producto: Optional[str] = None,
+        provincia: Optional[str] = None,
+        formato: str = "arrow",
+    ):
+        """Filas de dm_ventas entre `desde` y `hasta` (inclusive)."""
+        tabla = f"{DATAMARTS_DATASET}.dm_ventas"
+        sql, parametros = _armar_select(
+            tabla,
+            "*",
+            desde,
+            hasta,
+            {"producto": producto, "provincia": provincia},
+        )
+        return self.consultar(sql, parametros, [tabla], formato)
+
+    def stock(
+        self,
+        desde: date,
+        hasta: date,
+        producto: Optional[str] = None,
+        distribuidor: Optional[int] = None,
+        formato: str = "arrow",
+    ):
+        """Filas de dm_stock entre `desde` y `hasta` (inclusive)."""
+        tabla = f"{DATAMARTS_DATASET}.dm_stock"
+        sql, parametros = _armar_select(
+            tabla,
+            "*",
+            desde,
+            hasta,
+            {"producto": producto, "distribuidor": distribuidor},
+        )
+        return self.consultar(sql, parametros, [tabla], formato)
+
+    def ventas_por_distribuidor(
+        self,
+        desde: date,
+        hasta: date,
+        distribuidor: Optional[int] = None,
+        producto: Optional[str] = None,
+        formato: str = "arrow",
+    ):
+        """Ventas diarias por distribuidor y producto, leídas del rollup diario."""
+        tabla = elegir_tabla("ventas", "dia", ["distribuidor", "producto"])
+        sql, parametros = _armar_select(
+            tabla,
+            "fecha, distribuidor, producto, "
+            "SUM(venta_unidades) AS venta_unidades, SUM(venta_importe) AS venta_importe",
+            desde,
+            hasta,
+            {"distribuidor": distribuidor, "producto": producto},
+            agrupar="fecha, distribuidor, producto",
+        )
+        return self.consultar(sql, parametros, [tabla], formato)
+
+    def ventas_en_bbox(
+        self,
+        desde: date,
+        hasta: date,
+        lat_min: float,
+        lon_min: float,
+        lat_max: float,
+        lon_max: float,
+        formato: str = "arrow",
+    ):
+        """Filas de dm_ventas de clientes dentro del bounding box (poda por geohash)."""
+        tabla = f"{DATAMARTS_DATASET}.dm_ventas"
+        sql, parametros = _armar_select(
+            tabla,
+            "*",
+            desde,
+            hasta,
+            {},
+            condicion=filtro_bbox(lat_min, lon_min, lat_max, lon_max),
+        )
+        return self.consultar(sql, parametros, [tabla], formato)
+
+    def limpiar(self) -> None:
+        """Vacía la caché en memoria y en disco."""
+        with self._lock:
+            self._memoria.clear()
+            self._versiones.clear()
+        if self.ruta_cache is not None:
+            for ruta in self.ruta_cache.glob("*.arrow"):
+                ruta.unlink(missing_ok=True)
+
+
+# ======================
+# SQL
+# ======================
+
+def _armar_select(
+    tabla: str,
+    columnas: str,
+    desde: date,
+    hasta: date,
+    filtros: Dict,
+    agrupar: Optional[str] = None,
+    condicion: Optional[Tuple[str, Dict]] = None,
+) -> Tuple[str, Dict]:
+    """
+    Arma un SELECT con filtro de fechas, filtros de igualdad opcionales y
+    una condición adicional ya parametrizada (sql, parámetros).
+    """
+    if desde > hasta:
+        raise ValueError(f"Rango de fechas inválido: {desde} > {hasta}")
+
+    condiciones: List[str] = ["fecha BETWEEN @desde AND @hasta"]
+    parametros: Dict = {"desde": desde, "hasta": hasta}
+    for columna, valor in filtros.items():
+        if valor is not None:
+            condiciones.append(f"{columna} = @{columna}")
+            parametros[columna] = valor
+    if condicion:
+        condiciones.append(condicion[0])
+        parametros.update(condicion[1])
+
+    sql = f"SELECT {columnas}\nFROM `{tabla}`\nWHERE " + "\n  AND ".join(condiciones)
+    if agrupar:
+        sql += f"\nGROUP BY {agrupar}"
+    sql += "\nORDER BY fecha"
+    return sql, parametros
+
+
+def _parametro_bq(bigquery, nombre: str, valor):
+    """Infiere el tipo del parámetro de BigQuery a partir del valor Python."""
+    if isinstance(valor, bool):
+        tipo = "BOOL"
+    elif isinstance(valor, int):
+        tipo = "INT64"
+    elif isinstance(valor, float):
+        tipo = "FLOAT64"
+    elif isinstance(valor, datetime):
+        tipo = "TIMESTAMP"
+    elif isinstance(valor, date):
+        tipo = "DATE"
+    else:
+        tipo = "STRING"
+    return bigquery.ScalarQueryParameter(nombre, tipo, valor)
@@ -0,0 +1,302 @@
+"""
+Exportación de datamarts y tablas del DWH a Parquet local.
+
+- Lee la tabla con la BigQuery Storage Read API: una sesión de lectura
+  dividida en varios streams que se consumen en paralelo. La API no lee
+  vistas lógicas: una vista se materializa antes con un job de consulta
+- Proyección de columnas (selected_fields) y filtro de filas
+  (row_restriction) resueltos del lado de BigQuery
+- Escribe cada stream en forma incremental (un record batch por vez), de
+  modo que la memoria queda acotada al tamaño de los batches en vuelo
+- Opcionalmente particiona la salida por una columna (layout hive:
+  columna=valor/part-00000.parquet). Cada stream mantiene a lo sumo
+  EXPORT_MAX_ARCHIVOS_ABIERTOS archivos abiertos: al superarlo cierra el
+  menos usado, y si su valor vuelve a aparecer sigue en part-00000-1.parquet
+- Cada exportación es un snapshot: se escribe en un directorio temporal y
+  se publica con un rename al terminar
+
+La fuente de streams es intercambiable (`FuenteStreams`) para poder probar
+la exportación sin BigQuery.
+
+Uso:
+  python -m src.datamarts.exportar datamarts.dm_ventas
+  python -m src.datamarts.exportar datamarts.dm_ventas --particion fecha \\
+      --columnas fecha,producto,provincia,venta_importe --filtro "fecha >= '2025-01-01'"
+  python -m src.datamarts.exportar dwh.fact_stock --streams 16 --destino /tmp/exports
+"""
+
+import argparse
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Protocol
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.common.logger import get_logger
+from src.config import EXPORT_COMPRESION, EXPORT_MAX_ARCHIVOS_ABIERTOS, EXPORT_MAX_STREAMS, EXPORT_PATH
+
+logger = get_logger(__name__)
+
+PARTICION_NULA = "__HIVE_DEFAULT_PARTITION__"
+
+
+# ======================
+# FUENTES DE STREAMS
+# ======================
+
+class FuenteStreams(Protocol):
+    """Origen de datos dividido en streams leíbles en paralelo."""
+
+    def abrir_sesion(
+        self,
+        tabla: str,
+        columnas: Optional[List[str]],
+        filtro: Optional[str],
+        max_streams: int,
+    ) -> List[str]:
+        """Abre una sesión de lectura y retorna los identificadores de sus streams."""
+        ...
+
+    def leer_stream(self, stream: str) -> Iterator[pa.RecordBatch]:
+        """Itera los record batches de un stream."""
+        ...
+
+
+class FuenteBigQueryStorage:
+    """Streams de la BigQuery Storage Read API en formato Arrow."""
+
+    def __init__(self, project: Optional[str] = None):
+        from google.cloud import bigquery_storage_v1
+
+        from src.common.gcp_auth import get_bq_client, get_bq_read_client
+
+        self._tipos = bigquery_storage_v1.types
+        self.client = get_bq_read_client()
+        self.bq = get_bq_client()
+        self.project = project or self.bq.project
+        self._sesiones: Dict[str, object] = {}
+
+    def _materializar(self, tabla: str, columnas: Optional[List[str]], filtro: Optional[str]):
+        """Ejecuta la proyección y el filtro sobre la vista; retorna la tabla temporal del job."""
+        sql = f"SELECT {', '.join(columnas) if columnas else '*'} FROM `{self.project}.{tabla}`"
+        if filtro:
+            sql += f" WHERE {filtro}"
+        job = self.bq.query(sql)
+        job.result()
+        return job.destination
+
+    def abrir_sesion(self, tabla, columnas, filtro, max_streams):
+        proyecto = self.project
+        dataset, nombre = tabla.split(".")
+        if self.bq.get_table(f"{self.project}.{tabla}").table_type == "VIEW":
+            logger.info("%s es una vista: se materializa en una tabla temporal para leerla", tabla)
+            destino = self._materializar(tabla, columnas, filtro)
+            proyecto, dataset, nombre = destino.project, destino.dataset_id, destino.table_id
+            columnas, filtro = None, None
+
+        opciones = self._tipos.ReadSession.TableReadOptions(
+            selected_fields=columnas or [],
+            row_restriction=filtro or "",
+        )
+        sesion = self.client.create_read_session(
+            parent=f"projects/{self.project}",
+            read_session=self._tipos.ReadSession(
+                table=f"projects/{proyecto}/datasets/{dataset}/tables/{nombre}",
+                data_format=self._tipos.DataFormat.ARROW,
+                read_options=opciones,
+            ),
+            max_stream_count=max_streams,
+        )
+        for stream in sesion.streams:
+            self._sesiones[stream.name] = sesion
+        return [s.name for s in sesion.streams]
+
+    def leer_stream(self, stream):
+        sesion = self._sesiones[stream]
+        for pagina in self.client.read_rows(stream).rows(sesion).pages:
+            yield pagina.to_arrow()
+
+
+# ======================
+# ESCRITURA
+# ======================
+
+@dataclass
+class ResultadoStream:
+    filas: int = 0
+    batches: int = 0
+    archivos: int = 0
+
+
+def _valor_particion(valor) -> str:
+    return PARTICION_NULA if valor is None else str(valor)
+
+
+def _particionar(batch: pa.RecordBatch, columna: str) -> Iterator[tuple]:
+    """Divide un batch en (valor, sub-batch sin la columna de partición)."""
+    valores = batch.column(columna)
+    restantes = batch.drop_columns([columna])
+    for valor in pc.unique(valores).to_pylist():
+        mascara = pc.is_null(valores) if valor is None else pc.fill_null(pc.equal(valores, valor), False)
+        yield valor, restantes.filter(mascara)
+
+
+def escribir_stream(
+    batches: Iterator[pa.RecordBatch],
+    destino: Path,
+    indice: int,
+    particion: Optional[str] = None,
+    compresion: str = EXPORT_COMPRESION,
+    max_abiertos: int = EXPORT_MAX_ARCHIVOS_ABIERTOS,
+) -> ResultadoStream:
+    """
+    Escribe los batches de un stream en Parquet a medida que llegan.
+
+    Sin partición genera un único archivo part-NNNNN.parquet; con partición,
+    un archivo por valor en destino/columna=valor/. Con más de
+    `max_abiertos` valores se cierra el archivo usado hace más tiempo; si su
+    valor reaparece se abre part-NNNNN-k.parquet en la misma carpeta.
+    """
+    writers: "OrderedDict[str, pq.ParquetWriter]" = OrderedDict()
+    abiertos_por_clave: Dict[str, int] = {}
+    resultado = ResultadoStream()
+
+    def escribir(clave: str, carpeta: Path, datos: pa.RecordBatch) -> None:
+        if clave in writers:
+            writers.move_to_end(clave)
+        else:
+            if len(writers) >= max_abiertos:
+                writers.popitem(last=False)[1].close()
+            k = abiertos_por_clave.get(clave, 0)
+            abiertos_por_clave[clave] = k + 1
+            nombre = f"part-{indice:05d}.parquet" if k == 0 else f"part-{indice:05d}-{k}.parquet"
+            carpeta.mkdir(parents=True, exist_ok=True)
+            writers[clave] = pq.ParquetWriter(str(carpeta / nombre), datos.schema, compression=compresion)
+            resultado.archivos += 1
+        writers[clave].write_batch(datos)
+
+    try:
+        for batch in batches:
+            resultado.batches += 1
+            resultado.filas += batch.num_rows
+            if batch.num_rows == 0:
+                continue
+            if particion:
+                for valor, sub in _particionar(batch, particion):
+                    carpeta = f"{particion}={_valor_particion(valor)}"
+                    escribir(carpeta, destino / carpeta, sub)
+            else:
+                escribir("", destino, batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return resultado
+
+
+# ======================
+# EXPORTACIÓN
+# ======================
+
+def exportar(
+    fuente: FuenteStreams,
+    tabla: str,
+    destino: Path = Path(EXPORT_PATH),
+    columnas: Optional[List[str]] = None,
+    filtro: Optional[str] = None,
+    particion: Optional[str] = None,
+    max_streams: int = EXPORT_MAX_STREAMS,
+    snapshot: Optional[str] = None,
+) -> Dict:
+    """
+    Exporta `tabla` (dataset.tabla) a destino/dataset.tabla/snapshot=<marca>/.
+
+    Retorna un resumen con la ruta del snapshot, filas, archivos y duración.
+    """
+    if particion and columnas and particion not in columnas:
+        raise ValueError(f"La columna de partición '{particion}' debe estar entre las columnas exportadas")
+
+    snapshot = snapshot or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    final = destino / tabla / f"snapshot={snapshot}"
+    temporal = destino / tabla / f".tmp-snapshot={snapshot}"
+    if final.exists():
+        raise FileExistsError(f"El snapshot ya existe: {final}")
+    shutil.rmtree(temporal, ignore_errors=True)
+
+    t0 = time.time()
+    streams = fuente.abrir_sesion(tabla, columnas, filtro, max_streams)
+    logger.info("Exportando %s | streams=%d columnas=%s filtro=%s", tabla, len(streams), columnas or "*", filtro or "-")
+
+    temporal.mkdir(parents=True)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(streams))) as executor:
+            futuros = [
+                executor.submit(escribir_stream, fuente.leer_stream(s), temporal, i, particion)
+                for i, s in enumerate(streams)
+            ]
+            resultados = [f.result() for f in futuros]
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    temporal.rename(final)
+
+    resumen = {
+        "tabla": tabla,
+        "ruta": str(final),
+        "streams": len(streams),
+        "filas": sum(r.filas for r in resultados),
+        "archivos": sum(r.archivos for r in resultados),
+        "duracion_s": round(time.time() - t0, 2),
+    }
+    logger.info(
+        "%s exportada en %.1fs | filas=%d archivos=%d -> %s",
+        tabla, resumen["duracion_s"], resumen["filas"], resumen["archivos"], final,
+    )
+    return resumen
+
+
+def main(
+    tabla: str,
+    destino: str = EXPORT_PATH,
+    columnas: Optional[List[str]] = None,
+    filtro: Optional[str] = None,
+    particion: Optional[str] = None,
+    max_streams: int = EXPORT_MAX_STREAMS,
+) -> Dict:
+    return exportar(
+        FuenteBigQueryStorage(),
+        tabla,
+        destino=Path(destino),
+        columnas=columnas,
+        filtro=filtro,
+        particion=particion,
+        max_streams=max_streams,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportación de tablas a Parquet vía Storage Read API")
+    parser.add_argument("tabla", help="Tabla a exportar (dataset.tabla), ej. datamarts.dm_ventas")
+    parser.add_argument("--destino", default=EXPORT_PATH, help="Directorio base de los snapshots")
+    parser.add_argument("--columnas", help="Columnas a exportar, separadas por coma")
+    parser.add_argument("--filtro", help="Filtro de filas (row_restriction), ej. \"fecha >= '2025-01-01'\"")
+    parser.add_argument("--particion", help="Columna por la que particionar la salida (ej. fecha)")
+    parser.add_argument("--streams", type=int, default=EXPORT_MAX_STREAMS, help="Máximo de streams en paralelo")
+    args = parser.parse_args()
+
+    main(
+        args.tabla,
+        destino=args.destino,
+        columnas=args.columnas.split(",") if args.columnas else None,
+        filtro=args.filtro,
+        particion=args.particion,
+        max_streams=args.streams,
+    )
@@ -0,0 +1,89 @@
+"""
+Catálogo de rollups pre-agregados y ruteo de consultas.
+
+Los rollups se construyen en run_datamarts a partir de sql/datamarts/rollups/.
+`elegir_tabla` indica qué tabla conviene consultar para un grano y un
+conjunto de dimensiones: el rollup más chico capaz de responder, o el
+datamart a grano transacción si ningún rollup alcanza.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List
+
+from src.config import DATAMARTS_DATASET
+
+# Granos que puede responder cada grano almacenado, por hecho (una semana
+# ISO puede cruzar dos meses: el semanal no sirve para responder por mes).
+# El stock es una foto diaria: el semanal y el mensual guardan promedio,
+# mínimo, máximo y cierre, que no se re-agregan a un grano mayor (el
+# promedio de los promedios mensuales no es el promedio anual).
+GRANOS_RESPONDIBLES = {
+    "ventas": {
+        "dia": {"dia", "semana", "mes", "anio"},
+        "semana": {"semana"},
+        "mes": {"mes", "anio"},
+    },
+    "stock": {
+        "dia": {"dia", "semana", "mes", "anio"},
+        "semana": {"semana"},
+        "mes": {"mes"},
+    },
+}
+
+DIMENSIONES_VENTAS = frozenset({
+    "producto_id", "producto", "sucursal_id", "distribuidor", "provincia", "tipo_negocio",
+})
+
+DIMENSIONES_STOCK = frozenset({
+    "producto_id", "producto", "sucursal_id", "distribuidor",
+})
+
+
+@dataclass(frozen=True)
+class Rollup:
+    tabla: str
+    grano: str
+    dimensiones: frozenset
+
+
+# Ordenados de menor a mayor cantidad de filas
+ROLLUPS = {
+    "ventas": [
+        Rollup("rollup_ventas_mensual", "mes", DIMENSIONES_VENTAS),
+        Rollup("rollup_ventas_semanal", "semana", DIMENSIONES_VENTAS),
+        Rollup("rollup_ventas_diario", "dia", DIMENSIONES_VENTAS),
+    ],
+    "stock": [
+        Rollup("rollup_stock_mensual", "mes", DIMENSIONES_STOCK),
+        Rollup("rollup_stock_semanal", "semana", DIMENSIONES_STOCK),
+        Rollup("rollup_stock_diario", "dia", DIMENSIONES_STOCK),
+    ],
+}
+
+DATAMART_BASE = {
+    "ventas": "dm_ventas",
+    "stock": "dm_stock",
+}
+
+
+def tablas_rollup() -> List[str]:
+    return [r.tabla for rollups in ROLLUPS.values() for r in rollups]
+
+
+def elegir_tabla(hecho: str, grano: str, dimensiones: Iterable[str] = ()) -> str:
+    """
+    Retorna la tabla (dataset.tabla) más chica capaz de responder una
+    consulta de `hecho` ('ventas' o 'stock') agregada a `grano`
+    ('dia', 'semana', 'mes' o 'anio') por las `dimensiones` indicadas.
+    """
+    if hecho not in ROLLUPS:
+        raise ValueError(f"Hecho desconocido: {hecho}")
+    if grano not in {"dia", "semana", "mes", "anio"}:
+        raise ValueError(f"Grano desconocido: {grano}")
+
+    requeridas = set(dimensiones)
+    for rollup in ROLLUPS[hecho]:
+        if grano in GRANOS_RESPONDIBLES[hecho][rollup.grano] and requeridas <= rollup.dimensiones:
+            return f"{DATAMARTS_DATASET}.{rollup.tabla}"
+
+    return f"{DATAMARTS_DATASET}.{DATAMART_BASE[hecho]}"
@@ -3,21 +3,93 @@ Ejecución de Datamarts en BigQuery.
 
 - Crea el dataset datamarts si no existe
 - Ejecuta las vistas SQL orientadas a BI
+- Con motor duckdb, ejecuta las mismas vistas sobre la base local
+
+Modos:
+- vista:        datamarts como vistas (sin almacenamiento)
+- materializado: tablas particionadas por fecha y clusterizadas, refrescadas
+                 sólo para las fechas cargadas desde el último refresco
+                 (watermark 'datamarts' en infra.watermarks)
+
+Si las dimensiones que leen los datamarts (DIMENSIONES_DATAMARTS) cambiaron
+desde el último refresco, el refresco pasa a ser total: una fila ya
+materializada puede depender de cualquier cliente, producto o sucursal. El
+cambio se detecta con una huella del contenido (watermark
+'datamarts_dimensiones'); como el DWH reconstruye las dimensiones en cada
+corrida, last_modified sólo evita recalcular la huella si no se tocaron.
+
+Rollups (ver src/datamarts/rollups.py): tablas pre-agregadas de ventas y
+stock a grano diario, semanal y mensual, refrescadas incrementalmente con
+las mismas fechas que los datamarts materializados.
+
+Cobertura de stock (ver src/datamarts/cobertura.py): dm_cobertura_stock,
+siempre materializado. La primera construcción y el refresco total calculan
+todo el rango en un job; después, los días afectados por cargas tardías se
+recalculan uno por vez a partir de las ventanas del día anterior (watermark
+'cobertura_stock').
+
+Uso:
+  python -m src.datamarts.run_datamarts
+  python -m src.datamarts.run_datamarts --modo materializado
+  python -m src.datamarts.run_datamarts --modo materializado --refresco-total
+  python -m src.datamarts.run_datamarts --motor duckdb
+  python -m src.datamarts.run_datamarts --sin-cobertura
 """
 
+import argparse
 import time
+from datetime import date, datetime, timezone
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 from google.cloud import bigquery
 from google.cloud.exceptions import GoogleCloudError, NotFound
 
+from src.common.duckdb_engine import MotorDuckDB
 from src.common.gcp_auth import get_bq_client
+from src.common.incremental import (
+    fechas_cargadas_desde,
+    fechas_en_hechos,
+    guardar_watermark,
+    huella_tablas_dwh,
+    obtener_huella,
+    obtener_watermark,
+)
+from src.common.job_stats import guardar_estadisticas, registrar_job
 from src.common.logger import get_logger
-from src.config import DATAMARTS_DATASET, LOCATION, SQL_DATAMARTS_ORDER, SQL_DATAMARTS_PATH
+from src.config import (
+    DATAMARTS_COBERTURA,
+    DATAMARTS_DATASET,
+    DATAMARTS_MODO,
+    DATAMARTS_ROLLUPS,
+    DWH_DATASET,
+    LOCATION,
+    SQL_DATAMARTS_ORDER,
+    SQL_DATAMARTS_PATH,
+    SQL_ENGINE,
+    SQL_ROLLUPS_ORDER,
+)
+from src.datamarts.cobertura import (
+    SQL_COBERTURA,
+    SQL_COBERTURA_TABLAS,
+    SQL_COBERTURA_TOTAL,
+    TABLA_COBERTURA,
+    WATERMARK_COBERTURA,
+    dias_a_recalcular,
+)
+from src.datamarts.rollups import tablas_rollup
 
 logger = get_logger(__name__)
 
 SQL_BASE_PATH = Path(SQL_DATAMARTS_PATH)
+SQL_MATERIALIZADO_PATH = SQL_BASE_PATH / "materializado"
+SQL_ROLLUPS_PATH = SQL_BASE_PATH / "rollups"
+
+WATERMARK_DATAMARTS = "datamarts"
+WATERMARK_DIMENSIONES = "datamarts_dimensiones"
+
+# Dimensiones del DWH que leen los datamarts, los rollups y la cobertura
+DIMENSIONES_DATAMARTS = ["dim_cliente", "dim_fecha", "dim_producto", "dim_sucursal"]
 
 
 def ensure_dataset(client: bigquery.Client, dataset_name: str) -> None:
@@ -39,40 +111,345 @@ def load_sql(path: Path, project_id: str) -> str:
     return sql.replace("{{ project_id }}", project_id)
 
 
-def run_sql(client: bigquery.Client, sql: str, label: str) -> None:
+def ruta_sql(sql_file: str, modo: str) -> Path:
+    """Retorna la ruta del SQL del datamart según el modo (vista o materializado)."""
+    base = SQL_MATERIALIZADO_PATH if modo == "materializado" else SQL_BASE_PATH
+    path = base / sql_file
+
+    if not path.exists():
+        raise FileNotFoundError(f"No se encontró el archivo SQL: {path}")
+    return path
+
+
+def preparar_destino(client: bigquery.Client, nombre: str, modo: str) -> bool:
+    """
+    Elimina el objeto del datamart si su tipo no coincide con el modo
+    (vista ↔ tabla), para poder alternar entre modos con el mismo nombre.
+
+    Returns:
+        True si el objeto ya existía con el tipo esperado.
+    """
+    table_id = f"{client.project}.{DATAMARTS_DATASET}.{nombre}"
+    esperado = "TABLE" if modo == "materializado" else "VIEW"
+
+    try:
+        tabla = client.get_table(table_id)
+    except NotFound:
+        return False
+
+    if tabla.table_type == esperado:
+        return True
+
+    client.delete_table(table_id)
+    logger.info("Eliminado %s de tipo %s para recrearlo como %s", table_id, tabla.table_type, esperado)
+    return False
+
+
+def rutas_rollups() -> List[Path]:
+    rutas = []
+    for sql_file in SQL_ROLLUPS_ORDER:
+        path = SQL_ROLLUPS_PATH / sql_file
+        if not path.exists():
+            raise FileNotFoundError(f"No se encontró el archivo SQL: {path}")
+        rutas.append(path)
+    return rutas
+
+
+def tabla_existe(client: bigquery.Client, nombre: str) -> bool:
+    try:
+        client.get_table(f"{client.project}.{DATAMARTS_DATASET}.{nombre}")
+        return True
+    except NotFound:
+        return False
+
+
+def run_sql(
+    client: bigquery.Client,
+    sql: str,
+    label: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+) -> None:
     """Ejecuta una query SQL y espera a que finalice."""
     t0 = time.time()
-    job = client.query(sql)
-    job.result()
+    job = client.query(sql, job_config=job_config)
+    try:
+        job.result()
+    finally:
+        registrar_job(job, label, paso="datamarts")
     elapsed = time.time() - t0
     logger.info("%s completado en %.1fs", label, elapsed)
 
 
-def main() -> None:
+def run_local(
+    motor: MotorDuckDB,
+    modo: str = DATAMARTS_MODO,
+    rollups: bool = DATAMARTS_ROLLUPS,
+    cobertura: bool = DATAMARTS_COBERTURA,
+) -> None:
+    """
+    Crea los datamarts sobre la base DuckDB local.
+
+    En modo materializado, en los rollups y en la cobertura se refrescan
+    todas las fechas de los hechos: localmente no hay tabla de control de la
+    cual derivar las fechas nuevas.
+    """
+    logger.info("Ejecutando Datamarts | motor=duckdb base=%s modo=%s", motor.ruta_db, modo)
+
+    filas = motor.consultar(
+        f"SELECT fecha FROM {DWH_DATASET}.fact_ventas UNION SELECT fecha FROM {DWH_DATASET}.fact_stock"
+    )
+    fechas = {"fechas": sorted(f[0] for f in filas)}
+    parametros = fechas if modo == "materializado" else None
+
+    for sql_file in SQL_DATAMARTS_ORDER:
+        path = ruta_sql(sql_file, modo)
+        nombre = path.stem
+
+        tipo = motor.tipo_objeto(DATAMARTS_DATASET, nombre)
+        if tipo == "VIEW" and modo == "materializado":
+            motor.con.execute(f"DROP VIEW {DATAMARTS_DATASET}.{nombre}")
+        elif tipo == "BASE TABLE" and modo != "materializado":
+            motor.con.execute(f"DROP TABLE {DATAMARTS_DATASET}.{nombre}")
+
+        logger.info("Ejecutando %s...", sql_file)
+        motor.ejecutar(load_sql(path, "local"), sql_file, parametros)
+
+    if rollups:
+        for path in rutas_rollups():
+            logger.info("Ejecutando %s...", path.name)
+            motor.ejecutar(load_sql(path, "local"), path.name, fechas)
+
+    if cobertura and fechas["fechas"]:
+        rango = {"desde": fechas["fechas"][0], "hasta": fechas["fechas"][-1]}
+        logger.info("Ejecutando %s | %s a %s", SQL_COBERTURA_TOTAL.name, rango["desde"], rango["hasta"])
+        motor.ejecutar(load_sql(SQL_COBERTURA_TABLAS, "local"), SQL_COBERTURA_TABLAS.name)
+        motor.ejecutar(load_sql(SQL_COBERTURA_TOTAL, "local"), SQL_COBERTURA_TOTAL.name, rango)
+
+    logger.info("Datamarts creados correctamente.")
+
+
+def rango_hechos(client: bigquery.Client) -> Tuple[Optional[date], Optional[date]]:
+    """Primera y última fecha presentes en fact_ventas y fact_stock."""
+    query = f"""
+    SELECT MIN(fecha) AS desde, MAX(fecha) AS hasta
+    FROM (
+      SELECT fecha FROM `{client.project}.{DWH_DATASET}.fact_ventas`
+      UNION ALL
+      SELECT fecha FROM `{client.project}.{DWH_DATASET}.fact_stock`
+    )
+    """
+    fila = next(iter(client.query(query).result()))
+    return fila.desde, fila.hasta
+
+
+def refrescar_cobertura(client: bigquery.Client, fechas: List, refresco_total: bool = False) -> None:
+    """
+    Pone al día dm_cobertura_stock. Sin cálculo previo (o con
+    `refresco_total`) calcula todo el rango de los hechos en un único job;
+    si no, recalcula en orden los días afectados por `fechas` y los
+    posteriores al último calculado (un job por día).
+    """
+    ultimo = None
+    if not refresco_total and tabla_existe(client, TABLA_COBERTURA):
+        marca = obtener_watermark(client, WATERMARK_COBERTURA)
+        ultimo = marca.date() if marca else None
+
+    primer_dia, ultimo_dia = rango_hechos(client)
+    dias = dias_a_recalcular(fechas, ultimo, primer_dia, ultimo_dia)
+    if not dias:
+        logger.info("%s al día: no hay días para calcular.", TABLA_COBERTURA)
+        return
+
+    run_sql(client, load_sql(SQL_COBERTURA_TABLAS, client.project), SQL_COBERTURA_TABLAS.name)
+
+    if ultimo is None:
+        logger.info("Calculando %s completo | %s a %s", TABLA_COBERTURA, primer_dia, ultimo_dia)
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("desde", "DATE", primer_dia),
+            bigquery.ScalarQueryParameter("hasta", "DATE", ultimo_dia),
+        ])
+        run_sql(client, load_sql(SQL_COBERTURA_TOTAL, client.project), SQL_COBERTURA_TOTAL.name, job_config)
+    else:
+        logger.info("Calculando %s | días=%d (%s a %s)", TABLA_COBERTURA, len(dias), dias[0], dias[-1])
+        sql = load_sql(SQL_COBERTURA, client.project)
+        for dia in dias:
+            job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("fecha", "DATE", dia)])
+            run_sql(client, sql, f"{SQL_COBERTURA.name}:{dia}", job_config)
+
+    guardar_watermark(client, WATERMARK_COBERTURA, datetime(dias[-1].year, dias[-1].month, dias[-1].day, tzinfo=timezone.utc))
+
+
+def refrescar_fechas(
+    client: bigquery.Client,
+    fechas: List,
+    modo: str = DATAMARTS_MODO,
+    rollups: bool = DATAMARTS_ROLLUPS,
+    cobertura: bool = DATAMARTS_COBERTURA,
+) -> None:
+    """
+    Refresca sólo las fechas indicadas de los datamarts materializados, los
+    rollups y la cobertura de stock (usado por el backfill). Las vistas no
+    requieren refresco.
+    """
+    if cobertura and fechas:
+        refrescar_cobertura(client, fechas)
+
+    incrementales: List[Path] = []
+    if modo == "materializado":
+        incrementales += [ruta_sql(sql_file, modo) for sql_file in SQL_DATAMARTS_ORDER]
+    if rollups:
+        incrementales += rutas_rollups()
+
+    if not incrementales or not fechas:
+        return
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("fechas", "DATE", fechas)]
+    )
+    for path in incrementales:
+        logger.info("Refrescando %s | fechas=%d", path.name, len(fechas))
+        run_sql(client, load_sql(path, client.project), path.name, job_config)
+
+
+def resolver_fechas(client: bigquery.Client, refresco_total: bool):
+    """
+    Determina las fechas a refrescar en modo materializado.
+
+    Returns:
+        (fechas, hasta) donde `hasta` es la próxima marca de agua.
+    """
+    desde = None if refresco_total else obtener_watermark(client, WATERMARK_DATAMARTS)
+    fechas, hasta = fechas_cargadas_desde(client, desde)
+
+    if desde is None:
+        fechas = fechas_en_hechos(client)
+        logger.info("Refresco total de datamarts | fechas=%d", len(fechas))
+    else:
+        logger.info("Refresco incremental de datamarts | desde=%s fechas=%d", desde.isoformat(), len(fechas))
+
+    return fechas, hasta
+
+
+def huella_dimensiones(client: bigquery.Client) -> Tuple[Optional[str], str]:
+    """
+    Retorna (huella guardada, huella actual) de DIMENSIONES_DATAMARTS.
+
+    Si ninguna dimensión se modificó después de la última huella, la
+    reutiliza sin leer las tablas.
+    """
+    guardada = obtener_huella(client, WATERMARK_DIMENSIONES)
+    marca = obtener_watermark(client, WATERMARK_DIMENSIONES)
+    if guardada and marca:
+        modificadas = [
+            client.get_table(f"{client.project}.{DWH_DATASET}.{tabla}").modified
+            for tabla in DIMENSIONES_DATAMARTS
+        ]
+        if all(m is not None and m <= marca for m in modificadas):
+            return guardada, guardada
+    return guardada, huella_tablas_dwh(client, DIMENSIONES_DATAMARTS)
+
+
+def main(
+    motor: str = SQL_ENGINE,
+    modo: str = DATAMARTS_MODO,
+    refresco_total: bool = False,
+    rollups: bool = DATAMARTS_ROLLUPS,
+    cobertura: bool = DATAMARTS_COBERTURA,
+) -> None:
+    if motor == "duckdb":
+        motor_local = MotorDuckDB()
+        try:
+            run_local(motor_local, modo, rollups, cobertura)
+        finally:
+            motor_local.cerrar()
+        return
+
     client = get_bq_client()
     project_id = client.project
 
-    logger.info("Ejecutando Datamarts | proyecto=%s", project_id)
+    logger.info("Ejecutando Datamarts | proyecto=%s modo=%s", project_id, modo)
 
     ensure_dataset(client, DATAMARTS_DATASET)
 
-    for sql_file in SQL_DATAMARTS_ORDER:
-        path = SQL_BASE_PATH / sql_file
+    rutas = [ruta_sql(sql_file, modo) for sql_file in SQL_DATAMARTS_ORDER]
+    existentes_dm = [preparar_destino(client, path.stem, modo) for path in rutas]
 
-        if not path.exists():
-            raise FileNotFoundError(f"No se encontró el archivo SQL: {path}")
+    # Archivos con refresco incremental por fecha (@fechas)
+    incrementales: List[Path] = []
+    existentes: List[bool] = []
+    if modo == "materializado":
+        incrementales += rutas
+        existentes += existentes_dm
+    if rollups:
+        incrementales += rutas_rollups()
+        existentes += [tabla_existe(client, tabla) for tabla in tablas_rollup()]
+
+    fechas = []
+    hasta = None
+    huella = None
+    inicio = datetime.now(timezone.utc)
+    if incrementales or cobertura:
+        guardada, huella = huella_dimensiones(client)
+        if huella != guardada and not refresco_total:
+            logger.info("Las dimensiones cambiaron desde el último refresco: se refresca todo.")
+            refresco_total = True
+        fechas, hasta = resolver_fechas(client, refresco_total or not all(existentes))
+        if not fechas:
+            logger.info("Sin fechas nuevas desde el último refresco: se omiten los refrescos incrementales.")
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("fechas", "DATE", fechas)]
+    )
+
+    for path in dict.fromkeys(rutas + incrementales):
+        sql_file = path.name
+        es_incremental = path in incrementales
+        if es_incremental and not fechas:
+            continue
 
         logger.info("Ejecutando %s...", sql_file)
         sql = load_sql(path, project_id)
 
         try:
-            run_sql(client, sql, sql_file)
+            run_sql(client, sql, sql_file, job_config if es_incremental else None)
         except GoogleCloudError as e:
             logger.error("Error ejecutando %s: %s", sql_file, e)
+            guardar_estadisticas(client)
             raise
 
+    if cobertura:
+        try:
+            refrescar_cobertura(client, fechas, refresco_total)
+        except GoogleCloudError as e:
+            logger.error("Error calculando %s: %s", TABLA_COBERTURA, e)
+            guardar_estadisticas(client)
+            raise
+
+    if hasta is not None:
+        guardar_watermark(client, WATERMARK_DATAMARTS, hasta)
+    if huella is not None:
+        guardar_watermark(client, WATERMARK_DIMENSIONES, inicio, huella)
+
+    guardar_estadisticas(client)
     logger.info("Datamarts creados correctamente.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Construcción de datamarts")
+    parser.add_argument("--motor", choices=["bigquery", "duckdb"], default=SQL_ENGINE)
+    parser.add_argument("--modo", choices=["vista", "materializado"], default=DATAMARTS_MODO)
+    parser.add_argument("--sin-rollups", dest="rollups", action="store_false", default=DATAMARTS_ROLLUPS)
+    parser.add_argument("--sin-cobertura", dest="cobertura", action="store_false", default=DATAMARTS_COBERTURA)
+    parser.add_argument(
+        "--refresco-total",
+        action="store_true",
+        help="Refrescar todas las fechas de los datamarts materializados y rollups (p. ej. tras cambios en dimensiones)",
+    )
+    args = parser.parse_args()
+    main(
+        motor=args.motor,
+        modo=args.modo,
+        refresco_total=args.refresco_total,
+        rollups=args.rollups,
+        cobertura=args.cobertura,
+    )
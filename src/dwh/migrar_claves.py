@@ -0,0 +1,86 @@
+"""
+Migración única de los hechos creados antes de las claves subrogadas.
+
+- Completa producto_sk / sucursal_sk de las filas previas a claves.sql
+  (sql/migraciones/claves_subrogadas.sql). Recorre los hechos completos,
+  por eso no forma parte de cada corrida del DWH: se ejecuta una vez,
+  después de la primera corrida con claves subrogadas
+- Fija el clustering por producto_sk, sucursal_sk en los hechos que ya
+  existían: el CLUSTER BY del CREATE TABLE IF NOT EXISTS sólo aplica a
+  tablas nuevas. BigQuery clusteriza los datos escritos desde el cambio;
+  las particiones existentes se reorganizan recién cuando se reescriben
+  (por ejemplo, con run_backfill)
+
+Uso:
+  python -m src.dwh.migrar_claves
+  python -m src.dwh.migrar_claves --motor duckdb
+"""
+
+import argparse
+from pathlib import Path
+
+from google.cloud import bigquery
+
+from src.common.duckdb_engine import MotorDuckDB
+from src.common.gcp_auth import get_bq_client
+from src.common.job_stats import guardar_estadisticas
+from src.common.logger import get_logger
+from src.config import DWH_DATASET, SQL_ENGINE, SQL_MIGRACIONES_PATH
+from src.dwh.run_dwh import load_sql_file, run_sql
+
+logger = get_logger(__name__)
+
+SQL_MIGRACION = Path(SQL_MIGRACIONES_PATH) / "claves_subrogadas.sql"
+
+HECHOS = ["fact_ventas", "fact_stock"]
+CLUSTERING_HECHOS = ["producto_sk", "sucursal_sk"]
+
+
+def actualizar_clustering(client: bigquery.Client, tabla: str) -> None:
+    """Fija CLUSTERING_HECHOS en dwh.<tabla> si tiene otro clustering."""
+    table = client.get_table(f"{client.project}.{DWH_DATASET}.{tabla}")
+    if table.clustering_fields == CLUSTERING_HECHOS:
+        logger.info("%s ya está clusterizada por %s", tabla, ", ".join(CLUSTERING_HECHOS))
+        return
+
+    anterior = table.clustering_fields
+    table.clustering_fields = CLUSTERING_HECHOS
+    client.update_table(table, ["clustering_fields"])
+    logger.info(
+        "%s: clustering %s -> %s (aplica a los datos que se escriban desde ahora)",
+        tabla, anterior or "ninguno", ", ".join(CLUSTERING_HECHOS),
+    )
+
+
+def run_local(motor: MotorDuckDB) -> None:
+    """Completa las claves subrogadas de los hechos locales (DuckDB no clusteriza)."""
+    motor.ejecutar(load_sql_file(SQL_MIGRACION, "local"), SQL_MIGRACION.name)
+
+
+def main(motor: str = SQL_ENGINE) -> None:
+    if motor == "duckdb":
+        motor_local = MotorDuckDB()
+        try:
+            run_local(motor_local)
+        finally:
+            motor_local.cerrar()
+        return
+
+    client = get_bq_client()
+    logger.info("Migración de claves subrogadas | proyecto=%s", client.project)
+
+    try:
+        run_sql(client, load_sql_file(SQL_MIGRACION, client.project), SQL_MIGRACION.name)
+        for tabla in HECHOS:
+            actualizar_clustering(client, tabla)
+    finally:
+        guardar_estadisticas(client)
+
+    logger.info("Migración de claves subrogadas completada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migración única a claves subrogadas de los hechos existentes")
+    parser.add_argument("--motor", choices=["bigquery", "duckdb"], default=SQL_ENGINE)
+    args = parser.parse_args()
+    main(motor=args.motor)
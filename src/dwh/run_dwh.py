@@ -4,21 +4,69 @@ Ejecución del Data Warehouse (DWH).
 - Ejecuta scripts SQL del esquema estrella
 - No contiene lógica de negocio
 - Orquesta en orden correcto
+
+Motores:
+- bigquery: ejecución sobre BigQuery (por defecto)
+- duckdb:   ejecución local sobre los archivos de data/ (ver src/common/duckdb_engine.py)
+
+Modos de ejecución (BigQuery):
+- jobs:   un job de BigQuery por archivo SQL
+- script: todos los archivos en un único script multi-statement (un solo job),
+          opcionalmente dentro de una transacción
+
+Alcance de la transacción del modo script: BigQuery no admite DDL dentro
+de una transacción, y las dimensiones y las claves subrogadas se
+reconstruyen con CREATE OR REPLACE TABLE. Quedan antes de BEGIN
+TRANSACTION; sólo las cargas de los hechos son atómicas. Si el script
+falla en los hechos, las dimensiones quedan reconstruidas y los hechos
+vuelven a su estado anterior. Las dimensiones son reconstrucciones
+completas desde raw, así que la siguiente corrida las deja iguales, y las
+claves ya asignadas no cambian.
+
+Snapshot de actividad de cliente (sql/dwh/snapshot/): después de los hechos
+se actualiza dwh.snapshot_actividad_cliente sólo con las fechas cargadas
+desde la última actualización (watermark 'snapshot_actividad' en
+infra.watermarks). El backfill y el modo continuo lo actualizan con las
+fechas que reescriben.
+
+Uso:
+  python -m src.dwh.run_dwh
+  python -m src.dwh.run_dwh --modo script
+  python -m src.dwh.run_dwh --modo script --sin-transaccion
+  python -m src.dwh.run_dwh --motor duckdb
 """
 
+import argparse
 import time
+from datetime import date
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from google.cloud import bigquery
-from google.cloud.exceptions import GoogleCloudError
+from google.cloud.exceptions import GoogleCloudError, NotFound
 
+from src.common.duckdb_engine import MotorDuckDB
 from src.common.gcp_auth import get_bq_client
+from src.common.incremental import fechas_cargadas_desde, fechas_en_hechos, guardar_watermark, obtener_watermark
+from src.common.job_stats import guardar_estadisticas, registrar_job
 from src.common.logger import get_logger
-from src.config import SQL_DWH_ORDER, SQL_DWH_PATH
+from src.common.sql_utils import dividir_sentencias, es_ddl, es_ddl_idempotente
+from src.config import (
+    DWH_DATASET,
+    DWH_MODO_EJECUCION,
+    DWH_SCRIPT_TRANSACCION,
+    SQL_DWH_ORDER,
+    SQL_DWH_PATH,
+    SQL_ENGINE,
+)
 
 logger = get_logger(__name__)
 
 SQL_BASE_PATH = Path(SQL_DWH_PATH)
+SQL_SNAPSHOT = SQL_BASE_PATH / "snapshot" / "snapshot_actividad_cliente.sql"
+
+TABLA_SNAPSHOT = "snapshot_actividad_cliente"
+WATERMARK_SNAPSHOT = "snapshot_actividad"
 
 
 def load_sql_file(path: Path, project_id: str) -> str:
@@ -36,38 +84,315 @@ def load_sql_file(path: Path, project_id: str) -> str:
     return sql.replace("{{ project_id }}", project_id)
 
 
-def run_sql(client: bigquery.Client, sql: str, label: str) -> None:
+def run_sql(
+    client: bigquery.Client,
+    sql: str,
+    label: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+) -> None:
     """Ejecuta una query SQL en BigQuery y espera a que termine."""
     t0 = time.time()
-    job = client.query(sql)
-    job.result()
+    job = client.query(sql, job_config=job_config)
+    try:
+        job.result()
+    finally:
+        registrar_job(job, label, paso="dwh")
     elapsed = time.time() - t0
     logger.info("%s completado en %.1fs", label, elapsed)
 
 
-def main() -> None:
-    client = get_bq_client()
-    project_id = client.project
-
-    logger.info("Ejecutando Data Warehouse | proyecto=%s", project_id)
-
+def cargar_sql_ordenados(project_id: str) -> List[Tuple[str, str]]:
+    """Carga los archivos SQL del DWH en el orden de ejecución."""
+    archivos = []
     for sql_file in SQL_DWH_ORDER:
         path = SQL_BASE_PATH / sql_file
 
         if not path.exists():
             raise FileNotFoundError(f"No se encontró el archivo SQL: {path}")
 
+        archivos.append((sql_file, load_sql_file(path, project_id)))
+    return archivos
+
+
+# ======================
+# SNAPSHOT DE ACTIVIDAD
+# ======================
+
+def nuevo_corte(fechas: List[date], anterior: Optional[date]) -> Optional[date]:
+    """
+    Corte del snapshot tras aplicar `fechas`: la última fecha con datos. No
+    retrocede al recargar días viejos (backfill).
+    """
+    candidatos = [f for f in [anterior, max(fechas, default=None)] if f is not None]
+    return max(candidatos, default=None)
+
+
+def parametros_snapshot(fechas: List[date], anterior: Optional[date]) -> Dict:
+    return {"fechas": sorted(fechas), "corte_anterior": anterior, "corte": nuevo_corte(fechas, anterior)}
+
+
+def corte_snapshot(client: bigquery.Client) -> Optional[date]:
+    """Corte del snapshot vigente (None si todavía no existe)."""
+    query = f"SELECT MAX(fecha_corte) AS corte FROM `{client.project}.{DWH_DATASET}.{TABLA_SNAPSHOT}`"
+    try:
+        return next(iter(client.query(query).result())).corte
+    except NotFound:
+        return None
+
+
+def actualizar_snapshot(client: bigquery.Client, fechas: Optional[List[date]] = None) -> None:
+    """
+    Aplica al snapshot de actividad de cliente las fechas nuevas o
+    modificadas de fact_ventas.
+
+    Sin `fechas`, usa las cargadas desde el último watermark y lo avanza al
+    terminar. Sin snapshot previo se construye con todas las fechas de los
+    hechos.
+    """
+    anterior = corte_snapshot(client)
+    hasta = None
+    if fechas is None:
+        desde = obtener_watermark(client, WATERMARK_SNAPSHOT) if anterior is not None else None
+        fechas, hasta = fechas_cargadas_desde(client, desde)
+    if anterior is None:
+        fechas = fechas_en_hechos(client)
+
+    if fechas:
+        params = parametros_snapshot(fechas, anterior)
+        logger.info(
+            "Actualizando %s | fechas=%d corte=%s (anterior=%s)",
+            TABLA_SNAPSHOT, len(fechas), params["corte"], params["corte_anterior"],
+        )
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("fechas", "DATE", params["fechas"]),
+            bigquery.ScalarQueryParameter("corte_anterior", "DATE", params["corte_anterior"]),
+            bigquery.ScalarQueryParameter("corte", "DATE", params["corte"]),
+        ])
+        run_sql(client, load_sql_file(SQL_SNAPSHOT, client.project), SQL_SNAPSHOT.name, job_config)
+    else:
+        logger.info("%s al día: no hay fechas nuevas.", TABLA_SNAPSHOT)
+
+    if hasta is not None:
+        guardar_watermark(client, WATERMARK_SNAPSHOT, hasta)
+
+
+# ======================
+# MODO SCRIPT
+# ======================
+
+def renderizar_script(
+    archivos: List[Tuple[str, str]],
+    transaccion: bool,
+) -> Tuple[str, List[Dict]]:
+    """
+    Arma un único script multi-statement a partir de los archivos SQL.
+
+    Con transacción, las sentencias desde la primera DML en adelante se
+    ejecutan dentro de BEGIN TRANSACTION / COMMIT con ROLLBACK ante error.
+    BigQuery no admite DDL dentro de transacciones: el DDL previo a la
+    primera DML queda antes de la transacción y el DDL idempotente
+    (CREATE ... IF NOT EXISTS) posterior se adelanta. Cualquier otro DDL
+    posterior a una DML hace imposible el modo transaccional.
+
+    Returns:
+        (script, mapa) donde mapa tiene, por sentencia, el archivo de
+        origen, su índice dentro del archivo y las líneas que ocupa.
+    """
+    sentencias = [
+        {"archivo": archivo, "indice": i, "sql": sentencia}
+        for archivo, sql in archivos
+        for i, sentencia in enumerate(dividir_sentencias(sql), start=1)
+    ]
+
+    previas: List[Dict] = []
+    transaccionales: List[Dict] = []
+
+    if transaccion:
+        hubo_dml = False
+        for s in sentencias:
+            if not es_ddl(s["sql"]):
+                hubo_dml = True
+                transaccionales.append(s)
+            elif not hubo_dml or es_ddl_idempotente(s["sql"]):
+                previas.append(s)
+            else:
+                raise ValueError(
+                    f"{s['archivo']} (sentencia {s['indice']}): el DDL posterior a una DML "
+                    "no puede ejecutarse dentro de una transacción; usar --sin-transaccion"
+                )
+    else:
+        previas = sentencias
+
+    lineas: List[str] = []
+    mapa: List[Dict] = []
+
+    def agregar(texto: str, sentencia: Optional[Dict] = None, sangria: str = "") -> None:
+        inicio = len(lineas) + 1
+        lineas.extend(sangria + linea if linea else "" for linea in f"{texto};".splitlines())
+        if sentencia is not None:
+            mapa.append({
+                "archivo": sentencia["archivo"],
+                "indice": sentencia["indice"],
+                "linea_inicio": inicio,
+                "linea_fin": len(lineas),
+            })
+
+    for s in previas:
+        agregar(s["sql"], s)
+
+    if transaccionales:
+        lineas.append("BEGIN")
+        agregar("BEGIN TRANSACTION", sangria="  ")
+        for s in transaccionales:
+            agregar(s["sql"], s, sangria="  ")
+        agregar("COMMIT TRANSACTION", sangria="  ")
+        lineas.append("EXCEPTION WHEN ERROR THEN")
+        agregar("ROLLBACK TRANSACTION", sangria="  ")
+        agregar("RAISE USING MESSAGE = @@error.message", sangria="  ")
+        lineas.append("END;")
+
+    return "\n".join(lineas) + "\n", mapa
+
+
+def sentencia_para_linea(mapa: List[Dict], linea: int) -> Optional[Dict]:
+    """Retorna la sentencia del mapa que contiene la línea indicada del script."""
+    for s in mapa:
+        if s["linea_inicio"] <= linea <= s["linea_fin"]:
+            return s
+    return None
+
+
+def reportar_jobs_hijos(client: bigquery.Client, job: bigquery.QueryJob, mapa: List[Dict]) -> None:
+    """
+    Reporta tiempo y errores por sentencia a partir de los jobs hijos del
+    script, mapeando la línea de cada job hijo al archivo SQL de origen.
+    """
+    hijos = sorted(client.list_jobs(parent_job=job.job_id), key=lambda j: j.created)
+
+    for hijo in hijos:
+        frames = hijo.script_statistics.stack_frames if hijo.script_statistics else []
+        sentencia = sentencia_para_linea(mapa, frames[0].start_line) if frames else None
+        if sentencia is None:
+            continue
+
+        etiqueta = f"{sentencia['archivo']}#{sentencia['indice']}"
+        registrar_job(hijo, etiqueta, paso="dwh")
+
+        if hijo.error_result:
+            logger.error("%s falló: %s", etiqueta, hijo.error_result.get("message"))
+        elif hijo.started and hijo.ended:
+            logger.info("%s completado en %.1fs", etiqueta, (hijo.ended - hijo.started).total_seconds())
+
+
+def run_script(client: bigquery.Client, archivos: List[Tuple[str, str]], transaccion: bool) -> None:
+    """Ejecuta todos los archivos SQL del DWH como un único job multi-statement."""
+    script, mapa = renderizar_script(archivos, transaccion)
+
+    logger.info(
+        "Ejecutando script DWH | sentencias=%d transaccion=%s",
+        len(mapa), "sí" if transaccion else "no",
+    )
+
+    t0 = time.time()
+    job = client.query(script)
+    try:
+        job.result()
+    finally:
+        # Las estadísticas también consultan BigQuery: un error acá no debe
+        # reemplazar el del script
+        try:
+            registrar_job(job, "script_dwh", paso="dwh")
+            reportar_jobs_hijos(client, job, mapa)
+        except Exception as e:
+            logger.warning("No se pudieron reportar las estadísticas del script DWH: %s", e)
+    logger.info("Script DWH completado en %.1fs", time.time() - t0)
+
+
+def run_local(motor: MotorDuckDB) -> None:
+    """Ejecuta el DWH completo sobre DuckDB a partir de los archivos locales."""
+    logger.info("Ejecutando Data Warehouse | motor=duckdb base=%s", motor.ruta_db)
+
+    motor.cargar_raw()
+    for sql_file, sql in cargar_sql_ordenados("local"):
+        logger.info("Ejecutando %s...", sql_file)
+        motor.ejecutar(sql, sql_file)
+
+    # Localmente no hay tabla de control: se aplican todas las fechas de los
+    # hechos sobre el snapshot existente
+    anterior = None
+    if motor.tipo_objeto(DWH_DATASET, TABLA_SNAPSHOT):
+        anterior = motor.consultar(f"SELECT MAX(fecha_corte) FROM {DWH_DATASET}.{TABLA_SNAPSHOT}")[0][0]
+    fechas = [f[0] for f in motor.consultar(f"SELECT DISTINCT fecha FROM {DWH_DATASET}.fact_ventas")]
+    if fechas:
+        logger.info("Ejecutando %s...", SQL_SNAPSHOT.name)
+        motor.ejecutar(load_sql_file(SQL_SNAPSHOT, "local"), SQL_SNAPSHOT.name, parametros_snapshot(fechas, anterior))
+
+    logger.info("DWH actualizado correctamente.")
+
+
+def main(
+    modo: str = DWH_MODO_EJECUCION,
+    transaccion: bool = DWH_SCRIPT_TRANSACCION,
+    motor: str = SQL_ENGINE,
+) -> None:
+    if motor == "duckdb":
+        motor_local = MotorDuckDB()
+        try:
+            run_local(motor_local)
+        finally:
+            motor_local.cerrar()
+        return
+
+    client = get_bq_client()
+    project_id = client.project
+
+    logger.info("Ejecutando Data Warehouse | proyecto=%s modo=%s", project_id, modo)
+
+    archivos = cargar_sql_ordenados(project_id)
+
+    if modo == "script":
+        try:
+            run_script(client, archivos, transaccion)
+            actualizar_snapshot(client)
+        except GoogleCloudError as e:
+            logger.error("Error ejecutando script DWH: %s", e)
+            guardar_estadisticas(client)
+            raise
+        guardar_estadisticas(client)
+        logger.info("DWH actualizado correctamente.")
+        return
+
+    for sql_file, sql in archivos:
         logger.info("Ejecutando %s...", sql_file)
-        sql = load_sql_file(path, project_id)
 
         try:
             run_sql(client, sql, sql_file)
         except GoogleCloudError as e:
             logger.error("Error ejecutando %s: %s", sql_file, e)
+            guardar_estadisticas(client)
             raise
 
+    try:
+        actualizar_snapshot(client)
+    except GoogleCloudError as e:
+        logger.error("Error actualizando %s: %s", TABLA_SNAPSHOT, e)
+        guardar_estadisticas(client)
+        raise
+
+    guardar_estadisticas(client)
     logger.info("DWH actualizado correctamente.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Construcción del Data Warehouse")
+    parser.add_argument("--motor", choices=["bigquery", "duckdb"], default=SQL_ENGINE)
+    parser.add_argument("--modo", choices=["jobs", "script"], default=DWH_MODO_EJECUCION)
+    parser.add_argument(
+        "--sin-transaccion",
+        dest="transaccion",
+        action="store_false",
+        default=DWH_SCRIPT_TRANSACCION,
+        help="En modo script, no envolver las sentencias en una transacción",
+    )
+    args = parser.parse_args()
+    main(modo=args.modo, transaccion=args.transaccion, motor=args.motor)
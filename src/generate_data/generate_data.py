@@ -19,16 +19,20 @@ data/
 
 from __future__ import annotations
 
+import argparse
+import inspect
 import json
 import random as rd
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
+from src.common import metricas
 from src.common.logger import get_logger
+from src.common.shards import TODOS, SeleccionDistribuidores, agregar_argumentos, desde_argumentos
 
 logger = get_logger(__name__)
 
@@ -188,6 +192,7 @@ class GeneradorDatos:
         self.cant_distribuidores = cant_distribuidores
         self.cant_dias = cant_dias
         self.clientes_por_dist = clientes_por_dist
+        self.seed = seed
         self.fecha_actual = datetime.now()
         self.clientes: Dict[int, List[Cliente]] = {}
         self.stock_por_producto: Dict[int, Dict[str, Dict[str, object]]] = {}
@@ -311,100 +316,124 @@ class GeneradorDatos:
         self.stock_por_producto[distribuidor] = stock_actual
         return ventas, stock_actual
 
-    def escribir_archivos_locales(self, output_base_path: Path) -> None:
+    def escribir_archivos_locales(self, output_base_path: Path, seleccion: SeleccionDistribuidores = TODOS) -> None:
         """
         Genera todos los archivos de datos con estructura por distribuidor:
         - ventas (diario)
         - stock (diario)
         - maestro (1 vez por distribuidor)
         """
+        for _ in self.escribir_por_distribuidor(output_base_path, seleccion):
+            pass
+
+    def escribir_por_distribuidor(
+        self,
+        output_base_path: Path,
+        seleccion: SeleccionDistribuidores = TODOS,
+    ) -> Iterator[int]:
+        """
+        Igual que escribir_archivos_locales, pero produce cada distribuidor
+        apenas sus archivos quedan escritos (modo encadenado del pipeline).
+
+        Los distribuidores fuera de `seleccion` se simulan sin escribir
+        archivos: el generador aleatorio es compartido, y así cada
+        distribuidor obtiene los mismos datos con o sin selección. El
+        resumen se escribe al agotar el iterador, sólo sin selección.
+        """
         output_base_path.mkdir(parents=True, exist_ok=True)
         self.generar_clientes()
 
         for distribuidor in range(1, self.cant_distribuidores + 1):
-            logger.info("Generando datos para Distribuidor %d...", distribuidor)
-
-            paths = {
-                "ventas": output_base_path / "Archivos_VentaClientes" / f"Distribuidor_{distribuidor}",
-                "stock": output_base_path / "Archivos_Stock" / f"Distribuidor_{distribuidor}",
-                "maestro": output_base_path / "Archivos_Maestro" / f"Distribuidor_{distribuidor}",
-            }
+            if not seleccion.incluye(distribuidor):
+                self._generar_distribuidor(output_base_path, distribuidor, escribir=False)
+                continue
+            with metricas.span("generate.distribuidor", distribuidor=distribuidor):
+                self._generar_distribuidor(output_base_path, distribuidor)
+            yield distribuidor
+
+        if seleccion.todos:
+            self._generar_resumen(output_base_path)
+
+    def _generar_distribuidor(self, output_base_path: Path, distribuidor: int, escribir: bool = True) -> None:
+        if not escribir:
+            for dia in range(self.cant_dias):
+                self.generar_datos_por_dia(distribuidor, self.fecha_actual - timedelta(days=dia))
+            return
 
-            for p in paths.values():
-                p.mkdir(parents=True, exist_ok=True)
+        logger.info("Generando datos para Distribuidor %d...", distribuidor)
 
-            # Generación día a día
-            for dia in range(self.cant_dias):
-                fecha = self.fecha_actual - timedelta(days=dia)
-                fecha_str = fecha.strftime("%Y-%m-%d")
+        paths = {
+            "ventas": output_base_path / "Archivos_VentaClientes" / f"Distribuidor_{distribuidor}",
+            "stock": output_base_path / "Archivos_Stock" / f"Distribuidor_{distribuidor}",
+            "maestro": output_base_path / "Archivos_Maestro" / f"Distribuidor_{distribuidor}",
+        }
 
-                ventas, stock_actual = self.generar_datos_por_dia(distribuidor, fecha)
+        for p in paths.values():
+            p.mkdir(parents=True, exist_ok=True)
+
+        # Generación día a día
+        for dia in range(self.cant_dias):
+            fecha = self.fecha_actual - timedelta(days=dia)
+            fecha_str = fecha.strftime("%Y-%m-%d")
+
+            ventas, stock_actual = self.generar_datos_por_dia(distribuidor, fecha)
+
+            # Ventas (si hay)
+            if ventas:
+                self._escribir_csv(paths["ventas"] / f"Venta_Clientes_{fecha_str}.csv", pd.DataFrame(ventas), "ventas")
+
+            # Stock (siempre)
+            stock_data = []
+            for sku, info in stock_actual.items():
+                stock_data.append(
+                    {
+                        "sucursal": distribuidor * 100 + 1,
+                        "fecha_cierre": fecha_str,
+                        "sku": sku,
+                        "producto": PRODUCTOS[sku]["nombre"],
+                        "stock": int(info["cantidad"]),
+                        "unidad": str(info["unidad"]),
+                        "distribuidor": distribuidor,
+                    }
+                )
 
-                # Ventas (si hay)
-                if ventas:
-                    df_ventas = pd.DataFrame(ventas)
-                    (paths["ventas"] / f"Venta_Clientes_{fecha_str}.csv").write_text(
-                        df_ventas.to_csv(index=False, encoding="utf-8", lineterminator="\n"),
-                        encoding="utf-8",
-                    )
+            self._escribir_csv(paths["stock"] / f"StockPeriodo_{fecha_str}.csv", pd.DataFrame(stock_data), "stock")
 
-                # Stock (siempre)
-                stock_data = []
-                for sku, info in stock_actual.items():
-                    stock_data.append(
+            # Maestro (solo primer día)
+            if dia == 0:
+                maestro_data = []
+                for cliente in self.clientes[distribuidor]:
+                    maestro_data.append(
                         {
-                            "sucursal": distribuidor * 100 + 1,
-                            "fecha_cierre": fecha_str,
-                            "sku": sku,
-                            "producto": PRODUCTOS[sku]["nombre"],
-                            "stock": int(info["cantidad"]),
-                            "unidad": str(info["unidad"]),
+                            "sucursal": cliente.sucursal,
+                            "cliente": cliente.id_cliente,
+                            "ciudad": cliente.ciudad,
+                            "provincia": cliente.provincia,
+                            "estado": cliente.estado,
+                            "nombre_cliente": cliente.nombre,
+                            "cuit": cliente.cuit,
+                            "razon_social": cliente.razon_social,
+                            "direccion": cliente.direccion,
+                            "dia_visita": cliente.dia_visita,
+                            "telefono": cliente.telefono,
+                            "email": cliente.email,
+                            "fecha_alta": cliente.fecha_alta.strftime("%Y-%m-%d"),
+                            "fecha_baja": cliente.fecha_baja.strftime("%Y-%m-%d") if cliente.fecha_baja else "",
+                            "coordenada_latitud": cliente.coordenadas.lat,
+                            "coordenada_longitud": cliente.coordenadas.lon,
+                            "condicion_venta": cliente.condicion_venta,
+                            "deuda_vencida": cliente.deuda_vencida,
+                            "tipo_negocio": cliente.tipo_negocio,
                             "distribuidor": distribuidor,
                         }
                     )
 
-                df_stock = pd.DataFrame(stock_data)
-                (paths["stock"] / f"StockPeriodo_{fecha_str}.csv").write_text(
-                    df_stock.to_csv(index=False, encoding="utf-8", lineterminator="\n"),
-                    encoding="utf-8",
-                )
-
-                # Maestro (solo primer día)
-                if dia == 0:
-                    maestro_data = []
-                    for cliente in self.clientes[distribuidor]:
-                        maestro_data.append(
-                            {
-                                "sucursal": cliente.sucursal,
-                                "cliente": cliente.id_cliente,
-                                "ciudad": cliente.ciudad,
-                                "provincia": cliente.provincia,
-                                "estado": cliente.estado,
-                                "nombre_cliente": cliente.nombre,
-                                "cuit": cliente.cuit,
-                                "razon_social": cliente.razon_social,
-                                "direccion": cliente.direccion,
-                                "dia_visita": cliente.dia_visita,
-                                "telefono": cliente.telefono,
-                                "email": cliente.email,
-                                "fecha_alta": cliente.fecha_alta.strftime("%Y-%m-%d"),
-                                "fecha_baja": cliente.fecha_baja.strftime("%Y-%m-%d") if cliente.fecha_baja else "",
-                                "coordenada_latitud": cliente.coordenadas.lat,
-                                "coordenada_longitud": cliente.coordenadas.lon,
-                                "condicion_venta": cliente.condicion_venta,
-                                "deuda_vencida": cliente.deuda_vencida,
-                                "tipo_negocio": cliente.tipo_negocio,
-                                "distribuidor": distribuidor,
-                            }
-                        )
-
-                    df_maestro = pd.DataFrame(maestro_data)
-                    (paths["maestro"] / f"Maestro_{fecha_str}.csv").write_text(
-                        df_maestro.to_csv(index=False, encoding="utf-8", lineterminator="\n"),
-                        encoding="utf-8",
-                    )
+                self._escribir_csv(paths["maestro"] / f"Maestro_{fecha_str}.csv", pd.DataFrame(maestro_data), "maestro")
 
-        self._generar_resumen(output_base_path)
+    @staticmethod
+    def _escribir_csv(ruta: Path, df: pd.DataFrame, tipo: str) -> None:
+        ruta.write_text(df.to_csv(index=False, encoding="utf-8", lineterminator="\n"), encoding="utf-8")
+        metricas.incrementar("pipeline_archivos_generados", tipo=tipo)
 
     def _generar_resumen(self, output_base_path: Path) -> None:
         """Genera resumen estadístico de los datos generados."""
@@ -436,29 +465,53 @@ class GeneradorDatos:
 # MAIN
 # ====================
 
-def main() -> None:
-    output_path = Path("data")
+def crear_generador(
+    cant_distribuidores: int = 3,  # Valores originales: 5
+    cant_dias: int = 7,            # Valores originales: 93
+    clientes_por_dist: int = 5,    # Valores originales: 50
+    seed: Optional[int] = 42,
+) -> GeneradorDatos:
+    return GeneradorDatos(
+        cant_distribuidores=cant_distribuidores,
+        cant_dias=cant_dias,
+        clientes_por_dist=clientes_por_dist,
+        seed=seed,
+    )
 
-    config = {
-        "cant_distribuidores": 3,  # Valores originales: 5
-        "cant_dias": 7,            # Valores originales: 93
-        "clientes_por_dist": 5,    # Valores originales: 50
-        "seed": 42,
-    }
 
-    logger.info("Generador de Datos | salida=%s", output_path.resolve())
+def parametros_generador(generador: Optional[GeneradorDatos] = None) -> Dict[str, object]:
+    """
+    Parámetros que determinan los archivos generados, incluida la fecha del
+    día: los archivos se nombran por fecha a partir de hoy. Sin `generador`,
+    los de crear_generador() (sin instanciarlo: fijar la semilla cambia el
+    estado global de random).
+    """
+    if generador is None:
+        parametros = {n: p.default for n, p in inspect.signature(crear_generador).parameters.items()}
+        fecha = datetime.now().date()
+    else:
+        parametros = {
+            "cant_distribuidores": generador.cant_distribuidores,
+            "cant_dias": generador.cant_dias,
+            "clientes_por_dist": generador.clientes_por_dist,
+            "seed": generador.seed,
+        }
+        fecha = generador.fecha_actual.date()
+    return {**parametros, "fecha": fecha.isoformat()}
 
-    generador = GeneradorDatos(
-        cant_distribuidores=config["cant_distribuidores"],
-        cant_dias=config["cant_dias"],
-        clientes_por_dist=config["clientes_por_dist"],
-        seed=config["seed"],
-    )
 
-    generador.escribir_archivos_locales(output_path)
+def main(seleccion: SeleccionDistribuidores = TODOS, generador: Optional[GeneradorDatos] = None) -> None:
+    output_path = Path("data")
+
+    logger.info("Generador de Datos | salida=%s distribuidores=%s", output_path.resolve(), seleccion.etiqueta())
+
+    generador = generador or crear_generador()
+    generador.escribir_archivos_locales(output_path, seleccion)
 
     logger.info("Generación finalizada. Estructura creada bajo /data.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos")
+    agregar_argumentos(parser)
+    main(desde_argumentos(parser.parse_args()))
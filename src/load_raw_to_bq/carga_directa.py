@@ -0,0 +1,357 @@
+"""
+Carga directa de archivos locales a BigQuery, sin pasar por GCS.
+
+Para recargas puntuales y despliegues chicos: lee los CSV que deja el
+generador en data/ (Archivos_*/Distribuidor_N/) y los carga en raw sin
+subirlos antes al bucket. Dos métodos (CARGA_DIRECTA_METODO):
+
+- "archivo": load_table_from_file con hasta CARGA_DIRECTA_LOTE_ARCHIVOS
+  archivos por load job, concatenados sin repetir el encabezado
+- "filas": inserción por streaming (insert_rows_json) en lotes de
+  CARGA_DIRECTA_LOTE_FILAS filas, con un insertId por fila para que
+  BigQuery descarte los reintentos duplicados
+
+La idempotencia es la de load_raw: cada lote cargado se registra en la
+tabla de control con bucket CARGA_DIRECTA_BUCKET, la ruta que tendría en
+GCS, el mtime como generación y su manifiesto (el crc32c queda vacío: es
+un atributo de los objetos de GCS). Un archivo modificado vuelve a
+cargarse. Un archivo ya cargado desde GCS tampoco se vuelve a cargar: se
+reconoce por su ruta y el sha256 del manifiesto, sin importar bucket ni
+generación (los objetos subidos sin manifiesto no tienen sha256 y no se
+reconocen).
+
+Las filas insertadas por streaming pasan un tiempo en el buffer de
+streaming, donde BigQuery no admite UPDATE, DELETE ni MERGE sobre ellas
+(por ejemplo la retención de raw).
+
+Uso:
+  python -m src.load_raw_to_bq.load_raw --origen local
+  python -m src.load_raw_to_bq.carga_directa --metodo filas --distribuidores 1
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Set, Tuple
+
+from google.api_core.exceptions import BadRequest
+from google.cloud import bigquery
+from google.cloud.exceptions import GoogleCloudError
+
+from src.common import manifiesto, metricas
+from src.common.gcp_auth import get_bq_client
+from src.common.job_stats import guardar_estadisticas, registrar_job
+from src.common.logger import Progreso, get_logger
+from src.common.shards import TODOS, SeleccionDistribuidores, agregar_argumentos, desde_argumentos
+from src.config import (
+    CARGA_DIRECTA_BUCKET,
+    CARGA_DIRECTA_LOTE_ARCHIVOS,
+    CARGA_DIRECTA_LOTE_FILAS,
+    CARGA_DIRECTA_METODO,
+    CONTROL_TABLE,
+    GCS_BASE_PATH,
+    INFRA_DATASET,
+    LOCAL_DATA_PATH,
+    MAESTRO_CDC,
+    RAW_DATASET,
+    TABLAS_RAW,
+)
+from src.load_raw_to_bq import maestro_cdc
+from src.load_raw_to_bq.load_raw import SCHEMAS, filtrar_pendientes, registrar_control
+from src.upload_to_gcs.upload_to_gcs import TIPO_MAP, numero_distribuidor
+
+logger = get_logger(__name__)
+
+METODOS = ["archivo", "filas"]
+
+# Carpeta local de cada tabla raw (Archivos_VentaClientes → ventas)
+CARPETAS = {tabla: carpeta for carpeta, tabla in TIPO_MAP.items()}
+
+CONVERSIONES = {"INTEGER": int, "FLOAT": float}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def ruta_sintetica(distribuidor: int, tabla: str, nombre: str) -> str:
+    """Ruta que tendría el archivo en GCS; identifica al archivo en la tabla de control."""
+    return f"{GCS_BASE_PATH}/distribuidor_{distribuidor}/{tabla}/{nombre}"
+
+
+def lotes(items: Sequence, tamano: int) -> Iterator[List]:
+    for i in range(0, len(items), tamano):
+        yield list(items[i:i + tamano])
+
+
+def concatenar_csv(contenidos: Sequence[bytes]) -> bytes:
+    """Une varios CSV con encabezado en uno solo, con el encabezado del primero."""
+    partes = []
+    for i, contenido in enumerate(contenidos):
+        if i > 0:
+            _, _, contenido = contenido.partition(b"\n")
+        if contenido and not contenido.endswith(b"\n"):
+            contenido += b"\n"
+        partes.append(contenido)
+    return b"".join(partes)
+
+
+def filas_json(contenido: bytes, schema: Sequence[bigquery.SchemaField]) -> List[Dict]:
+    """
+    Filas de un CSV con encabezado como dicts del esquema. Como en un load
+    job, las columnas se asignan por posición; los vacíos quedan en None.
+    """
+    lector = csv.reader(io.StringIO(contenido.decode("utf-8")))
+    next(lector, None)
+    filas = []
+    for valores in lector:
+        if not valores:
+            continue
+        fila = {}
+        for campo, valor in zip(schema, valores):
+            conversion = CONVERSIONES.get(campo.field_type, str)
+            fila[campo.name] = conversion(valor) if valor != "" else None
+        filas.append(fila)
+    return filas
+
+
+def filtrar_por_contenido(archivos: List[Dict], contenidos: Set[Tuple[str, str]]) -> List[Dict]:
+    """
+    Descarta los archivos cuyo (object_path, sha256) ya figura en la tabla
+    de control, cargados por cualquier camino. Sólo se lee y hashea el
+    contenido de los archivos cuya ruta aparece en `contenidos`.
+    """
+    rutas = {ruta for ruta, _ in contenidos}
+    pendientes = []
+    for a in archivos:
+        if a["object_path"] in rutas:
+            sha256 = hashlib.sha256(a["ruta_local"].read_bytes()).hexdigest()
+            if (a["object_path"], sha256) in contenidos:
+                continue
+        pendientes.append(a)
+    return pendientes
+
+
+def registro_control(archivo: Dict, contenido: bytes) -> Dict:
+    """Registro de la tabla de control de un archivo local, con su manifiesto."""
+    calculado = manifiesto.calcular_manifiesto(contenido)
+    return {
+        "bucket": archivo["bucket"],
+        "object_path": archivo["object_path"],
+        "generation": archivo["generation"],
+        "crc32c": None,
+        "tabla": archivo["tabla"],
+        "distribuidor": archivo["distribuidor"],
+        "fecha_actualizacion": archivo["fecha_actualizacion"],
+        **{campo: calculado[campo] for campo in manifiesto.COLUMNAS_CONTROL},
+    }
+
+
+# ======================
+# ARCHIVOS LOCALES
+# ======================
+
+def distribuidores_locales(data_path: Path) -> List[int]:
+    """Distribuidores con alguna carpeta Archivos_*/Distribuidor_N en `data_path`."""
+    distribuidores = set()
+    for carpeta in CARPETAS.values():
+        for directorio in (data_path / carpeta).glob("Distribuidor_*"):
+            numero = numero_distribuidor(directorio)
+            if directorio.is_dir() and numero is not None:
+                distribuidores.add(numero)
+    return sorted(distribuidores)
+
+
+def listar_archivos(data_path: Path, distribuidor: int, tabla: str) -> List[Dict]:
+    """Archivos locales de una tabla con las claves de la tabla de control, en orden de nombre."""
+    carpeta = data_path / CARPETAS[tabla] / f"Distribuidor_{distribuidor}"
+    archivos = []
+    for ruta in sorted(carpeta.glob("*.csv")):
+        # mtime en microsegundos (la precisión de un TIMESTAMP): como la
+        # generación de GCS, cambia cada vez que se reescribe el archivo
+        modificado = ruta.stat().st_mtime_ns // 1000
+        archivos.append({
+            "bucket": CARGA_DIRECTA_BUCKET,
+            "object_path": ruta_sintetica(distribuidor, tabla, ruta.name),
+            "generation": modificado,
+            "tabla": tabla,
+            "distribuidor": distribuidor,
+            "fecha_actualizacion": EPOCH + timedelta(microseconds=modificado),
+            "ruta_local": ruta,
+        })
+    return archivos
+
+
+# ======================
+# BIGQUERY
+# ======================
+
+def obtener_cargados(
+    bq_client: bigquery.Client,
+    tabla: str,
+    distribuidor: int,
+) -> Tuple[Set[Tuple], Set[Tuple[str, str]]]:
+    """
+    Archivos de la tabla de control de un distribuidor, cargados desde GCS o
+    desde local: sus claves (bucket, object_path, generation,
+    fecha_actualizacion) y sus pares (object_path, sha256) con manifiesto.
+    """
+    query = f"""
+    SELECT bucket, object_path, generation, fecha_actualizacion, sha256
+    FROM `{bq_client.project}.{INFRA_DATASET}.{CONTROL_TABLE}`
+    WHERE tabla = @tabla AND distribuidor = @dist
+    """
+    job = bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("tabla", "STRING", tabla),
+                bigquery.ScalarQueryParameter("dist", "INT64", distribuidor),
+            ]
+        ),
+    )
+    try:
+        filas = list(job.result())
+    finally:
+        registrar_job(job, f"obtener_ya_cargados:{tabla}", paso="load_raw")
+
+    claves = {(r.bucket, r.object_path, r.generation, r.fecha_actualizacion) for r in filas}
+    contenidos = {(r.object_path, r.sha256) for r in filas if r.sha256}
+    return claves, contenidos
+
+
+def cargar_archivos(bq_client: bigquery.Client, contenidos: Sequence[bytes], tabla: str) -> None:
+    """Carga uno o varios CSV locales (un único load job) en raw.<tabla>."""
+    table_id = f"{bq_client.project}.{RAW_DATASET}.{tabla}"
+
+    job_config = bigquery.LoadJobConfig(
+        schema=SCHEMAS[tabla],
+        source_format=bigquery.SourceFormat.CSV,
+        skip_leading_rows=1,
+        write_disposition="WRITE_APPEND",
+    )
+
+    job = bq_client.load_table_from_file(io.BytesIO(concatenar_csv(contenidos)), table_id, job_config=job_config)
+    try:
+        job.result()
+    finally:
+        registrar_job(job, f"cargar_archivo_local:{tabla}", paso="load_raw")
+
+
+def insertar_filas(bq_client: bigquery.Client, archivo: Dict, contenido: bytes, tabla: str) -> None:
+    """Inserta las filas de un archivo por streaming en lotes de CARGA_DIRECTA_LOTE_FILAS."""
+    table_id = f"{bq_client.project}.{RAW_DATASET}.{tabla}"
+    filas = filas_json(contenido, SCHEMAS[tabla])
+    # insertId estable: un reintento del mismo archivo no duplica filas
+    prefijo = f"{archivo['object_path']}:{archivo['generation']}"
+    ids = [f"{prefijo}:{i}" for i in range(len(filas))]
+
+    for inicio in range(0, len(filas), CARGA_DIRECTA_LOTE_FILAS):
+        fin = inicio + CARGA_DIRECTA_LOTE_FILAS
+        errores = bq_client.insert_rows_json(table_id, filas[inicio:fin], row_ids=ids[inicio:fin])
+        if errores:
+            raise BadRequest(f"Inserción por streaming en {table_id} con {len(errores)} errores: {errores[:3]}")
+
+
+def cargar_tabla_local(
+    bq_client: bigquery.Client,
+    data_path: Path,
+    distribuidor: int,
+    tabla: str,
+    metodo: str,
+    progreso: Progreso,
+) -> None:
+    archivos = listar_archivos(data_path, distribuidor, tabla)
+    ya_cargados, contenidos = obtener_cargados(bq_client, tabla, distribuidor)
+    pendientes = filtrar_por_contenido(filtrar_pendientes(archivos, ya_cargados), contenidos)
+
+    logger.info(
+        "Distribuidor %d | tabla=%s | locales=%d, ya cargados=%d, pendientes=%d",
+        distribuidor, tabla, len(archivos), len(archivos) - len(pendientes), len(pendientes),
+    )
+
+    cdc = tabla == "maestro" and MAESTRO_CDC
+    vigentes = maestro_cdc.obtener_vigentes(bq_client, distribuidor) if cdc and pendientes else {}
+    # El CDC y el streaming procesan archivo por archivo; los load jobs, por lotes
+    tamano = CARGA_DIRECTA_LOTE_ARCHIVOS if metodo == "archivo" and not cdc else 1
+
+    for lote in lotes(pendientes, tamano):
+        try:
+            contenidos = [a["ruta_local"].read_bytes() for a in lote]
+            if cdc:
+                maestro_cdc.procesar_texto(bq_client, lote[0], contenidos[0].decode("utf-8"), vigentes, SCHEMAS[tabla])
+            elif metodo == "archivo":
+                cargar_archivos(bq_client, contenidos, tabla)
+            else:
+                insertar_filas(bq_client, lote[0], contenidos[0], tabla)
+        except (GoogleCloudError, OSError) as e:
+            for a in lote:
+                metricas.incrementar("pipeline_errores_archivo", operacion="load_raw", tabla=tabla)
+                progreso.error(str(a["ruta_local"]), e)
+            continue
+
+        # Se registra cada lote apenas se carga: un corte posterior no lo
+        # deja cargado y sin registrar (se volvería a anexar)
+        registrar_control(bq_client, [registro_control(a, c) for a, c in zip(lote, contenidos)])
+        for a in lote:
+            metricas.incrementar("pipeline_archivos_cargados", tabla=tabla)
+            progreso.ok(f"Cargado: {a['ruta_local']}")
+
+
+def cargar_distribuidor_local(
+    bq_client: bigquery.Client,
+    data_path: Path,
+    distribuidor: int,
+    metodo: str = CARGA_DIRECTA_METODO,
+) -> int:
+    """
+    Carga los archivos locales pendientes de todas las tablas raw de un
+    distribuidor. Retorna la cantidad de archivos que fallaron.
+    """
+    with metricas.span("load_raw.distribuidor", distribuidor=distribuidor, origen="local"), \
+            Progreso(logger, f"Carga RAW directa distribuidor {distribuidor}") as progreso:
+        for tabla in TABLAS_RAW:
+            cargar_tabla_local(bq_client, data_path, distribuidor, tabla, metodo, progreso)
+    return progreso.errores
+
+
+# ======================
+# MAIN
+# ======================
+
+def main(
+    seleccion: SeleccionDistribuidores = TODOS,
+    metodo: str = CARGA_DIRECTA_METODO,
+    data_path: Path = Path(LOCAL_DATA_PATH),
+) -> None:
+    if metodo not in METODOS:
+        raise ValueError(f"Método de carga directa desconocido: {metodo}")
+
+    bq_client = get_bq_client()
+
+    logger.info(
+        "Carga RAW directa | origen=%s proyecto=%s metodo=%s distribuidores=%s",
+        data_path, bq_client.project, metodo, seleccion.etiqueta(),
+    )
+
+    errores = 0
+    for distribuidor in seleccion.filtrar(distribuidores_locales(data_path)):
+        errores += cargar_distribuidor_local(bq_client, data_path, distribuidor, metodo)
+
+    guardar_estadisticas(bq_client)
+    if errores:
+        raise RuntimeError(f"Carga RAW directa con {errores} archivos fallidos")
+    logger.info("Carga RAW directa finalizada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga directa de archivos locales a BigQuery, sin GCS")
+    parser.add_argument("--metodo", choices=METODOS, default=CARGA_DIRECTA_METODO)
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+    main(desde_argumentos(args), metodo=args.metodo)
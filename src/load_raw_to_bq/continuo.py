@@ -0,0 +1,515 @@
+"""
+Modo continuo de load_raw: carga por micro-lotes a medida que llegan archivos.
+
+- Sondea el bucket (o un directorio local, ver src/common/almacenamiento.py)
+  cada CONTINUO_INTERVALO_SEG segundos con un cursor de listado: sólo se
+  consideran los objetos actualizados después del último sondeo (con un
+  margen de CONTINUO_MARGEN_SEG para objetos que aparecen con retraso)
+- No lista todo data/ en cada sondeo: lista cada carpeta distribuidor/tabla
+  conocida desde su último nombre (los nombres llevan la fecha, así que los
+  archivos nuevos quedan al final). Cada CONTINUO_LISTADO_COMPLETO_CADA
+  sondeos lista data/ completo para descubrir carpetas nuevas y archivos
+  con fechas anteriores; el cursor conserva lo entregado desde el listado
+  completo anterior para no repetirlo
+- Junta los archivos nuevos en un micro-lote que se procesa al superar
+  CONTINUO_LOTE_MAX_BYTES o CONTINUO_LOTE_MAX_ARCHIVOS, o cuando el archivo
+  más antiguo espera más de CONTINUO_LOTE_MAX_EDAD_SEG
+- Cada micro-lote se carga en raw con un load job por tabla (no uno por
+  archivo), se registra en la tabla de control y refresca sólo las fechas
+  afectadas del DWH y de los datamarts, igual que el backfill
+- El refresco que falta se guarda en CONTINUO_REFRESCO_PATH a medida que se
+  registra cada tabla, y se borra al terminar el refresco. Si el refresco
+  falla, el reintento ya no ve esos archivos como pendientes, pero refresca
+  igual las fechas guardadas
+- El cursor se guarda en CONTINUO_CURSOR_PATH cuando no quedan archivos sin
+  procesar; tras un reinicio se retoma desde ahí (y la tabla de control
+  evita recargar lo ya cargado)
+- Con --directorio sondea un directorio local con la estructura del bucket
+  y carga los archivos como la carga directa (carga_directa.py), sin GCS
+
+Uso:
+  python -m src.load_raw_to_bq.continuo
+  python -m src.load_raw_to_bq.continuo --una-vez   # un sondeo y procesa lo pendiente
+  python -m src.load_raw_to_bq.continuo --directorio /ruta/al/bucket
+"""
+
+import argparse
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+from src.backfill.run_backfill import reconstruir_dimensiones, reescribir_hechos
+from src.common import manifiesto, metricas
+from src.common.almacenamiento import AlmacenamientoGCS, AlmacenamientoLocal, Objeto
+from src.common.gcp_auth import get_bq_client, get_gcs_client
+from src.common.job_stats import guardar_estadisticas
+from src.common.logger import get_logger
+from src.config import (
+    BUCKET_NAME,
+    CARGA_DIRECTA_BUCKET,
+    CONTINUO_CURSOR_PATH,
+    CONTINUO_INTERVALO_SEG,
+    CONTINUO_LOTE_MAX_ARCHIVOS,
+    CONTINUO_LOTE_MAX_BYTES,
+    CONTINUO_LISTADO_COMPLETO_CADA,
+    CONTINUO_LOTE_MAX_EDAD_SEG,
+    CONTINUO_MARGEN_SEG,
+    CONTINUO_REFRESCO_PATH,
+    DATAMARTS_MODO,
+    DATAMARTS_ROLLUPS,
+    GCS_BASE_PATH,
+    MAESTRO_CDC,
+    PARTICIONES_RAW,
+    TABLAS_RAW,
+)
+from src.datamarts.run_datamarts import refrescar_fechas
+from src.dwh.run_dwh import actualizar_snapshot
+from src.load_raw_to_bq import carga_directa, maestro_cdc
+from src.load_raw_to_bq.load_raw import SCHEMAS, cargar_archivo, filtrar_pendientes, obtener_ya_cargados, registrar_control
+
+logger = get_logger(__name__)
+
+REGEX_ARCHIVO_RAW = re.compile(rf"^{re.escape(GCS_BASE_PATH)}/distribuidor_(\d+)/([a-z]+)/[^/]+\.csv$", re.IGNORECASE)
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def clasificar(ruta: str) -> Optional[Tuple[int, str]]:
+    """'data/distribuidor_3/ventas/x.csv' -> (3, 'ventas'); None si no es un archivo raw."""
+    m = REGEX_ARCHIVO_RAW.match(ruta)
+    if not m or m.group(2).lower() not in TABLAS_RAW:
+        return None
+    return int(m.group(1)), m.group(2).lower()
+
+
+def rangos_contiguos(fechas: Iterable[date]) -> List[Tuple[date, date]]:
+    """[1, 2, 3, 7, 8] (días) -> [(1, 3), (7, 8)]"""
+    rangos: List[Tuple[date, date]] = []
+    for fecha in sorted(set(fechas)):
+        if rangos and fecha - rangos[-1][1] == timedelta(days=1):
+            rangos[-1] = (rangos[-1][0], fecha)
+        else:
+            rangos.append((fecha, fecha))
+    return rangos
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Posición del listado incremental.
+
+    `actualizado` es la mayor fecha de actualización entregada y `vistos`
+    los (ruta, generación, actualizado) entregados dentro del margen previo
+    a esa fecha. Un objeto es nuevo si se actualizó después del corte
+    (actualizado - margen) y no está entre los vistos: así se detectan
+    objetos que aparecen en el listado con una fecha algo anterior a la de
+    otros ya entregados, sin volver a entregar nada.
+
+    `completo` es `actualizado` al último listado completo. Un listado
+    completo corta en (completo - margen), para entregar lo que los listados
+    parciales no ven, y los vistos se conservan desde ese corte.
+    """
+
+    actualizado: Optional[datetime] = None
+    vistos: FrozenSet[Tuple[str, int, datetime]] = frozenset()
+    completo: Optional[datetime] = None
+
+    def nuevos(self, objetos: Iterable[Objeto], margen: timedelta, listado_completo: bool = False) -> List[Objeto]:
+        desde = self.completo if listado_completo and self.completo else self.actualizado
+        corte = desde - margen if desde else None
+        vistos = {(ruta, generacion) for ruta, generacion, _ in self.vistos}
+        return [
+            o for o in objetos
+            if (corte is None or o.actualizado >= corte) and (o.ruta, o.generacion) not in vistos
+        ]
+
+    def avanzar(self, nuevos: List[Objeto], margen: timedelta, listado_completo: bool = False) -> "Cursor":
+        if not nuevos and not listado_completo:
+            return self
+        fechas = [o.actualizado for o in nuevos] + ([self.actualizado] if self.actualizado else [])
+        if not fechas:
+            return self
+        actualizado = max(fechas)
+        completo = actualizado if listado_completo else self.completo
+        corte = min(actualizado, completo or actualizado) - margen
+        vistos = self.vistos | {(o.ruta, o.generacion, o.actualizado) for o in nuevos}
+        return Cursor(actualizado, frozenset(v for v in vistos if v[2] >= corte), completo)
+
+    def a_dict(self) -> Dict:
+        return {
+            "actualizado": self.actualizado.isoformat() if self.actualizado else None,
+            "vistos": sorted([ruta, generacion, fecha.isoformat()] for ruta, generacion, fecha in self.vistos),
+            "completo": self.completo.isoformat() if self.completo else None,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> "Cursor":
+        actualizado, completo = datos.get("actualizado"), datos.get("completo")
+        return cls(
+            datetime.fromisoformat(actualizado) if actualizado else None,
+            frozenset((ruta, int(generacion), datetime.fromisoformat(fecha)) for ruta, generacion, fecha in datos.get("vistos", [])),
+            datetime.fromisoformat(completo) if completo else None,
+        )
+
+
+@dataclass(frozen=True)
+class RefrescoPendiente:
+    """Dimensiones y fechas del DWH y los datamarts por refrescar tras cargar raw."""
+
+    dimensiones: bool = False
+    fechas: FrozenSet[date] = frozenset()
+
+    def __bool__(self) -> bool:
+        return self.dimensiones or bool(self.fechas)
+
+    def agregar(self, archivos: List[Dict]) -> "RefrescoPendiente":
+        fechas = {fecha for a in archivos if a["tabla"] in PARTICIONES_RAW for fecha in manifiesto.fechas_de(a)}
+        return RefrescoPendiente(self.dimensiones or bool(archivos), self.fechas | fechas)
+
+    def a_dict(self) -> Dict:
+        return {"dimensiones": self.dimensiones, "fechas": sorted(f.isoformat() for f in self.fechas)}
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> "RefrescoPendiente":
+        return cls(bool(datos.get("dimensiones")), frozenset(date.fromisoformat(f) for f in datos.get("fechas", [])))
+
+
+class MicroLote:
+    """Archivos en espera de carga; está listo por tamaño, cantidad o antigüedad."""
+
+    def __init__(
+        self,
+        max_bytes: int = CONTINUO_LOTE_MAX_BYTES,
+        max_archivos: int = CONTINUO_LOTE_MAX_ARCHIVOS,
+        max_edad_seg: float = CONTINUO_LOTE_MAX_EDAD_SEG,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.max_archivos = max_archivos
+        self.max_edad_seg = max_edad_seg
+        self.reloj = reloj
+        self.objetos: List[Objeto] = []
+        self._desde: Optional[float] = None
+
+    @property
+    def bytes(self) -> int:
+        return sum(o.tamano for o in self.objetos)
+
+    def agregar(self, objetos: List[Objeto]) -> None:
+        if objetos and not self.objetos:
+            self._desde = self.reloj()
+        self.objetos.extend(objetos)
+
+    def listo(self) -> bool:
+        if not self.objetos:
+            return False
+        return (
+            self.bytes >= self.max_bytes
+            or len(self.objetos) >= self.max_archivos
+            or self.reloj() - self._desde >= self.max_edad_seg
+        )
+
+    def vaciar(self) -> List[Objeto]:
+        """Retira hasta max_archivos archivos, los más antiguos primero."""
+        lote, self.objetos = self.objetos[:self.max_archivos], self.objetos[self.max_archivos:]
+        if not self.objetos:
+            self._desde = None
+        return lote
+
+    def devolver(self, lote: List[Objeto]) -> None:
+        """Reincorpora un lote que no se pudo procesar (se reintenta en el próximo sondeo)."""
+        if not self.objetos:
+            self._desde = self.reloj() - self.max_edad_seg
+        self.objetos = lote + self.objetos
+
+
+# ======================
+# SONDEO
+# ======================
+
+class CargaContinua:
+    """Sondea el almacenamiento y entrega micro-lotes de archivos raw a `procesar`."""
+
+    def __init__(
+        self,
+        almacenamiento,
+        procesar: Callable[[List[Objeto]], None],
+        ruta_cursor: Path = Path(CONTINUO_CURSOR_PATH),
+        lote: Optional[MicroLote] = None,
+        intervalo_seg: float = CONTINUO_INTERVALO_SEG,
+        margen: timedelta = timedelta(seconds=CONTINUO_MARGEN_SEG),
+        dormir: Callable[[float], None] = time.sleep,
+        listado_completo_cada: int = CONTINUO_LISTADO_COMPLETO_CADA,
+    ):
+        self.almacenamiento = almacenamiento
+        self.procesar = procesar
+        self.ruta_cursor = ruta_cursor
+        self.lote = lote or MicroLote()
+        self.intervalo_seg = intervalo_seg
+        self.margen = margen
+        self.dormir = dormir
+        self.listado_completo_cada = listado_completo_cada
+        self.cursor = self._leer_cursor()
+        # Último nombre listado de cada carpeta distribuidor/tabla
+        self.ultimos: Dict[str, str] = {}
+        self._sondeos = 0
+
+    def _leer_cursor(self) -> Cursor:
+        if not self.ruta_cursor.exists():
+            return Cursor()
+        return Cursor.desde_dict(json.loads(self.ruta_cursor.read_text(encoding="utf-8")))
+
+    def _guardar_cursor(self) -> None:
+        self.ruta_cursor.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_cursor.with_suffix(".tmp")
+        temporal.write_text(json.dumps(self.cursor.a_dict(), indent=2), encoding="utf-8")
+        temporal.replace(self.ruta_cursor)
+
+    def _listar(self, completo: bool) -> List[Objeto]:
+        if completo:
+            objetos = list(self.almacenamiento.listar(f"{GCS_BASE_PATH}/"))
+        else:
+            objetos = [
+                o for carpeta, desde in sorted(self.ultimos.items())
+                for o in self.almacenamiento.listar(carpeta, desde)
+            ]
+        for o in objetos:
+            if clasificar(o.ruta):
+                carpeta = o.ruta.rsplit("/", 1)[0] + "/"
+                self.ultimos[carpeta] = max(self.ultimos.get(carpeta, ""), o.ruta)
+        return objetos
+
+    def sondear(self) -> int:
+        """Lista los objetos nuevos y agrega los archivos raw al micro-lote."""
+        completo = not self.ultimos or self._sondeos % self.listado_completo_cada == 0
+        self._sondeos += 1
+        nuevos = self.cursor.nuevos(self._listar(completo), self.margen, completo)
+        self.cursor = self.cursor.avanzar(nuevos, self.margen, completo)
+        raw = [o for o in nuevos if clasificar(o.ruta)]
+        self.lote.agregar(raw)
+        if raw:
+            logger.info("Archivos nuevos=%d | en espera=%d (%d bytes)", len(raw), len(self.lote.objetos), self.lote.bytes)
+        return len(raw)
+
+    def paso(self, forzar: bool = False) -> List[List[Objeto]]:
+        """
+        Un sondeo y el procesamiento de los micro-lotes listos (todos los
+        pendientes con `forzar`). Retorna los lotes procesados.
+        """
+        self.sondear()
+        procesados = []
+        while self.lote.listo() or (forzar and self.lote.objetos):
+            lote = self.lote.vaciar()
+            try:
+                self.procesar(lote)
+            except Exception:
+                self.lote.devolver(lote)
+                raise
+            procesados.append(lote)
+
+        # El cursor sólo se persiste cuando todo lo listado ya se procesó
+        if not self.lote.objetos:
+            self._guardar_cursor()
+        return procesados
+
+    def ejecutar(self, iteraciones: Optional[int] = None) -> None:
+        """Sondea cada `intervalo_seg` segundos (indefinidamente si `iteraciones` es None)."""
+        n = 0
+        while iteraciones is None or n < iteraciones:
+            try:
+                self.paso()
+            except Exception as e:
+                logger.error("Error procesando un micro-lote, se reintenta en el próximo sondeo: %s", e)
+            n += 1
+            if iteraciones is None or n < iteraciones:
+                self.dormir(self.intervalo_seg)
+
+
+# ======================
+# CARGA A BIGQUERY
+# ======================
+
+def archivo_de_objeto(almacenamiento, objeto: Objeto) -> Dict:
+    """
+    Registro de archivo con el formato de listar_blobs / la tabla de control.
+    En un directorio local, con el bucket y la ruta local de la carga directa
+    (el manifiesto se calcula al leerlo).
+    """
+    distribuidor, tabla = clasificar(objeto.ruta)
+    archivo = {
+        "object_path": objeto.ruta,
+        "generation": objeto.generacion,
+        "crc32c": objeto.crc32c,
+        "tabla": tabla,
+        "distribuidor": distribuidor,
+        "fecha_actualizacion": objeto.actualizado,
+    }
+    if isinstance(almacenamiento, AlmacenamientoLocal):
+        return {"bucket": CARGA_DIRECTA_BUCKET, **archivo, "ruta_local": Path(almacenamiento.uri(objeto.ruta))}
+    return {"bucket": almacenamiento.nombre, **archivo, **manifiesto.para_control(objeto.metadata)}
+
+
+def cargar_locales(bq_client: bigquery.Client, archivos: List[Dict], tabla: str) -> List[Dict]:
+    """
+    Carga archivos de un directorio local como la carga directa (un load job,
+    o el CDC del maestro). Retorna sus registros de control con manifiesto.
+    """
+    contenidos = [a["ruta_local"].read_bytes() for a in archivos]
+    if tabla == "maestro" and MAESTRO_CDC:
+        vigentes: Dict[int, Dict] = {}
+        for a, contenido in zip(archivos, contenidos):
+            if a["distribuidor"] not in vigentes:
+                vigentes[a["distribuidor"]] = maestro_cdc.obtener_vigentes(bq_client, a["distribuidor"])
+            maestro_cdc.procesar_texto(bq_client, a, contenido.decode("utf-8"), vigentes[a["distribuidor"]], SCHEMAS[tabla])
+    else:
+        carga_directa.cargar_archivos(bq_client, contenidos, tabla)
+    return [carga_directa.registro_control(a, c) for a, c in zip(archivos, contenidos)]
+
+
+def leer_refresco(ruta: Path) -> RefrescoPendiente:
+    if not ruta.exists():
+        return RefrescoPendiente()
+    return RefrescoPendiente.desde_dict(json.loads(ruta.read_text(encoding="utf-8")))
+
+
+def guardar_refresco(ruta: Path, refresco: RefrescoPendiente) -> None:
+    if not refresco:
+        ruta.unlink(missing_ok=True)
+        return
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_text(json.dumps(refresco.a_dict(), indent=2), encoding="utf-8")
+    temporal.replace(ruta)
+
+
+def cargar_lote(
+    bq_client: bigquery.Client,
+    almacenamiento,
+    objetos: List[Objeto],
+    modo: str = DATAMARTS_MODO,
+    rollups: bool = DATAMARTS_ROLLUPS,
+    ruta_refresco: Optional[Path] = None,
+) -> List[date]:
+    """
+    Carga un micro-lote en raw (un load job por tabla) y refresca las fechas
+    afectadas del DWH y los datamarts, más las que quedaron pendientes de un
+    lote anterior (`ruta_refresco`). Retorna las fechas refrescadas.
+    """
+    ruta_refresco = ruta_refresco or Path(CONTINUO_REFRESCO_PATH)
+    refresco = leer_refresco(ruta_refresco)
+    t0 = time.time()
+    local = isinstance(almacenamiento, AlmacenamientoLocal)
+    archivos = [archivo_de_objeto(almacenamiento, o) for o in objetos]
+
+    grupos: Dict[Tuple[str, int], List[Dict]] = {}
+    for a in archivos:
+        grupos.setdefault((a["tabla"], a["distribuidor"]), []).append(a)
+    pendientes = []
+    for (tabla, distribuidor), grupo in sorted(grupos.items()):
+        if local:
+            # Como en la carga directa: también se omite lo ya cargado desde GCS
+            ya_cargados, contenidos = carga_directa.obtener_cargados(bq_client, tabla, distribuidor)
+            pendientes += carga_directa.filtrar_por_contenido(filtrar_pendientes(grupo, ya_cargados), contenidos)
+        else:
+            pendientes += filtrar_pendientes(grupo, obtener_ya_cargados(bq_client, tabla, distribuidor))
+
+    cargados: List[Dict] = []
+    with metricas.span("continuo.lote", archivos=len(pendientes)):
+        for tabla in TABLAS_RAW:
+            de_tabla = sorted((a for a in pendientes if a["tabla"] == tabla), key=lambda a: a["object_path"])
+            if not de_tabla:
+                continue
+
+            if local:
+                de_tabla = cargar_locales(bq_client, de_tabla, tabla)
+            elif tabla == "maestro" and MAESTRO_CDC:
+                for distribuidor in sorted({a["distribuidor"] for a in de_tabla}):
+                    vigentes = maestro_cdc.obtener_vigentes(bq_client, distribuidor)
+                    for a in de_tabla:
+                        if a["distribuidor"] == distribuidor:
+                            maestro_cdc.procesar_archivo(almacenamiento.cliente, bq_client, a, vigentes, SCHEMAS[tabla])
+            else:
+                cargar_archivo(bq_client, [almacenamiento.uri(a["object_path"]) for a in de_tabla], tabla)
+
+            # Se registra por tabla: si falla una tabla posterior, el reintento
+            # no duplica ésta. Su refresco queda guardado antes del registro:
+            # el reintento ya no la verá como pendiente
+            refresco = refresco.agregar(de_tabla)
+            guardar_refresco(ruta_refresco, refresco)
+            registrar_control(bq_client, de_tabla)
+            metricas.incrementar("pipeline_archivos_cargados", len(de_tabla), tabla=tabla)
+            cargados += de_tabla
+
+        fechas = sorted(refresco.fechas)
+        if refresco:
+            reconstruir_dimensiones(bq_client)
+            for desde, hasta in rangos_contiguos(fechas):
+                reescribir_hechos(bq_client, desde, hasta, None)
+            actualizar_snapshot(bq_client, fechas)
+            refrescar_fechas(bq_client, fechas, modo, rollups)
+            guardar_refresco(ruta_refresco, RefrescoPendiente())
+
+    guardar_estadisticas(bq_client)
+    logger.info(
+        "Micro-lote cargado | archivos=%d (ya cargados=%d) fechas=%d en %.1fs",
+        len(cargados), len(archivos) - len(pendientes), len(fechas), time.time() - t0,
+    )
+    return fechas
+
+
+def main(
+    una_vez: bool = False,
+    modo: str = DATAMARTS_MODO,
+    rollups: bool = DATAMARTS_ROLLUPS,
+    directorio: Optional[Path] = None,
+) -> None:
+    bq_client = get_bq_client()
+    ruta_cursor = Path(CONTINUO_CURSOR_PATH)
+    if directorio:
+        almacenamiento = AlmacenamientoLocal(directorio)
+        # Cursor propio: sus generaciones (mtime) no son las del bucket
+        ruta_cursor = ruta_cursor.with_name(f"{ruta_cursor.stem}_local{ruta_cursor.suffix}")
+    else:
+        almacenamiento = AlmacenamientoGCS(get_gcs_client(), BUCKET_NAME)
+
+    logger.info(
+        "Carga continua | origen=%s intervalo=%ss lote<=%d archivos/%d bytes/%ss",
+        almacenamiento.nombre, CONTINUO_INTERVALO_SEG, CONTINUO_LOTE_MAX_ARCHIVOS,
+        CONTINUO_LOTE_MAX_BYTES, CONTINUO_LOTE_MAX_EDAD_SEG,
+    )
+
+    carga = CargaContinua(
+        almacenamiento,
+        lambda objetos: cargar_lote(bq_client, almacenamiento, objetos, modo, rollups),
+        ruta_cursor=ruta_cursor,
+    )
+    if una_vez:
+        carga.paso(forzar=True)
+        return
+    try:
+        carga.ejecutar()
+    except KeyboardInterrupt:
+        logger.info("Carga continua detenida; los archivos en espera se retoman en el próximo inicio.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga continua por micro-lotes desde GCS a BigQuery")
+    parser.add_argument("--una-vez", action="store_true", help="Un único sondeo que procesa todo lo pendiente")
+    parser.add_argument("--modo", choices=["vista", "materializado"], default=DATAMARTS_MODO)
+    parser.add_argument("--sin-rollups", dest="rollups", action="store_false", default=DATAMARTS_ROLLUPS)
+    parser.add_argument(
+        "--directorio",
+        type=Path,
+        default=None,
+        help="Sondear un directorio local con la estructura del bucket (data/distribuidor_N/<tabla>/) en lugar de GCS",
+    )
+    args = parser.parse_args()
+    main(una_vez=args.una_vez, modo=args.modo, rollups=args.rollups, directorio=args.directorio)
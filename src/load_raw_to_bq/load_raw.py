@@ -3,21 +3,32 @@ Carga incremental de datos RAW desde GCS a BigQuery.
 
 - Idempotencia por archivo
 - Control por tabla infra.control_archivos_cargados
+- Maestro con captura de cambios (ver maestro_cdc.py) si MAESTRO_CDC
+- Modo continuo por micro-lotes en continuo.py
+- Con origen "local" los archivos de data/ se cargan sin pasar por GCS
+  (ver carga_directa.py)
 """
 
+import argparse
 from datetime import datetime, timezone
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Set, Tuple, Union
 
 from google.cloud import bigquery, storage
 from google.cloud.exceptions import GoogleCloudError, NotFound
 
+from src.common import manifiesto, metricas
 from src.common.gcp_auth import get_bq_client, get_gcs_client
-from src.common.logger import get_logger
+from src.common.job_stats import guardar_estadisticas, registrar_job
+from src.common.logger import Progreso, get_logger
+from src.common.shards import TODOS, SeleccionDistribuidores, agregar_argumentos, desde_argumentos
+from src.load_raw_to_bq import maestro_cdc
 from src.config import (
     BUCKET_NAME,
     CONTROL_TABLE,
     GCS_BASE_PATH,
     INFRA_DATASET,
+    LOAD_RAW_ORIGEN,
+    MAESTRO_CDC,
     RAW_DATASET,
     TABLAS_RAW,
 )
@@ -118,6 +129,7 @@ def listar_blobs(
             "tabla": tabla,
             "distribuidor": distribuidor,
             "fecha_actualizacion": blob.updated,
+            **manifiesto.para_control(blob.metadata),
         })
 
     return archivos
@@ -144,9 +156,14 @@ def obtener_ya_cargados(
         ),
     )
 
+    try:
+        filas = job.result()
+    finally:
+        registrar_job(job, f"obtener_ya_cargados:{tabla}", paso="load_raw")
+
     return {
         (r.bucket, r.object_path, r.generation, r.fecha_actualizacion)
-        for r in job.result()
+        for r in filas
     }
 
 
@@ -164,9 +181,10 @@ def filtrar_pendientes(
 
 def cargar_archivo(
     bq_client: bigquery.Client,
-    gcs_uri: str,
+    gcs_uri: Union[str, List[str]],
     tabla: str,
 ) -> None:
+    """Carga uno o varios archivos (un único load job) en raw.<tabla>."""
     table_id = f"{bq_client.project}.{RAW_DATASET}.{tabla}"
 
     job_config = bigquery.LoadJobConfig(
@@ -177,7 +195,10 @@ def cargar_archivo(
     )
 
     job = bq_client.load_table_from_uri(gcs_uri, table_id, job_config=job_config)
-    job.result()
+    try:
+        job.result()
+    finally:
+        registrar_job(job, f"cargar_archivo:{tabla}", paso="load_raw")
 
 
 def registrar_control(
@@ -200,55 +221,113 @@ def registrar_control(
         table_id,
         job_config=bigquery.LoadJobConfig(write_disposition="WRITE_APPEND"),
     )
-    job.result()
+    try:
+        job.result()
+    finally:
+        registrar_job(job, "registrar_control", paso="load_raw")
+
+
+def cargar_distribuidor(
+    bq_client: bigquery.Client,
+    storage_client: storage.Client,
+    distribuidor: int,
+) -> int:
+    """
+    Carga los archivos pendientes de todas las tablas raw de un distribuidor.
+    Retorna la cantidad de archivos que fallaron (quedan sin registrar y se
+    reintentan en la próxima corrida).
+    """
+    with metricas.span("load_raw.distribuidor", distribuidor=distribuidor), \
+            Progreso(logger, f"Carga RAW distribuidor {distribuidor}") as progreso:
+        for tabla in TABLAS_RAW:
+            _cargar_tabla(bq_client, storage_client, distribuidor, tabla, progreso)
+    return progreso.errores
+
+
+def _cargar_tabla(
+    bq_client: bigquery.Client,
+    storage_client: storage.Client,
+    distribuidor: int,
+    tabla: str,
+    progreso: Progreso,
+) -> None:
+    archivos = listar_blobs(storage_client, distribuidor, tabla)
+    ya_cargados = obtener_ya_cargados(bq_client, tabla, distribuidor)
+    pendientes = filtrar_pendientes(archivos, ya_cargados)
+
+    logger.info(
+        "Distribuidor %d | tabla=%s | en GCS=%d, ya cargados=%d, pendientes=%d",
+        distribuidor, tabla, len(archivos), len(ya_cargados), len(pendientes),
+    )
+
+    registros_control = []
+    cdc = tabla == "maestro" and MAESTRO_CDC
+    vigentes = maestro_cdc.obtener_vigentes(bq_client, distribuidor) if cdc and pendientes else {}
+
+    for a in pendientes:
+        uri = f"gs://{a['bucket']}/{a['object_path']}"
+        try:
+            if cdc:
+                maestro_cdc.procesar_archivo(storage_client, bq_client, a, vigentes, SCHEMAS[tabla])
+            else:
+                cargar_archivo(bq_client, uri, tabla)
+            registros_control.append({
+                "bucket": a["bucket"],
+                "object_path": a["object_path"],
+                "generation": a["generation"],
+                "crc32c": a["crc32c"],
+                "tabla": tabla,
+                "distribuidor": a["distribuidor"],
+                "fecha_actualizacion": a["fecha_actualizacion"],
+                **{campo: a.get(campo) for campo in manifiesto.COLUMNAS_CONTROL},
+            })
+            metricas.incrementar("pipeline_archivos_cargados", tabla=tabla)
+            progreso.ok(f"Cargado: {uri}")
+        except GoogleCloudError as e:
+            metricas.incrementar("pipeline_errores_archivo", operacion="load_raw", tabla=tabla)
+            progreso.error(uri, e)
+
+    registrar_control(bq_client, registros_control)
 
 
 # ======================
 # MAIN
 # ======================
 
-def main() -> None:
+def main(seleccion: SeleccionDistribuidores = TODOS, origen: str = LOAD_RAW_ORIGEN) -> None:
+    if origen == "local":
+        from src.load_raw_to_bq import carga_directa
+
+        carga_directa.main(seleccion)
+        return
+
     bq_client = get_bq_client()
     storage_client = get_gcs_client()
 
-    logger.info("Carga RAW incremental | proyecto=%s", bq_client.project)
-
-    distribuidores = obtener_distribuidores(storage_client)
+    logger.info(
+        "Carga RAW incremental | proyecto=%s distribuidores=%s",
+        bq_client.project, seleccion.etiqueta(),
+    )
 
-    for distribuidor in distribuidores:
-        for tabla in TABLAS_RAW:
-            archivos = listar_blobs(storage_client, distribuidor, tabla)
-            ya_cargados = obtener_ya_cargados(bq_client, tabla, distribuidor)
-            pendientes = filtrar_pendientes(archivos, ya_cargados)
-
-            logger.info(
-                "Distribuidor %d | tabla=%s | en GCS=%d, ya cargados=%d, pendientes=%d",
-                distribuidor, tabla, len(archivos), len(ya_cargados), len(pendientes),
-            )
-
-            registros_control = []
-
-            for a in pendientes:
-                uri = f"gs://{a['bucket']}/{a['object_path']}"
-                try:
-                    cargar_archivo(bq_client, uri, tabla)
-                    registros_control.append({
-                        "bucket": a["bucket"],
-                        "object_path": a["object_path"],
-                        "generation": a["generation"],
-                        "crc32c": a["crc32c"],
-                        "tabla": tabla,
-                        "distribuidor": a["distribuidor"],
-                        "fecha_actualizacion": a["fecha_actualizacion"],
-                    })
-                    logger.info("Cargado: %s", uri)
-                except GoogleCloudError as e:
-                    logger.error("Error cargando %s: %s", uri, e)
-
-            registrar_control(bq_client, registros_control)
+    errores = 0
+    for distribuidor in seleccion.filtrar(obtener_distribuidores(storage_client)):
+        errores += cargar_distribuidor(bq_client, storage_client, distribuidor)
 
+    guardar_estadisticas(bq_client)
+    # Un paso con archivos fallidos no debe quedar como exitoso en la caché del pipeline
+    if errores:
+        raise RuntimeError(f"Carga RAW incremental con {errores} archivos fallidos")
     logger.info("Carga RAW incremental finalizada.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Carga incremental RAW desde GCS a BigQuery")
+    parser.add_argument(
+        "--origen",
+        choices=["gcs", "local"],
+        default=LOAD_RAW_ORIGEN,
+        help="local = cargar los archivos de data/ directo en BigQuery, sin GCS",
+    )
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+    main(desde_argumentos(args), origen=args.origen)
@@ -0,0 +1,222 @@
+"""
+Captura de cambios (CDC) del maestro de clientes.
+
+Cada corrida del generador escribe un Maestro_YYYY-MM-DD.csv completo por
+distribuidor. En lugar de anexarlo entero a raw.maestro, se compara cada
+archivo contra el último estado conocido de cada cliente (hash de sus
+columnas de atributos) y sólo se cargan los cambios en raw.maestro_cambios:
+
+- I: cliente nuevo
+- U: cliente con algún atributo modificado
+- D: cliente presente en el snapshot anterior y ausente en el nuevo
+
+El estado vigente de un cliente es su último cambio (por cargado_en) cuando
+no es una baja. dim_cliente se construye a partir de ese estado.
+"""
+
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from google.cloud import bigquery, storage
+from google.cloud.exceptions import NotFound
+
+from src.common.job_stats import registrar_job
+from src.common.logger import get_logger
+from src.config import MAESTRO_CAMBIOS_TABLE, RAW_DATASET
+
+logger = get_logger(__name__)
+
+COLUMNAS_CLAVE = ("distribuidor", "cliente")
+
+OPERACION_ALTA = "I"
+OPERACION_MODIFICACION = "U"
+OPERACION_BAJA = "D"
+
+Clave = Tuple[int, int]
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def leer_maestro_csv(texto: str) -> List[Dict[str, Optional[str]]]:
+    """Parsea un CSV de maestro; las celdas vacías quedan en None."""
+    return [
+        {k: (v if v != "" else None) for k, v in fila.items()}
+        for fila in csv.DictReader(io.StringIO(texto))
+    ]
+
+
+def clave_fila(fila: Dict) -> Clave:
+    return int(fila["distribuidor"]), int(fila["cliente"])
+
+
+def hash_fila(fila: Dict, columnas: Iterable[str]) -> str:
+    """Hash de las columnas de atributos de una fila (orden fijo de columnas)."""
+    valores = [fila.get(c) for c in columnas]
+    return hashlib.sha256(json.dumps(valores, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def columnas_atributo(columnas: Iterable[str]) -> List[str]:
+    return [c for c in columnas if c not in COLUMNAS_CLAVE]
+
+
+def calcular_cambios(
+    filas: List[Dict],
+    vigentes: Dict[Clave, str],
+    columnas: List[str],
+) -> List[Dict]:
+    """
+    Compara un snapshot completo del maestro contra los hashes vigentes.
+
+    `vigentes` mapea (distribuidor, cliente) -> hash del último estado
+    conocido y debe contener sólo clientes de los distribuidores incluidos
+    en el snapshot. Retorna las filas de cambio con `operacion` y `hash_fila`.
+    """
+    atributos = columnas_atributo(columnas)
+
+    # Una sola fila por cliente: si el archivo repite un cliente, gana la última
+    snapshot: Dict[Clave, Dict] = {}
+    for fila in filas:
+        snapshot[clave_fila(fila)] = fila
+
+    cambios = []
+    for clave, fila in snapshot.items():
+        h = hash_fila(fila, atributos)
+        previo = vigentes.get(clave)
+        if previo == h:
+            continue
+        operacion = OPERACION_ALTA if previo is None else OPERACION_MODIFICACION
+        cambios.append({**fila, "operacion": operacion, "hash_fila": h})
+
+    for clave in sorted(set(vigentes) - set(snapshot)):
+        baja = {c: None for c in columnas}
+        baja.update(dict(zip(COLUMNAS_CLAVE, clave)))
+        cambios.append({**baja, "operacion": OPERACION_BAJA, "hash_fila": None})
+
+    return cambios
+
+
+def aplicar_cambios(vigentes: Dict[Clave, str], cambios: List[Dict]) -> None:
+    """Actualiza en el lugar los hashes vigentes con los cambios calculados."""
+    for cambio in cambios:
+        clave = clave_fila(cambio)
+        if cambio["operacion"] == OPERACION_BAJA:
+            vigentes.pop(clave, None)
+        else:
+            vigentes[clave] = cambio["hash_fila"]
+
+
+def esquema_cambios(schema_maestro: List[bigquery.SchemaField]) -> List[bigquery.SchemaField]:
+    """Esquema de raw.maestro_cambios: columnas del maestro + metadatos del cambio."""
+    return list(schema_maestro) + [
+        bigquery.SchemaField("operacion", "STRING"),
+        bigquery.SchemaField("hash_fila", "STRING"),
+        bigquery.SchemaField("object_path", "STRING"),
+        bigquery.SchemaField("cargado_en", "TIMESTAMP"),
+    ]
+
+
+# ======================
+# BIGQUERY / GCS
+# ======================
+
+def obtener_vigentes(bq_client: bigquery.Client, distribuidor: int) -> Dict[Clave, str]:
+    """Hashes del estado vigente de cada cliente del distribuidor."""
+    query = f"""
+    SELECT distribuidor, cliente, operacion, hash_fila
+    FROM `{bq_client.project}.{RAW_DATASET}.{MAESTRO_CAMBIOS_TABLE}`
+    WHERE distribuidor = @dist
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY distribuidor, cliente ORDER BY cargado_en DESC) = 1
+    """
+    job = bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("dist", "INT64", distribuidor)]
+        ),
+    )
+    try:
+        filas = list(job.result())
+    except NotFound:
+        return {}
+    finally:
+        registrar_job(job, "obtener_vigentes:maestro", paso="load_raw")
+
+    return {
+        (r.distribuidor, r.cliente): r.hash_fila
+        for r in filas
+        if r.operacion != OPERACION_BAJA
+    }
+
+
+def cargar_cambios(
+    bq_client: bigquery.Client,
+    cambios: List[Dict],
+    object_path: str,
+    schema_maestro: List[bigquery.SchemaField],
+) -> None:
+    """Anexa las filas de cambio a raw.maestro_cambios."""
+    if not cambios:
+        return
+
+    table_id = f"{bq_client.project}.{RAW_DATASET}.{MAESTRO_CAMBIOS_TABLE}"
+    cargado_en = datetime.now(timezone.utc).isoformat()
+    registros = [{**c, "object_path": object_path, "cargado_en": cargado_en} for c in cambios]
+
+    job = bq_client.load_table_from_json(
+        registros,
+        table_id,
+        job_config=bigquery.LoadJobConfig(
+            schema=esquema_cambios(schema_maestro),
+            write_disposition="WRITE_APPEND",
+            time_partitioning=bigquery.TimePartitioning(field="cargado_en"),
+            clustering_fields=list(COLUMNAS_CLAVE),
+        ),
+    )
+    try:
+        job.result()
+    finally:
+        registrar_job(job, "cargar_cambios:maestro", paso="load_raw")
+
+
+def procesar_archivo(
+    storage_client: storage.Client,
+    bq_client: bigquery.Client,
+    archivo: Dict,
+    vigentes: Dict[Clave, str],
+    schema_maestro: List[bigquery.SchemaField],
+) -> Dict[str, int]:
+    """
+    Descarga un archivo de maestro, calcula y carga sus cambios, y
+    actualiza `vigentes`. Retorna la cantidad de cambios por operación.
+    """
+    blob = storage_client.bucket(archivo["bucket"]).blob(archivo["object_path"], generation=archivo["generation"])
+    return procesar_texto(bq_client, archivo, blob.download_as_text(encoding="utf-8"), vigentes, schema_maestro)
+
+
+def procesar_texto(
+    bq_client: bigquery.Client,
+    archivo: Dict,
+    texto: str,
+    vigentes: Dict[Clave, str],
+    schema_maestro: List[bigquery.SchemaField],
+) -> Dict[str, int]:
+    """Como procesar_archivo, con el contenido ya leído (por ejemplo de un archivo local)."""
+    filas = leer_maestro_csv(texto)
+
+    cambios = calcular_cambios(filas, vigentes, [f.name for f in schema_maestro])
+    cargar_cambios(bq_client, cambios, archivo["object_path"], schema_maestro)
+    aplicar_cambios(vigentes, cambios)
+
+    conteo = {op: 0 for op in (OPERACION_ALTA, OPERACION_MODIFICACION, OPERACION_BAJA)}
+    for c in cambios:
+        conteo[c["operacion"]] += 1
+    logger.info(
+        "CDC maestro %s | filas=%d altas=%d modificaciones=%d bajas=%d",
+        archivo["object_path"], len(filas), conteo["I"], conteo["U"], conteo["D"],
+    )
+    return conteo
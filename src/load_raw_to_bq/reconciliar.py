@@ -0,0 +1,193 @@
+"""
+Reconciliación entre los archivos cargados y las tablas raw, sólo con
+metadata.
+
+Compara, por tabla y fecha, la suma de filas de los manifiestos registrados
+en infra.control_archivos_cargados con las filas de la partición de raw y
+raw_archivo (INFORMATION_SCHEMA.PARTITIONS). No lee los datos de raw ni de
+GCS.
+
+Estados:
+- ok:             coinciden
+- diferencia:     las filas no coinciden (archivos duplicados, cargas parciales)
+- sin_manifiesto: algún archivo de la fecha se cargó sin manifiesto
+- sin_control:    la partición tiene filas pero no hay archivos registrados
+
+Los Parquet mensuales de la retención (src/retencion/run_retencion.py) se
+comparan contra la suma de las particiones de su mes: una fila por tabla y
+mes, con `hasta` el último día. Los demás archivos con más de una fecha
+(fecha_min <> fecha_max) no se pueden asignar a una partición: no suman en
+el control y las fechas que tocan aparecen como diferencia. Los archivos
+del generador tienen una sola fecha.
+
+Uso:
+  python -m src.load_raw_to_bq.reconciliar
+"""
+
+import sys
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+from src.common.gcp_auth import get_bq_client
+from src.common.incremental import REGEX_FECHA_ARCHIVO
+from src.common.logger import get_logger
+from src.config import (
+    CONTROL_TABLE,
+    INFRA_DATASET,
+    PARTICIONES_RAW,
+    RAW_ARCHIVO_DATASET,
+    RAW_DATASET,
+    RETENCION_ARCHIVO_PREFIJO,
+)
+
+logger = get_logger(__name__)
+
+Clave = Tuple[str, date]
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def _rango_de(rangos: List[Tuple[str, date, date]], tabla: str, fecha: date) -> Optional[Tuple[str, date, date]]:
+    for rango in rangos:
+        if rango[0] == tabla and rango[1] <= fecha <= rango[2]:
+            return rango
+    return None
+
+
+def comparar(control: List[Dict], particiones: List[Dict]) -> List[Dict]:
+    """
+    Cruza las filas esperadas según la tabla de control (tabla, fecha,
+    filas, archivos, sin_manifiesto y opcionalmente hasta, para los
+    archivos de un rango de fechas) con las filas de cada partición
+    (tabla, fecha, filas). Las particiones y archivos diarios dentro de un
+    rango suman al rango. Retorna una fila por (tabla, fecha), ordenada.
+    """
+    rangos = [(c["tabla"], c["fecha"], c["hasta"]) for c in control if c.get("hasta")]
+
+    esperado: Dict[Clave, Dict] = {}
+    for c in control:
+        rango = _rango_de(rangos, c["tabla"], c["fecha"])
+        clave = (c["tabla"], rango[1]) if rango else (c["tabla"], c["fecha"])
+        previo = esperado.get(clave)
+        if previo is None:
+            esperado[clave] = {**c, "hasta": rango[2] if rango else None}
+        else:
+            filas = None if previo["filas"] is None or c["filas"] is None else previo["filas"] + c["filas"]
+            esperado[clave] = {
+                **previo,
+                "filas": filas,
+                "archivos": previo["archivos"] + c["archivos"],
+                "sin_manifiesto": previo["sin_manifiesto"] + c["sin_manifiesto"],
+            }
+
+    real: Dict[Clave, int] = {}
+    for p in particiones:
+        rango = _rango_de(rangos, p["tabla"], p["fecha"])
+        clave = (p["tabla"], rango[1]) if rango else (p["tabla"], p["fecha"])
+        real[clave] = real.get(clave, 0) + p["filas"]
+
+    resultado = []
+    for clave in sorted(set(esperado) | set(real)):
+        c = esperado.get(clave)
+        filas_raw = real.get(clave, 0)
+        filas_control = c["filas"] if c else None
+
+        if c is None:
+            estado = "sin_control" if filas_raw else "ok"
+        elif c["sin_manifiesto"]:
+            estado = "sin_manifiesto"
+        elif filas_control == filas_raw:
+            estado = "ok"
+        else:
+            estado = "diferencia"
+
+        resultado.append({
+            "tabla": clave[0],
+            "fecha": clave[1],
+            "hasta": c["hasta"] if c else None,
+            "filas_control": filas_control,
+            "filas_raw": filas_raw,
+            "archivos": c["archivos"] if c else 0,
+            "estado": estado,
+        })
+    return resultado
+
+
+# ======================
+# BIGQUERY
+# ======================
+
+def filas_segun_control(client: bigquery.Client, tablas: List[str]) -> List[Dict]:
+    query = f"""
+    SELECT
+      tabla,
+      COALESCE(fecha_min, SAFE.PARSE_DATE('%Y-%m-%d', REGEXP_EXTRACT(object_path, r'{REGEX_FECHA_ARCHIVO}'))) AS fecha,
+      IF(STARTS_WITH(object_path, '{RETENCION_ARCHIVO_PREFIJO}/'), fecha_max, NULL) AS hasta,
+      SUM(filas) AS filas,
+      COUNT(*) AS archivos,
+      COUNTIF(filas IS NULL) AS sin_manifiesto
+    FROM `{client.project}.{INFRA_DATASET}.{CONTROL_TABLE}`
+    WHERE tabla IN UNNEST(@tablas)
+      AND (fecha_min IS NULL OR fecha_min = fecha_max OR STARTS_WITH(object_path, '{RETENCION_ARCHIVO_PREFIJO}/'))
+    GROUP BY tabla, fecha, hasta
+    HAVING fecha IS NOT NULL
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tablas", "STRING", tablas)]
+        ),
+    )
+    return [dict(r.items()) for r in job.result()]
+
+
+def filas_por_particion(client: bigquery.Client, tablas: List[str]) -> List[Dict]:
+    """Filas por partición de raw y raw_archivo (una fila por tabla y fecha)."""
+    particiones = " UNION ALL ".join(
+        f"SELECT table_name, partition_id, total_rows "
+        f"FROM `{client.project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS`"
+        for dataset in (RAW_DATASET, RAW_ARCHIVO_DATASET)
+    )
+    query = f"""
+    SELECT table_name AS tabla, PARSE_DATE('%Y%m%d', partition_id) AS fecha, SUM(total_rows) AS filas
+    FROM ({particiones})
+    WHERE table_name IN UNNEST(@tablas)
+      AND partition_id NOT IN ('__NULL__', '__UNPARTITIONED__')
+    GROUP BY tabla, fecha
+    """
+    job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tablas", "STRING", tablas)]
+        ),
+    )
+    return [dict(r.items()) for r in job.result()]
+
+
+def main() -> None:
+    client = get_bq_client()
+    tablas = list(PARTICIONES_RAW)
+
+    logger.info("Reconciliación raw vs archivos cargados | proyecto=%s tablas=%s", client.project, tablas)
+
+    resultado = comparar(filas_segun_control(client, tablas), filas_por_particion(client, tablas))
+    problemas = [r for r in resultado if r["estado"] != "ok"]
+
+    for r in problemas:
+        logger.warning(
+            "%s %s%s | %s | control=%s raw=%d archivos=%d",
+            r["tabla"], r["fecha"], f"..{r['hasta']}" if r["hasta"] else "",
+            r["estado"], r["filas_control"], r["filas_raw"], r["archivos"],
+        )
+    logger.info("Reconciliación finalizada | particiones=%d con diferencias=%d", len(resultado), len(problemas))
+
+    if any(r["estado"] in ("diferencia", "sin_control") for r in problemas):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,25 @@ Este script prepara la infraestructura mínima en BigQuery:
 - raw
 - dwh
 - datamarts
+- raw_archivo (particiones de raw movidas por la retención)
+- tablas raw de ventas y stock particionadas por fecha de negocio, y sus
+  pares vacíos en raw_archivo
+- raw.maestro sin particionar: con el CDC nunca recibe cargas, pero el DWH
+  la lee (clientes cargados antes del CDC)
 
 Es idempotente: puede ejecutarse múltiples veces sin romper nada.
 """
 
+from typing import Optional
+
 from google.api_core.exceptions import Conflict
 from google.cloud import bigquery
+from google.cloud.exceptions import NotFound
 
 from src.common.gcp_auth import get_bq_client
 from src.common.logger import get_logger
-from src.config import LOCATION
+from src.config import LOCATION, PARTICIONES_RAW, RAW_ARCHIVO_DATASET, RAW_DATASET, TABLAS_RAW
+from src.load_raw_to_bq.load_raw import SCHEMAS
 
 logger = get_logger(__name__)
 
@@ -23,6 +32,10 @@ DATASETS = [
         "dataset_id": "raw",
         "description": "Capa RAW: copia fiel de archivos provenientes de Cloud Storage",
     },
+    {
+        "dataset_id": RAW_ARCHIVO_DATASET,
+        "description": "Particiones de RAW con más antigüedad que la política de retención",
+    },
     {
         "dataset_id": "dwh",
         "description": "Data Warehouse: modelo dimensional (esquema estrella)",
@@ -54,6 +67,38 @@ def create_dataset(client: bigquery.Client, dataset_id: str, description: str) -
         logger.info("Dataset ya existe: %s", dataset_id)
 
 
+def create_raw_table(
+    client: bigquery.Client,
+    tabla: str,
+    columna_fecha: Optional[str],
+    dataset: str = RAW_DATASET,
+) -> None:
+    """
+    Crea <dataset>.<tabla> particionada por día sobre `columna_fecha` y
+    clusterizada por distribuidor, si no existe. Las tablas existentes no
+    se modifican (el particionado no puede agregarse a una tabla creada).
+    Con columna_fecha=None la tabla se crea sin particionar.
+    """
+    table_id = f"{client.project}.{dataset}.{tabla}"
+
+    try:
+        existente = client.get_table(table_id)
+        if columna_fecha and existente.time_partitioning is None:
+            logger.warning("Tabla %s existe sin particionar: el backfill recorrerá la tabla completa", table_id)
+        else:
+            logger.info("Tabla ya existe: %s", table_id)
+        return
+    except NotFound:
+        pass
+
+    table = bigquery.Table(table_id, schema=SCHEMAS[tabla])
+    if columna_fecha:
+        table.time_partitioning = bigquery.TimePartitioning(field=columna_fecha)
+    table.clustering_fields = ["distribuidor"]
+    client.create_table(table)
+    logger.info("Tabla creada: %s (partición por %s)", table_id, columna_fecha or "ninguna")
+
+
 def main() -> None:
     client = get_bq_client()
 
@@ -66,6 +111,13 @@ def main() -> None:
             description=ds["description"],
         )
 
+    for tabla, columna_fecha in PARTICIONES_RAW.items():
+        create_raw_table(client, tabla, columna_fecha)
+        create_raw_table(client, tabla, columna_fecha, RAW_ARCHIVO_DATASET)
+    for tabla in TABLAS_RAW:
+        if tabla not in PARTICIONES_RAW:
+            create_raw_table(client, tabla, None)
+
     logger.info("Setup de datasets completado.")
 
 
@@ -3,18 +3,23 @@ Setup de infraestructura para control de cargas incrementales.
 
 Crea:
 - Dataset infra
-- Tabla infra.control_archivos_cargados
+- Tabla infra.control_archivos_cargados (si ya existe, se le agregan las
+  columnas nuevas, como las del manifiesto de cada archivo)
+- Tabla infra.job_stats (estadísticas de ejecución de jobs)
+- Tabla infra.watermarks (marcas de agua de refrescos incrementales)
 
 Este script es idempotente.
 """
 
 import time
+from typing import List
+
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
 from src.common.gcp_auth import get_bq_client
 from src.common.logger import get_logger
-from src.config import INFRA_DATASET, CONTROL_TABLE, LOCATION
+from src.config import INFRA_DATASET, CONTROL_TABLE, JOB_STATS_TABLE, LOCATION, WATERMARKS_TABLE
 
 logger = get_logger(__name__)
 
@@ -60,13 +65,21 @@ def create_infra_dataset(client: bigquery.Client) -> None:
     logger.info("Dataset creado: %s", dataset_ref)
 
 
+def agregar_columnas_faltantes(client: bigquery.Client, table_ref: str, schema: List[bigquery.SchemaField]) -> None:
+    """Agrega a una tabla existente las columnas (nullable) del esquema que no tiene."""
+    table = client.get_table(table_ref)
+    existentes = {f.name for f in table.schema}
+    faltantes = [f for f in schema if f.name not in existentes]
+    if not faltantes:
+        return
+    table.schema = list(table.schema) + faltantes
+    client.update_table(table, ["schema"])
+    logger.info("Columnas agregadas a %s: %s", table_ref, [f.name for f in faltantes])
+
+
 def create_control_table(client: bigquery.Client) -> None:
     table_ref = f"{client.project}.{INFRA_DATASET}.{CONTROL_TABLE}"
 
-    if table_exists(client, table_ref):
-        logger.info("Tabla de control ya existe: %s", table_ref)
-        return
-
     schema = [
         bigquery.SchemaField("bucket", "STRING", mode="REQUIRED"),
         bigquery.SchemaField("object_path", "STRING", mode="REQUIRED"),
@@ -76,8 +89,18 @@ def create_control_table(client: bigquery.Client) -> None:
         bigquery.SchemaField("distribuidor", "INT64", mode="REQUIRED"),
         bigquery.SchemaField("loaded_at", "TIMESTAMP", mode="REQUIRED"),
         bigquery.SchemaField("fecha_actualizacion", "TIMESTAMP"),
+        # Manifiesto del archivo (src/common/manifiesto.py)
+        bigquery.SchemaField("filas", "INT64"),
+        bigquery.SchemaField("fecha_min", "DATE"),
+        bigquery.SchemaField("fecha_max", "DATE"),
+        bigquery.SchemaField("sha256", "STRING"),
     ]
 
+    if table_exists(client, table_ref):
+        logger.info("Tabla de control ya existe: %s", table_ref)
+        agregar_columnas_faltantes(client, table_ref, schema)
+        return
+
     table = bigquery.Table(table_ref, schema=schema)
     client.create_table(table)
     logger.info("Tabla de control creada: %s", table_ref)
@@ -85,6 +108,78 @@ def create_control_table(client: bigquery.Client) -> None:
     wait_table_ready(client, table_ref)
 
 
+def create_job_stats_table(client: bigquery.Client) -> None:
+    table_ref = f"{client.project}.{INFRA_DATASET}.{JOB_STATS_TABLE}"
+
+    if table_exists(client, table_ref):
+        logger.info("Tabla de estadísticas ya existe: %s", table_ref)
+        return
+
+    etapas = [
+        bigquery.SchemaField("nombre", "STRING"),
+        bigquery.SchemaField("estado", "STRING"),
+        bigquery.SchemaField("duracion_ms", "INT64"),
+        bigquery.SchemaField("espera_ms_avg", "INT64"),
+        bigquery.SchemaField("lectura_ms_avg", "INT64"),
+        bigquery.SchemaField("computo_ms_avg", "INT64"),
+        bigquery.SchemaField("escritura_ms_avg", "INT64"),
+        bigquery.SchemaField("slot_ms", "INT64"),
+        bigquery.SchemaField("registros_leidos", "INT64"),
+        bigquery.SchemaField("registros_escritos", "INT64"),
+    ]
+
+    schema = [
+        bigquery.SchemaField("run_id", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("paso", "STRING"),
+        bigquery.SchemaField("etiqueta", "STRING"),
+        bigquery.SchemaField("job_id", "STRING"),
+        bigquery.SchemaField("tipo_job", "STRING"),
+        bigquery.SchemaField("creado_en", "TIMESTAMP"),
+        bigquery.SchemaField("inicio", "TIMESTAMP"),
+        bigquery.SchemaField("fin", "TIMESTAMP"),
+        bigquery.SchemaField("duracion_ms", "INT64"),
+        bigquery.SchemaField("bytes_procesados", "INT64"),
+        bigquery.SchemaField("bytes_facturados", "INT64"),
+        bigquery.SchemaField("slot_ms", "INT64"),
+        bigquery.SchemaField("cache_hit", "BOOL"),
+        bigquery.SchemaField("filas_escritas", "INT64"),
+        bigquery.SchemaField("etapas", "RECORD", mode="REPEATED", fields=etapas),
+        bigquery.SchemaField("error", "STRING"),
+    ]
+
+    table = bigquery.Table(table_ref, schema=schema)
+    table.time_partitioning = bigquery.TimePartitioning(field="creado_en")
+    table.clustering_fields = ["run_id", "paso", "etiqueta"]
+    client.create_table(table)
+    logger.info("Tabla de estadísticas creada: %s", table_ref)
+
+    wait_table_ready(client, table_ref)
+
+
+def create_watermarks_table(client: bigquery.Client) -> None:
+    table_ref = f"{client.project}.{INFRA_DATASET}.{WATERMARKS_TABLE}"
+
+    schema = [
+        bigquery.SchemaField("proceso", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("valor", "TIMESTAMP", mode="REQUIRED"),
+        bigquery.SchemaField("actualizado_en", "TIMESTAMP", mode="REQUIRED"),
+        bigquery.SchemaField("run_id", "STRING"),
+        # Huella del contenido leído (p. ej. las dimensiones de los datamarts)
+        bigquery.SchemaField("huella", "STRING"),
+    ]
+
+    if table_exists(client, table_ref):
+        logger.info("Tabla de watermarks ya existe: %s", table_ref)
+        agregar_columnas_faltantes(client, table_ref, schema)
+        return
+
+    table = bigquery.Table(table_ref, schema=schema)
+    client.create_table(table)
+    logger.info("Tabla de watermarks creada: %s", table_ref)
+
+    wait_table_ready(client, table_ref)
+
+
 def main() -> None:
     client = get_bq_client()
 
@@ -92,6 +187,8 @@ def main() -> None:
 
     create_infra_dataset(client)
     create_control_table(client)
+    create_job_stats_table(client)
+    create_watermarks_table(client)
 
     logger.info("Infraestructura de control lista.")
 
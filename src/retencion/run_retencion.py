@@ -0,0 +1,477 @@
+"""
+Retención del lago y de raw según la política de src/config.py.
+
+Lago (GCS), meses completos anteriores a hoy - RETENCION_LAGO_DIAS:
+
+1. Los CSV de data/distribuidor_N/<tabla>/ ya registrados en
+   infra.control_archivos_cargados se compactan en un Parquet por
+   distribuidor, tabla y mes:
+   archivo/distribuidor_N/<tabla>/<tabla>_YYYY-MM.parquet
+   Las columnas conservan el tipo del esquema de raw y se agrega
+   archivo_origen. Si el mes ya tenía Parquet (archivos tardíos), se le
+   suman los CSV nuevos
+2. Se borran los CSV compactados
+3. En la tabla de control, las filas de los CSV se reemplazan por una fila
+   del Parquet con el rango del mes y el mayor loaded_at de las
+   reemplazadas: load_raw no lo ve pendiente (está fuera de data/) y los
+   refrescos incrementales no lo ven como carga nueva
+
+Los CSV no cargados todavía no se compactan. Un Parquet sin fila de control
+(corrida cortada entre 2 y 3) se registra en la corrida siguiente.
+
+Raw (BigQuery), particiones de ventas y stock anteriores a
+hoy - RETENCION_RAW_DIAS:
+- "archivar": se mueven a raw_archivo.<tabla> en una transacción
+- "expirar": se fija el vencimiento de particiones de raw.<tabla>
+
+Los hechos del DWH son incrementales y conservan la historia; las
+dimensiones y el backfill leen raw y raw_archivo. load_raw y los refrescos
+incrementales trabajan sólo sobre lo reciente.
+
+Uso:
+  python -m src.retencion.run_retencion
+  python -m src.retencion.run_retencion --solo lago
+  python -m src.retencion.run_retencion --solo raw --raw-modo expirar
+"""
+
+import argparse
+import calendar
+import hashlib
+import io
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import bigquery, storage
+
+from src.common import manifiesto
+from src.common.gcp_auth import get_bq_client, get_gcs_client
+from src.common.incremental import fecha_de_archivo
+from src.common.job_stats import guardar_estadisticas, registrar_job
+from src.common.logger import get_logger
+from src.config import (
+    BUCKET_NAME,
+    CONTROL_TABLE,
+    INFRA_DATASET,
+    PARTICIONES_RAW,
+    RAW_ARCHIVO_DATASET,
+    RAW_DATASET,
+    RETENCION_ARCHIVO_PREFIJO,
+    RETENCION_LAGO_DIAS,
+    RETENCION_RAW_DIAS,
+    RETENCION_RAW_MODO,
+    TABLAS_RAW,
+)
+from src.load_raw_to_bq.load_raw import (
+    SCHEMAS,
+    filtrar_pendientes,
+    listar_blobs,
+    obtener_distribuidores,
+    obtener_ya_cargados,
+)
+
+logger = get_logger(__name__)
+
+COLUMNA_ORIGEN = "archivo_origen"
+COMPRESION = "zstd"
+
+TIPOS_ARROW = {
+    "INTEGER": pa.int64(),
+    "INT64": pa.int64(),
+    "FLOAT": pa.float64(),
+    "FLOAT64": pa.float64(),
+    "STRING": pa.string(),
+    "DATE": pa.date32(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "BOOL": pa.bool_(),
+    "BOOLEAN": pa.bool_(),
+}
+
+
+# ======================
+# LÓGICA PURA
+# ======================
+
+def fecha_corte(hoy: date, dias: int) -> date:
+    """Primera fecha que se conserva: lo anterior a ella cae en la retención."""
+    return hoy - timedelta(days=dias)
+
+
+def mes_de(fecha: date) -> str:
+    return fecha.strftime("%Y-%m")
+
+
+def limites_mes(mes: str) -> Tuple[date, date]:
+    anio, numero = (int(p) for p in mes.split("-"))
+    return date(anio, numero, 1), date(anio, numero, calendar.monthrange(anio, numero)[1])
+
+
+def meses_compactables(archivos: List[Dict], corte: date) -> Dict[str, List[Dict]]:
+    """
+    Agrupa por mes (fecha del nombre del archivo) los archivos de meses que
+    terminan antes del corte. Un mes sólo se compacta completo: los que el
+    corte parte al medio esperan a la corrida siguiente.
+    """
+    por_mes: Dict[str, List[Dict]] = defaultdict(list)
+    for a in archivos:
+        fecha = fecha_de_archivo(a["object_path"])
+        if fecha is not None and limites_mes(mes_de(fecha))[1] < corte:
+            por_mes[mes_de(fecha)].append(a)
+    return dict(sorted(por_mes.items()))
+
+
+def ruta_archivo(distribuidor: int, tabla: str, mes: str, prefijo: str = RETENCION_ARCHIVO_PREFIJO) -> str:
+    return f"{prefijo}/distribuidor_{distribuidor}/{tabla}/{tabla}_{mes}.parquet"
+
+
+def esquema_arrow(tabla: str) -> pa.Schema:
+    return pa.schema([(f.name, TIPOS_ARROW[f.field_type]) for f in SCHEMAS[tabla]])
+
+
+def leer_csv(contenido: bytes, tabla: str, origen: str) -> pa.Table:
+    """
+    CSV del lago como tabla Arrow con los tipos de raw.<tabla>. Las columnas
+    se toman por posición, como en el load job de load_raw.
+    """
+    esquema = esquema_arrow(tabla)
+    datos = pv.read_csv(
+        io.BytesIO(contenido),
+        read_options=pv.ReadOptions(column_names=esquema.names, skip_rows=1),
+        convert_options=pv.ConvertOptions(column_types=esquema),
+    )
+    return datos.append_column(COLUMNA_ORIGEN, pa.array([origen] * datos.num_rows, pa.string()))
+
+
+def combinar(existente: Optional[pa.Table], nuevos: List[pa.Table]) -> pa.Table:
+    """
+    Suma los CSV nuevos al Parquet existente del mes. Las filas de un
+    archivo de origen que ya estaba en el Parquet se reemplazan (una corrida
+    repetida no duplica).
+    """
+    partes = list(nuevos)
+    if existente is not None:
+        origenes = set()
+        for t in nuevos:
+            origenes.update(t.column(COLUMNA_ORIGEN).unique().to_pylist())
+        mascara = pc.invert(pc.is_in(existente.column(COLUMNA_ORIGEN), pa.array(sorted(origenes), pa.string())))
+        partes.insert(0, existente.filter(mascara))
+    return pa.concat_tables(partes, promote_options="default")
+
+
+def origenes_de(datos: pa.Table) -> List[str]:
+    return sorted(datos.column(COLUMNA_ORIGEN).unique().to_pylist())
+
+
+# ======================
+# GCS
+# ======================
+
+def leer_parquet(bucket: storage.Bucket, ruta: str) -> Tuple[Optional[pa.Table], int]:
+    """Parquet de archivo y su generación (0 si no existe)."""
+    blob = bucket.get_blob(ruta)
+    if blob is None:
+        return None, 0
+    return pq.read_table(io.BytesIO(blob.download_as_bytes())), int(blob.generation)
+
+
+def subir_parquet(
+    bucket: storage.Bucket,
+    ruta: str,
+    datos: pa.Table,
+    generacion_previa: int,
+    distribuidor: int,
+    mes: str,
+) -> storage.Blob:
+    """
+    Sube el Parquet con su manifiesto como metadata. La precondición de
+    generación evita pisar un archivo escrito por otra corrida.
+    """
+    buffer = io.BytesIO()
+    pq.write_table(datos, buffer, compression=COMPRESION)
+    contenido = buffer.getvalue()
+
+    desde, hasta = limites_mes(mes)
+    blob = bucket.blob(ruta)
+    blob.metadata = manifiesto.a_metadata({
+        "filas": datos.num_rows,
+        "fecha_min": desde.isoformat(),
+        "fecha_max": hasta.isoformat(),
+        "distribuidor": distribuidor,
+        "sha256": hashlib.sha256(contenido).hexdigest(),
+    })
+    blob.upload_from_string(contenido, content_type="application/vnd.apache.parquet", if_generation_match=generacion_previa)
+    return blob
+
+
+def borrar_csvs(bucket: storage.Bucket, archivos: List[Dict]) -> None:
+    """Borra los CSV compactados; los reescritos desde el listado no se tocan."""
+    for a in archivos:
+        try:
+            bucket.delete_blob(a["object_path"], if_generation_match=a["generation"])
+        except PreconditionFailed:
+            logger.warning("%s cambió desde el listado: no se borra", a["object_path"])
+        except NotFound:
+            pass
+
+
+# ======================
+# BIGQUERY
+# ======================
+
+def run_sql(
+    client: bigquery.Client,
+    sql: str,
+    label: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+) -> None:
+    t0 = time.time()
+    job = client.query(sql, job_config=job_config)
+    try:
+        job.result()
+    finally:
+        registrar_job(job, label, paso="retencion")
+    logger.info("%s completado en %.1fs", label, time.time() - t0)
+
+
+def reemplazar_en_control(
+    client: bigquery.Client,
+    blob: storage.Blob,
+    tabla: str,
+    distribuidor: int,
+    origenes: List[str],
+) -> None:
+    """
+    Reemplaza en una transacción las filas de control de los archivos de
+    origen (y la de una versión anterior del Parquet) por la del Parquet.
+    """
+    control = f"{client.project}.{INFRA_DATASET}.{CONTROL_TABLE}"
+    meta = manifiesto.para_control(blob.metadata)
+    sql = f"""
+    BEGIN TRANSACTION;
+
+    INSERT INTO `{control}` (
+      bucket, object_path, generation, crc32c, tabla, distribuidor, loaded_at,
+      fecha_actualizacion, filas, fecha_min, fecha_max, sha256
+    )
+    SELECT
+      @bucket, @ruta, @generacion, @crc32c, @tabla, @distribuidor,
+      COALESCE(MAX(loaded_at), CURRENT_TIMESTAMP()),
+      @actualizado, @filas, @fecha_min, @fecha_max, @sha256
+    FROM `{control}`
+    WHERE tabla = @tabla AND distribuidor = @distribuidor
+      AND object_path IN UNNEST(@origenes);
+
+    DELETE FROM `{control}`
+    WHERE tabla = @tabla AND distribuidor = @distribuidor
+      AND (
+        object_path IN UNNEST(@origenes)
+        OR (object_path = @ruta AND generation != @generacion)
+      );
+
+    COMMIT TRANSACTION;
+    """
+    parametros = [
+        bigquery.ScalarQueryParameter("bucket", "STRING", blob.bucket.name),
+        bigquery.ScalarQueryParameter("ruta", "STRING", blob.name),
+        bigquery.ScalarQueryParameter("generacion", "INT64", int(blob.generation)),
+        bigquery.ScalarQueryParameter("crc32c", "STRING", blob.crc32c),
+        bigquery.ScalarQueryParameter("tabla", "STRING", tabla),
+        bigquery.ScalarQueryParameter("distribuidor", "INT64", distribuidor),
+        bigquery.ScalarQueryParameter("actualizado", "TIMESTAMP", blob.updated),
+        bigquery.ScalarQueryParameter("filas", "INT64", meta["filas"]),
+        bigquery.ScalarQueryParameter("fecha_min", "DATE", meta["fecha_min"]),
+        bigquery.ScalarQueryParameter("fecha_max", "DATE", meta["fecha_max"]),
+        bigquery.ScalarQueryParameter("sha256", "STRING", meta["sha256"]),
+        bigquery.ArrayQueryParameter("origenes", "STRING", origenes + [blob.name]),
+    ]
+    run_sql(
+        client,
+        sql,
+        f"control:{tabla}:{distribuidor}",
+        bigquery.QueryJobConfig(query_parameters=parametros),
+    )
+
+
+def archivar_particiones(client: bigquery.Client, tabla: str, corte: date) -> None:
+    """Mueve las filas de raw.<tabla> anteriores al corte a raw_archivo.<tabla>."""
+    origen = f"{client.project}.{RAW_DATASET}.{tabla}"
+    destino = f"{client.project}.{RAW_ARCHIVO_DATASET}.{tabla}"
+    columna_fecha = PARTICIONES_RAW[tabla]
+
+    # DDL fuera de la transacción (no se admite dentro)
+    run_sql(client, f"CREATE TABLE IF NOT EXISTS `{destino}` LIKE `{origen}`", f"raw_archivo:{tabla}")
+
+    sql = f"""
+    BEGIN TRANSACTION;
+
+    INSERT INTO `{destino}`
+    SELECT * FROM `{origen}`
+    WHERE {columna_fecha} < @corte;
+
+    DELETE FROM `{origen}`
+    WHERE {columna_fecha} < @corte;
+
+    COMMIT TRANSACTION;
+    """
+    run_sql(
+        client,
+        sql,
+        f"archivar:{tabla}",
+        bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("corte", "DATE", corte)]),
+    )
+
+
+def fijar_vencimiento(client: bigquery.Client, tabla: str, dias: int) -> None:
+    """Vencimiento de particiones de raw.<tabla>: BigQuery borra las más viejas."""
+    table = client.get_table(f"{client.project}.{RAW_DATASET}.{tabla}")
+    if table.time_partitioning is None:
+        logger.warning("raw.%s no está particionada: no admite vencimiento de particiones", tabla)
+        return
+    table.time_partitioning.expiration_ms = dias * 24 * 3600 * 1000
+    client.update_table(table, ["time_partitioning"])
+    logger.info("raw.%s | vencimiento de particiones=%d días", tabla, dias)
+
+
+# ======================
+# EJECUCIÓN
+# ======================
+
+def compactar_mes(
+    bq_client: bigquery.Client,
+    bucket: storage.Bucket,
+    distribuidor: int,
+    tabla: str,
+    mes: str,
+    archivos: List[Dict],
+) -> storage.Blob:
+    ruta = ruta_archivo(distribuidor, tabla, mes)
+    nuevos = [leer_csv(bucket.blob(a["object_path"]).download_as_bytes(), tabla, a["object_path"]) for a in archivos]
+    existente, generacion = leer_parquet(bucket, ruta)
+    datos = combinar(existente, nuevos)
+
+    blob = subir_parquet(bucket, ruta, datos, generacion, distribuidor, mes)
+    borrar_csvs(bucket, archivos)
+    reemplazar_en_control(bq_client, blob, tabla, distribuidor, [a["object_path"] for a in archivos])
+
+    logger.info(
+        "%s | archivos=%d filas=%d (%s)",
+        ruta, len(archivos), datos.num_rows, "ampliado" if existente is not None else "nuevo",
+    )
+    return blob
+
+
+def registrar_pendientes(
+    bq_client: bigquery.Client,
+    bucket: storage.Bucket,
+    distribuidor: int,
+    tabla: str,
+    ya_cargados: Set[Tuple],
+    omitir: Set[str],
+    existentes: Set[str],
+) -> None:
+    """
+    Registra en control los Parquet que quedaron sin su fila (corrida
+    cortada después de borrar los CSV). Sólo se reemplazan los orígenes que
+    ya no existen en el lago.
+    """
+    prefijo = f"{RETENCION_ARCHIVO_PREFIJO}/distribuidor_{distribuidor}/{tabla}/"
+    for blob in bucket.list_blobs(prefix=prefijo):
+        clave = (bucket.name, blob.name, int(blob.generation), blob.updated)
+        if blob.name in omitir or clave in ya_cargados:
+            continue
+        datos, _ = leer_parquet(bucket, blob.name)
+        origenes = [o for o in origenes_de(datos) if o not in existentes]
+        logger.warning("%s sin fila de control: se registra (orígenes=%d)", blob.name, len(origenes))
+        reemplazar_en_control(bq_client, blob, tabla, distribuidor, origenes)
+
+
+def retener_lago(
+    bq_client: bigquery.Client,
+    storage_client: storage.Client,
+    corte: date,
+) -> int:
+    """Compacta el lago anterior al corte. Retorna la cantidad de CSV compactados."""
+    bucket = storage_client.bucket(BUCKET_NAME)
+    total = 0
+
+    for distribuidor in obtener_distribuidores(storage_client):
+        for tabla in TABLAS_RAW:
+            archivos = listar_blobs(storage_client, distribuidor, tabla)
+            ya_cargados = obtener_ya_cargados(bq_client, tabla, distribuidor)
+            pendientes = {a["object_path"] for a in filtrar_pendientes(archivos, ya_cargados)}
+            cargados = [a for a in archivos if a["object_path"] not in pendientes]
+
+            escritos: Set[str] = set()
+            compactados: Set[str] = set()
+            for mes, del_mes in meses_compactables(cargados, corte).items():
+                escritos.add(compactar_mes(bq_client, bucket, distribuidor, tabla, mes, del_mes).name)
+                compactados.update(a["object_path"] for a in del_mes)
+
+            sin_cargar = meses_compactables([a for a in archivos if a["object_path"] in pendientes], corte)
+            if sin_cargar:
+                logger.warning(
+                    "distribuidor=%d tabla=%s | %d archivos anteriores al corte sin cargar: no se compactan",
+                    distribuidor, tabla, sum(len(v) for v in sin_cargar.values()),
+                )
+
+            existentes = {a["object_path"] for a in archivos} - compactados
+            registrar_pendientes(bq_client, bucket, distribuidor, tabla, ya_cargados, escritos, existentes)
+            total += len(compactados)
+
+    return total
+
+
+def retener_raw(bq_client: bigquery.Client, modo: str, dias: int, hoy: date) -> None:
+    corte = fecha_corte(hoy, dias)
+    for tabla in PARTICIONES_RAW:
+        if modo == "expirar":
+            fijar_vencimiento(bq_client, tabla, dias)
+        else:
+            archivar_particiones(bq_client, tabla, corte)
+            logger.info("raw.%s | particiones anteriores a %s movidas a %s", tabla, corte, RAW_ARCHIVO_DATASET)
+
+
+def main(
+    solo: Optional[str] = None,
+    lago_dias: int = RETENCION_LAGO_DIAS,
+    raw_dias: int = RETENCION_RAW_DIAS,
+    raw_modo: str = RETENCION_RAW_MODO,
+) -> None:
+    if raw_modo not in ("archivar", "expirar"):
+        raise ValueError(f"Modo de retención de raw inválido: {raw_modo}")
+
+    bq_client = get_bq_client()
+    hoy = datetime.now(timezone.utc).date()
+
+    logger.info(
+        "Retención | proyecto=%s lago=%d días raw=%d días (%s)",
+        bq_client.project, lago_dias, raw_dias, raw_modo,
+    )
+
+    try:
+        if solo in (None, "lago"):
+            corte = fecha_corte(hoy, lago_dias)
+            compactados = retener_lago(bq_client, get_gcs_client(), corte)
+            logger.info("Lago | corte=%s archivos compactados=%d", corte, compactados)
+        if solo in (None, "raw"):
+            retener_raw(bq_client, raw_modo, raw_dias, hoy)
+    finally:
+        guardar_estadisticas(bq_client)
+
+    logger.info("Retención finalizada")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retención y compactación del lago y de raw")
+    parser.add_argument("--solo", choices=["lago", "raw"], default=None)
+    parser.add_argument("--lago-dias", type=int, default=RETENCION_LAGO_DIAS)
+    parser.add_argument("--raw-dias", type=int, default=RETENCION_RAW_DIAS)
+    parser.add_argument("--raw-modo", choices=["archivar", "expirar"], default=RETENCION_RAW_MODO)
+    args = parser.parse_args()
+    main(args.solo, args.lago_dias, args.raw_dias, args.raw_modo)
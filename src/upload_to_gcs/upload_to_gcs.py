@@ -1,6 +1,9 @@
 """
 Subida de archivos locales a Google Cloud Storage.
 
+Cada objeto lleva como metadata su manifiesto (filas, rango de fechas,
+distribuidor y SHA-256; ver src/common/manifiesto.py).
+
 Estructura destino en GCS:
 
 data/
@@ -10,13 +13,17 @@ data/
     └── maestro/
 """
 
+import argparse
 from pathlib import Path
+from typing import Optional
 
 from google.cloud import storage
 from google.cloud.exceptions import GoogleCloudError
 
+from src.common import manifiesto, metricas
 from src.common.gcp_auth import get_gcs_client
-from src.common.logger import get_logger
+from src.common.logger import Progreso, get_logger
+from src.common.shards import TODOS, SeleccionDistribuidores, agregar_argumentos, desde_argumentos
 from src.config import BUCKET_NAME, GCS_BASE_PATH
 
 logger = get_logger(__name__)
@@ -40,11 +47,44 @@ def get_or_create_bucket(client: storage.Client, bucket_name: str) -> storage.Bu
         return client.create_bucket(bucket_name)
 
 
-def upload_all_files(bucket: storage.Bucket) -> None:
+def subir_archivo(
+    bucket: storage.Bucket,
+    archivo: Path,
+    distribuidor: str,
+    tipo_gcs: str,
+    progreso: Progreso,
+) -> None:
+    blob_path = f"{GCS_BASE_PATH}/{distribuidor}/{tipo_gcs}/{archivo.name}"
+    uri = f"gs://{bucket.name}/{blob_path}"
+    # Se lee una sola vez: el mismo contenido alimenta el manifiesto y la subida
+    contenido = archivo.read_bytes()
+    blob = bucket.blob(blob_path)
+    blob.metadata = manifiesto.a_metadata(manifiesto.calcular_manifiesto(contenido))
+    try:
+        blob.upload_from_string(contenido, content_type="text/csv")
+    except GoogleCloudError as e:
+        metricas.incrementar("pipeline_errores_archivo", operacion="upload", tipo=tipo_gcs)
+        progreso.error(uri, e)
+        raise
+    if metricas.habilitado():
+        metricas.incrementar("pipeline_archivos_subidos", tipo=tipo_gcs)
+        metricas.incrementar("pipeline_bytes_subidos", len(contenido), tipo=tipo_gcs)
+    progreso.ok(f"Subido: {uri}")
+
+
+def numero_distribuidor(carpeta: Path) -> Optional[int]:
+    """Distribuidor_3 -> 3 (None si la carpeta no sigue la convención)."""
+    try:
+        return int(carpeta.name.split("_", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def upload_all_files(bucket: storage.Bucket, seleccion: SeleccionDistribuidores = TODOS) -> None:
     if not LOCAL_BASE_PATH.exists():
         raise FileNotFoundError("No existe la carpeta local 'data/'")
 
-    total = 0
+    progreso = Progreso(logger, "Subida a GCS")
     for tipo_local, tipo_gcs in TIPO_MAP.items():
         base_tipo_path = LOCAL_BASE_PATH / tipo_local
 
@@ -56,23 +96,40 @@ def upload_all_files(bucket: storage.Bucket) -> None:
             if not distribuidor_dir.is_dir():
                 continue
 
+            numero = numero_distribuidor(distribuidor_dir)
+            if not seleccion.todos and (numero is None or not seleccion.incluye(numero)):
+                continue
+
             distribuidor = distribuidor_dir.name.lower()  # Distribuidor_1 → distribuidor_1
 
-            for archivo in distribuidor_dir.glob("*.csv"):
-                blob_path = f"{GCS_BASE_PATH}/{distribuidor}/{tipo_gcs}/{archivo.name}"
-                blob = bucket.blob(blob_path)
-                blob.upload_from_filename(archivo)
-                total += 1
-                logger.info("Subido: gs://%s/%s", bucket.name, blob_path)
+            with metricas.span("upload.distribuidor", distribuidor=numero, tipo=tipo_gcs):
+                for archivo in distribuidor_dir.glob("*.csv"):
+                    subir_archivo(bucket, archivo, distribuidor, tipo_gcs, progreso)
+
+    progreso.cerrar()
+    logger.info("Subida a GCS completada. Total archivos: %d", progreso.procesados)
 
-    logger.info("Subida a GCS completada. Total archivos: %d", total)
+
+def subir_distribuidor(bucket: storage.Bucket, distribuidor: int) -> int:
+    """Sube los archivos de un único distribuidor (modo encadenado del pipeline)."""
+    with metricas.span("upload.distribuidor", distribuidor=distribuidor), \
+            Progreso(logger, f"Subida a GCS distribuidor {distribuidor}") as progreso:
+        for tipo_local, tipo_gcs in TIPO_MAP.items():
+            carpeta = LOCAL_BASE_PATH / tipo_local / f"Distribuidor_{distribuidor}"
+            if not carpeta.is_dir():
+                continue
+            for archivo in carpeta.glob("*.csv"):
+                subir_archivo(bucket, archivo, f"distribuidor_{distribuidor}", tipo_gcs, progreso)
+    return progreso.procesados
 
 
-def main() -> None:
+def main(seleccion: SeleccionDistribuidores = TODOS) -> None:
     client = get_gcs_client()
     bucket = get_or_create_bucket(client, BUCKET_NAME)
-    upload_all_files(bucket)
+    upload_all_files(bucket, seleccion)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Subida de archivos locales a GCS")
+    agregar_argumentos(parser)
+    main(desde_argumentos(parser.parse_args()))
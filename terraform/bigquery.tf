@@ -4,6 +4,12 @@ resource "google_bigquery_dataset" "raw" {
   description = "Capa RAW: copia fiel de archivos provenientes de Cloud Storage"
 }
 
+resource "google_bigquery_dataset" "raw_archivo" {
+  dataset_id  = "raw_archivo"
+  location    = var.bq_location
+  description = "Particiones de RAW con más antigüedad que la política de retención"
+}
+
 resource "google_bigquery_dataset" "dwh" {
   dataset_id  = "dwh"
   location    = var.bq_location
@@ -0,0 +1,106 @@
+"""Tests unitarios para la selección de archivos del backfill (sin conexión a GCP)."""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+from google.cloud import bigquery
+
+from src.backfill.run_backfill import fechas_del_rango, filtrar_por_rango, validar_retencion
+from src.common.incremental import fecha_de_archivo
+
+
+def archivo(path):
+    return {"object_path": path}
+
+
+class TestFechaDeArchivo:
+    def test_ventas_y_stock(self):
+        assert fecha_de_archivo("data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv") == date(2025, 1, 6)
+        assert fecha_de_archivo("data/distribuidor_1/stock/StockPeriodo_2025-01-06.parquet") == date(2025, 1, 6)
+
+    def test_sin_fecha_o_fecha_invalida(self):
+        assert fecha_de_archivo("data/distribuidor_1/ventas/ventas.csv") is None
+        assert fecha_de_archivo("data/distribuidor_1/ventas/Venta_Clientes_2025-13-01.csv") is None
+
+
+class TestRango:
+    def test_fechas_inclusivas(self):
+        assert fechas_del_rango(date(2025, 1, 30), date(2025, 2, 1)) == [
+            date(2025, 1, 30), date(2025, 1, 31), date(2025, 2, 1),
+        ]
+
+    def test_rango_invertido(self):
+        with pytest.raises(ValueError):
+            fechas_del_rango(date(2025, 2, 1), date(2025, 1, 1))
+
+    def test_rango_anterior_a_particiones_expiradas(self):
+        hoy = date(2025, 7, 1)
+        with pytest.raises(ValueError):
+            validar_retencion(date(2024, 12, 31), hoy, modo="expirar", dias=180)
+        validar_retencion(date(2025, 1, 2), hoy, modo="expirar", dias=180)
+        validar_retencion(date(2024, 12, 31), hoy, modo="archivar", dias=180)
+
+    def test_filtra_archivos_del_rango(self):
+        archivos = [
+            archivo("d/ventas/Venta_Clientes_2025-01-05.csv"),
+            archivo("d/ventas/Venta_Clientes_2025-01-06.csv"),
+            archivo("d/ventas/Venta_Clientes_2025-01-12.csv"),
+            archivo("d/ventas/Venta_Clientes_2025-01-13.csv"),
+            archivo("d/ventas/leeme.csv"),
+        ]
+        seleccionados = filtrar_por_rango(archivos, date(2025, 1, 6), date(2025, 1, 12))
+        assert [a["object_path"][-14:-4] for a in seleccionados] == ["2025-01-06", "2025-01-12"]
+
+
+class TestBackfillDuckDB:
+    def test_rango_archivado_por_la_retencion(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from run_pipeline import STEPS, run_step
+        from src.backfill import run_backfill
+        from src.benchmark.run_benchmark import entorno_local
+        from src.config import BUCKET_NAME
+        from src.generate_data.generate_data import crear_generador
+
+        raiz = Path(__file__).resolve().parents[1]
+        monkeypatch.chdir(raiz)
+        generador = crear_generador(cant_distribuidores=1, cant_dias=3, clientes_por_dist=3)
+        with entorno_local(tmp_path, raiz / "sql") as (gcs, bq):
+            for paso in STEPS[:STEPS.index("dwh")]:
+                run_step(paso, **({"generador": generador} if paso == "generate" else {}))
+            run_step("dwh", motor="bigquery")
+
+            def contar(tabla, columna, dia):
+                sql = f"SELECT COUNT(*) AS n FROM `{bq.project}.{tabla}` WHERE {columna} = @dia"
+                config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("dia", "DATE", dia)])
+                return next(iter(bq.query(sql, job_config=config).result())).n
+
+            def archivar(dia):
+                # Lo que hace run_retencion.archivar_particiones con corte = dia + 1
+                for tabla in ("ventas", "stock"):
+                    bq.query(f"""
+                    INSERT INTO `{bq.project}.raw_archivo.{tabla}`
+                    SELECT * FROM `{bq.project}.raw.{tabla}` WHERE fecha_cierre <= DATE '{dia}';
+                    DELETE FROM `{bq.project}.raw.{tabla}` WHERE fecha_cierre <= DATE '{dia}';
+                    """).result()
+
+            dia = min(r.fecha for r in bq.query(f"SELECT fecha FROM `{bq.project}.dwh.fact_ventas`").result())
+            ventas = contar("dwh.fact_ventas", "fecha", dia)
+            stock = contar("dwh.fact_stock", "fecha", dia)
+            assert ventas and stock
+
+            # Con los CSV en el lago: se recargan en raw y salen de raw_archivo
+            archivar(dia)
+            run_backfill.main(dia, dia, modo="vista", rollups=False)
+            assert contar("raw.ventas", "fecha_cierre", dia) + contar("raw_archivo.ventas", "fecha_cierre", dia) == ventas
+            assert contar("raw_archivo.ventas", "fecha_cierre", dia) == 0
+            assert contar("dwh.fact_ventas", "fecha", dia) == ventas
+
+            # Sin los CSV (compactados por la retención): los hechos salen de raw_archivo
+            archivar(dia)
+            for blob in list(gcs.bucket(BUCKET_NAME).list_blobs(prefix="data/")):
+                if dia.isoformat() in blob.name:
+                    blob.delete()
+            run_backfill.main(dia, dia, modo="vista", rollups=False)
+            assert contar("dwh.fact_ventas", "fecha", dia) == ventas
+            assert contar("dwh.fact_stock", "fecha", dia) == stock
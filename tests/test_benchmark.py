@@ -0,0 +1,93 @@
+"""Tests del benchmark de punta a punta (comparación y corrida con GCS y BigQuery locales)."""
+
+from pathlib import Path
+
+import pytest
+
+from src.benchmark.run_benchmark import comparar, es_regresion, medir_volumen, ritmos
+
+
+def make_paso(pared_s=2.0, memoria_pico_mb=10.0, solicitudes_gcs=5, solicitudes_bigquery=20, filas_por_s=1000.0):
+    return {
+        "pared_s": pared_s,
+        "memoria_pico_mb": memoria_pico_mb,
+        "solicitudes_gcs": solicitudes_gcs,
+        "solicitudes_bigquery": solicitudes_bigquery,
+        "filas_por_s": filas_por_s,
+        "archivos_por_s": 10.0,
+    }
+
+
+def make_resultado(**pasos):
+    return {"escalas": {"chica": {"pasos": pasos}}}
+
+
+class TestComparar:
+    def test_mas_tiempo_y_menos_ritmo_son_regresion(self):
+        assert es_regresion("pared_s", 1.0, 1.3, 0.2)
+        assert not es_regresion("pared_s", 1.0, 1.1, 0.2)
+        assert es_regresion("filas_por_s", 1000, 700, 0.2)
+        assert not es_regresion("filas_por_s", 1000, 1500, 0.2)
+
+    def test_sin_valor_base_no_hay_regresion(self):
+        assert not es_regresion("solicitudes_gcs", 0, 10, 0.2)
+        assert not es_regresion("pared_s", None, 1.0, 0.2)
+
+    def test_marca_las_metricas_que_empeoran(self):
+        base = make_resultado(load_raw=make_paso())
+        nuevo = make_resultado(load_raw=make_paso(pared_s=3.0, solicitudes_bigquery=40, filas_por_s=600.0))
+        (fila,) = comparar(base, nuevo, umbral=0.2)
+        assert fila["paso"] == "load_raw"
+        assert fila["regresiones"] == ["pared_s", "solicitudes_bigquery", "filas_por_s"]
+        assert fila["solicitudes_bigquery"] == (20, 40)
+
+    def test_pasos_cortos_no_comparan_tiempos(self):
+        base = make_resultado(setup_infra=make_paso(pared_s=0.05))
+        nuevo = make_resultado(setup_infra=make_paso(pared_s=0.2, solicitudes_gcs=10, filas_por_s=100.0))
+        (fila,) = comparar(base, nuevo, umbral=0.2)
+        assert fila["regresiones"] == ["solicitudes_gcs"]
+
+    def test_solo_escalas_y_pasos_comunes(self):
+        base = {"escalas": {"chica": {"pasos": {"dwh": make_paso()}}}}
+        nuevo = {"escalas": {
+            "chica": {"pasos": {"dwh": make_paso(), "datamarts": make_paso()}},
+            "grande": {"pasos": {"dwh": make_paso()}},
+        }}
+        assert [(f["escala"], f["paso"]) for f in comparar(base, nuevo)] == [("chica", "dwh")]
+
+    def test_ritmos(self):
+        assert ritmos({"filas": 500, "archivos": 10}, 2.0) == {"filas_por_s": 250.0, "archivos_por_s": 5.0}
+        assert ritmos({"filas": 500, "archivos": 10}, 0) == {"filas_por_s": None, "archivos_por_s": None}
+
+
+class TestVolumen:
+    def test_cuenta_filas_sin_encabezado(self, tmp_path):
+        carpeta = tmp_path / "Archivos_Stock" / "Distribuidor_1"
+        carpeta.mkdir(parents=True)
+        (carpeta / "a.csv").write_text("x,y\n1,2\n3,4\n", encoding="utf-8")
+        (carpeta / "b.csv").write_text("x,y\n", encoding="utf-8")
+        (tmp_path / "resumen_generacion.json").write_text("{}", encoding="utf-8")
+        assert medir_volumen(tmp_path) == {"archivos": 2, "filas": 2}
+
+
+class TestBenchmarkLocal:
+    def test_pipeline_completo_con_clientes_locales(self, monkeypatch):
+        pytest.importorskip("duckdb")
+        from run_pipeline import STEPS
+        from src.benchmark.run_benchmark import correr_escala
+        from src.common import gcp_auth
+
+        raiz = Path(__file__).resolve().parents[1]
+        monkeypatch.chdir(raiz)
+        escala = {"cant_distribuidores": 1, "cant_dias": 3, "clientes_por_dist": 3}
+        resultado = correr_escala("test", escala, sql_path=raiz / "sql")
+
+        assert list(resultado["pasos"]) == STEPS
+        assert resultado["volumen"]["archivos"] == 7  # ventas y stock por día + maestro
+        pasos = resultado["pasos"]
+        assert pasos["upload"]["solicitudes_gcs"] >= resultado["volumen"]["archivos"]
+        assert pasos["load_raw"]["solicitudes_bigquery"] > 0
+        assert pasos["load_raw"]["filas_por_s"] > 0
+        assert "filas_por_s" not in pasos["setup_infra"]
+        # El registro de clientes queda limpio
+        assert gcp_auth._clientes == {}
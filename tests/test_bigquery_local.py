@@ -0,0 +1,127 @@
+"""Tests del cliente de BigQuery sobre DuckDB."""
+
+from datetime import date, datetime, timezone
+
+import pytest
+from google.api_core.exceptions import BadRequest, Conflict, NotFound
+from google.cloud import bigquery
+
+pytest.importorskip("duckdb")
+
+from src.common.bigquery_local import ClienteBigQueryLocal, tipo_duckdb  # noqa: E402
+from src.common.gcs_local import ClienteGCSLocal  # noqa: E402
+
+ESQUEMA = [
+    bigquery.SchemaField("fecha", "DATE"),
+    bigquery.SchemaField("sku", "STRING"),
+    bigquery.SchemaField("unidades", "INTEGER"),
+]
+
+
+@pytest.fixture
+def clientes(tmp_path):
+    gcs = ClienteGCSLocal(tmp_path / "gcs")
+    bq = ClienteBigQueryLocal(tmp_path / "bq.duckdb", gcs=gcs)
+    bq.create_dataset("raw")
+    yield gcs, bq
+    bq.close()
+
+
+class TestEsquema:
+    def test_tipos(self):
+        campo = bigquery.SchemaField(
+            "etapas", "RECORD", mode="REPEATED",
+            fields=[bigquery.SchemaField("nombre", "STRING"), bigquery.SchemaField("ms", "INTEGER")],
+        )
+        assert tipo_duckdb(campo) == "STRUCT(nombre VARCHAR, ms BIGINT)[]"
+
+    def test_tablas_y_datasets(self, clientes):
+        _, bq = clientes
+        with pytest.raises(Conflict):
+            bq.create_dataset("raw")
+        with pytest.raises(NotFound):
+            bq.get_table("local.raw.ventas")
+
+        tabla = bigquery.Table("local.raw.ventas", schema=ESQUEMA)
+        tabla.time_partitioning = bigquery.TimePartitioning(field="fecha")
+        bq.create_table(tabla)
+        leida = bq.get_table("local.raw.ventas")
+        assert [f.name for f in leida.schema] == ["fecha", "sku", "unidades"]
+        assert leida.time_partitioning.field == "fecha"
+        assert leida.num_rows == 0
+
+
+class TestJobs:
+    def test_carga_csv_desde_gcs_y_query(self, clientes):
+        gcs, bq = clientes
+        gcs.create_bucket("b").blob("v.csv").upload_from_string("f,s,u\n2025-01-01,A,3\n2025-01-02,B,4\n")
+
+        job = bq.load_table_from_uri(
+            "gs://b/v.csv", "local.raw.ventas",
+            job_config=bigquery.LoadJobConfig(schema=ESQUEMA, skip_leading_rows=1),
+        )
+        job.result()
+        assert job.output_rows == 2
+
+        filas = bq.query(
+            "SELECT sku, unidades FROM `local.raw.ventas` WHERE fecha IN UNNEST(@fechas) ORDER BY sku",
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ArrayQueryParameter("fechas", "DATE", [date(2025, 1, 2)])]
+            ),
+        ).result()
+        assert [(f["sku"], f.unidades) for f in filas] == [("B", 4)]
+
+    def test_dml_y_timestamps_en_utc(self, clientes):
+        _, bq = clientes
+        bq.query("CREATE TABLE `local.raw.t` (id INT64, en TIMESTAMP)").result()
+        job = bq.query(
+            "INSERT INTO `local.raw.t` VALUES (1, @en)",
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("en", "TIMESTAMP", datetime(2025, 1, 1, 12, tzinfo=timezone.utc)),
+            ]),
+        )
+        job.result()
+        assert job.num_dml_affected_rows == 1
+        (fila,) = bq.query("SELECT en FROM `local.raw.t`").result()
+        assert fila.en == datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+    def test_errores_en_result(self, clientes):
+        _, bq = clientes
+        job = bq.query("SELECT * FROM `local.raw.no_existe`")
+        assert job.done()
+        with pytest.raises(NotFound):
+            job.result()
+        with pytest.raises(BadRequest):
+            bq.load_table_from_json([{"a": 1}], "local.raw.sin_esquema").result()
+
+    def test_carga_json_reemplaza_con_write_truncate(self, clientes):
+        _, bq = clientes
+        config = bigquery.LoadJobConfig(schema=ESQUEMA, write_disposition="WRITE_TRUNCATE")
+        bq.load_table_from_json([{"fecha": "2025-01-01", "sku": "A", "unidades": 1}], "local.raw.v", job_config=config).result()
+        bq.load_table_from_json([{"fecha": "2025-01-02", "sku": "B", "unidades": 2}], "local.raw.v", job_config=config).result()
+        assert [tuple(f.values()) for f in bq.query("SELECT * FROM `local.raw.v`").result()] == [(date(2025, 1, 2), "B", 2)]
+        assert bq.solicitudes["load"] == 2
+
+    def test_carga_desde_archivo_abierto(self, clientes):
+        import io
+
+        _, bq = clientes
+        config = bigquery.LoadJobConfig(schema=ESQUEMA, skip_leading_rows=1)
+        job = bq.load_table_from_file(io.BytesIO(b"f,s,u\n2025-01-01,A,3\n"), "local.raw.v", job_config=config)
+        job.result()
+        assert job.output_rows == 1
+
+    def test_streaming_descarta_insert_ids_repetidos(self, clientes):
+        _, bq = clientes
+        bq.create_table(bigquery.Table("local.raw.v", schema=ESQUEMA))
+        filas = [{"fecha": "2025-01-01", "sku": "A", "unidades": 1}, {"fecha": "2025-01-01", "sku": "B", "unidades": 2}]
+
+        assert bq.insert_rows_json("local.raw.v", filas, row_ids=["a", "b"]) == []
+        assert bq.insert_rows_json("local.raw.v", filas, row_ids=["a", "c"]) == []
+        (fila,) = bq.query("SELECT COUNT(*) AS n FROM `local.raw.v`").result()
+        assert fila.n == 3
+
+        errores = bq.insert_rows_json("local.raw.v", [{"fecha": "no-es-fecha", "sku": "C", "unidades": 1}])
+        assert errores and errores[0]["index"] == 0
+        with pytest.raises(NotFound):
+            bq.insert_rows_json("local.raw.no_existe", filas)
@@ -0,0 +1,102 @@
+"""Tests unitarios para la caché de pasos por huella de entradas (sin conexión a GCP)."""
+
+import pytest
+
+from src.common.cache_pasos import (
+    Entradas,
+    EstadoPasos,
+    calcular_huella,
+    huella_archivos,
+    huella_existencia,
+    salidas_presentes,
+)
+
+
+@pytest.fixture
+def estado(tmp_path):
+    return EstadoPasos(tmp_path / "cache" / "pasos.json")
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sql").mkdir()
+    (tmp_path / "sql" / "a.sql").write_text("SELECT 1")
+    (tmp_path / "sql" / "b.sql").write_text("SELECT 2")
+    return tmp_path
+
+
+class TestHuella:
+    def test_glob_y_contenido(self, directorio):
+        huellas = huella_archivos(["sql/*.sql"])
+        assert list(huellas) == ["sql/a.sql", "sql/b.sql"]
+
+        (directorio / "sql" / "b.sql").write_text("SELECT 3")
+        assert huella_archivos(["sql/*.sql"])["sql/b.sql"] != huellas["sql/b.sql"]
+
+    def test_estable_si_no_cambian_las_entradas(self, directorio, estado):
+        entradas = Entradas(archivos=["sql/*.sql"], config=["SQL_DWH_ORDER"])
+        assert calcular_huella(entradas, estado) == calcular_huella(entradas, estado)
+
+    def test_cambia_con_archivos_opciones_y_dependencias(self, directorio, estado):
+        entradas = Entradas(archivos=["sql/*.sql"], depende_de=["dwh"])
+        base = calcular_huella(entradas, estado)
+
+        assert calcular_huella(entradas, estado, extra={"motor": "duckdb"}) != base
+
+        estado.registrar("dwh", "abc", "run-1")
+        con_dependencia = calcular_huella(entradas, estado)
+        assert con_dependencia != base
+
+        (directorio / "sql" / "c.sql").write_text("SELECT 4")
+        assert calcular_huella(entradas, estado) != con_dependencia
+
+    def test_clientes_solo_si_se_declaran(self, directorio, estado):
+        def no_invocar():
+            raise AssertionError("no debería crear el cliente")
+
+        calcular_huella(Entradas(archivos=["sql/a.sql"]), estado, no_invocar, no_invocar)
+
+    def test_existencia_sin_last_modified(self, tmp_path):
+        pytest.importorskip("duckdb")
+        from google.cloud import bigquery
+
+        from src.common.bigquery_local import ClienteBigQueryLocal
+
+        bq = ClienteBigQueryLocal(tmp_path / "bq.duckdb")
+        try:
+            recursos = ["raw", "raw.ventas"]
+            assert huella_existencia(bq, recursos) == {"raw": False, "raw.ventas": False}
+
+            bq.create_dataset("raw")
+            bq.create_table(bigquery.Table(f"{bq.project}.raw.ventas", schema=[bigquery.SchemaField("a", "INTEGER")]))
+            assert huella_existencia(bq, recursos) == {"raw": True, "raw.ventas": True}
+
+            # Los datos que se agregan no cambian la huella; borrar la tabla sí
+            bq.con.execute("INSERT INTO raw.ventas VALUES (1)")
+            assert huella_existencia(bq, recursos) == {"raw": True, "raw.ventas": True}
+            bq.delete_table(f"{bq.project}.raw.ventas")
+            assert huella_existencia(bq, recursos) == {"raw": True, "raw.ventas": False}
+        finally:
+            bq.close()
+
+
+class TestEstado:
+    def test_persistencia_e_invalidacion(self, estado):
+        estado.registrar("dwh", "abc", "run-1")
+
+        recargado = EstadoPasos(estado.ruta)
+        assert recargado.vigente("dwh", "abc")
+        assert not recargado.vigente("dwh", "otra")
+
+        recargado.invalidar("dwh")
+        assert EstadoPasos(estado.ruta).huella("dwh") is None
+
+    def test_estado_ilegible(self, estado):
+        estado.ruta.parent.mkdir(parents=True)
+        estado.ruta.write_text("{no es json")
+        assert EstadoPasos(estado.ruta).huella("dwh") is None
+
+    def test_salidas(self, directorio):
+        assert salidas_presentes(Entradas(salidas=["sql"]))
+        assert not salidas_presentes(Entradas(salidas=["sql", "data/warehouse.duckdb"]))
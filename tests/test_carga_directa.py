@@ -0,0 +1,187 @@
+"""Tests de la carga directa de archivos locales a BigQuery (sin GCS)."""
+
+import os
+
+import pytest
+from google.cloud import bigquery
+
+from src.common.shards import SeleccionDistribuidores
+from src.load_raw_to_bq.carga_directa import concatenar_csv, filas_json, lotes, registro_control, ruta_sintetica
+
+ESQUEMA = [
+    bigquery.SchemaField("sucursal", "INTEGER"),
+    bigquery.SchemaField("fecha_cierre", "DATE"),
+    bigquery.SchemaField("importe", "FLOAT"),
+    bigquery.SchemaField("sku", "STRING"),
+]
+
+
+class TestLogicaPura:
+    def test_ruta_sintetica_como_gcs(self):
+        assert ruta_sintetica(3, "ventas", "V_2025-01-01.csv") == "data/distribuidor_3/ventas/V_2025-01-01.csv"
+
+    def test_lotes(self):
+        assert list(lotes([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+        assert list(lotes([], 2)) == []
+
+    def test_concatenar_csv_sin_repetir_encabezado(self):
+        unido = concatenar_csv([b"a,b\n1,2\n", b"a,b\n3,4", b"a,b\n"])
+        assert unido == b"a,b\n1,2\n3,4\n"
+
+    def test_filas_json_por_posicion_y_con_tipos(self):
+        contenido = b"suc,fecha,imp,sku\n101,2025-01-01,10.5,A\n102,2025-01-02,,\n"
+        assert filas_json(contenido, ESQUEMA) == [
+            {"sucursal": 101, "fecha_cierre": "2025-01-01", "importe": 10.5, "sku": "A"},
+            {"sucursal": 102, "fecha_cierre": "2025-01-02", "importe": None, "sku": None},
+        ]
+
+    def test_registro_control_con_manifiesto(self):
+        archivo = {
+            "bucket": "local", "object_path": "data/distribuidor_1/ventas/x.csv", "generation": 1,
+            "tabla": "ventas", "distribuidor": 1, "fecha_actualizacion": None, "ruta_local": "x.csv",
+        }
+        registro = registro_control(archivo, b"sucursal,fecha_cierre\n1,2025-01-02\n1,2025-01-01\n")
+        assert "ruta_local" not in registro
+        assert registro["crc32c"] is None
+        assert (registro["filas"], registro["fecha_min"], registro["fecha_max"]) == (2, "2025-01-01", "2025-01-02")
+
+
+class TestCargaDirectaLocal:
+    @pytest.fixture
+    def bq(self, tmp_path):
+        pytest.importorskip("duckdb")
+        from src.common import gcp_auth
+        from src.common.bigquery_local import ClienteBigQueryLocal
+        from src.generate_data.generate_data import GeneradorDatos
+        from src.load_raw_to_bq import setup_datasets, setup_infra_control
+
+        GeneradorDatos(cant_distribuidores=2, cant_dias=3, clientes_por_dist=3, seed=1).escribir_archivos_locales(tmp_path / "data")
+        cliente = ClienteBigQueryLocal(tmp_path / "bq.duckdb")
+        gcp_auth.registrar_cliente("bigquery", cliente)
+        setup_datasets.main()
+        setup_infra_control.main()
+        yield cliente
+        cliente.close()
+        gcp_auth.reiniciar_clientes()
+
+    def contar(self, bq, tabla):
+        return bq.con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    def filas_csv(self, carpeta):
+        return sum(len(r.read_text(encoding="utf-8").splitlines()) - 1 for r in carpeta.glob("*/*.csv"))
+
+    @pytest.mark.parametrize("metodo", ["archivo", "filas"])
+    def test_carga_idempotente(self, bq, tmp_path, metodo):
+        from src.load_raw_to_bq import carga_directa
+
+        data = tmp_path / "data"
+        carga_directa.main(metodo=metodo, data_path=data)
+        assert (bq.solicitudes["insert_rows"] > 0) == (metodo == "filas")
+
+        assert self.contar(bq, "raw.ventas") == self.filas_csv(data / "Archivos_VentaClientes")
+        assert self.contar(bq, "raw.stock") == self.filas_csv(data / "Archivos_Stock")
+        assert self.contar(bq, "raw.maestro_cambios") == self.filas_csv(data / "Archivos_Maestro")
+        control = bq.con.execute(
+            "SELECT DISTINCT bucket, split_part(object_path, '/', 2) FROM infra.control_archivos_cargados ORDER BY 2"
+        ).fetchall()
+        assert control == [("local", "distribuidor_1"), ("local", "distribuidor_2")]
+        archivos = self.contar(bq, "infra.control_archivos_cargados")
+        assert archivos == len(list(data.glob("Archivos_*/*/*.csv")))
+
+        # Segunda corrida: nada pendiente
+        ventas = self.contar(bq, "raw.ventas")
+        carga_directa.main(metodo=metodo, data_path=data)
+        assert self.contar(bq, "raw.ventas") == ventas
+        assert self.contar(bq, "infra.control_archivos_cargados") == archivos
+
+        # Otro mtime con el mismo contenido no se recarga
+        ruta = sorted(data.glob("Archivos_VentaClientes/Distribuidor_1/*.csv"))[0]
+        info = ruta.stat()
+        os.utime(ruta, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+        carga_directa.main(metodo=metodo, data_path=data)
+        assert self.contar(bq, "raw.ventas") == ventas
+
+        # Un archivo reescrito con otro contenido vuelve a cargarse
+        lineas = ruta.read_text(encoding="utf-8").splitlines()
+        ruta.write_text("\n".join(lineas + lineas[1:2]) + "\n", encoding="utf-8")
+        carga_directa.main(metodo=metodo, data_path=data)
+        assert self.contar(bq, "raw.ventas") == ventas + len(lineas)
+        assert self.contar(bq, "infra.control_archivos_cargados") == archivos + 1
+
+    def test_no_recarga_lo_cargado_desde_gcs(self, bq, tmp_path):
+        import hashlib
+
+        from src.load_raw_to_bq import carga_directa
+
+        data = tmp_path / "data"
+        ruta = sorted(data.glob("Archivos_VentaClientes/Distribuidor_1/*.csv"))[0]
+        bq.con.execute(
+            "INSERT INTO infra.control_archivos_cargados (bucket, object_path, generation, tabla, distribuidor, sha256) "
+            "VALUES ('mi-bucket', ?, 123, 'ventas', 1, ?)",
+            [ruta_sintetica(1, "ventas", ruta.name), hashlib.sha256(ruta.read_bytes()).hexdigest()],
+        )
+        carga_directa.main(data_path=data)
+
+        cargadas = self.contar(bq, "raw.ventas")
+        assert cargadas == self.filas_csv(data / "Archivos_VentaClientes") - (len(ruta.read_text(encoding="utf-8").splitlines()) - 1)
+
+    def test_un_load_job_por_lote(self, bq, tmp_path, monkeypatch):
+        from src.load_raw_to_bq import carga_directa
+
+        monkeypatch.setattr(carga_directa, "CARGA_DIRECTA_LOTE_ARCHIVOS", 2)
+        carga_directa.main(metodo="archivo", data_path=tmp_path / "data")
+        jobs = dict(bq.con.execute(
+            "SELECT etiqueta, COUNT(*) FROM infra.job_stats WHERE etiqueta LIKE 'cargar_%' GROUP BY 1"
+        ).fetchall())
+        # Por distribuidor, 3 archivos de ventas y 3 de stock en lotes de 2; el maestro va por CDC
+        assert jobs == {
+            "cargar_archivo_local:ventas": 4,
+            "cargar_archivo_local:stock": 4,
+            "cargar_cambios:maestro": 2,
+        }
+        assert bq.solicitudes["insert_rows"] == 0
+
+    def test_registra_cada_lote_cargado(self, bq, tmp_path, monkeypatch):
+        from src.load_raw_to_bq import carga_directa
+
+        monkeypatch.setattr(carga_directa, "CARGA_DIRECTA_LOTE_ARCHIVOS", 2)
+        cargar_archivos = carga_directa.cargar_archivos
+        llamadas = []
+
+        def corte_en_el_segundo_lote(bq_client, contenidos, tabla):
+            llamadas.append(tabla)
+            if len(llamadas) == 2:
+                raise RuntimeError("proceso interrumpido")
+            cargar_archivos(bq_client, contenidos, tabla)
+
+        monkeypatch.setattr(carga_directa, "cargar_archivos", corte_en_el_segundo_lote)
+        with pytest.raises(RuntimeError):
+            carga_directa.main(SeleccionDistribuidores(frozenset({1})), metodo="archivo", data_path=tmp_path / "data")
+
+        # Distribuidor 1: ventas en lotes de 2 archivos; el corte en el segundo
+        # lote deja registrado el primero
+        registrados = bq.con.execute(
+            "SELECT COUNT(*) FROM infra.control_archivos_cargados WHERE tabla = 'ventas'"
+        ).fetchone()[0]
+        assert llamadas == ["ventas", "ventas"]
+        assert registrados == 2
+
+    def test_archivo_fallido_hace_fallar_la_carga(self, bq, tmp_path, monkeypatch):
+        from google.api_core.exceptions import BadRequest
+
+        from src.load_raw_to_bq import carga_directa
+
+        cargar_archivos = carga_directa.cargar_archivos
+
+        def falla_stock(bq_client, contenidos, tabla):
+            if tabla == "stock":
+                raise BadRequest("CSV inválido")
+            cargar_archivos(bq_client, contenidos, tabla)
+
+        monkeypatch.setattr(carga_directa, "cargar_archivos", falla_stock)
+        # El resto se carga, pero el paso no termina como exitoso
+        with pytest.raises(RuntimeError, match="archivos fallidos"):
+            carga_directa.main(metodo="archivo", data_path=tmp_path / "data")
+        assert self.contar(bq, "raw.ventas") == self.filas_csv(tmp_path / "data" / "Archivos_VentaClientes")
+        assert self.contar(bq, "infra.control_archivos_cargados WHERE tabla = 'stock'") == 0
+
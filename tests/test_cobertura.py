@@ -0,0 +1,90 @@
+"""Tests del datamart de cobertura de stock (lógica pura y motor DuckDB local)."""
+
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.datamarts.cobertura import SQL_COBERTURA, dias_a_recalcular
+
+D = [date(2025, 1, 1) + timedelta(days=i) for i in range(60)]
+
+
+class TestDiasARecalcular:
+    def test_sin_calculo_previo_recorre_toda_la_historia(self):
+        assert dias_a_recalcular([D[5]], None, D[0], D[3]) == D[0:4]
+
+    def test_dia_nuevo(self):
+        assert dias_a_recalcular([D[10]], D[9], D[0], D[10]) == [D[10]]
+
+    def test_sin_fechas_se_pone_al_dia(self):
+        assert dias_a_recalcular([], D[9], D[0], D[12]) == D[10:13]
+        assert dias_a_recalcular([], D[12], D[0], D[12]) == []
+
+    def test_fecha_tardia_propaga_hasta_la_ventana_mas_larga(self):
+        # Un cambio en D[5] afecta las ventanas de D[5] a D[32]; D[33..40] ya son correctos
+        dias = dias_a_recalcular([D[5]], D[40], D[0], D[42])
+        assert dias == D[5:33] + D[41:43]
+
+    def test_fechas_tardias_separadas_no_recalculan_el_medio(self):
+        dias = dias_a_recalcular([D[40], D[2]], D[55], D[0], D[55])
+        assert dias == D[2:30] + D[40:56]
+
+    def test_sin_hechos(self):
+        assert dias_a_recalcular([D[0]], None, None, None) == []
+
+
+class TestCoberturaDuckDB:
+    def test_construccion_completa_y_por_dia_igualan_a_la_suma_directa(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.datamarts import run_datamarts
+        from src.dwh import run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        GeneradorDatos(cant_distribuidores=1, cant_dias=35, clientes_por_dist=4, seed=0).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        run_dwh.run_local(motor)
+        run_datamarts.run_local(motor, rollups=False)
+
+        assert motor.consultar("SELECT COUNT(*) FROM datamarts.dm_cobertura_stock") == motor.consultar(
+            "SELECT COUNT(*) FROM dwh.fact_stock"
+        )
+
+        # Ventanas por suma directa sobre fact_ventas
+        directo = """
+        SELECT s.fecha, s.producto_id, s.sucursal_id,
+          COALESCE(SUM(CASE WHEN v.fecha > s.fecha - 7 THEN v.venta_unidades END), 0) AS u7,
+          COALESCE(SUM(v.venta_unidades), 0) AS u28
+        FROM dwh.fact_stock s
+        LEFT JOIN dwh.fact_ventas v
+          ON v.producto_id = s.producto_id AND v.sucursal_id = s.sucursal_id
+         AND v.fecha BETWEEN s.fecha - 27 AND s.fecha
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        """
+        incremental = """
+        SELECT fecha, producto_id, sucursal_id, venta_unidades_7d, venta_unidades_28d
+        FROM datamarts.dm_cobertura_stock
+        ORDER BY 1, 2, 3
+        """
+        esperado = motor.consultar(directo)
+        assert any(u7 != u28 for *_, u7, u28 in esperado)
+        assert motor.consultar(incremental) == esperado
+
+        fila = motor.consultar(
+            "SELECT stock, venta_unidades_7d, dias_cobertura_7d FROM datamarts.dm_cobertura_stock "
+            "WHERE venta_unidades_7d > 0 LIMIT 1"
+        )[0]
+        assert fila[2] == pytest.approx(fila[0] * 7 / fila[1])
+
+        # El camino por día (cargas tardías) reproduce la construcción completa
+        sql_dia = run_datamarts.load_sql(SQL_COBERTURA, "local")
+        motor.con.execute("DELETE FROM datamarts.ventas_ventana")
+        motor.con.execute("DELETE FROM datamarts.dm_cobertura_stock")
+        for dia in dias_a_recalcular([], None, *motor.consultar("SELECT MIN(fecha), MAX(fecha) FROM dwh.fact_stock")[0]):
+            motor.ejecutar(sql_dia, f"{SQL_COBERTURA.name}:{dia}", {"fecha": dia})
+        assert motor.consultar(incremental) == esperado
+        motor.cerrar()
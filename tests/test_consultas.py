@@ -0,0 +1,159 @@
+"""Tests unitarios para la API de lectura de datamarts con caché."""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.datamarts.consultas import (  # noqa: E402
+    ConsultasDatamarts,
+    clave_consulta,
+    modificado_bigquery,
+    normalizar_sql,
+    tablas_de_vista,
+)
+
+
+class OrigenFalso:
+    """Simula BigQuery: cuenta ejecuciones y expone un last_modified editable."""
+
+    def __init__(self):
+        self.ejecuciones = []
+        self.version = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.consultas_metadata = 0
+
+    def ejecutar(self, sql, parametros):
+        self.ejecuciones.append((sql, parametros))
+        return pa.table({"fecha": [date(2025, 1, 1)], "venta_unidades": [len(self.ejecuciones)]})
+
+    def modificado(self, tabla):
+        self.consultas_metadata += 1
+        return self.version
+
+
+class TablaFalsa:
+    def __init__(self, modified, view_query=None):
+        self.modified = modified
+        self.view_query = view_query
+        self.table_type = "VIEW" if view_query else "TABLE"
+
+
+class ClienteFalso:
+    """Simula get_table de BigQuery sobre un diccionario dataset.tabla -> TablaFalsa."""
+
+    project = "proyecto-1"
+
+    def __init__(self, tablas):
+        self.tablas = tablas
+
+    def get_table(self, table_id):
+        return self.tablas[table_id.split(".", 1)[1]]
+
+
+@pytest.fixture
+def origen():
+    return OrigenFalso()
+
+
+def crear(origen, tmp_path, **kwargs):
+    return ConsultasDatamarts(origen.ejecutar, origen.modificado, ruta_cache=tmp_path, **kwargs)
+
+
+class TestClaves:
+    def test_normaliza_espacios_y_comentarios(self):
+        assert normalizar_sql("SELECT *\n  FROM t -- comentario\n") == "SELECT * FROM t"
+
+    def test_clave_depende_de_la_version(self):
+        v1 = {"datamarts.dm_ventas": datetime(2025, 1, 1)}
+        v2 = {"datamarts.dm_ventas": datetime(2025, 1, 2)}
+        assert clave_consulta("SELECT 1", {}, v1) != clave_consulta("SELECT 1", {}, v2)
+
+    def test_clave_ignora_orden_de_parametros(self):
+        assert clave_consulta("q", {"a": 1, "b": 2}, {}) == clave_consulta("q", {"b": 2, "a": 1}, {})
+
+    def test_tablas_de_vista(self):
+        sql = "SELECT * FROM `proyecto-1.dwh.fact_ventas` fv JOIN `dwh.dim_fecha` df ON fv.fecha = df.fecha"
+        assert tablas_de_vista(sql) == ["dwh.dim_fecha", "dwh.fact_ventas"]
+
+
+class TestConsultasDatamarts:
+    def test_repeticion_sale_de_memoria(self, origen, tmp_path):
+        consultas = crear(origen, tmp_path)
+        primero = consultas.ventas(date(2025, 1, 1), date(2025, 1, 31), producto="X")
+        segundo = consultas.ventas(date(2025, 1, 1), date(2025, 1, 31), producto="X")
+
+        assert len(origen.ejecuciones) == 1
+        assert consultas.aciertos_memoria == 1
+        assert segundo.equals(primero)
+
+    def test_metadata_se_consulta_una_vez_por_ttl(self, origen, tmp_path):
+        ahora = [0.0]
+        consultas = crear(origen, tmp_path, ttl_metadata=30, reloj=lambda: ahora[0])
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+        assert origen.consultas_metadata == 1
+
+        ahora[0] = 31
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+        assert origen.consultas_metadata == 2
+
+    def test_cache_en_disco_sobrevive_a_otra_instancia(self, origen, tmp_path):
+        crear(origen, tmp_path).stock(date(2025, 1, 1), date(2025, 1, 2), distribuidor=3)
+        nueva = crear(origen, tmp_path)
+        nueva.stock(date(2025, 1, 1), date(2025, 1, 2), distribuidor=3)
+
+        assert len(origen.ejecuciones) == 1
+        assert nueva.aciertos_disco == 1
+
+    def test_cambio_de_last_modified_invalida(self, origen, tmp_path):
+        consultas = crear(origen, tmp_path, ttl_metadata=0)
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+
+        origen.version = datetime(2025, 1, 2, tzinfo=timezone.utc)
+        resultado = consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+
+        assert len(origen.ejecuciones) == 2
+        assert resultado["venta_unidades"].to_pylist() == [2]
+        assert len(list(tmp_path.glob("*.arrow"))) == 1
+
+    def test_lru_descarta_la_menos_usada(self, origen, tmp_path):
+        consultas = ConsultasDatamarts(origen.ejecutar, origen.modificado, ruta_cache=None, max_entradas=2)
+        for dia in (1, 2, 3):
+            consultas.ventas(date(2025, 1, dia), date(2025, 1, dia))
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 1))
+        assert len(origen.ejecuciones) == 4
+
+    def test_filtros_opcionales_y_pandas(self, origen, tmp_path):
+        df = crear(origen, tmp_path).ventas_por_distribuidor(date(2025, 1, 1), date(2025, 1, 2), distribuidor=7, formato="pandas")
+        sql, parametros = origen.ejecuciones[0]
+
+        assert "datamarts.rollup_ventas_diario" in sql
+        assert "distribuidor = @distribuidor" in sql and "@producto" not in sql
+        assert parametros == {"desde": date(2025, 1, 1), "hasta": date(2025, 1, 2), "distribuidor": 7}
+        assert list(df.columns) == ["fecha", "venta_unidades"]
+
+    def test_rango_invalido(self, origen, tmp_path):
+        with pytest.raises(ValueError):
+            crear(origen, tmp_path).ventas(date(2025, 2, 1), date(2025, 1, 1))
+
+    def test_recarga_del_hecho_invalida_la_vista(self, origen, tmp_path):
+        """El last_modified de la vista no cambia al recargar el hecho: manda el del hecho."""
+        t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        client = ClienteFalso({
+            "datamarts.dm_ventas": TablaFalsa(t0, "SELECT * FROM `proyecto-1.dwh.fact_ventas` JOIN `proyecto-1.dwh.dim_fecha` USING (fecha)"),
+            "dwh.fact_ventas": TablaFalsa(t0),
+            "dwh.dim_fecha": TablaFalsa(t0),
+        })
+        consultas = ConsultasDatamarts(
+            origen.ejecutar, lambda tabla: modificado_bigquery(client, tabla), ruta_cache=tmp_path, ttl_metadata=0
+        )
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+        consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+        assert len(origen.ejecuciones) == 1
+
+        client.tablas["dwh.fact_ventas"] = TablaFalsa(datetime(2025, 1, 2, tzinfo=timezone.utc))
+        resultado = consultas.ventas(date(2025, 1, 1), date(2025, 1, 2))
+
+        assert len(origen.ejecuciones) == 2
+        assert resultado["venta_unidades"].to_pylist() == [2]
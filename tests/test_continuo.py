@@ -0,0 +1,313 @@
+"""Tests del modo continuo de carga sobre un directorio local (sin conexión a GCP)."""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.common.almacenamiento import AlmacenamientoLocal, Objeto
+from src.load_raw_to_bq.continuo import CargaContinua, Cursor, MicroLote, clasificar, rangos_contiguos
+
+MARGEN = timedelta(seconds=60)
+T0 = datetime(2025, 1, 6, 12, 0, tzinfo=timezone.utc)
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def objeto(ruta, segundos=0, generacion=1, tamano=100):
+    return Objeto(ruta, tamano, T0 + timedelta(seconds=segundos), generacion)
+
+
+def escribir(raiz, ruta, contenido="a,b\n1,2\n", segundos=None):
+    path = raiz / ruta
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(contenido)
+    if segundos is not None:
+        marca = (T0 + timedelta(seconds=segundos)).timestamp()
+        os.utime(path, (marca, marca))
+    return path
+
+
+class TestLogicaPura:
+    def test_clasificar(self):
+        assert clasificar("data/distribuidor_3/ventas/Venta_Clientes_2025-01-06.csv") == (3, "ventas")
+        assert clasificar("data/distribuidor_3/maestro/Maestro_2025-01-06.csv") == (3, "maestro")
+        assert clasificar("data/distribuidor_3/otros/x.csv") is None
+        assert clasificar("data/distribuidor_3/ventas/x.parquet") is None
+        assert clasificar("data/resumen_generacion.json") is None
+
+    def test_rangos_contiguos(self):
+        fechas = [date(2025, 1, d) for d in (8, 1, 2, 3, 7, 2)]
+        assert rangos_contiguos(fechas) == [
+            (date(2025, 1, 1), date(2025, 1, 3)),
+            (date(2025, 1, 7), date(2025, 1, 8)),
+        ]
+        assert rangos_contiguos([]) == []
+
+
+class TestCursor:
+    def test_entrega_cada_objeto_una_vez(self):
+        cursor = Cursor()
+        primeros = [objeto("data/a.csv", 0), objeto("data/b.csv", 10)]
+        assert cursor.nuevos(primeros, MARGEN) == primeros
+        cursor = cursor.avanzar(primeros, MARGEN)
+
+        assert cursor.nuevos(primeros, MARGEN) == []
+        nuevo = objeto("data/c.csv", 20)
+        assert cursor.nuevos(primeros + [nuevo], MARGEN) == [nuevo]
+
+    def test_objeto_tardio_dentro_del_margen(self):
+        cursor = Cursor().avanzar([objeto("data/b.csv", 100)], MARGEN)
+        tardio = objeto("data/a.csv", 90)
+        muy_viejo = objeto("data/z.csv", 0)
+        assert cursor.nuevos([tardio, muy_viejo], MARGEN) == [tardio]
+
+    def test_nueva_generacion_es_nueva(self):
+        cursor = Cursor().avanzar([objeto("data/a.csv", 0)], MARGEN)
+        reescrito = objeto("data/a.csv", 5, generacion=2)
+        assert cursor.nuevos([reescrito], MARGEN) == [reescrito]
+
+    def test_vistos_fuera_del_margen_se_descartan(self):
+        cursor = Cursor().avanzar([objeto("data/a.csv", 0)], MARGEN)
+        cursor = cursor.avanzar([objeto("data/b.csv", 500)], MARGEN)
+        assert {v[0] for v in cursor.vistos} == {"data/b.csv"}
+
+    def test_serializacion(self):
+        cursor = Cursor().avanzar([objeto("data/a.csv", 0), objeto("data/b.csv", 30)], MARGEN, listado_completo=True)
+        assert Cursor.desde_dict(cursor.a_dict()) == cursor
+
+    def test_listado_completo_corta_en_el_anterior(self):
+        cursor = Cursor().avanzar([objeto("data/b.csv", 0)], MARGEN, listado_completo=True)
+        cursor = cursor.avanzar([objeto("data/c.csv", 500)], MARGEN)
+        # Llegó después del listado completo con un nombre que el parcial no ve
+        tardio = objeto("data/a.csv", 200)
+        assert cursor.nuevos([tardio], MARGEN) == []
+        assert {v[0] for v in cursor.vistos} == {"data/b.csv", "data/c.csv"}
+
+        completos = [objeto("data/b.csv", 0), tardio, objeto("data/c.csv", 500)]
+        assert cursor.nuevos(completos, MARGEN, listado_completo=True) == [tardio]
+        cursor = cursor.avanzar([tardio], MARGEN, listado_completo=True)
+        assert cursor.completo == T0 + timedelta(seconds=500)
+        assert {v[0] for v in cursor.vistos} == {"data/c.csv"}
+
+
+class TestMicroLote:
+    def test_listo_por_edad(self):
+        reloj = Reloj()
+        lote = MicroLote(max_bytes=10_000, max_archivos=100, max_edad_seg=60, reloj=reloj)
+        assert not lote.listo()
+        lote.agregar([objeto("data/a.csv")])
+        reloj.ahora = 59
+        assert not lote.listo()
+        reloj.ahora = 60
+        assert lote.listo()
+
+    def test_listo_por_tamano_y_cantidad(self):
+        lote = MicroLote(max_bytes=250, max_archivos=100, max_edad_seg=60, reloj=Reloj())
+        lote.agregar([objeto("data/a.csv"), objeto("data/b.csv")])
+        assert not lote.listo()
+        lote.agregar([objeto("data/c.csv")])
+        assert lote.listo()
+
+        lote = MicroLote(max_bytes=10_000, max_archivos=2, max_edad_seg=60, reloj=Reloj())
+        lote.agregar([objeto("data/a.csv"), objeto("data/b.csv"), objeto("data/c.csv")])
+        assert [o.ruta for o in lote.vaciar()] == ["data/a.csv", "data/b.csv"]
+        assert [o.ruta for o in lote.objetos] == ["data/c.csv"]
+
+
+class AlmacenamientoContado(AlmacenamientoLocal):
+    def __init__(self, raiz):
+        super().__init__(raiz)
+        self.listados = []
+
+    def listar(self, prefijo, desde=None):
+        self.listados.append((prefijo, desde))
+        return super().listar(prefijo, desde)
+
+
+class TestCargaContinua:
+    @pytest.fixture
+    def entorno(self, tmp_path):
+        raiz = tmp_path / "bucket"
+        raiz.mkdir()
+        reloj = Reloj()
+        lotes = []
+        carga = CargaContinua(
+            AlmacenamientoLocal(raiz),
+            lotes.append,
+            ruta_cursor=tmp_path / "cursor.json",
+            lote=MicroLote(max_bytes=10_000, max_archivos=100, max_edad_seg=60, reloj=reloj),
+            margen=MARGEN,
+            dormir=lambda _: None,
+        )
+        return raiz, reloj, lotes, carga
+
+    def test_micro_lote_por_edad(self, entorno):
+        raiz, reloj, lotes, carga = entorno
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv", segundos=0)
+        escribir(raiz, "data/distribuidor_1/ventas/.Venta_Clientes_2025-01-07.csv.tmp", segundos=0)
+        escribir(raiz, "data/resumen_generacion.json", segundos=0)
+
+        assert carga.paso() == []
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv", segundos=5)
+        reloj.ahora = 30
+        assert carga.paso() == []
+
+        reloj.ahora = 61
+        procesados = carga.paso()
+        assert [sorted(o.ruta for o in lote) for lote in procesados] == [[
+            "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv",
+            "data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv",
+        ]]
+        assert carga.paso() == []
+
+    def test_reinicio_retoma_desde_el_cursor(self, entorno, tmp_path):
+        raiz, reloj, lotes, carga = entorno
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv", segundos=0)
+        carga.paso(forzar=True)
+        assert len(lotes) == 1
+
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv", segundos=10)
+        otra = CargaContinua(
+            AlmacenamientoLocal(raiz), lotes.append, ruta_cursor=tmp_path / "cursor.json", margen=MARGEN,
+        )
+        otra.paso(forzar=True)
+        assert [o.ruta for o in lotes[1]] == ["data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv"]
+
+    def test_lote_fallido_se_reintenta(self, entorno, tmp_path):
+        raiz, reloj, lotes, carga = entorno
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv", segundos=0)
+
+        def falla(lote):
+            raise RuntimeError("BigQuery no disponible")
+
+        carga.procesar = falla
+        carga.sondear()
+        reloj.ahora = 61
+        carga.ejecutar(iteraciones=1)
+        assert not (tmp_path / "cursor.json").exists()
+
+        carga.procesar = lotes.append
+        carga.paso()
+        assert len(lotes) == 1
+        assert (tmp_path / "cursor.json").exists()
+
+    def test_sondeos_parciales_por_carpeta(self, tmp_path):
+        raiz = tmp_path / "bucket"
+        almacenamiento = AlmacenamientoContado(raiz)
+        lotes = []
+        carga = CargaContinua(
+            almacenamiento, lotes.append, ruta_cursor=tmp_path / "cursor.json",
+            margen=MARGEN, dormir=lambda _: None, listado_completo_cada=3,
+        )
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv", segundos=0)
+        escribir(raiz, "data/distribuidor_1/stock/StockPeriodo_2025-01-06.csv", segundos=0)
+        carga.paso(forzar=True)
+        assert almacenamiento.listados == [("data/", None)]
+
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv", segundos=10)
+        escribir(raiz, "data/distribuidor_1/ventas/Venta_Clientes_2025-01-01.csv", segundos=10)
+        escribir(raiz, "data/distribuidor_2/ventas/Venta_Clientes_2025-01-06.csv", segundos=10)
+        carga.paso(forzar=True)
+        assert almacenamiento.listados[1:] == [
+            ("data/distribuidor_1/stock/", "data/distribuidor_1/stock/StockPeriodo_2025-01-06.csv"),
+            ("data/distribuidor_1/ventas/", "data/distribuidor_1/ventas/Venta_Clientes_2025-01-06.csv"),
+        ]
+        assert [o.ruta for o in lotes[1]] == ["data/distribuidor_1/ventas/Venta_Clientes_2025-01-07.csv"]
+
+        # El tercer sondeo es parcial; el cuarto, completo, entrega lo que no vieron
+        carga.paso(forzar=True)
+        assert len(lotes) == 2
+        carga.paso(forzar=True)
+        assert almacenamiento.listados[-1] == ("data/", None)
+        assert sorted(o.ruta for o in lotes[2]) == [
+            "data/distribuidor_1/ventas/Venta_Clientes_2025-01-01.csv",
+            "data/distribuidor_2/ventas/Venta_Clientes_2025-01-06.csv",
+        ]
+
+
+class TestDirectorioLocal:
+    @pytest.fixture
+    def bq(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from src.common import gcp_auth
+        from src.common.bigquery_local import ClienteBigQueryLocal
+        from src.generate_data.generate_data import GeneradorDatos
+        from src.load_raw_to_bq import continuo, setup_datasets, setup_infra_control
+        from src.upload_to_gcs.upload_to_gcs import TIPO_MAP
+
+        generados = tmp_path / "generados"
+        GeneradorDatos(cant_distribuidores=2, cant_dias=3, clientes_por_dist=3, seed=1).escribir_archivos_locales(generados)
+        for carpeta, tabla in TIPO_MAP.items():
+            for archivo in sorted(generados.glob(f"{carpeta}/Distribuidor_*/*.csv")):
+                distribuidor = archivo.parent.name.lower()
+                escribir(tmp_path / "bucket", f"data/{distribuidor}/{tabla}/{archivo.name}", archivo.read_text(encoding="utf-8"))
+
+        cliente = ClienteBigQueryLocal(tmp_path / "bq.duckdb")
+        gcp_auth.registrar_cliente("bigquery", cliente)
+        setup_datasets.main()
+        setup_infra_control.main()
+
+        # Sólo la carga en raw: el refresco del DWH se prueba con el backfill
+        self.refrescadas = []
+        monkeypatch.setattr(continuo, "CONTINUO_CURSOR_PATH", str(tmp_path / "cursor.json"))
+        monkeypatch.setattr(continuo, "CONTINUO_REFRESCO_PATH", str(tmp_path / "refresco.json"))
+        monkeypatch.setattr(continuo, "reconstruir_dimensiones", lambda bq: None)
+        monkeypatch.setattr(continuo, "reescribir_hechos", lambda bq, desde, hasta, seleccion: None)
+        monkeypatch.setattr(continuo, "actualizar_snapshot", lambda bq, fechas: None)
+        monkeypatch.setattr(continuo, "refrescar_fechas", lambda bq, fechas, modo, rollups: self.refrescadas.append(fechas))
+        yield cliente
+        cliente.close()
+        gcp_auth.reiniciar_clientes()
+
+    def contar(self, bq, tabla):
+        return bq.con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    def test_carga_sin_gcs(self, bq, tmp_path):
+        from src.load_raw_to_bq import continuo
+
+        raiz = tmp_path / "bucket"
+        filas = sum(len(r.read_text(encoding="utf-8").splitlines()) - 1 for r in raiz.glob("data/*/ventas/*.csv"))
+        archivos = len(list(raiz.glob("data/*/*/*.csv")))
+
+        continuo.main(una_vez=True, directorio=raiz)
+        assert self.contar(bq, "raw.ventas") == filas
+        assert self.contar(bq, "infra.control_archivos_cargados WHERE bucket = 'local' AND sha256 IS NOT NULL") == archivos
+        assert len(self.refrescadas) == 1 and len(self.refrescadas[0]) == 3
+        assert (tmp_path / "cursor_local.json").exists()
+
+        # Otro proceso sin cursor no recarga: los reconoce la tabla de control
+        (tmp_path / "cursor_local.json").unlink()
+        continuo.main(una_vez=True, directorio=raiz)
+        assert self.contar(bq, "raw.ventas") == filas
+        assert len(self.refrescadas) == 1
+
+    def test_refresco_fallido_se_reintenta(self, bq, tmp_path, monkeypatch):
+        from src.load_raw_to_bq import continuo
+
+        raiz = tmp_path / "bucket"
+        refrescar = continuo.refrescar_fechas
+
+        def falla(bq_client, fechas, modo, rollups):
+            raise RuntimeError("datamarts no disponibles")
+
+        monkeypatch.setattr(continuo, "refrescar_fechas", falla)
+        with pytest.raises(RuntimeError):
+            continuo.main(una_vez=True, directorio=raiz)
+        assert self.refrescadas == []
+        assert (tmp_path / "refresco.json").exists()
+
+        # Los archivos ya quedaron registrados, pero sus fechas se refrescan igual
+        ventas = self.contar(bq, "raw.ventas")
+        monkeypatch.setattr(continuo, "refrescar_fechas", refrescar)
+        continuo.main(una_vez=True, directorio=raiz)
+        assert self.contar(bq, "raw.ventas") == ventas
+        assert len(self.refrescadas) == 1 and len(self.refrescadas[0]) == 3
+        assert not (tmp_path / "refresco.json").exists()
+
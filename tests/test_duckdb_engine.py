@@ -0,0 +1,224 @@
+"""Tests unitarios para el motor local DuckDB y la traducción de dialecto."""
+
+from pathlib import Path
+
+import pytest
+
+from src.common.duckdb_engine import traducir_sql
+
+
+class TestTraducirSql:
+    def test_quita_proyecto_y_backticks(self):
+        sql = traducir_sql("SELECT * FROM `mi-proyecto.dwh.fact_ventas`")
+        assert sql == "SELECT * FROM dwh.fact_ventas"
+
+    def test_generate_date_array_con_unnest(self):
+        sql = traducir_sql(
+            "SELECT fecha FROM UNNEST(GENERATE_DATE_ARRAY((SELECT MIN(f) FROM t), (SELECT MAX(f) FROM t))) AS fecha"
+        )
+        assert "generate_series(CAST((SELECT MIN(f) FROM t) AS DATE)" in sql
+        assert "AS _fecha(fecha)" in sql
+
+    def test_format_date_invierte_argumentos(self):
+        assert traducir_sql("CAST(FORMAT_DATE('%u', fecha) AS INT64)") == "CAST(strftime(fecha, '%u') AS BIGINT)"
+
+    def test_date_trunc_semana_iso(self):
+        assert traducir_sql("DATE_TRUNC(fecha, ISOWEEK)") == "CAST(date_trunc('week', fecha) AS DATE)"
+        assert traducir_sql("DATE_TRUNC(d.fecha, MONTH)") == "CAST(date_trunc('month', d.fecha) AS DATE)"
+
+    def test_aritmetica_de_fechas(self):
+        assert traducir_sql("DATE_SUB(@fecha, INTERVAL 7 DAY)") == "CAST($fecha - INTERVAL 7 DAY AS DATE)"
+        assert traducir_sql("DATE_ADD(f, INTERVAL 1 DAY)") == "CAST(f + INTERVAL 1 DAY AS DATE)"
+        assert traducir_sql("DATE_DIFF(@corte, ultima, DAY)") == "date_diff('day', ultima, $corte)"
+
+    def test_funciones_de_la_tabla_de_control(self):
+        sql = traducir_sql(
+            "SELECT ARRAY_AGG(DISTINCT fecha IGNORE NULLS), COUNTIF(filas IS NULL), "
+            "SAFE.PARSE_DATE('%Y-%m-%d', REGEXP_EXTRACT(object_path, r'(\\d{4})\\.csv$'))"
+        )
+        assert sql == (
+            "SELECT ARRAY_AGG(DISTINCT fecha) FILTER (WHERE fecha IS NOT NULL), count_if(filas IS NULL), "
+            "CAST(try_strptime(regexp_extract(object_path, '(\\d{4})\\.csv$', 1), '%Y-%m-%d') AS DATE)"
+        )
+        assert traducir_sql("PARSE_DATE('%Y%m%d', p)") == "CAST(strptime(p, '%Y%m%d') AS DATE)"
+        assert traducir_sql("REGEXP_EXTRACT(s, r'a.b')") == "regexp_extract(s, 'a.b', 0)"
+        assert traducir_sql("SELECT 'r'") == "SELECT 'r'"
+
+    def test_merge_agrega_into(self):
+        assert traducir_sql("MERGE `p.dwh.fact_stock` t").startswith("MERGE INTO dwh.fact_stock t")
+        assert traducir_sql("MERGE INTO dwh.x t") == "MERGE INTO dwh.x t"
+
+    def test_current_timestamp_sin_parentesis(self):
+        assert traducir_sql("SELECT CURRENT_TIMESTAMP() AS ts") == "SELECT CURRENT_TIMESTAMP AS ts"
+
+    def test_quita_options_y_traduce_tipos(self):
+        sql = traducir_sql('CREATE TABLE IF NOT EXISTS `p.dwh.x` (a STRING, b FLOAT64)\nOPTIONS (description = "Hecho (x)");')
+        assert "OPTIONS" not in sql
+        assert "a VARCHAR, b DOUBLE" in sql
+
+    def test_quita_particion_y_cluster_pero_no_ventanas(self):
+        sql = traducir_sql(
+            "CREATE TABLE IF NOT EXISTS `p.dm.x` (fecha DATE)\nPARTITION BY fecha\nCLUSTER BY a, b;\n"
+            "SELECT ROW_NUMBER() OVER (\n  PARTITION BY a\n  ORDER BY fecha) FROM t"
+        )
+        assert "CLUSTER BY" not in sql
+        assert sql.count("PARTITION BY") == 1
+        assert "  PARTITION BY a" in sql
+
+    def test_clausula_final_conserva_punto_y_coma(self):
+        sql = traducir_sql("CREATE TABLE t (a INT64)\nCLUSTER BY a;\nSELECT 1;")
+        assert sql == "CREATE TABLE t (a BIGINT)\n;\nSELECT 1;"
+
+    def test_parametros_e_in_unnest(self):
+        sql = traducir_sql("DELETE FROM t WHERE fecha IN UNNEST(@fechas)")
+        assert sql == "DELETE FROM t WHERE fecha IN (SELECT UNNEST($fechas))"
+
+
+class TestMotorDuckDB:
+    def test_ejecuta_dwh_y_datamarts_sobre_archivos_locales(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.datamarts import run_datamarts
+        from src.dwh import run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        GeneradorDatos(cant_distribuidores=2, cant_dias=3, clientes_por_dist=4, seed=0).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        run_dwh.run_local(motor)
+        run_dwh.run_local(motor)  # reejecución idempotente
+        run_datamarts.run_local(motor)
+
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.dim_fecha")[0][0] == 3
+        ventas_raw = motor.consultar("SELECT COUNT(*) FROM raw.ventas")[0][0]
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.fact_ventas")[0][0] == ventas_raw
+        assert motor.consultar("SELECT COUNT(*) FROM datamarts.dm_stock")[0][0] == 2 * 3 * 10
+
+        # El backfill de hechos reescribe sólo el rango sin duplicar filas
+        from src.backfill.run_backfill import SQL_BASE_PATH as SQL_BACKFILL
+
+        fecha = motor.consultar("SELECT MIN(fecha) FROM dwh.fact_ventas")[0][0]
+        for path in sorted(SQL_BACKFILL.glob("fact_*.sql")):
+            parametros = {"desde": fecha, "hasta": fecha, "distribuidor": 1}
+            motor.ejecutar(run_dwh.load_sql_file(path, "local"), path.name, parametros)
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.fact_ventas")[0][0] == ventas_raw
+
+        # Los rollups conservan los totales del hecho
+        total = "SELECT ROUND(SUM(venta_importe), 2) FROM {}"
+        assert motor.consultar(total.format("datamarts.rollup_ventas_mensual")) == motor.consultar(total.format("dwh.fact_ventas"))
+        assert motor.consultar(total.format("datamarts.rollup_ventas_semanal")) == motor.consultar(total.format("dwh.fact_ventas"))
+
+        # Modo materializado: reemplaza las vistas y es idempotente
+        run_datamarts.run_local(motor, modo="materializado")
+        run_datamarts.run_local(motor, modo="materializado")
+        assert motor.tipo_objeto("datamarts", "dm_ventas") == "BASE TABLE"
+        assert motor.consultar("SELECT COUNT(*) FROM datamarts.dm_ventas")[0][0] == ventas_raw
+        assert motor.consultar("SELECT COUNT(*) FROM datamarts.dm_stock")[0][0] == 2 * 3 * 10
+        motor.cerrar()
+
+    def test_claves_subrogadas_estables_y_backfill(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.dwh import migrar_claves, run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        GeneradorDatos(cant_distribuidores=2, cant_dias=2, clientes_por_dist=3, seed=1).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        motor.cargar_raw()
+        # Hecho creado antes de las claves subrogadas
+        motor.con.execute("""
+            CREATE TABLE dwh.fact_ventas AS
+            SELECT fecha_cierre AS fecha, cliente AS cliente_id, sku AS producto_id, sucursal AS sucursal_id,
+                   venta_unidades, venta_importe
+            FROM raw.ventas
+        """)
+
+        run_dwh.run_local(motor)
+        claves = motor.consultar("SELECT producto_id, producto_sk FROM dwh.claves_producto ORDER BY producto_sk")
+        run_dwh.run_local(motor)
+
+        assert motor.consultar("SELECT producto_id, producto_sk FROM dwh.claves_producto ORDER BY producto_sk") == claves
+        assert [sk for _, sk in claves] == list(range(1, len(claves) + 1))
+
+        # El DWH no recorre el hecho completo: las filas previas esperan a la migración
+        previas = "SELECT COUNT(*) FROM dwh.fact_ventas WHERE producto_sk IS NULL"
+        assert motor.consultar(previas)[0][0] > 0
+        migrar_claves.run_local(motor)
+        for hecho in ("fact_ventas", "fact_stock"):
+            nulos = motor.consultar(f"SELECT COUNT(*) FROM dwh.{hecho} WHERE producto_sk IS NULL OR sucursal_sk IS NULL")
+            assert nulos[0][0] == 0
+        motor.cerrar()
+
+    def test_dwh_con_cdc_sin_maestro_completo(self, tmp_path, monkeypatch):
+        """Con el CDC activo raw.maestro queda vacía: el DWH se arma desde raw.maestro_cambios."""
+        pytest.importorskip("duckdb")
+        from src.common import duckdb_engine
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.datamarts import run_datamarts
+        from src.dwh import run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        monkeypatch.setattr(duckdb_engine, "MAESTRO_CDC", True)
+        GeneradorDatos(cant_distribuidores=2, cant_dias=2, clientes_por_dist=3, seed=2).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        cargar_raw = motor.cargar_raw
+
+        def cargar_raw_sin_maestro():
+            cargar_raw()
+            motor.con.execute("DELETE FROM raw.maestro")
+
+        monkeypatch.setattr(motor, "cargar_raw", cargar_raw_sin_maestro)
+        run_dwh.run_local(motor)
+        run_datamarts.run_local(motor)
+
+        sucursales = motor.consultar("SELECT COUNT(DISTINCT sucursal) FROM raw.maestro_cambios")[0][0]
+        assert sucursales > 0
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.dim_sucursal")[0][0] >= sucursales
+        clientes = motor.consultar("SELECT COUNT(DISTINCT cliente) FROM raw.maestro_cambios")[0][0]
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.dim_cliente")[0][0] == clientes
+        ventas_raw = motor.consultar("SELECT COUNT(*) FROM raw.ventas")[0][0]
+        assert motor.consultar("SELECT COUNT(*) FROM datamarts.dm_ventas")[0][0] == ventas_raw
+        motor.cerrar()
+
+    def test_dimensiones_con_bajas_y_clientes_de_otro_distribuidor(self, tmp_path, monkeypatch):
+        """Las bajas del CDC no crean sucursales NULL; el CDC de un distribuidor no oculta el maestro de otro."""
+        pytest.importorskip("duckdb")
+        from src.common import duckdb_engine
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.dwh import run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        monkeypatch.setattr(duckdb_engine, "MAESTRO_CDC", True)
+        GeneradorDatos(cant_distribuidores=2, cant_dias=2, clientes_por_dist=3, seed=2).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        cargar_raw = motor.cargar_raw
+
+        def cargar_raw_mixto():
+            cargar_raw()
+            # Distribuidor 1 por CDC; distribuidor 2 sólo por carga completa,
+            # con los mismos números de cliente que el 1
+            motor.con.execute("DELETE FROM raw.maestro WHERE distribuidor = 1")
+            motor.con.execute("DELETE FROM raw.maestro_cambios WHERE distribuidor = 2")
+            motor.con.execute("UPDATE raw.maestro SET cliente = cliente - 1000 WHERE distribuidor = 2")
+            # Una baja llega sin sucursal
+            motor.con.execute("""
+                INSERT INTO raw.maestro_cambios (cliente, distribuidor, operacion, cargado_en)
+                SELECT cliente, distribuidor, 'D', cargado_en + INTERVAL 1 DAY
+                FROM raw.maestro_cambios ORDER BY cliente LIMIT 1
+            """)
+
+        monkeypatch.setattr(motor, "cargar_raw", cargar_raw_mixto)
+        run_dwh.run_local(motor)
+
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.dim_sucursal WHERE sucursal_id IS NULL")[0][0] == 0
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.claves_sucursal WHERE sucursal_id IS NULL")[0][0] == 0
+        # 3 clientes del distribuidor 1 menos la baja, y los 3 del distribuidor 2
+        assert motor.consultar("SELECT COUNT(*) FROM dwh.dim_cliente")[0][0] == 5
+        motor.cerrar()
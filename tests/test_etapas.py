@@ -0,0 +1,80 @@
+"""Tests unitarios para la ejecución encadenada de etapas."""
+
+import threading
+
+import pytest
+
+from src.common.etapas import ejecutar_encadenado
+
+
+class TestEncadenado:
+    def test_cada_item_pasa_por_todas_las_etapas_en_orden(self):
+        visitas = []
+        etapas = [
+            ("a", lambda x: visitas.append(("a", x))),
+            ("b", lambda x: visitas.append(("b", x))),
+        ]
+        assert ejecutar_encadenado(range(1, 4), etapas) == [1, 2, 3]
+        for item in (1, 2, 3):
+            assert visitas.index(("a", item)) < visitas.index(("b", item))
+
+    def test_etapas_se_solapan(self):
+        # La etapa final procesa el ítem 1 antes de que la fuente produzca el 3
+        cargado = threading.Event()
+
+        def fuente():
+            yield 1
+            yield 2
+            assert cargado.wait(timeout=5)
+            yield 3
+
+        def cargar(item):
+            if item == 1:
+                cargado.set()
+
+        assert ejecutar_encadenado(fuente(), [("upload", lambda x: None), ("load", cargar)]) == [1, 2, 3]
+
+    def test_cola_acotada(self):
+        producidos = []
+        liberar = threading.Event()
+
+        def fuente():
+            for i in range(10):
+                producidos.append(i)
+                yield i
+
+        def lenta(item):
+            assert liberar.wait(timeout=5)
+
+        hilo = threading.Thread(target=ejecutar_encadenado, args=(fuente(), [("lenta", lenta)], 1))
+        hilo.start()
+        # Un ítem en proceso + uno en cola + uno esperando para entrar
+        hilo.join(timeout=0.5)
+        assert len(producidos) <= 3
+        liberar.set()
+        hilo.join(timeout=5)
+        assert len(producidos) == 10
+
+    def test_error_cancela_y_se_relanza(self):
+        procesados = []
+
+        def fallar(item):
+            if item == 2:
+                raise RuntimeError("falló la carga")
+            procesados.append(item)
+
+        with pytest.raises(RuntimeError, match="falló la carga"):
+            ejecutar_encadenado(range(1, 100), [("upload", lambda x: None), ("load", fallar)])
+        assert 1 in procesados and len(procesados) < 98
+
+    def test_error_en_la_fuente(self):
+        def fuente():
+            yield 1
+            raise ValueError("generación rota")
+
+        with pytest.raises(ValueError, match="generación rota"):
+            ejecutar_encadenado(fuente(), [("upload", lambda x: None)])
+
+    def test_sin_etapas(self):
+        with pytest.raises(ValueError):
+            ejecutar_encadenado([1], [])
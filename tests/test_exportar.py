@@ -0,0 +1,162 @@
+"""Tests unitarios para la exportación a Parquet por streams."""
+
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.datamarts.exportar import PARTICION_NULA, FuenteBigQueryStorage, escribir_stream, exportar  # noqa: E402
+
+
+class FuenteFalsa:
+    """Divide una tabla Arrow en streams de batches chicos."""
+
+    def __init__(self, tabla, tam_batch=2):
+        self.tabla = tabla
+        self.tam_batch = tam_batch
+        self.sesion = None
+
+    def abrir_sesion(self, tabla, columnas, filtro, max_streams):
+        self.sesion = (tabla, columnas, filtro, max_streams)
+        datos = self.tabla.select(columnas) if columnas else self.tabla
+        porcion = -(-datos.num_rows // max_streams)
+        self.streams = {
+            f"stream-{i}": datos.slice(i * porcion, porcion)
+            for i in range(max_streams)
+            if i * porcion < datos.num_rows
+        }
+        return list(self.streams)
+
+    def leer_stream(self, stream):
+        yield from self.streams[stream].to_batches(max_chunksize=self.tam_batch)
+
+
+@pytest.fixture
+def tabla():
+    return pa.table({
+        "fecha": [date(2025, 1, 1), date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 2), None],
+        "producto": ["A", "B", "A", "B", "C"],
+        "venta_importe": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+
+
+class TestExportar:
+    def test_exporta_todos_los_streams(self, tabla, tmp_path):
+        fuente = FuenteFalsa(tabla)
+        resumen = exportar(fuente, "datamarts.dm_ventas", tmp_path, max_streams=3, snapshot="s1")
+
+        ruta = tmp_path / "datamarts.dm_ventas" / "snapshot=s1"
+        assert resumen["ruta"] == str(ruta)
+        assert resumen["filas"] == 5 and resumen["streams"] == 3
+        assert sorted(p.name for p in ruta.glob("*.parquet")) == [
+            "part-00000.parquet", "part-00001.parquet", "part-00002.parquet",
+        ]
+        assert pq.read_table(ruta).num_rows == 5
+
+    def test_proyeccion_y_filtro_se_delegan_a_la_fuente(self, tabla, tmp_path):
+        fuente = FuenteFalsa(tabla)
+        exportar(fuente, "datamarts.dm_ventas", tmp_path, columnas=["fecha", "venta_importe"],
+                 filtro="fecha >= '2025-01-02'", max_streams=2, snapshot="s1")
+
+        assert fuente.sesion == ("datamarts.dm_ventas", ["fecha", "venta_importe"], "fecha >= '2025-01-02'", 2)
+        leida = pq.read_table(tmp_path / "datamarts.dm_ventas" / "snapshot=s1")
+        assert leida.column_names == ["fecha", "venta_importe"]
+
+    def test_particiona_por_columna(self, tabla, tmp_path):
+        exportar(FuenteFalsa(tabla), "datamarts.dm_ventas", tmp_path, particion="fecha", max_streams=2, snapshot="s1")
+
+        ruta = tmp_path / "datamarts.dm_ventas" / "snapshot=s1"
+        carpetas = sorted(p.name for p in ruta.iterdir())
+        assert carpetas == ["fecha=2025-01-01", "fecha=2025-01-02", f"fecha={PARTICION_NULA}"]
+
+        dia = pq.read_table(ruta / "fecha=2025-01-02")
+        assert dia.column_names == ["producto", "venta_importe"]
+        assert sorted(dia["venta_importe"].to_pylist()) == [3.0, 4.0]
+
+    def test_particion_fuera_de_la_proyeccion(self, tabla, tmp_path):
+        with pytest.raises(ValueError):
+            exportar(FuenteFalsa(tabla), "datamarts.dm_ventas", tmp_path, columnas=["producto"], particion="fecha")
+
+    def test_error_en_un_stream_no_publica_el_snapshot(self, tabla, tmp_path):
+        class FuenteRota(FuenteFalsa):
+            def leer_stream(self, stream):
+                yield from super().leer_stream(stream)
+                raise RuntimeError("stream cortado")
+
+        with pytest.raises(RuntimeError):
+            exportar(FuenteRota(tabla), "datamarts.dm_ventas", tmp_path, max_streams=2, snapshot="s1")
+
+        assert list((tmp_path / "datamarts.dm_ventas").iterdir()) == []
+
+    def test_rota_archivos_con_muchas_particiones(self, tmp_path):
+        batches = [
+            pa.record_batch({"fecha": [date(2025, 1, dia)], "venta_importe": [float(dia)]})
+            for dia in (1, 2, 1, 3)
+        ]
+        resultado = escribir_stream(iter(batches), tmp_path, 0, particion="fecha", max_abiertos=1)
+
+        assert resultado.archivos == 4 and resultado.filas == 4
+        assert sorted(p.name for p in (tmp_path / "fecha=2025-01-01").iterdir()) == [
+            "part-00000-1.parquet", "part-00000.parquet",
+        ]
+        assert sorted(pq.read_table(tmp_path / "fecha=2025-01-01")["venta_importe"].to_pylist()) == [1.0, 1.0]
+
+
+class ClienteBQFalso:
+    project = "proyecto-1"
+
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.consultas = []
+
+    def get_table(self, table_id):
+        return SimpleNamespace(table_type=self.tipo)
+
+    def query(self, sql):
+        self.consultas.append(sql)
+        destino = SimpleNamespace(project="proyecto-1", dataset_id="_anonimo", table_id="anon_1")
+        return SimpleNamespace(result=lambda: None, destination=destino)
+
+
+class ClienteLecturaFalso:
+    def create_read_session(self, parent, read_session, max_stream_count):
+        self.sesion = read_session
+        return SimpleNamespace(streams=[SimpleNamespace(name="s0")])
+
+
+@pytest.fixture
+def clientes():
+    """Registra clientes falsos de BigQuery y de la Storage Read API con el tipo de tabla pedido."""
+    pytest.importorskip("google.cloud.bigquery_storage_v1")
+    from src.common import gcp_auth
+
+    def registrar(tipo):
+        bq, lectura = ClienteBQFalso(tipo), ClienteLecturaFalso()
+        gcp_auth.registrar_cliente("bigquery", bq)
+        gcp_auth.registrar_cliente("bigquery_read", lectura)
+        return bq, lectura
+
+    yield registrar
+    gcp_auth.reiniciar_clientes()
+
+
+class TestFuenteBigQueryStorage:
+    def test_tabla_se_lee_directo(self, clientes):
+        bq, lectura = clientes("TABLE")
+        FuenteBigQueryStorage().abrir_sesion("dwh.fact_ventas", ["fecha"], "fecha >= '2025-01-01'", 2)
+
+        assert bq.consultas == []
+        assert lectura.sesion.table == "projects/proyecto-1/datasets/dwh/tables/fact_ventas"
+        assert list(lectura.sesion.read_options.selected_fields) == ["fecha"]
+
+    def test_vista_se_materializa_antes_de_leer(self, clientes):
+        bq, lectura = clientes("VIEW")
+        FuenteBigQueryStorage().abrir_sesion("datamarts.dm_ventas", ["fecha"], "fecha >= '2025-01-01'", 2)
+
+        assert bq.consultas == ["SELECT fecha FROM `proyecto-1.datamarts.dm_ventas` WHERE fecha >= '2025-01-01'"]
+        assert lectura.sesion.table == "projects/proyecto-1/datasets/_anonimo/tables/anon_1"
+        assert list(lectura.sesion.read_options.selected_fields) == []
+        assert lectura.sesion.read_options.row_restriction == ""
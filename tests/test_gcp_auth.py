@@ -0,0 +1,53 @@
+"""Tests unitarios para el registro de clientes de GCP (sin conexión a GCP)."""
+
+import pytest
+
+from src.common import gcp_auth
+
+
+@pytest.fixture
+def credenciales_falsas(monkeypatch):
+    google_auth = pytest.importorskip("google.auth")
+    from google.auth.credentials import AnonymousCredentials
+
+    llamadas = []
+
+    def default(scopes=None):
+        llamadas.append(scopes)
+        return AnonymousCredentials(), "proyecto-test"
+
+    monkeypatch.setattr(google_auth, "default", default)
+    gcp_auth.reiniciar_clientes()
+    yield llamadas
+    gcp_auth.reiniciar_clientes()
+
+
+class TestRegistro:
+    def test_un_cliente_por_servicio_y_una_resolucion_de_credenciales(self, credenciales_falsas):
+        pytest.importorskip("google.cloud.bigquery")
+        pytest.importorskip("google.cloud.storage")
+
+        bq = gcp_auth.get_bq_client()
+        assert gcp_auth.get_bq_client() is bq
+        assert bq.project == "proyecto-test"
+
+        gcs = gcp_auth.get_gcs_client()
+        assert gcp_auth.get_gcs_client() is gcs
+        assert len(credenciales_falsas) == 1
+
+    def test_pool_http_configurable(self, credenciales_falsas):
+        from google.auth.credentials import AnonymousCredentials
+
+        sesion = gcp_auth.crear_sesion_http(AnonymousCredentials(), pool_size=7)
+        adaptador = sesion.get_adapter("https://bigquery.googleapis.com")
+        assert adaptador._pool_maxsize == 7
+
+    def test_registrar_y_reiniciar(self, credenciales_falsas):
+        falso = object()
+        gcp_auth.registrar_cliente("bigquery", falso)
+        assert gcp_auth.get_bq_client() is falso
+        assert credenciales_falsas == []
+
+        pytest.importorskip("google.cloud.bigquery")
+        gcp_auth.reiniciar_clientes()
+        assert gcp_auth.get_bq_client() is not falso
@@ -0,0 +1,72 @@
+"""Tests del cliente de Cloud Storage sobre un directorio local."""
+
+import pytest
+from google.api_core.exceptions import Conflict, NotFound, PreconditionFailed
+
+from src.common.gcs_local import ClienteGCSLocal, calcular_crc32c
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    return ClienteGCSLocal(tmp_path / "gcs")
+
+
+class TestObjetos:
+    def test_crc32c_como_gcs(self):
+        # Valor de referencia de CRC32C para "123456789": 0xE3069283
+        assert calcular_crc32c(b"123456789") == "4waSgw=="
+
+    def test_subida_y_descarga(self, cliente):
+        bucket = cliente.create_bucket("b")
+        blob = bucket.blob("raw/ventas/a.csv")
+        blob.metadata = {"distribuidor": "1"}
+        blob.upload_from_string("x,y\n1,2\n", content_type="text/csv")
+
+        leido = cliente.get_bucket("b").get_blob("raw/ventas/a.csv")
+        assert leido.download_as_text() == "x,y\n1,2\n"
+        assert leido.size == 8
+        assert leido.crc32c == calcular_crc32c(b"x,y\n1,2\n")
+        assert leido.metadata == {"distribuidor": "1"}
+        assert leido.generation == blob.generation
+        assert cliente.ruta_local("gs://b/raw/ventas/a.csv").read_bytes() == b"x,y\n1,2\n"
+
+    def test_generaciones_crecientes_y_precondiciones(self, cliente):
+        bucket = cliente.create_bucket("b")
+        bucket.blob("a").upload_from_string("1", if_generation_match=0)
+        primera = bucket.get_blob("a").generation
+
+        with pytest.raises(PreconditionFailed):
+            bucket.blob("a").upload_from_string("2", if_generation_match=0)
+
+        bucket.blob("a").upload_from_string("2", if_generation_match=primera)
+        assert bucket.get_blob("a").generation > primera
+        # La generación anterior ya no se puede leer (bucket sin versionado)
+        with pytest.raises(NotFound):
+            bucket.blob("a", generation=primera).download_as_bytes()
+
+    def test_listado_por_prefijo_y_borrado(self, cliente):
+        bucket = cliente.create_bucket("b")
+        for nombre in ("raw/ventas/1.csv", "raw/ventas/2.csv", "raw/stock/1.csv"):
+            bucket.blob(nombre).upload_from_string("x")
+
+        assert [b.name for b in cliente.list_blobs("b", prefix="raw/ventas/")] == ["raw/ventas/1.csv", "raw/ventas/2.csv"]
+        bucket.delete_blob("raw/ventas/1.csv")
+        assert not bucket.blob("raw/ventas/1.csv").exists()
+        with pytest.raises(NotFound):
+            bucket.delete_blob("raw/ventas/1.csv")
+
+
+class TestBuckets:
+    def test_conflict_y_not_found(self, cliente):
+        with pytest.raises(NotFound):
+            cliente.get_bucket("b")
+        cliente.create_bucket("b")
+        with pytest.raises(Conflict):
+            cliente.create_bucket("b")
+
+    def test_cuenta_solicitudes(self, cliente):
+        bucket = cliente.create_bucket("b")
+        bucket.blob("a").upload_from_string("x")
+        list(bucket.list_blobs())
+        bucket.blob("a").download_as_bytes()
+        assert cliente.solicitudes == {"create_bucket": 1, "upload": 1, "list_blobs": 1, "download": 1}
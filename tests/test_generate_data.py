@@ -2,11 +2,14 @@
 
 import pytest
 
+from src.common.shards import SeleccionDistribuidores
 from src.generate_data.generate_data import (
     ESTADOS_CLIENTE,
     PRODUCTOS,
     Cliente,
     GeneradorDatos,
+    crear_generador,
+    parametros_generador,
 )
 
 
@@ -58,6 +61,30 @@ class TestGeneradorDatos:
         assert resumen["total_clientes"] == 8
         assert resumen["productos"] == len(PRODUCTOS)
 
+    def test_shard_genera_los_mismos_archivos_que_la_corrida_completa(self, tmp_path):
+        self.gen.escribir_archivos_locales(tmp_path / "completa")
+
+        shard = GeneradorDatos(cant_distribuidores=2, cant_dias=3, clientes_por_dist=4, seed=0)
+        shard.escribir_archivos_locales(tmp_path / "shard", SeleccionDistribuidores(shard=(2, 2)))
+
+        archivos = sorted(p.relative_to(tmp_path / "shard") for p in (tmp_path / "shard").rglob("*.csv"))
+        assert archivos and all(p.parent.name == "Distribuidor_2" for p in archivos)
+        for p in archivos:
+            assert (tmp_path / "shard" / p).read_bytes() == (tmp_path / "completa" / p).read_bytes()
+        assert not (tmp_path / "shard" / "resumen_generacion.json").exists()
+
+
+class TestParametrosGenerador:
+    def test_incluye_la_fecha_del_dia(self):
+        from datetime import datetime
+
+        parametros = parametros_generador()
+        assert parametros["fecha"] == datetime.now().date().isoformat()
+        assert parametros == parametros_generador(crear_generador())
+
+    def test_cambian_con_el_generador(self):
+        assert parametros_generador(crear_generador(cant_dias=30)) != parametros_generador()
+
 
 class TestCliente:
     def test_cuit_formato_valido(self):
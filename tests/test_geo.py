@@ -0,0 +1,43 @@
+"""Tests unitarios para geohash y filtros por bounding box."""
+
+import pytest
+
+from src.common.geo import celdas_bbox, codificar_geohash, filtro_bbox, rangos_geohash, siguiente_geohash
+
+
+class TestGeohash:
+    def test_valor_de_referencia(self):
+        assert codificar_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    def test_prefijo_de_menor_precision(self):
+        assert codificar_geohash(-34.6037, -58.3816, 7).startswith(codificar_geohash(-34.6037, -58.3816, 4))
+
+    def test_coordenadas_fuera_de_rango(self):
+        with pytest.raises(ValueError):
+            codificar_geohash(95, 0)
+
+    def test_siguiente_con_acarreo(self):
+        assert siguiente_geohash("6e0") == "6e1"
+        assert siguiente_geohash("6ez") == "6f0"
+        assert siguiente_geohash("zz") is None
+
+
+class TestBoundingBox:
+    def test_cubre_los_puntos_interiores(self):
+        celdas = celdas_bbox(-34.7, -58.5, -34.5, -58.3, 5)
+        for lat, lon in [(-34.7, -58.5), (-34.6, -58.4), (-34.5, -58.3)]:
+            assert codificar_geohash(lat, lon, 5) in celdas
+
+    def test_agrupa_celdas_consecutivas(self):
+        assert rangos_geohash(["6e1", "6e0", "6e3"]) == [("6e0", "6e2"), ("6e3", "6e4")]
+
+    def test_filtro_respeta_max_celdas(self):
+        condicion, parametros = filtro_bbox(-40, -70, -30, -55, max_celdas=8)
+        desde = [v for k, v in parametros.items() if k.startswith("gh_desde_")]
+        assert 0 < len(desde) <= 8
+        assert "ST_INTERSECTSBOX(ubicacion, @bbox_lon_min" in condicion
+        assert parametros["bbox_lat_min"] == -40.0
+
+    def test_bbox_invalido(self):
+        with pytest.raises(ValueError):
+            celdas_bbox(-30, -58, -40, -55, 4)
@@ -0,0 +1,111 @@
+"""Tests unitarios para la extracción y comparación de estadísticas de jobs entre corridas."""
+
+from types import SimpleNamespace
+
+from google.cloud import bigquery
+
+from src.common.job_stats import agregar_por_etiqueta, comparar_corridas, extraer_estadisticas
+
+ESTADISTICAS = {"creationTime": "1704110400000", "startTime": "1704110400000", "endTime": "1704110403000"}
+
+
+def job_desde_api(clase, configuracion, estadisticas):
+    recurso = {
+        "jobReference": {"projectId": "p", "jobId": "job-1"},
+        "configuration": configuracion,
+        "statistics": {**ESTADISTICAS, **estadisticas},
+        "status": {"state": "DONE"},
+    }
+    return clase.from_api_repr(recurso, SimpleNamespace(project="p"))
+
+
+def make_fila(etiqueta="fact_ventas.sql", paso="dwh", duracion_ms=1000, bytes_procesados=100, slot_ms=50):
+    return {
+        "paso": paso,
+        "etiqueta": etiqueta,
+        "duracion_ms": duracion_ms,
+        "bytes_procesados": bytes_procesados,
+        "bytes_facturados": bytes_procesados,
+        "slot_ms": slot_ms,
+        "filas_escritas": 10,
+    }
+
+
+class TestExtraerEstadisticas:
+    def test_query_job(self):
+        job = job_desde_api(
+            bigquery.QueryJob,
+            {"query": {"query": "SELECT 1"}},
+            {"query": {
+                "totalBytesProcessed": "100",
+                "totalBytesBilled": "200",
+                "totalSlotMs": "40",
+                "cacheHit": False,
+                "numDmlAffectedRows": "5",
+            }},
+        )
+        registro = extraer_estadisticas(job, "fact_ventas.sql", "dwh")
+        assert registro["tipo_job"] == "query"
+        assert registro["duracion_ms"] == 3000
+        assert (registro["bytes_procesados"], registro["bytes_facturados"], registro["slot_ms"]) == (100, 200, 40)
+        assert registro["cache_hit"] is False
+        assert registro["filas_escritas"] == 5
+        assert registro["error"] is None
+
+    def test_load_job(self):
+        job = job_desde_api(
+            bigquery.LoadJob,
+            {"load": {
+                "sourceUris": ["gs://b/ventas.csv"],
+                "destinationTable": {"projectId": "p", "datasetId": "raw", "tableId": "ventas"},
+            }},
+            {"load": {"outputRows": "120", "inputFileBytes": "2048"}},
+        )
+        registro = extraer_estadisticas(job, "cargar_archivo:ventas", "load_raw")
+        assert registro["tipo_job"] == "load"
+        assert (registro["bytes_procesados"], registro["filas_escritas"]) == (2048, 120)
+        assert registro["bytes_facturados"] is None
+        assert registro["etapas"] == []
+
+
+class TestAgregarPorEtiqueta:
+    def test_suma_jobs_de_la_misma_etiqueta(self):
+        filas = [
+            make_fila(etiqueta="cargar_archivo:ventas", paso="load_raw", duracion_ms=100),
+            make_fila(etiqueta="cargar_archivo:ventas", paso="load_raw", duracion_ms=300),
+        ]
+        agregado = agregar_por_etiqueta(filas)
+        acc = agregado[("load_raw", "cargar_archivo:ventas")]
+        assert acc["jobs"] == 2
+        assert acc["duracion_ms"] == 400
+
+    def test_metricas_nulas_cuentan_como_cero(self):
+        fila = make_fila()
+        fila["slot_ms"] = None
+        agregado = agregar_por_etiqueta([fila])
+        assert agregado[("dwh", "fact_ventas.sql")]["slot_ms"] == 0
+
+
+class TestCompararCorridas:
+    def test_sin_cambios_no_hay_regresiones(self):
+        comparacion = comparar_corridas([make_fila()], [make_fila()])
+        assert comparacion[0]["regresiones"] == []
+
+    def test_detecta_regresion_sobre_umbral(self):
+        base = [make_fila(bytes_procesados=100)]
+        nueva = [make_fila(bytes_procesados=150)]
+        comparacion = comparar_corridas(base, nueva, umbral=0.2)
+        assert "bytes_procesados" in comparacion[0]["regresiones"]
+        assert "duracion_ms" not in comparacion[0]["regresiones"]
+
+    def test_crecimiento_dentro_del_umbral_no_es_regresion(self):
+        base = [make_fila(duracion_ms=1000)]
+        nueva = [make_fila(duracion_ms=1100)]
+        comparacion = comparar_corridas(base, nueva, umbral=0.2)
+        assert comparacion[0]["regresiones"] == []
+
+    def test_etiqueta_nueva_aparece_sin_regresion(self):
+        comparacion = comparar_corridas([], [make_fila(etiqueta="dm_ventas.sql", paso="datamarts")])
+        assert len(comparacion) == 1
+        assert comparacion[0]["duracion_ms"] == (None, 1000)
+        assert comparacion[0]["regresiones"] == []
@@ -0,0 +1,116 @@
+"""Tests unitarios para el formato JSON y el resumen de progreso del logging."""
+
+import io
+import json
+import logging
+import sys
+
+from src.common import logger as modulo_logger
+from src.common.logger import FormatoJson, Progreso
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def registro(mensaje, *args, **extra):
+    r = logging.LogRecord("src.test", logging.INFO, __file__, 1, mensaje, args, None)
+    r.__dict__.update(extra)
+    return r
+
+
+class TestFormatoJson:
+    def test_campos_basicos_y_datos(self, monkeypatch):
+        monkeypatch.setenv("PIPELINE_RUN_ID", "run-1")
+        linea = FormatoJson().format(registro("Subidos %d", 3, datos={"procesados": 3}))
+        d = json.loads(linea)
+        assert d["mensaje"] == "Subidos 3"
+        assert d["nivel"] == "INFO"
+        assert d["logger"] == "src.test"
+        assert d["run_id"] == "run-1"
+        assert d["procesados"] == 3
+
+
+class TestProgreso:
+    def setup_method(self):
+        self.logger = logging.getLogger("test.progreso")
+        self.reloj = RelojFalso()
+
+    def test_resumen_periodico_en_lugar_de_una_linea_por_item(self, caplog):
+        caplog.set_level(logging.INFO, logger="test.progreso")
+        progreso = Progreso(self.logger, "Carga", total=100, intervalo=10, reloj=self.reloj)
+
+        for i in range(50):
+            self.reloj.ahora = i * 0.1
+            progreso.ok(f"archivo {i}")
+        assert caplog.records == []
+
+        self.reloj.ahora = 10.0
+        progreso.ok("archivo 50")
+        progreso.cerrar()
+
+        resumenes = [r for r in caplog.records if r.levelno == logging.INFO]
+        assert len(resumenes) == 2
+        assert resumenes[-1].datos["procesados"] == 51
+        assert resumenes[-1].datos["por_segundo"] == 5.1
+        assert "51/100" in resumenes[-1].getMessage()
+
+    def test_errores_uno_por_uno(self, caplog):
+        caplog.set_level(logging.INFO, logger="test.progreso")
+        with Progreso(self.logger, "Carga", intervalo=60, reloj=self.reloj) as progreso:
+            progreso.ok("a")
+            progreso.error("gs://b/x.csv", RuntimeError("404"))
+            progreso.error("gs://b/y.csv", RuntimeError("403"))
+
+        errores = [r for r in caplog.records if r.levelno == logging.ERROR]
+        assert [("x.csv" in r.getMessage(), "y.csv" in r.getMessage()) for r in errores] == [
+            (True, False), (False, True),
+        ]
+        assert caplog.records[-1].datos["errores"] == 2
+
+    def test_detalle_por_item_en_debug(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="test.progreso")
+        Progreso(self.logger, "Subida", reloj=self.reloj).ok("Subido: gs://b/x.csv")
+        assert caplog.records[0].levelno == logging.DEBUG
+
+
+class TestAsincronico:
+    def test_la_cola_se_vacia_al_detener(self, capsys):
+        # Reinicia el escritor para que apunte al stdout capturado
+        modulo_logger.detener_logging()
+        handler = modulo_logger._handler_asincronico()
+        log = logging.getLogger("test.asincronico")
+        log.propagate = False
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        try:
+            for i in range(100):
+                log.info("linea %d", i)
+            modulo_logger.detener_logging()
+        finally:
+            log.removeHandler(handler)
+            modulo_logger.iniciar_escritor()
+
+        salida = capsys.readouterr().out
+        assert "linea 0" in salida and "linea 99" in salida
+
+    def test_escribe_en_el_stdout_vigente(self, monkeypatch):
+        log = logging.getLogger("test.stdout_vigente")
+        log.propagate = False
+        log.addHandler(modulo_logger._handler_asincronico())
+        log.setLevel(logging.INFO)
+
+        nuevo = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", nuevo)
+        try:
+            log.info("despues del cambio")
+            modulo_logger.detener_logging()
+        finally:
+            log.handlers.clear()
+            modulo_logger.iniciar_escritor()
+
+        assert "despues del cambio" in nuevo.getvalue()
@@ -0,0 +1,55 @@
+"""Tests unitarios para la captura de cambios del maestro (sin conexión a GCP)."""
+
+from src.load_raw_to_bq.maestro_cdc import (
+    aplicar_cambios,
+    calcular_cambios,
+    hash_fila,
+    leer_maestro_csv,
+)
+
+COLUMNAS = ["sucursal", "cliente", "provincia", "tipo_negocio", "distribuidor"]
+ATRIBUTOS = ["sucursal", "provincia", "tipo_negocio"]
+
+
+def fila(cliente, provincia="Córdoba", tipo="Almacén", dist="1"):
+    return {"sucursal": "101", "cliente": str(cliente), "provincia": provincia, "tipo_negocio": tipo, "distribuidor": dist}
+
+
+def vigentes_de(*filas):
+    return {(int(f["distribuidor"]), int(f["cliente"])): hash_fila(f, ATRIBUTOS) for f in filas}
+
+
+class TestCalcularCambios:
+    def test_primer_snapshot_son_todas_altas(self):
+        cambios = calcular_cambios([fila(1), fila(2)], {}, COLUMNAS)
+        assert [c["operacion"] for c in cambios] == ["I", "I"]
+
+    def test_snapshot_identico_no_genera_cambios(self):
+        filas = [fila(1), fila(2)]
+        assert calcular_cambios(filas, vigentes_de(*filas), COLUMNAS) == []
+
+    def test_detecta_modificaciones_y_bajas(self):
+        vigentes = vigentes_de(fila(1), fila(2), fila(3))
+        cambios = calcular_cambios([fila(1), fila(2, provincia="Salta"), fila(4)], vigentes, COLUMNAS)
+
+        por_cliente = {c["cliente"]: c["operacion"] for c in cambios}
+        assert por_cliente == {"2": "U", "4": "I", 3: "D"}
+        baja = next(c for c in cambios if c["operacion"] == "D")
+        assert baja["distribuidor"] == 1 and baja["provincia"] is None and baja["hash_fila"] is None
+
+    def test_cliente_repetido_en_el_archivo_gana_la_ultima_fila(self):
+        cambios = calcular_cambios([fila(1), fila(1, tipo="Kiosco")], {}, COLUMNAS)
+        assert len(cambios) == 1 and cambios[0]["tipo_negocio"] == "Kiosco"
+
+    def test_aplicar_cambios_actualiza_vigentes(self):
+        vigentes = vigentes_de(fila(1), fila(2))
+        cambios = calcular_cambios([fila(1, provincia="Salta")], vigentes, COLUMNAS)
+        aplicar_cambios(vigentes, cambios)
+
+        assert set(vigentes) == {(1, 1)}
+        assert calcular_cambios([fila(1, provincia="Salta")], vigentes, COLUMNAS) == []
+
+
+def test_leer_csv_convierte_vacios_en_none():
+    filas = leer_maestro_csv("cliente,fecha_baja\n1,\n2,2025-01-01\n")
+    assert filas == [{"cliente": "1", "fecha_baja": None}, {"cliente": "2", "fecha_baja": "2025-01-01"}]
@@ -0,0 +1,108 @@
+"""Tests unitarios para los manifiestos por archivo y la reconciliación."""
+
+import hashlib
+from datetime import date
+
+from src.backfill.run_backfill import filtrar_por_rango
+from src.common.manifiesto import a_metadata, calcular_manifiesto, desde_metadata, fechas_de, para_control
+from src.load_raw_to_bq.reconciliar import comparar
+
+STOCK = (
+    "sucursal,fecha_cierre,sku,producto,stock,unidad,distribuidor\n"
+    "101,2025-01-07,A1,Yerba,10,UN,1\n"
+    "101,2025-01-05,A2,Azucar,3,UN,1\n"
+    "101,2025-01-06,A3,Harina,0,UN,1\n"
+).encode("utf-8")
+
+
+class TestCalcularManifiesto:
+    def test_filas_fechas_y_hash(self):
+        m = calcular_manifiesto(STOCK)
+        assert m == {
+            "filas": 3,
+            "fecha_min": "2025-01-05",
+            "fecha_max": "2025-01-07",
+            "distribuidor": 1,
+            "sha256": hashlib.sha256(STOCK).hexdigest(),
+        }
+
+    def test_sin_fecha_cierre(self):
+        m = calcular_manifiesto(b"sucursal,cliente,distribuidor\n101,1,2\n101,2,2\n")
+        assert (m["filas"], m["fecha_min"], m["fecha_max"], m["distribuidor"]) == (2, None, None, 2)
+
+    def test_archivo_vacio(self):
+        m = calcular_manifiesto(b"sucursal,fecha_cierre\n")
+        assert (m["filas"], m["fecha_min"]) == (0, None)
+
+
+class TestMetadata:
+    def test_ida_y_vuelta(self):
+        m = calcular_manifiesto(STOCK)
+        metadata = a_metadata(m)
+        assert all(isinstance(v, str) for v in metadata.values())
+        assert desde_metadata(metadata) == m
+
+    def test_objeto_sin_manifiesto(self):
+        assert para_control(None) == {"filas": None, "fecha_min": None, "fecha_max": None, "sha256": None}
+        assert "distribuidor" not in para_control(a_metadata(calcular_manifiesto(STOCK)))
+
+
+class TestFechas:
+    def test_prefiere_el_manifiesto(self):
+        archivo = {
+            "object_path": "data/distribuidor_1/stock/StockPeriodo_2025-01-07.csv",
+            "fecha_min": "2025-01-05",
+            "fecha_max": "2025-01-07",
+        }
+        assert fechas_de(archivo) == [date(2025, 1, 5), date(2025, 1, 6), date(2025, 1, 7)]
+        assert fechas_de({"object_path": archivo["object_path"]}) == [date(2025, 1, 7)]
+
+    def test_backfill_selecciona_por_rango_del_manifiesto(self):
+        archivo = {
+            "object_path": "data/distribuidor_1/stock/StockPeriodo_2025-01-07.csv",
+            "fecha_min": "2025-01-05",
+            "fecha_max": "2025-01-07",
+        }
+        assert filtrar_por_rango([archivo], date(2025, 1, 5), date(2025, 1, 5)) == [archivo]
+
+
+class TestReconciliacion:
+    def test_estados(self):
+        d1, d2, d3, d4 = (date(2025, 1, d) for d in (1, 2, 3, 4))
+        control = [
+            {"tabla": "ventas", "fecha": d1, "filas": 10, "archivos": 2, "sin_manifiesto": 0},
+            {"tabla": "ventas", "fecha": d2, "filas": 10, "archivos": 2, "sin_manifiesto": 0},
+            {"tabla": "ventas", "fecha": d3, "filas": None, "archivos": 1, "sin_manifiesto": 1},
+        ]
+        particiones = [
+            {"tabla": "ventas", "fecha": d1, "filas": 10},
+            {"tabla": "ventas", "fecha": d2, "filas": 20},
+            {"tabla": "ventas", "fecha": d3, "filas": 5},
+            {"tabla": "ventas", "fecha": d4, "filas": 7},
+        ]
+        estados = {r["fecha"]: r["estado"] for r in comparar(control, particiones)}
+        assert estados == {d1: "ok", d2: "diferencia", d3: "sin_manifiesto", d4: "sin_control"}
+
+    def test_archivos_sin_filas_en_raw(self):
+        control = [{"tabla": "stock", "fecha": date(2025, 1, 1), "filas": 4, "archivos": 1, "sin_manifiesto": 0}]
+        [fila] = comparar(control, [])
+        assert (fila["estado"], fila["filas_raw"]) == ("diferencia", 0)
+
+    def test_archivo_mensual_de_la_retencion(self):
+        enero = (date(2025, 1, 1), date(2025, 1, 31))
+        control = [
+            {"tabla": "ventas", "fecha": enero[0], "hasta": enero[1], "filas": 30, "archivos": 1, "sin_manifiesto": 0},
+            # Archivo tardío del mes, todavía sin compactar
+            {"tabla": "ventas", "fecha": date(2025, 1, 20), "filas": 5, "archivos": 1, "sin_manifiesto": 0},
+            {"tabla": "ventas", "fecha": date(2025, 2, 1), "filas": 3, "archivos": 1, "sin_manifiesto": 0},
+        ]
+        particiones = [
+            {"tabla": "ventas", "fecha": date(2025, 1, 2), "filas": 20},
+            {"tabla": "ventas", "fecha": date(2025, 1, 20), "filas": 15},
+            {"tabla": "ventas", "fecha": date(2025, 2, 1), "filas": 3},
+        ]
+        filas = comparar(control, particiones)
+        assert [(r["fecha"], r["hasta"], r["filas_control"], r["filas_raw"], r["estado"]) for r in filas] == [
+            (enero[0], enero[1], 35, 35, "ok"),
+            (date(2025, 2, 1), None, 3, 3, "ok"),
+        ]
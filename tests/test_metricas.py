@@ -0,0 +1,140 @@
+"""Tests unitarios para las métricas OpenMetrics y las trazas OTLP."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.common import job_stats, metricas
+from src.common.etapas import ejecutar_encadenado
+
+
+@pytest.fixture
+def registro():
+    metricas.habilitar("run-1")
+    yield metricas._registro
+    metricas.deshabilitar()
+
+
+def job_load(error=None):
+    inicio = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    return SimpleNamespace(
+        job_type="load",
+        job_id="job-1",
+        slot_millis=40,
+        output_rows=120,
+        input_file_bytes=2048,
+        created=inicio,
+        started=inicio,
+        ended=inicio + timedelta(seconds=3),
+        error_result={"message": error} if error else None,
+    )
+
+
+class TestDeshabilitado:
+    def test_no_registra_nada(self, tmp_path):
+        metricas.deshabilitar()
+        metricas.incrementar("pipeline_archivos_subidos", tipo="ventas")
+        metricas.observar("pipeline_duracion_paso_segundos", 1.0, paso="dwh")
+        with metricas.span("paso.dwh"):
+            pass
+        assert metricas.escribir(tmp_path) is None
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestOpenMetrics:
+    def test_contadores_con_etiquetas(self, registro):
+        metricas.incrementar("pipeline_archivos_subidos", tipo="ventas")
+        metricas.incrementar("pipeline_archivos_subidos", tipo="ventas")
+        metricas.incrementar("pipeline_bytes_subidos", 1500, tipo="stock")
+
+        texto = metricas.formatear_openmetrics(registro)
+        assert 'pipeline_archivos_subidos_total{tipo="ventas"} 2' in texto
+        assert 'pipeline_bytes_subidos_total{tipo="stock"} 1500' in texto
+        assert "# TYPE pipeline_archivos_subidos counter" in texto
+        assert texto.endswith("# EOF\n")
+
+    def test_histograma_acumulado(self, registro):
+        for valor in (0.05, 2.0, 700.0):
+            metricas.observar("pipeline_duracion_paso_segundos", valor, paso="dwh")
+
+        texto = metricas.formatear_openmetrics(registro)
+        assert 'pipeline_duracion_paso_segundos_bucket{paso="dwh",le="0.1"} 1' in texto
+        assert 'pipeline_duracion_paso_segundos_bucket{paso="dwh",le="2.5"} 2' in texto
+        assert 'pipeline_duracion_paso_segundos_bucket{paso="dwh",le="600.0"} 2' in texto
+        assert 'pipeline_duracion_paso_segundos_bucket{paso="dwh",le="+Inf"} 3' in texto
+        assert 'pipeline_duracion_paso_segundos_count{paso="dwh"} 3' in texto
+        assert 'pipeline_duracion_paso_segundos_sum{paso="dwh"} 702.05' in texto
+
+    def test_escapa_valores_de_etiquetas(self, registro):
+        metricas.incrementar("pipeline_jobs", etiqueta='a"b')
+        assert 'etiqueta="a\\"b"' in metricas.formatear_openmetrics(registro)
+
+
+class TestTrazas:
+    def test_spans_anidados(self, registro):
+        with metricas.span("pipeline"):
+            with metricas.span("paso.load_raw", paso="load_raw"):
+                with metricas.span("load_raw.distribuidor", distribuidor=1):
+                    pass
+
+        por_nombre = {s["nombre"]: s for s in registro.spans}
+        assert por_nombre["pipeline"]["padre"] is None
+        assert por_nombre["paso.load_raw"]["padre"] == por_nombre["pipeline"]["span_id"]
+        assert por_nombre["load_raw.distribuidor"]["padre"] == por_nombre["paso.load_raw"]["span_id"]
+
+    def test_span_con_error(self, registro):
+        with pytest.raises(RuntimeError):
+            with metricas.span("paso.dwh"):
+                raise RuntimeError("falló")
+
+        otlp = metricas.formatear_otlp(registro)
+        span = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert span["status"]["code"] == 2
+        assert "falló" in span["status"]["message"]
+
+    def test_hilos_de_etapas_heredan_el_span(self, registro):
+        def etapa(distribuidor):
+            with metricas.span("upload.distribuidor", distribuidor=distribuidor):
+                pass
+
+        with metricas.span("paso.encadenado"):
+            ejecutar_encadenado(iter([1, 2]), [("upload", etapa)])
+
+        padre = next(s for s in registro.spans if s["nombre"] == "paso.encadenado")
+        hijos = [s for s in registro.spans if s["nombre"] == "upload.distribuidor"]
+        assert len(hijos) == 2
+        assert all(h["padre"] == padre["span_id"] for h in hijos)
+
+    def test_job_registra_metricas_y_span(self, registro):
+        with metricas.span("paso.load_raw"):
+            job_stats.registrar_job(job_load(), "cargar_archivo:ventas", paso="load_raw")
+
+        texto = metricas.formatear_openmetrics(registro)
+        assert 'pipeline_jobs_total{paso="load_raw",resultado="ok",tipo_job="load"} 1' in texto
+        assert 'pipeline_filas_escritas_total{paso="load_raw",tipo_job="load"} 120' in texto
+        assert 'pipeline_duracion_job_segundos_count{paso="load_raw",tipo_job="load"} 1' in texto
+
+        span = next(s for s in registro.spans if s["nombre"] == "bigquery.load")
+        assert span["fin_ns"] - span["inicio_ns"] == 3_000_000_000
+        assert span["atributos"]["etiqueta"] == "cargar_archivo:ventas"
+        job_stats._pendientes.clear()
+
+
+class TestEscribir:
+    def test_archivos_de_salida(self, registro, tmp_path):
+        metricas.incrementar("pipeline_archivos_cargados", tabla="ventas")
+        with metricas.span("paso.load_raw", paso="load_raw", filas=10):
+            pass
+
+        ruta_metricas, ruta_trazas = metricas.escribir(tmp_path)
+        assert ruta_metricas == tmp_path / "pipeline.prom"
+        assert 'pipeline_archivos_cargados_total{tabla="ventas"} 1' in ruta_metricas.read_text()
+
+        otlp = json.loads(ruta_trazas.read_text())
+        recurso = otlp["resourceSpans"][0]
+        assert {"key": "pipeline.run_id", "value": {"stringValue": "run-1"}} in recurso["resource"]["attributes"]
+        span = recurso["scopeSpans"][0]["spans"][0]
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert {"key": "filas", "value": {"intValue": "10"}} in span["attributes"]
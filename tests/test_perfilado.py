@@ -0,0 +1,82 @@
+"""Tests unitarios para el perfilado de pasos."""
+
+import cProfile
+import json
+import pstats
+
+import pytest
+
+from src.common.perfilado import ContadorHttp, Perfilador, hotspots, parsear_io_proceso
+
+IO_PROCESO = """rchar: 1000
+wchar: 200
+syscr: 10
+syscw: 5
+read_bytes: 4096
+write_bytes: 8192
+cancelled_write_bytes: 0
+"""
+
+
+def trabajo_lento():
+    return sum(i * i for i in range(200_000))
+
+
+def trabajo_rapido():
+    return 1
+
+
+class TestLogicaPura:
+    def test_parsear_io_proceso(self):
+        assert parsear_io_proceso(IO_PROCESO) == {
+            "bytes_leidos": 1000,
+            "bytes_escritos": 200,
+            "bytes_leidos_disco": 4096,
+            "bytes_escritos_disco": 8192,
+        }
+
+    def test_hotspots_ordenados(self):
+        perfil = cProfile.Profile()
+        perfil.enable()
+        trabajo_lento()
+        trabajo_rapido()
+        perfil.disable()
+
+        filas = hotspots(pstats.Stats(perfil), top_n=50, orden="cumulative")
+        funciones = [f["funcion"] for f in filas]
+        assert funciones.index("trabajo_lento") < funciones.index("trabajo_rapido")
+        assert all(a["cumtime_s"] >= b["cumtime_s"] for a, b in zip(filas, filas[1:]))
+
+        with pytest.raises(ValueError):
+            hotspots(pstats.Stats(perfil), orden="llamadas")
+
+
+class TestPerfilador:
+    def test_reporte_por_paso(self, tmp_path):
+        perfilador = Perfilador("run-1", destino=tmp_path, top_n=5)
+        with perfilador.paso("generate"):
+            (tmp_path / "salida.txt").write_text("x" * 10_000)
+            trabajo_lento()
+
+        with pytest.raises(RuntimeError):
+            with perfilador.paso("upload"):
+                raise RuntimeError("sin red")
+
+        reporte = json.loads(perfilador.guardar().read_text())
+        generate = reporte["pasos"]["generate"]
+        assert generate["pared_s"] > 0
+        assert generate["error"] is None
+        assert len(generate["hotspots_acumulado"]) == 5
+        assert "sin red" in reporte["pasos"]["upload"]["error"]
+        assert (tmp_path / "run-1" / "generate.prof").exists()
+        assert (tmp_path / "run-1" / "generate.txt").exists()
+
+    def test_contador_http_se_desinstala(self):
+        urllib3 = pytest.importorskip("urllib3")
+        original = urllib3.connectionpool.HTTPConnectionPool.urlopen
+
+        contador = ContadorHttp()
+        contador.instalar()
+        assert urllib3.connectionpool.HTTPConnectionPool.urlopen is not original
+        contador.desinstalar()
+        assert urllib3.connectionpool.HTTPConnectionPool.urlopen is original
@@ -0,0 +1,80 @@
+"""Tests de la lógica pura de retención y compactación del lago (sin conexión a GCP)."""
+
+import io
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.retencion.run_retencion import (
+    COLUMNA_ORIGEN,
+    combinar,
+    fecha_corte,
+    leer_csv,
+    limites_mes,
+    meses_compactables,
+    origenes_de,
+    ruta_archivo,
+)
+
+STOCK = "sucursal,fecha_cierre,sku,producto,stock,unidad,distribuidor\n101,{fecha},A1,Yerba,{stock},UN,1\n"
+
+
+def archivo(ruta):
+    return {"object_path": ruta, "generation": 1}
+
+
+def csv_stock(fecha, stock=10):
+    return STOCK.format(fecha=fecha, stock=stock).encode("utf-8")
+
+
+class TestMeses:
+    def test_limites_mes(self):
+        assert limites_mes("2024-02") == (date(2024, 2, 1), date(2024, 2, 29))
+        assert limites_mes("2025-12") == (date(2025, 12, 1), date(2025, 12, 31))
+
+    def test_fecha_corte(self):
+        assert fecha_corte(date(2025, 4, 30), 90) == date(2025, 1, 30)
+
+    def test_solo_meses_completos_anteriores_al_corte(self):
+        archivos = [
+            archivo("data/distribuidor_1/stock/StockPeriodo_2024-12-31.csv"),
+            archivo("data/distribuidor_1/stock/StockPeriodo_2025-01-05.csv"),
+            archivo("data/distribuidor_1/stock/StockPeriodo_2025-01-31.csv"),
+            archivo("data/distribuidor_1/stock/StockPeriodo_2025-02-01.csv"),
+            archivo("data/distribuidor_1/stock/sin_fecha.csv"),
+        ]
+        por_mes = meses_compactables(archivos, corte=date(2025, 2, 15))
+        assert {mes: len(v) for mes, v in por_mes.items()} == {"2024-12": 1, "2025-01": 2}
+
+        # El corte en el último día del mes todavía no lo incluye
+        assert list(meses_compactables(archivos, corte=date(2025, 1, 31))) == ["2024-12"]
+
+    def test_ruta_archivo(self):
+        assert ruta_archivo(3, "ventas", "2025-01", prefijo="archivo") == "archivo/distribuidor_3/ventas/ventas_2025-01.parquet"
+
+
+class TestCompactacion:
+    def test_leer_csv_con_tipos_de_raw(self):
+        datos = leer_csv(csv_stock("2025-01-05"), "stock", "data/distribuidor_1/stock/StockPeriodo_2025-01-05.csv")
+        assert datos.schema.field("fecha_cierre").type == pa.date32()
+        assert datos.schema.field("stock").type == pa.int64()
+        assert datos.schema.field("sku").type == pa.string()
+        assert datos.column(COLUMNA_ORIGEN).to_pylist() == ["data/distribuidor_1/stock/StockPeriodo_2025-01-05.csv"]
+
+    def test_combinar_reemplaza_origenes_repetidos(self):
+        a = leer_csv(csv_stock("2025-01-05", 10), "stock", "a.csv")
+        b = leer_csv(csv_stock("2025-01-06", 20), "stock", "b.csv")
+        existente = combinar(None, [a, b])
+
+        # Ida y vuelta por Parquet, como el archivo en GCS
+        buffer = io.BytesIO()
+        pq.write_table(existente, buffer)
+        existente = pq.read_table(io.BytesIO(buffer.getvalue()))
+
+        b_nuevo = leer_csv(csv_stock("2025-01-06", 25), "stock", "b.csv")
+        c = leer_csv(csv_stock("2025-01-07", 30), "stock", "c.csv")
+        datos = combinar(existente, [b_nuevo, c])
+
+        assert origenes_de(datos) == ["a.csv", "b.csv", "c.csv"]
+        assert sorted(datos.column("stock").to_pylist()) == [10, 25, 30]
@@ -0,0 +1,37 @@
+"""Tests unitarios para el ruteo de consultas a rollups."""
+
+import pytest
+
+from src.datamarts.rollups import elegir_tabla, tablas_rollup
+
+
+class TestElegirTabla:
+    def test_mes_usa_rollup_mensual(self):
+        assert elegir_tabla("ventas", "mes", ["producto", "provincia"]) == "datamarts.rollup_ventas_mensual"
+
+    def test_anio_usa_rollup_mensual(self):
+        assert elegir_tabla("ventas", "anio") == "datamarts.rollup_ventas_mensual"
+
+    def test_stock_anual_no_promedia_promedios_mensuales(self):
+        assert elegir_tabla("stock", "anio") == "datamarts.rollup_stock_diario"
+        assert elegir_tabla("stock", "mes") == "datamarts.rollup_stock_mensual"
+
+    def test_semana_usa_rollup_semanal(self):
+        assert elegir_tabla("ventas", "semana", ["tipo_negocio"]) == "datamarts.rollup_ventas_semanal"
+
+    def test_dia_usa_rollup_diario(self):
+        assert elegir_tabla("stock", "dia", ["sucursal_id"]) == "datamarts.rollup_stock_diario"
+
+    def test_dimension_no_agregada_cae_al_datamart_base(self):
+        assert elegir_tabla("ventas", "mes", ["coordenadas"]) == "datamarts.dm_ventas"
+
+    def test_dimension_de_ventas_no_existe_en_stock(self):
+        assert elegir_tabla("stock", "semana", ["provincia"]) == "datamarts.dm_stock"
+
+    def test_grano_desconocido(self):
+        with pytest.raises(ValueError):
+            elegir_tabla("ventas", "hora")
+
+
+def test_catalogo_lista_todas_las_tablas():
+    assert len(tablas_rollup()) == 6
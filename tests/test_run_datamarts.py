@@ -0,0 +1,45 @@
+"""Tests de run_datamarts sobre los clientes locales de GCS y BigQuery."""
+
+from pathlib import Path
+
+import pytest
+
+
+class TestDimensionesModificadas:
+    def test_cambio_en_una_dimension_refresca_todo(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from run_pipeline import STEPS, run_step
+        from src.benchmark.run_benchmark import entorno_local
+        from src.datamarts import run_datamarts
+        from src.generate_data.generate_data import crear_generador
+
+        totales = []
+        resolver_fechas = run_datamarts.resolver_fechas
+
+        def espiar(client, refresco_total):
+            totales.append(refresco_total)
+            return resolver_fechas(client, refresco_total)
+
+        monkeypatch.setattr(run_datamarts, "resolver_fechas", espiar)
+
+        raiz = Path(__file__).resolve().parents[1]
+        monkeypatch.chdir(raiz)
+        generador = crear_generador(cant_distribuidores=1, cant_dias=3, clientes_por_dist=3)
+        with entorno_local(tmp_path, raiz / "sql") as (_, bq):
+            for paso in STEPS[:STEPS.index("dwh")]:
+                run_step(paso, **({"generador": generador} if paso == "generate" else {}))
+            run_step("dwh", motor="bigquery")
+
+            def correr_datamarts():
+                run_datamarts.main(motor="bigquery", modo="materializado", rollups=True, cobertura=False)
+
+            correr_datamarts()
+            correr_datamarts()
+            bq.query(f"UPDATE `{bq.project}.dwh.dim_producto` SET producto = 'Renombrado' WHERE TRUE").result()
+            correr_datamarts()
+
+            productos = bq.query(f"SELECT DISTINCT producto FROM `{bq.project}.datamarts.dm_stock`").result()
+            assert [f.producto for f in productos] == ["Renombrado"]
+
+        # Primera construcción, sin cambios, dimensión modificada
+        assert totales == [True, False, True]
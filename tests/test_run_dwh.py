@@ -0,0 +1,87 @@
+"""Tests unitarios para el armado del script multi-statement del DWH (sin conexión a GCP)."""
+
+import pytest
+
+from src.common.sql_utils import dividir_sentencias, es_ddl, es_ddl_idempotente
+from src.dwh.run_dwh import renderizar_script, run_script, sentencia_para_linea
+
+DIM_SQL = """
+-- Dimensión
+CREATE OR REPLACE TABLE `p.dwh.dim_x` AS
+SELECT 'a;b' AS col;
+"""
+
+FACT_SQL = """
+CREATE TABLE IF NOT EXISTS `p.dwh.fact_x` (fecha DATE);
+
+-- Carga; incremental
+INSERT INTO `p.dwh.fact_x` SELECT CURRENT_DATE();
+"""
+
+
+class TestDividirSentencias:
+    def test_ignora_punto_y_coma_en_literales_y_comentarios(self):
+        sentencias = dividir_sentencias(DIM_SQL + FACT_SQL)
+        assert len(sentencias) == 3
+        assert "'a;b'" in sentencias[0]
+
+    def test_descarta_sentencias_solo_con_comentarios(self):
+        assert dividir_sentencias("-- nada;\n;\n") == []
+
+    def test_clasifica_ddl(self):
+        ddl, crear_fact, insert = dividir_sentencias(DIM_SQL + FACT_SQL)
+        assert es_ddl(ddl) and not es_ddl_idempotente(ddl)
+        assert es_ddl(crear_fact) and es_ddl_idempotente(crear_fact)
+        assert not es_ddl(insert)
+
+
+class TestRenderizarScript:
+    def test_sin_transaccion_respeta_el_orden(self):
+        script, mapa = renderizar_script([("dim_x.sql", DIM_SQL), ("fact_x.sql", FACT_SQL)], transaccion=False)
+        assert "TRANSACTION" not in script
+        assert [(s["archivo"], s["indice"]) for s in mapa] == [
+            ("dim_x.sql", 1), ("fact_x.sql", 1), ("fact_x.sql", 2),
+        ]
+
+    def test_con_transaccion_envuelve_solo_las_dml(self):
+        script, mapa = renderizar_script([("dim_x.sql", DIM_SQL), ("fact_x.sql", FACT_SQL)], transaccion=True)
+        lineas = script.splitlines()
+        inicio_tx = lineas.index("  BEGIN TRANSACTION;") + 1
+
+        crear_fact = next(s for s in mapa if s["archivo"] == "fact_x.sql" and s["indice"] == 1)
+        insert = next(s for s in mapa if s["archivo"] == "fact_x.sql" and s["indice"] == 2)
+        assert crear_fact["linea_fin"] < inicio_tx
+        assert insert["linea_inicio"] > inicio_tx
+        assert "ROLLBACK TRANSACTION;" in script
+
+    def test_ddl_no_idempotente_despues_de_dml_falla_en_transaccion(self):
+        archivos = [("fact_x.sql", FACT_SQL), ("dim_x.sql", DIM_SQL)]
+        with pytest.raises(ValueError):
+            renderizar_script(archivos, transaccion=True)
+
+    def test_mapa_de_lineas_apunta_a_la_sentencia(self):
+        script, mapa = renderizar_script([("dim_x.sql", DIM_SQL), ("fact_x.sql", FACT_SQL)], transaccion=False)
+        lineas = script.splitlines()
+        linea_insert = next(i for i, l in enumerate(lineas, start=1) if l.startswith("INSERT INTO"))
+        sentencia = sentencia_para_linea(mapa, linea_insert)
+        assert (sentencia["archivo"], sentencia["indice"]) == ("fact_x.sql", 2)
+
+
+class TestRunScript:
+    def test_el_error_del_script_no_se_pierde_si_fallan_las_estadisticas(self):
+        class JobFallido:
+            job_id = "script-1"
+
+            def result(self):
+                raise RuntimeError("fact_x.sql: error de sintaxis")
+
+        class ClienteFalso:
+            def query(self, script):
+                return JobFallido()
+
+            def list_jobs(self, parent_job=None):
+                raise ConnectionError("sin conexión")
+
+        with pytest.raises(RuntimeError, match="error de sintaxis"):
+            run_script(ClienteFalso(), [("dim_x.sql", DIM_SQL), ("fact_x.sql", FACT_SQL)], transaccion=True)
+
@@ -0,0 +1,53 @@
+"""Tests unitarios para la selección de distribuidores y el sharding."""
+
+import argparse
+
+import pytest
+
+from src.common.shards import (
+    TODOS,
+    SeleccionDistribuidores,
+    parsear_distribuidores,
+    parsear_shard,
+    shard_de,
+)
+
+
+class TestParseo:
+    def test_lista_con_rangos(self):
+        assert parsear_distribuidores("1, 3,5-7") == {1, 3, 5, 6, 7}
+
+    @pytest.mark.parametrize("texto", ["", "a", "3-1", "1,,x"])
+    def test_lista_invalida(self, texto):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parsear_distribuidores(texto)
+
+    def test_shard(self):
+        assert parsear_shard("2/4") == (2, 4)
+
+    @pytest.mark.parametrize("texto", ["0/4", "5/4", "1/0", "1", "a/b"])
+    def test_shard_invalido(self, texto):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parsear_shard(texto)
+
+
+class TestSeleccion:
+    def test_shards_cubren_sin_superponerse(self):
+        distribuidores = range(1, 21)
+        asignados = [SeleccionDistribuidores(shard=(i, 3)).filtrar(distribuidores) for i in (1, 2, 3)]
+        assert sorted(d for shard in asignados for d in shard) == list(distribuidores)
+        assert asignados[0] == [1, 4, 7, 10, 13, 16, 19]
+
+    def test_asignacion_no_depende_del_conjunto(self):
+        assert shard_de(7, 3) == 1
+        assert SeleccionDistribuidores(shard=(1, 3)).filtrar([7]) == [7]
+
+    def test_combinada(self):
+        seleccion = SeleccionDistribuidores(frozenset({1, 2, 3, 4}), (2, 2))
+        assert seleccion.filtrar(range(1, 10)) == [2, 4]
+        assert seleccion.etiqueta() == "d1_2_3_4-shard2de2"
+
+    def test_todos(self):
+        assert TODOS.todos
+        assert TODOS.filtrar([3, 1]) == [3, 1]
+        assert TODOS.etiqueta() == "todos"
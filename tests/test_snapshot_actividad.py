@@ -0,0 +1,105 @@
+"""Tests del snapshot de actividad de cliente (lógica pura y motor DuckDB local)."""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from src.dwh.run_dwh import nuevo_corte, parametros_snapshot
+
+
+class TestCorte:
+    def test_avanza_con_fechas_nuevas(self):
+        assert nuevo_corte([date(2025, 1, 3), date(2025, 1, 5)], date(2025, 1, 2)) == date(2025, 1, 5)
+
+    def test_no_retrocede_con_un_backfill(self):
+        assert nuevo_corte([date(2025, 1, 1)], date(2025, 1, 9)) == date(2025, 1, 9)
+
+    def test_sin_snapshot_previo(self):
+        params = parametros_snapshot([date(2025, 1, 2), date(2025, 1, 1)], None)
+        assert params == {
+            "fechas": [date(2025, 1, 1), date(2025, 1, 2)],
+            "corte_anterior": None,
+            "corte": date(2025, 1, 2),
+        }
+
+
+class TestSnapshotDuckDB:
+    # Cálculo completo sobre fact_ventas al corte del snapshot
+    DIRECTO = """
+    WITH diaria AS (
+      SELECT cliente_id, fecha, COUNT(*) AS lineas, SUM(venta_importe) AS importe
+      FROM dwh.fact_ventas
+      GROUP BY 1, 2
+    ),
+    corte AS (SELECT MAX(fecha) AS corte FROM dwh.fact_ventas)
+    SELECT
+      cliente_id,
+      MIN(fecha),
+      MAX(fecha),
+      COUNT(*),
+      SUM(lineas),
+      COUNT(*) FILTER (WHERE fecha > corte - 90),
+      ROUND(COALESCE(SUM(importe) FILTER (WHERE fecha > corte - 30), 0), 2),
+      ROUND(COALESCE(SUM(importe) FILTER (WHERE fecha > corte - 90), 0), 2),
+      CASE
+        WHEN corte - MAX(fecha) > 180 THEN 'BAJA'
+        WHEN corte - MAX(fecha) > 60 THEN 'INACTIVO'
+        ELSE 'ACTIVO'
+      END
+    FROM diaria, corte
+    GROUP BY cliente_id, corte
+    ORDER BY cliente_id
+    """
+
+    SNAPSHOT = """
+    SELECT
+      cliente_id, primera_compra, ultima_compra, dias_con_compra, lineas, dias_con_compra_90d,
+      ROUND(venta_importe_30d, 2), ROUND(venta_importe_90d, 2), estado
+    FROM dwh.snapshot_actividad_cliente
+    ORDER BY cliente_id
+    """
+
+    def test_incremental_igual_al_calculo_completo(self, tmp_path, monkeypatch):
+        pytest.importorskip("duckdb")
+        from src.common.duckdb_engine import MotorDuckDB
+        from src.dwh import run_dwh
+        from src.generate_data.generate_data import GeneradorDatos
+
+        monkeypatch.chdir(Path(__file__).resolve().parents[1])
+        GeneradorDatos(cant_distribuidores=1, cant_dias=120, clientes_por_dist=6, seed=0).escribir_archivos_locales(tmp_path)
+
+        motor = MotorDuckDB(ruta_db=tmp_path / "warehouse.duckdb", data_path=tmp_path)
+        run_dwh.run_local(motor)
+
+        esperado = motor.consultar(self.DIRECTO)
+        assert motor.consultar(self.SNAPSHOT) == esperado
+        assert {fila[-1] for fila in esperado} >= {"ACTIVO"}
+
+        # Desde cero, de a tramos: el corte avanza y las compras viejas salen de las ventanas
+        motor.con.execute("DROP TABLE dwh.snapshot_actividad_cliente")
+        motor.con.execute("DROP TABLE dwh.actividad_cliente_diaria")
+        fechas = [f[0] for f in motor.consultar("SELECT DISTINCT fecha FROM dwh.fact_ventas ORDER BY fecha")]
+        sql = run_dwh.load_sql_file(run_dwh.SQL_SNAPSHOT, "local")
+        anterior = None
+        for tramo in (fechas[:40], fechas[40:41], fechas[41:100], fechas[100:]):
+            params = run_dwh.parametros_snapshot(tramo, anterior)
+            motor.ejecutar(sql, "snapshot", params)
+            anterior = params["corte"]
+        assert motor.consultar(self.SNAPSHOT) == esperado
+
+        # Backfill que quita la primera compra de un cliente y las últimas de otro
+        primero, ultimo = motor.consultar("SELECT MIN(cliente_id), MAX(cliente_id) FROM dwh.fact_ventas")[0]
+        motor.con.execute("DELETE FROM dwh.fact_ventas WHERE fecha = ? AND cliente_id = ?", [fechas[0], primero])
+        motor.con.execute("DELETE FROM dwh.fact_ventas WHERE fecha > ? AND cliente_id = ?", [fechas[40], ultimo])
+        recargadas = [fechas[0]] + fechas[41:]
+        motor.ejecutar(sql, "snapshot", run_dwh.parametros_snapshot(recargadas, anterior))
+        recalculado = motor.consultar(self.DIRECTO)
+        assert motor.consultar(self.SNAPSHOT) == recalculado
+        assert recalculado[0][1] > fechas[0]
+        assert recalculado[-1][-1] == "INACTIVO"
+
+        # Reaplicar fechas ya aplicadas no cambia el snapshot
+        run_dwh.run_local(motor)
+        assert motor.consultar(self.SNAPSHOT) == motor.consultar(self.DIRECTO)
+        motor.cerrar()